@@ -1,18 +1,127 @@
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import httpx
 
 st.set_page_config(page_title="Carbon Compliance Platform", layout="wide")
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+API_HTTP2 = os.getenv("API_HTTP2", "1") == "1"
+API_CACHE_TTL_S = float(os.getenv("API_CACHE_TTL_S", "15"))
+API_CACHE_MAX = int(os.getenv("API_CACHE_MAX", "512"))
+
+
+@st.cache_resource
+def _http_pool() -> httpx.Client:
+    """Süreç genelinde tek keep-alive bağlantı havuzu: widget rerun'ları TCP/TLS kurulumunu tekrarlamaz.
+
+    Kimlik bilgisi havuzda değil istek başına header'dadır; HTTP/2 yalnız `h2` kuruluysa açılır.
+    """
+    http2 = API_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+    return httpx.Client(
+        base_url=API_BASE_URL,
+        timeout=60.0,
+        http2=http2,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0),
+    )
+
+
+@st.cache_resource
+def _fetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="api-fetch")
+
+
+# GET yanıtları için kısa TTL cache: anahtar (tenant + token özeti, URL, parametreler).
+# Kullanıcının RLS kapsamı token'a bağlı olduğundan aynı tenant'ın farklı kullanıcıları ayrı tutulur.
+_RESP_CACHE: dict = {}
+_RESP_CACHE_LOCK = threading.Lock()
+
+
+def invalidate_api_cache(scope: str | None = None) -> None:
+    with _RESP_CACHE_LOCK:
+        if scope is None:
+            _RESP_CACHE.clear()
+            return
+        for k in [k for k in _RESP_CACHE if k[0] == scope]:
+            _RESP_CACHE.pop(k, None)
+
+
+class ApiClient:
+    """Sayfalarda kullanılan httpx.Client arayüzü; havuzu kapatmaz, GET'leri cache'ler.
+
+    Yazma çağrıları (POST/PUT/PATCH/DELETE) bu kullanıcının cache'ini temizler; bir sonraki
+    liste GET'i güncel veriyi görür.
+    """
+
+    def __init__(self, headers: dict, scope: str):
+        self._headers = headers
+        self._scope = scope
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get(self, url: str, params: dict | None = None, **kwargs) -> httpx.Response:
+        if API_CACHE_TTL_S <= 0 or kwargs:
+            return _http_pool().get(url, params=params, headers=self._headers, **kwargs)
+        key = (self._scope, url, repr(sorted((params or {}).items())))
+        now = time.monotonic()
+        with _RESP_CACHE_LOCK:
+            hit = _RESP_CACHE.get(key)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        r = _http_pool().get(url, params=params, headers=self._headers)
+        if r.status_code == 200:
+            with _RESP_CACHE_LOCK:
+                if len(_RESP_CACHE) >= API_CACHE_MAX:
+                    for k in [k for k, v in _RESP_CACHE.items() if v[0] <= now] or [min(_RESP_CACHE, key=lambda k: _RESP_CACHE[k][0])]:
+                        _RESP_CACHE.pop(k, None)
+                _RESP_CACHE[key] = (now + API_CACHE_TTL_S, r)
+        return r
+
+    def _write(self, method: str, url: str, **kwargs) -> httpx.Response:
+        r = _http_pool().request(method, url, headers=self._headers, **kwargs)
+        invalidate_api_cache(self._scope)
+        return r
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self._write("POST", url, **kwargs)
 
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self._write("PUT", url, **kwargs)
 
-def api_client():
+    def patch(self, url: str, **kwargs) -> httpx.Response:
+        return self._write("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self._write("DELETE", url, **kwargs)
+
+
+def api_client() -> ApiClient:
     headers = {}
     token = st.session_state.get("access_token")
     if token:
         headers["Authorization"] = f"Bearer {token}"
-    return httpx.Client(base_url=API_BASE_URL, timeout=60.0, headers=headers)
+    scope = f"{st.session_state.get('tenant_id', '')}:{hashlib.sha256((token or '').encode('utf-8')).hexdigest()[:16]}"
+    return ApiClient(headers, scope)
+
+
+def fetch_many(requests: dict) -> dict:
+    """Bağımsız GET'leri paralel çalıştırır: {ad: (path, params)} -> {ad: httpx.Response}."""
+    c = api_client()  # session_state okuması ana thread'de
+    futures = {name: _fetch_pool().submit(c.get, path, params=params) for name, (path, params) in requests.items()}
+    return {name: f.result() for name, f in futures.items()}
 
 
 def ensure_login():
@@ -84,8 +193,7 @@ if page == "Giriş":
         email = st.text_input("E-posta", value=st.session_state.get("email", ""))
         password = st.text_input("Şifre", type="password", value="")
         if st.button("Giriş Yap"):
-            with httpx.Client(base_url=API_BASE_URL, timeout=60.0) as c:
-                r = c.post("/auth/login", json={"tenant_id": tenant_id, "email": email, "password": password})
+            r = _http_pool().post("/auth/login", json={"tenant_id": tenant_id, "email": email, "password": password})
             if r.status_code == 200:
                 st.session_state["access_token"] = r.json()["access_token"]
                 st.session_state["tenant_id"] = tenant_id
@@ -188,6 +296,7 @@ elif page == "MRV / İzleme Planı":
     fac_map = {f["name"]: f["id"] for f in facilities}
     fac_name = st.selectbox("Tesis seç", list(fac_map.keys()))
     facility_id = fac_map[fac_name]
+    bundle_path = f"/mrv/facilities/{facility_id}/bundle"
 
     colA, colB = st.columns(2)
     with colA:
@@ -216,13 +325,26 @@ elif page == "MRV / İzleme Planı":
             else:
                 st.error(r.text)
 
-        with api_client() as c:
-            r = c.get("/mrv/methodologies", params={"scope": scope, "status": "active"})
+        # methodology listesi ve tesis MRV paketi (plan/method/asset/control) paralel, tek turda
+        fetched = fetch_many({
+            "methodologies": ("/mrv/methodologies", {"scope": scope, "status": "active"}),
+            "bundle": (bundle_path, None),
+        })
+        r = fetched["methodologies"]
         if r.status_code == 200:
             st.dataframe(r.json(), use_container_width=True)
         else:
             st.error(r.text)
 
+    bundle_r = fetched["bundle"]
+    bundle = bundle_r.json() if bundle_r.status_code == 200 else {}
+
+    def _reload_bundle():
+        # yazma sonrası (cache temizlendi) paketi tazele; aynı rerun'da yeni kayıt görünür
+        global bundle_r, bundle
+        bundle_r = api_client().get(bundle_path)
+        bundle = bundle_r.json() if bundle_r.status_code == 200 else bundle
+
     with colB:
         st.subheader("Monitoring Plan Oluştur")
         version = st.number_input("Versiyon", value=1, step=1, min_value=1)
@@ -244,17 +366,16 @@ elif page == "MRV / İzleme Planı":
                 )
             if r.status_code == 200:
                 st.success("Monitoring Plan oluşturuldu.")
+                _reload_bundle()
             else:
                 st.error(r.text)
 
         st.subheader("Monitoring Plan Listesi")
-        with api_client() as c:
-            r = c.get("/mrv/monitoring-plans", params={"facility_id": facility_id})
-        plans = r.json() if r.status_code == 200 else []
-        if r.status_code == 200:
+        plans = bundle.get("monitoring_plans", [])
+        if bundle_r.status_code == 200:
             st.dataframe(plans, use_container_width=True)
         else:
-            st.error(r.text)
+            st.error(bundle_r.text)
 
         st.divider()
         st.subheader("Monitoring Method (Plan'a bağlı)")
@@ -289,16 +410,15 @@ elif page == "MRV / İzleme Planı":
                 )
             if r.status_code == 200:
                 st.success("Monitoring Method eklendi.")
+                _reload_bundle()
             else:
                 st.error(r.text)
 
         if mp_id:
-            with api_client() as c:
-                r = c.get("/mrv/monitoring-methods", params={"monitoring_plan_id": mp_id})
-            if r.status_code == 200:
-                st.dataframe(r.json(), use_container_width=True)
-            else:
-                st.error(r.text)
+            st.dataframe(
+                [m for m in bundle.get("monitoring_methods", []) if m.get("monitoring_plan_id") == mp_id],
+                use_container_width=True,
+            )
 
         st.divider()
         st.subheader("Metering Assets (Sayaç / Ölçüm ekipmanı)")
@@ -321,15 +441,11 @@ elif page == "MRV / İzleme Planı":
                 )
             if r.status_code == 200:
                 st.success("Metering Asset eklendi.")
+                _reload_bundle()
             else:
                 st.error(r.text)
 
-        with api_client() as c:
-            r = c.get("/mrv/metering-assets", params={"facility_id": facility_id})
-        if r.status_code == 200:
-            st.dataframe(r.json(), use_container_width=True)
-        else:
-            st.error(r.text)
+        st.dataframe(bundle.get("metering_assets", []), use_container_width=True)
 
         st.divider()
         st.subheader("QA/QC Controls")
@@ -350,15 +466,14 @@ elif page == "MRV / İzleme Planı":
                     )
                 if r.status_code == 200:
                     st.success("QA/QC control eklendi.")
+                    _reload_bundle()
                 else:
                     st.error(r.text)
 
-            with api_client() as c:
-                r = c.get("/mrv/qaqc-controls", params={"monitoring_plan_id": mp_id})
-            if r.status_code == 200:
-                st.dataframe(r.json(), use_container_width=True)
-            else:
-                st.error(r.text)
+            st.dataframe(
+                [q for q in bundle.get("qaqc_controls", []) if q.get("monitoring_plan_id") == mp_id],
+                use_container_width=True,
+            )
         else:
             st.info("QA/QC eklemek için önce Monitoring Plan seçin/oluşturun.")
 
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: Decimal yolu (run) vs fixed-point batch yolu (run_batch).
+
+Kullanım:
+    python -m packages.calc_core.bench_fixed_point --fuels 5000 --exports 5000 --repeats 5
+
+Her boyutta iki yolun sonucu quantize_result ile karşılaştırılır (eşit değilse AssertionError).
+batch_ms run_batch(breakdown=True) = Decimal + yayın yuvarlaması; fixed_point_no_breakdown_ms
+run_batch(breakdown=False) = fixed-point yol (yalnız toplamlar).
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from packages.calc_core.engines import ETS_CBAM_Engine, CBAM_Product_Engine
+from packages.calc_core.fixed_point import PUBLISHED_DP, quantize_result
+
+
+def _dec(rng: random.Random, lo: float, hi: float, places: int) -> Decimal:
+    return Decimal(str(round(rng.uniform(lo, hi), places)))
+
+
+def synthetic_facility(n_fuels: int, n_elec: int, n_proc: int, seed: int = 42):
+    rng = random.Random(seed)
+    fuels = [
+        SimpleNamespace(
+            fuel_type=f"fuel_{i % 7}",
+            quantity=_dec(rng, 1, 5000, 3),
+            ncv=_dec(rng, 0.01, 0.05, 5),
+            emission_factor=_dec(rng, 50, 100, 3),
+            oxidation_factor=_dec(rng, 0.95, 1.0, 3),
+        )
+        for i in range(n_fuels)
+    ]
+    electricity = [SimpleNamespace(kwh=_dec(rng, 100, 1e6, 1), grid_factor=_dec(rng, 0.0003, 0.0006, 6)) for _ in range(n_elec)]
+    processes = [
+        SimpleNamespace(process_type=f"p{i % 3}", production_qty=_dec(rng, 1, 1e4, 2), factor=_dec(rng, 0.1, 0.6, 4))
+        for i in range(n_proc)
+    ]
+    cost = SimpleNamespace(allowances=Decimal("1000"), ets_price=Decimal("82.35"))
+    return fuels, electricity, processes, cost
+
+
+def synthetic_products(n_products: int, n_precursors: int, n_exports: int, seed: int = 42):
+    rng = random.Random(seed)
+    pids = [f"P{i:04d}" for i in range(n_products)]
+    productions = [SimpleNamespace(product_id=p, quantity=_dec(rng, 10, 1e5, 3)) for p in pids]
+    precursors = [
+        SimpleNamespace(
+            product_id=rng.choice(pids), material_id=f"M{i % 50}", quantity=_dec(rng, 1, 1e4, 3), embedded_factor=_dec(rng, 0.1, 3, 4)
+        )
+        for i in range(n_precursors)
+    ]
+    exports = [
+        {"export_id": f"E{i}", "product_id": rng.choice(pids), "export_qty": _dec(rng, 1, 500, 3), "destination": "EU"}
+        for i in range(n_exports)
+    ]
+    return productions, precursors, exports
+
+
+def _time(fn, repeats: int) -> tuple[float, object]:
+    out = None
+    samples = []
+    for _ in range(max(1, repeats)):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples), out
+
+
+def run(n_fuels: int = 5000, n_exports: int = 5000, repeats: int = 5, dp: int = PUBLISHED_DP, seed: int = 42) -> list[dict]:
+    rows = []
+
+    fuels, elec, procs, cost = synthetic_facility(n_fuels, max(1, n_fuels // 10), max(1, n_fuels // 10), seed=seed)
+    eng = ETS_CBAM_Engine()
+    dec_ms, dec_res = _time(lambda: eng.run(fuels, elec, procs, cost, Decimal("250000")), repeats)
+    batch_ms, batch_res = _time(lambda: eng.run_batch(fuels, elec, procs, cost, Decimal("250000"), dp=dp), repeats)
+    lean_ms, lean_res = _time(lambda: eng.run_batch(fuels, elec, procs, cost, Decimal("250000"), dp=dp, breakdown=False), repeats)
+    assert quantize_result(dec_res, dp) == quantize_result(batch_res, dp), "ETS_CBAM_Engine: batch sonucu farklı"
+    assert quantize_result(dec_res, dp)["totals"] == lean_res["totals"]
+    rows.append({"engine": "ETS_CBAM_Engine", "rows": n_fuels, "decimal_ms": dec_ms, "batch_ms": batch_ms, "fixed_point_no_breakdown_ms": lean_ms})
+
+    productions, precursors, exports = synthetic_products(max(1, n_exports // 50), n_exports, n_exports, seed=seed)
+    facility = {"facility_tco2e": dec_res["totals"]["facility_tco2e"]}
+    peng = CBAM_Product_Engine()
+    price = Decimal("82.35")
+    dec_ms, dec_res = _time(lambda: peng.run(facility, productions, precursors, exports, price), repeats)
+    batch_ms, batch_res = _time(lambda: peng.run_batch(facility, productions, precursors, exports, price, dp=dp), repeats)
+    lean_ms, lean_res = _time(lambda: peng.run_batch(facility, productions, precursors, exports, price, dp=dp, breakdown=False), repeats)
+    assert quantize_result(dec_res, dp) == quantize_result(batch_res, dp), "CBAM_Product_Engine: batch sonucu farklı"
+    assert quantize_result(dec_res, dp)["totals"] == lean_res["totals"]
+    rows.append({"engine": "CBAM_Product_Engine", "rows": n_exports, "decimal_ms": dec_ms, "batch_ms": batch_ms, "fixed_point_no_breakdown_ms": lean_ms})
+
+    for r in rows:
+        r["speedup_no_breakdown"] = round(r["decimal_ms"] / r["fixed_point_no_breakdown_ms"], 2) if r["fixed_point_no_breakdown_ms"] > 0 else None
+    return rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="calc_core Decimal vs fixed-point micro-benchmark")
+    ap.add_argument("--fuels", type=int, default=5000)
+    ap.add_argument("--exports", type=int, default=5000)
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--dp", type=int, default=PUBLISHED_DP)
+    ap.add_argument("--seed", type=int, default=42)
+    a = ap.parse_args()
+    print(json.dumps(run(a.fuels, a.exports, a.repeats, a.dp, a.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ from packages.calc_core.models import (
     ProductionInput, PrecursorInput
 )
 from packages.calc_core.utils import d, canonical_json, sha256_text
+from packages.calc_core.fixed_point import (
+    FIXED_POINT_AVAILABLE, PUBLISHED_DP, publish_decimal_result, run_ets_cbam_batch, run_cbam_products_batch
+)
 
 class ETS_CBAM_Engine:
     """
@@ -100,6 +103,27 @@ class ETS_CBAM_Engine:
         result["meta"]["result_hash"] = result_hash
         return result
 
+    def run_batch(
+        self,
+        fuels: list[FuelInput],
+        electricity: list[ElectricityInput],
+        processes: list[ProcessInput],
+        cost: CostInputs,
+        production_total: Decimal | None = None,
+        *,
+        dp: int = PUBLISHED_DP,
+        breakdown: bool = True,
+    ) -> dict:
+        """
+        run() sonucunun dp basamakta yayınlanmış hali: meta hariç quantize_result(run(...)) ile aynı.
+        breakdown=False satır bazlı dökümü atlar ve fixed-point yolu kullanır (binlerce yakıt satırında
+        run()'dan birkaç kat hızlı). Döküm istendiğinde Decimal yolu.
+        """
+        if breakdown or not FIXED_POINT_AVAILABLE:
+            res = self.run(fuels, electricity, processes, cost, production_total)
+            return publish_decimal_result(res, dp, breakdown=breakdown)
+        return run_ets_cbam_batch(fuels, electricity, processes, cost, production_total, dp=dp)
+
 
 class CBAM_Product_Engine:
     """
@@ -216,3 +240,24 @@ class CBAM_Product_Engine:
         result_hash = sha256_text(canonical_json(result))
         result["meta"]["result_hash"] = result_hash
         return result
+
+    def run_batch(
+        self,
+        facility_totals: dict,
+        productions: list[ProductionInput],
+        precursors: list[PrecursorInput],
+        exports: list[dict],
+        ets_price_eur_per_tco2: Decimal,
+        *,
+        dp: int = PUBLISHED_DP,
+        breakdown: bool = True,
+    ) -> dict:
+        """
+        run() sonucunun dp basamakta yayınlanmış hali: meta hariç quantize_result(run(...)) ile aynı.
+        breakdown=False: fixed-point yol (öncül ve ihracat satırları ölçekli tamsayı dizileriyle), satır
+        listeleri yok. breakdown=True: Decimal yolu.
+        """
+        if breakdown or not FIXED_POINT_AVAILABLE:
+            res = self.run(facility_totals, productions, precursors, exports, ets_price_eur_per_tco2)
+            return publish_decimal_result(res, dp, breakdown=breakdown)
+        return run_cbam_products_batch(facility_totals, productions, precursors, exports, ets_price_eur_per_tco2, dp=dp)
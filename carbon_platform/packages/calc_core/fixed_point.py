@@ -0,0 +1,475 @@
+"""
+Fixed-point batch yolu (ETS_CBAM_Engine / CBAM_Product_Engine).
+
+Decimal yolu her satırda d(...) dönüşümü, Decimal çarpımı ve str() yapar. Burada girdiler kolon
+bazında bir kez ölçeklenmiş tamsayıya çevrilir (kolon ölçeği = kolondaki en fazla ondalık basamak),
+satır çarpımları/toplamları NumPy int64 dizileriyle (taşma riski varsa Python int / object dizi)
+TAM olarak hesaplanır ve sonuçlar yayın hassasiyetine (PUBLISHED_DP, ROUND_HALF_EVEN) yuvarlanır.
+
+Eşitlik garantisi (meta hariç: quantize_result(Decimal sonucu) == fixed-point sonucu):
+- Decimal bağlamı 28 anlamlı basamaktır. Tüm ara çarpım/toplamların mutlak değer üst sınırı
+  10**28 ölçekli-tamsayının altındaysa Decimal işlemleri de tamdır -> iki yol aynı tam değeri
+  aynı kuralla yuvarlar. Sınır aşılırsa ilgili bölüm Decimal ile (aynı işlem sırasıyla) hesaplanır.
+- Bölme içeren ürün başı değerler (pay, yoğunluk) sayıca azdır; Decimal zinciriyle birebir
+  hesaplanır, satır bazlı ağır kısım (öncül ve ihracat satırları) tamsayı yolundadır.
+- İhracatta yoğunluk zaten 28 basamaklıdır; Decimal yolu satır çarpımlarını/toplamı yuvarlar.
+  Tam değer, Decimal'in yuvarlama hatası üst sınırından daha uzaksa yayın orta noktasına, iki yol
+  aynı dp değerini verir; değilse ilgili değer Decimal ile yeniden hesaplanır.
+
+Fixed-point yol yalnız toplamları üretir, satır dökümü yoktur; engines.run_batch onu breakdown=False'ta
+kullanır (5k satırda run()'dan ~2.5-4x hızlı). Döküm istendiğinde maliyet dict/JSON üretimine ve
+hash'e kayar; engines.run_batch Decimal sonucunu publish_decimal_result ile yayın hassasiyetine indirir.
+NumPy kurulu değilse (FIXED_POINT_AVAILABLE=False) her durumda Decimal yolu kullanılır.
+"""
+from __future__ import annotations
+
+from decimal import Context, Decimal, ROUND_HALF_EVEN
+
+try:
+    import numpy as np
+except Exception:  # opsiyonel: yalnız fixed-point yolu için
+    np = None
+
+from packages.calc_core.utils import canonical_json, sha256_text
+
+PUBLISHED_DP = 6
+FIXED_POINT_AVAILABLE = np is not None
+
+_DEC_LIMIT = 10 ** 28  # Decimal varsayılan bağlam hassasiyeti (anlamlı basamak)
+_I64_LIMIT = 2 ** 62   # toplama payı bırakılmış int64 sınırı
+_F64_EXACT = 10 ** 15  # |ölçekli değer| bunun altındaysa float64 ayrıştırma + rint tam sonuç verir
+
+
+def _parse(v) -> tuple[int, int]:
+    """'12.345' -> (12345, 3). Üslü/özel gösterimler Decimal ile ayrıştırılır."""
+    s = v if isinstance(v, str) else str(v)
+    s = s.strip()
+    if "e" in s or "E" in s:
+        t = Decimal(s).as_tuple()
+        if not isinstance(t.exponent, int):
+            raise ValueError(f"Sayısal olmayan değer: {v!r}")
+        n = int("".join(map(str, t.digits)) or "0")
+        n = -n if t.sign else n
+        if t.exponent >= 0:
+            return n * 10 ** t.exponent, 0
+        return n, -t.exponent
+    neg = s.startswith("-")
+    body = s.lstrip("+-")
+    ip, _, fp = body.partition(".")
+    if not (ip or fp) or not (ip + fp).isdigit():
+        raise ValueError(f"Sayısal olmayan değer: {v!r}")
+    n = int((ip or "0") + fp)
+    return (-n if neg else n), len(fp)
+
+
+def _column(values) -> tuple[np.ndarray, int, np.ndarray]:
+    """Değer listesi -> (ölçekli tamsayı dizisi, ölçek üssü, aynı değerlerin float64 gölgesi).
+
+    Hızlı yol: str -> float64 (C) + ondalık basamak sayısı (NumPy string ufunc'ları). Ölçekli
+    değerler 1e15'in altındaysa float hatası (≤ 2^-52 bağıl) 0.5'ten küçüktür, rint tam tamsayıyı
+    verir. Üslü gösterim, boşluk, 1e15 üstü değerler vb. için satır satır tam ayrıştırmaya düşülür.
+    Float gölge yalnız büyüklük tahmini (taşma / 28 basamak kontrolleri) için kullanılır.
+    """
+    strs = list(map(str, values))
+    if not strs:
+        return np.zeros(0, dtype=np.int64), 0, np.zeros(0)
+    joined = "".join(strs)
+    fast = not ("e" in joined or "E" in joined or " " in joined)
+    if fast:
+        try:
+            fl = np.fromiter(map(float, strs), dtype=np.float64, count=len(strs))
+        except ValueError:
+            fast = False
+    if fast and np.isfinite(fl).all():
+        arr = np.array(strs)
+        dot = np.char.find(arr, ".")
+        frac = np.where(dot >= 0, np.char.str_len(arr) - dot - 1, 0)
+        exp = int(frac.max())
+        if exp <= 22:
+            scaled = fl * (10.0 ** exp)
+            if np.abs(scaled).max() < _F64_EXACT:
+                return np.rint(scaled).astype(np.int64), exp, scaled
+    parsed = [_parse(v) for v in strs]
+    exp = max(e for _, e in parsed)
+    ints = [n * 10 ** (exp - e) for n, e in parsed]
+    dtype = np.int64 if max(abs(n) for n in ints) < _I64_LIMIT else object
+    arr = np.array(ints, dtype=dtype)
+    return arr, exp, arr.astype(np.float64)
+
+
+def _safe(est: float, limit: int) -> bool:
+    # float tahmini + pay: gerçek değer est·(1 ± 1e-9) aralığında
+    return est * (1.0 + 1e-9) < float(limit)
+
+
+def _product(cols: list[tuple[np.ndarray, int, np.ndarray]]) -> tuple[np.ndarray, int, np.ndarray, bool]:
+    """Satır bazlı tam çarpım. Dönen: (dizi, üs, float gölge, Decimal'de tam mı).
+
+    Decimal ara çarpımları (soldan sağa) 28 basamağa sığıyorsa Decimal yolu da tamdır.
+    """
+    arr, exp, fl = cols[0]
+    exact = len(fl) == 0 or _safe(float(np.abs(fl).max()), _DEC_LIMIT)
+    for a, e, af in cols[1:]:
+        fl = fl * af
+        est = float(np.abs(fl).max()) if len(fl) else 0.0
+        exact = exact and _safe(est, _DEC_LIMIT)
+        if arr.dtype == object or a.dtype == object or not _safe(est, _I64_LIMIT):
+            arr = arr.astype(object) * a.astype(object)
+        else:
+            arr = arr * a
+        exp += e
+    return arr, exp, fl, exact
+
+
+def _abs_sum(fl: np.ndarray) -> float:
+    return float(np.abs(fl).sum()) if len(fl) else 0.0
+
+
+def _total(arr: np.ndarray, fl: np.ndarray) -> int:
+    if arr.dtype != object and _safe(_abs_sum(fl), _I64_LIMIT):
+        return int(arr.sum())
+    return sum(int(x) for x in arr.tolist())
+
+
+def _rescale(n: int, exp: int, to_exp: int) -> int:
+    return n * 10 ** (to_exp - exp)
+
+
+def _round_half_even(num: int, den: int) -> int:
+    q, r = divmod(num, den)
+    twice = 2 * r
+    if twice > den or (twice == den and q % 2 == 1):
+        q += 1
+    return q
+
+
+def _fmt_units(units: int, dp: int) -> str:
+    # yayın biçimi: sabit nokta, negatif sıfır yok ("-0.00" -> "0.00")
+    sign = "-" if units < 0 else ""
+    s = str(abs(units)).rjust(dp + 1, "0")
+    return f"{sign}{s[:-dp]}.{s[-dp:]}" if dp > 0 else f"{sign}{s}"
+
+
+def _publish(n: int, exp: int, dp: int) -> str:
+    """Tam değer n·10^-exp -> dp basamak (ROUND_HALF_EVEN) sabit gösterim."""
+    if exp <= dp:
+        return _fmt_units(n * 10 ** (dp - exp), dp)
+    return _fmt_units(_round_half_even(n, 10 ** (exp - dp)), dp)
+
+
+_CTX28 = Context(prec=28)
+
+
+def _publish_dec(x: Decimal | None, dp: int) -> str | None:
+    if x is None:
+        return None
+    need = x.adjusted() + dp + 2
+    ctx = _CTX28 if need <= 28 else Context(prec=need)
+    q = x.quantize(Decimal(1).scaleb(-dp), rounding=ROUND_HALF_EVEN, context=ctx)
+    return format(q.copy_abs() if q.is_zero() else q, "f")
+
+
+def _to_dec(n: int, exp: int) -> Decimal:
+    return Decimal(n).scaleb(-exp)
+
+
+def _dec(x) -> Decimal:
+    return x if isinstance(x, Decimal) else Decimal(str(x))
+
+
+# -----------------------------
+# Decimal sonucunu yayın hassasiyetine indirme (karşılaştırma / doğrulama)
+# -----------------------------
+PUBLISHED_KEYS = frozenset({
+    "tco2e", "fuel_tco2e", "electricity_tco2e", "process_tco2e", "facility_tco2e", "embedded_tco2e",
+    "intensity_tco2e_per_unit", "ets_payable_tco2", "ets_cost_eur", "cbam_certificates_tco2", "cbam_cost_eur",
+    "allocated_facility_tco2e", "precursor_tco2e", "embedded_tco2e_total", "embedded_intensity_tco2e_per_unit",
+    "export_embedded_tco2e", "cbam_certificates_tco2e",
+})
+
+
+def quantize_result(result, dp: int = PUBLISHED_DP):
+    """Decimal yolunun çıktısındaki hesaplanan alanları dp basamağa yuvarlar (meta hariç)."""
+    if isinstance(result, dict):
+        out = {}
+        for k, v in result.items():
+            if k == "meta":
+                continue
+            if k in PUBLISHED_KEYS and isinstance(v, str):
+                out[k] = _publish_dec(Decimal(v), dp)
+            else:
+                out[k] = quantize_result(v, dp)
+        return out
+    if isinstance(result, list):
+        return [quantize_result(x, dp) for x in result]
+    return result
+
+
+_BREAKDOWN_KEYS = {
+    "ETS_CBAM_Engine": ("breakdown",),
+    "CBAM_Product_Engine": ("precursors", "exports"),
+}
+
+
+def publish_decimal_result(result: dict, dp: int = PUBLISHED_DP, *, breakdown: bool = True) -> dict:
+    """Decimal yolunun (run) sonucu -> run_batch biçimi: dp basamak, batch meta'sı ve hash'i."""
+    engine = result["meta"]["engine"]
+    out = quantize_result(result, dp)
+    if not breakdown:
+        for k in _BREAKDOWN_KEYS.get(engine, ()):
+            out.pop(k, None)
+    return _finish(out, engine, dp, breakdown, "decimal")
+
+
+def _finish(result: dict, engine: str, dp: int, breakdown: bool, arithmetic: str) -> dict:
+    result["meta"] = {
+        "engine": engine,
+        "deterministic": True,
+        "arithmetic": arithmetic,
+        "precision_dp": dp,
+        "breakdown": bool(breakdown),
+    }
+    result["meta"]["result_hash"] = sha256_text(canonical_json(result))
+    return result
+
+
+# -----------------------------
+# ETS_CBAM_Engine batch
+# -----------------------------
+def run_ets_cbam_batch(
+    fuels,
+    electricity,
+    processes,
+    cost,
+    production_total=None,
+    *,
+    dp: int = PUBLISHED_DP,
+) -> dict:
+    fuel_cols = [_column([f.quantity for f in fuels]), _column([f.ncv for f in fuels]),
+                 _column([f.emission_factor for f in fuels]), _column([f.oxidation_factor for f in fuels])]
+    elec_cols = [_column([e.kwh for e in electricity]), _column([e.grid_factor for e in electricity])]
+    proc_cols = [_column([p.production_qty for p in processes]), _column([p.factor for p in processes])]
+
+    sections = []
+    exact = True
+    for cols, n in ((fuel_cols, len(fuels)), (elec_cols, len(electricity)), (proc_cols, len(processes))):
+        rows, exp, fl, ok = _product(cols)
+        total = _total(rows, fl) if n else 0
+        exact = exact and ok and _safe(_abs_sum(fl), _DEC_LIMIT)  # Σ|satır| 28 basamağa sığmalı
+        sections.append((rows, exp, total))
+
+    allow_n, allow_e = _parse(cost.allowances)
+    price_n, price_e = _parse(cost.ets_price)
+
+    if exact:
+        fexp = max(s[1] for s in sections)
+        fuel_t, elec_t, proc_t = (_rescale(t, e, fexp) for _, e, t in sections)
+        facility = fuel_t + elec_t + proc_t
+        pay_exp = max(fexp, allow_e)
+        payable = max(0, _rescale(facility, fexp, pay_exp) - _rescale(allow_n, allow_e, pay_exp))
+        ets_cost = payable * price_n
+        cbam_cost = facility * price_n
+        exact = all(abs(x) < _DEC_LIMIT for x in (facility, payable, ets_cost, cbam_cost))
+
+    if exact:
+        totals = {
+            "fuel_tco2e": _publish(fuel_t, fexp, dp),
+            "electricity_tco2e": _publish(elec_t, fexp, dp),
+            "process_tco2e": _publish(proc_t, fexp, dp),
+            "facility_tco2e": _publish(facility, fexp, dp),
+            "embedded_tco2e": _publish(facility, fexp, dp),
+        }
+        facility_dec = _to_dec(facility, fexp)
+        costs_num = {
+            "ets_payable_tco2": _publish(payable, pay_exp, dp),
+            "ets_cost_eur": _publish(ets_cost, pay_exp + price_e, dp),
+            "cbam_certificates_tco2": _publish(facility, fexp, dp),
+            "cbam_cost_eur": _publish(cbam_cost, fexp + price_e, dp),
+        }
+    else:
+        # 28 basamak aşıldı: Decimal yolunun işlem sırası birebir
+        fuel_em = sum((_dec(f.quantity) * _dec(f.ncv) * _dec(f.emission_factor) * _dec(f.oxidation_factor) for f in fuels), Decimal("0"))
+        elec_em = sum((_dec(e.kwh) * _dec(e.grid_factor) for e in electricity), Decimal("0"))
+        proc_em = sum((_dec(p.production_qty) * _dec(p.factor) for p in processes), Decimal("0"))
+        facility_dec = fuel_em + elec_em + proc_em
+        payable_dec = facility_dec - _dec(cost.allowances)
+        if payable_dec < 0:
+            payable_dec = Decimal("0")
+        totals = {
+            "fuel_tco2e": _publish_dec(fuel_em, dp),
+            "electricity_tco2e": _publish_dec(elec_em, dp),
+            "process_tco2e": _publish_dec(proc_em, dp),
+            "facility_tco2e": _publish_dec(facility_dec, dp),
+            "embedded_tco2e": _publish_dec(facility_dec, dp),
+        }
+        costs_num = {
+            "ets_payable_tco2": _publish_dec(payable_dec, dp),
+            "ets_cost_eur": _publish_dec(payable_dec * _dec(cost.ets_price), dp),
+            "cbam_certificates_tco2": _publish_dec(facility_dec, dp),
+            "cbam_cost_eur": _publish_dec(facility_dec * _dec(cost.ets_price), dp),
+        }
+
+    intensity = None
+    if production_total is not None and _dec(production_total) != 0:
+        intensity = facility_dec / _dec(production_total)
+    totals["intensity_tco2e_per_unit"] = _publish_dec(intensity, dp)
+
+    result = {"totals": totals}
+    result["costs"] = {
+        "ets_allowances_tco2": str(cost.allowances),
+        "ets_payable_tco2": costs_num["ets_payable_tco2"],
+        "ets_price_eur_per_tco2": str(cost.ets_price),
+        "ets_cost_eur": costs_num["ets_cost_eur"],
+        "cbam_certificates_tco2": costs_num["cbam_certificates_tco2"],
+        "cbam_cost_eur": costs_num["cbam_cost_eur"],
+    }
+    return _finish(result, "ETS_CBAM_Engine", dp, False, "fixed_point" if exact else "fixed_point+decimal_fallback")
+
+
+# -----------------------------
+# CBAM_Product_Engine batch
+# -----------------------------
+def _group_sum(codes: np.ndarray, rows: np.ndarray, fl: np.ndarray, n_groups: int) -> list[int]:
+    if rows.dtype != object and _safe(_abs_sum(fl), _I64_LIMIT):
+        out = np.zeros(n_groups, dtype=np.int64)
+        np.add.at(out, codes, rows)
+        return [int(x) for x in out.tolist()]
+    acc = [0] * n_groups
+    for c, x in zip(codes.tolist(), rows.tolist()):
+        acc[c] += int(x)
+    return acc
+
+
+def _publish_near(n: int, exp: int, err: int, dp: int) -> str | None:
+    """Tam değer n·10^-exp, Decimal sonucundan en fazla err (aynı ölçekte) sapıyorsa yayın değeri.
+
+    Tam değer bir yuvarlama orta noktasına err'den yakınsa iki yol farklı yuvarlayabilir -> None
+    (çağıran Decimal ile yeniden hesaplar).
+    """
+    if exp <= dp:
+        k = 10 ** (dp + 1 - exp)
+        n, err, exp = n * k, err * k, dp + 1
+    den = 10 ** (exp - dp)
+    if abs(2 * (n % den) - den) <= 2 * err:
+        return None
+    return _publish(n, exp, dp)
+
+
+def run_cbam_products_batch(
+    facility_totals: dict,
+    productions,
+    precursors,
+    exports: list[dict],
+    ets_price_eur_per_tco2,
+    *,
+    dp: int = PUBLISHED_DP,
+) -> dict:
+    facility_tco2e = _dec(facility_totals.get("facility_tco2e", "0"))
+    if facility_tco2e < 0:
+        facility_tco2e = Decimal("0")
+
+    prod_total = sum([_dec(p.quantity) for p in productions], Decimal("0"))
+    if prod_total <= 0:
+        raise ValueError("Ürün bazlı üretim (production_record) toplamı 0. Allocation yapılamaz.")
+
+    # ürün kodları (üretim sırası; öncül/ihracatta geçen ama üretimi olmayanlar sona)
+    pids: dict = {}
+    for p in productions:
+        pids.setdefault(p.product_id, len(pids))
+    for x in precursors:
+        pids.setdefault(x.product_id, len(pids))
+
+    # öncüller: satır bazlı tam çarpım + ürün bazlı tam toplam (O(M), NumPy)
+    exact = True
+    prec_rows, prec_exp, prec_fl, ok = _product([
+        _column([x.quantity for x in precursors]),
+        _column([x.embedded_factor for x in precursors]),
+    ])
+    exact = exact and ok and _safe(_abs_sum(prec_fl), _DEC_LIMIT)
+    codes = np.array([pids[x.product_id] for x in precursors], dtype=np.int64)
+    if exact:
+        sums = _group_sum(codes, prec_rows, prec_fl, len(pids)) if len(precursors) else [0] * len(pids)
+        prec_by_code = [_to_dec(n, prec_exp) for n in sums]
+    else:
+        prec_by_code = [Decimal("0")] * len(pids)
+        for x in precursors:
+            c = pids[x.product_id]
+            prec_by_code[c] = prec_by_code[c] + _dec(x.quantity) * _dec(x.embedded_factor)
+
+    # ürün başı değerler: sayıca az, Decimal zinciri birebir (pay/yoğunluk bölme içerir)
+    allocated = {}
+    for p in productions:
+        allocated[p.product_id] = facility_tco2e * (_dec(p.quantity) / prod_total)
+
+    product_rows = []
+    product_intensity = {}
+    for p in productions:
+        pid = p.product_id
+        alloc = allocated.get(pid, Decimal("0"))
+        prec = prec_by_code[pids[pid]]
+        embedded = alloc + prec
+        q = _dec(p.quantity)
+        intensity = embedded / q if q != 0 else None
+        product_intensity[pid] = intensity
+        product_rows.append({
+            "product_id": pid,
+            "production_qty": str(p.quantity),
+            "allocated_facility_tco2e": _publish_dec(alloc, dp),
+            "precursor_tco2e": _publish_dec(prec, dp),
+            "embedded_tco2e_total": _publish_dec(embedded, dp),
+            "embedded_intensity_tco2e_per_unit": _publish_dec(intensity, dp),
+        })
+
+    # ihracat: Decimal yolu her satırda yoğunluk×miktar'ı 28 basamağa yuvarlar ve yuvarlayarak
+    # toplar. Burada miktarlar ürün bazında tam toplanır (int64), tam toplam Σ_p I_p·X_p Python
+    # int ile hesaplanır; Decimal'in birikmiş yuvarlama hatası üst sınırı (N+2)·S·1e-27 ile
+    # yayın orta noktasına uzaklık karşılaştırılır, belirsizse Decimal ile yeniden hesaplanır.
+    for ex in exports:
+        if product_intensity.get(ex["product_id"]) is None:
+            raise ValueError(f"Ürün intensity hesaplanamadı: product_id={ex['product_id']}")
+    inten = {pid: _parse(v) for pid, v in product_intensity.items() if v is not None}
+    i_exp = max((e for _, e in inten.values()), default=0)
+    i_int = {pid: _rescale(n, e, i_exp) for pid, (n, e) in inten.items()}
+    qty_rows, q_exp, q_fl = _column([ex["export_qty"] for ex in exports])
+    ex_pids = list(dict.fromkeys(ex["product_id"] for ex in exports))
+    ex_code = {pid: i for i, pid in enumerate(ex_pids)}
+    ex_codes = np.array([ex_code[ex["product_id"]] for ex in exports], dtype=np.int64)
+    qty_by = _group_sum(ex_codes, qty_rows, q_fl, len(ex_pids)) if exports else []
+    abs_by = np.zeros(len(ex_pids))
+    if exports:
+        np.add.at(abs_by, ex_codes, np.abs(q_fl))
+
+    emb_exp = i_exp + q_exp
+    total_n = sum(i_int[pid] * x for pid, x in zip(ex_pids, qty_by))
+    scale = 10.0 ** -emb_exp
+    s_abs = sum(abs(float(product_intensity[pid])) * float(a) * 10.0 ** -q_exp for pid, a in zip(ex_pids, abs_by.tolist()))
+    err = (len(exports) + 2) * s_abs * 1e-27 * 1.01
+    price = _dec(ets_price_eur_per_tco2)
+    price_n, price_e = _parse(ets_price_eur_per_tco2)
+    cost_err = err * abs(float(price)) + s_abs * abs(float(price)) * 1e-27
+
+    total_str = _publish_near(total_n, emb_exp, int(err / scale) + 1, dp)
+    cost_str = _publish_near(total_n * price_n, emb_exp + price_e, int(cost_err / scale * 10.0 ** price_e) + 1, dp)
+    if total_str is None or cost_str is None:
+        total_dec = Decimal("0")
+        for ex in exports:
+            total_dec += _dec(product_intensity[ex["product_id"]]) * _dec(ex["export_qty"])
+        total_str = _publish_dec(total_dec, dp)
+        cost_str = _publish_dec(total_dec * price, dp)
+        exact = False
+
+    result = {
+        "facility": {
+            "facility_tco2e": _publish_dec(facility_tco2e, dp),
+            "allocation_basis": "production_share",
+            "production_total": str(prod_total),
+        },
+        "products": product_rows,
+    }
+    result["totals"] = {
+        "export_embedded_tco2e": total_str,
+        "cbam_certificates_tco2e": total_str,
+        "ets_price_eur_per_tco2": str(ets_price_eur_per_tco2),
+        "cbam_cost_eur": cost_str,
+    }
+    return _finish(result, "CBAM_Product_Engine", dp, False, "fixed_point" if exact else "fixed_point+decimal_fallback")
@@ -1,5 +1,9 @@
 import os
-from pydantic import BaseSettings
+
+try:
+    from pydantic_settings import BaseSettings  # pydantic 2 (requirements.txt)
+except ImportError:
+    from pydantic import BaseSettings
 
 
 class Settings(BaseSettings):
@@ -47,5 +51,43 @@ class Settings(BaseSettings):
 
     JWT_ALGORITHM: str = "HS256"
 
+    # Doküman storage: "local" (LOCAL_S3_ROOT altında dosya) veya "s3"
+    STORAGE_MODE: str = os.getenv(
+        "STORAGE_MODE",
+        "local"
+    )
+
+    LOCAL_S3_ROOT: str = os.getenv(
+        "LOCAL_S3_ROOT",
+        "./storage/s3"
+    )
+
+    PRESIGN_EXPIRES_SECONDS: int = int(os.getenv(
+        "PRESIGN_EXPIRES_SECONDS",
+        "900"
+    ))
+
+    AWS_S3_BUCKET: str = os.getenv("AWS_S3_BUCKET", "")
+    AWS_REGION: str = os.getenv("AWS_REGION", "")
+    AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID", "")
+    AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY", "")
+    AWS_S3_PREFIX: str = os.getenv("AWS_S3_PREFIX", "carbon-platform")
+
+    # S3 uyumlu özel endpoint (MinIO vb.); boşsa boto3 AWS bölge endpoint'ini kullanır.
+    # S3_ENDPOINT (docker-compose MinIO varsayılanı) STORAGE_MODE=s3'te kullanılmaz.
+    S3_ENDPOINT_URL: str | None = os.getenv("S3_ENDPOINT_URL") or None
+
+    # Storage I/O: boto3 çağrıları bu boyutta bir thread pool'da koşar (event loop bloklanmaz)
+    STORAGE_IO_WORKERS: int = int(os.getenv(
+        "STORAGE_IO_WORKERS",
+        "8"
+    ))
+
+    # Bu boyutun üstündeki yüklemeler multipart (part boyutu aynı; S3 min 5 MB)
+    S3_MULTIPART_CHUNK_MB: int = int(os.getenv(
+        "S3_MULTIPART_CHUNK_MB",
+        "8"
+    ))
+
 
 settings = Settings()
@@ -0,0 +1,166 @@
+"""
+Liste endpoint'leri için ortak yardımcılar: keyset (cursor) sayfalama, alan projeksiyonu, NDJSON akış.
+
+- Sıralama anahtarı (order_col, id): endpoint'in önceki sırası korunur (ürün/malzeme koduna göre,
+  dokümanlar en yeni önce, diğerleri created_at). Uygun composite index'lerle her sayfa bir index
+  range scan'dir; OFFSET yoktur, derin sayfalar da sabit maliyetlidir.
+- Sayfalama isteğe bağlıdır: limit ve cursor verilmezse tüm liste döner (eski davranış, istemciler
+  sessizce kesilmiş liste almaz). limit verilirse (veya cursor ile devam edilirse; limit yoksa
+  LIST_DEFAULT_LIMIT) sonraki sayfa X-Next-Cursor header'ında döner; gövde eskisi gibi liste kalır.
+- Cursor opaktır: base64url(JSON [sıralama değeri, id]).
+- Sıralama kolonu nullable ise anahtar coalesced_key ile sabit bir değere çekilir: (NULL, id) < (x, id)
+  karşılaştırması NULL döner ve NULL'lı satırlar sayfalar arasında kaybolur/tekrar eder.
+- fields=a,b,c ile yalnızca istenen kolonlar SELECT edilir (ORM nesnesi / Pydantic modeli kurulmaz).
+- format=ndjson toplu dışa aktarım içindir: satırlar server-side cursor ile EXPORT_PAGE_SIZE'lık
+  parçalar halinde okunup yanıt gövdesine akar (bellekte en fazla bir parça). Endpoint'in RLS'li
+  session'ı gövde akmadan kapandığından akış aynı engine üzerinde kendi session'ını açar ve RLS
+  bağlamını yeniden kurar.
+"""
+import base64
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import DateTime, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+LIST_DEFAULT_LIMIT = int(os.getenv("API_LIST_DEFAULT_LIMIT", "500"))
+LIST_MAX_LIMIT = int(os.getenv("API_LIST_MAX_LIMIT", "5000"))
+EXPORT_PAGE_SIZE = int(os.getenv("API_EXPORT_PAGE_SIZE", "5000"))
+
+# alan adı -> (SQL kolonu, dönüştürücü | None)
+FieldSpec = dict[str, tuple[Any, Callable[[Any], Any] | None]]
+
+
+def as_str(v):
+    return str(v) if v is not None else None
+
+
+def as_float(v):
+    return float(v) if v is not None else None
+
+
+def as_iso(v):
+    return v.isoformat() if v is not None else None
+
+
+@dataclass
+class ListParams:
+    limit: int | None
+    cursor: str | None
+    fields: list[str] | None
+    format: str
+
+
+def list_params(
+    limit: int | None = Query(None, ge=1, le=LIST_MAX_LIMIT, description="Sayfa boyutu; verilmezse tüm liste"),
+    cursor: str | None = Query(None, description="Önceki yanıtın X-Next-Cursor değeri"),
+    fields: str | None = Query(None, description="Virgülle ayrılmış alan listesi (projeksiyon)"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+) -> ListParams:
+    parsed = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return ListParams(limit=limit, cursor=cursor, fields=parsed or None, format=format)
+
+
+def coalesced_key(col, fill):
+    """Nullable sıralama kolonu için keyset anahtarı: COALESCE(col, fill).
+
+    fill SQL'e bind parametresi değil literal olarak yazılır; aynı ifadeyle kurulan expression index'i
+    (bkz. ddl_list_pagination.sql) planner eşleyebilsin.
+    """
+    return func.coalesce(col, literal(fill, col.type, literal_execute=True))
+
+
+def encode_cursor(key, row_id) -> str:
+    value = key.isoformat() if isinstance(key, datetime) else key
+    raw = json.dumps([value, str(row_id)], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_col) -> tuple[Any, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, rid = json.loads(raw)
+        if value is not None and isinstance(order_col.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, uuid.UUID(str(rid))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+
+
+def _projection(spec: FieldSpec, fields: list[str] | None) -> list[str]:
+    if not fields:
+        return list(spec)
+    unknown = [f for f in fields if f not in spec]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen alan(lar): {', '.join(unknown)}; geçerli: {', '.join(spec)}")
+    return list(dict.fromkeys(fields))
+
+
+def _query(conds, cols, order_col, id_col, after, limit: int | None, descending: bool):
+    q = select(*cols, order_col, id_col).where(*conds)
+    if after is not None:
+        key = tuple_(order_col, id_col)
+        bound = tuple_(literal(after[0], order_col.type), literal(after[1], id_col.type))
+        q = q.where(key < bound if descending else key > bound)
+    order = (order_col.desc(), id_col.desc()) if descending else (order_col.asc(), id_col.asc())
+    q = q.order_by(*order)
+    return q.limit(limit) if limit is not None else q
+
+
+async def _ndjson_stream(bind, ctx: dict | None, q, row: Callable[[Any], dict]):
+    async with AsyncSession(bind) as s:
+        async with s.begin():  # server-side cursor ve transaction-local RLS aynı transaction'da
+            if ctx is not None:
+                from services.api.routers.auth import apply_rls
+
+                await apply_rls(s, ctx)
+            result = await s.stream(q)
+            async for part in result.partitions(EXPORT_PAGE_SIZE):
+                yield "".join(json.dumps(row(r), ensure_ascii=False, default=str) + "\n" for r in part).encode("utf-8")
+
+
+async def list_response(
+    db,
+    *,
+    conds: list,
+    spec: FieldSpec,
+    order_col,
+    id_col,
+    params: ListParams,
+    ctx: dict | None = None,
+    descending: bool = False,
+):
+    """Liste yanıtı (JSON liste; sayfalı istekte + X-Next-Cursor) veya NDJSON akışı.
+
+    ctx: endpoint'in auth bağlamı; NDJSON akışının kendi session'ında RLS'i yeniden kurmak için.
+    """
+    names = _projection(spec, params.fields)
+    cols = [spec[n][0] for n in names]
+    convs = [spec[n][1] for n in names]
+    k = len(names)
+    after = decode_cursor(params.cursor, order_col) if params.cursor else None
+
+    def _row(r) -> dict:
+        return {n: (c(v) if c else v) for n, c, v in zip(names, convs, r[:k])}
+
+    if params.format == "ndjson":
+        q = _query(conds, cols, order_col, id_col, after, params.limit, descending)
+        return StreamingResponse(_ndjson_stream(db.bind, ctx, q, _row), media_type="application/x-ndjson")
+
+    limit = params.limit or (LIST_DEFAULT_LIMIT if params.cursor else None)
+    if limit is None:
+        res = await db.execute(_query(conds, cols, order_col, id_col, after, None, descending))
+        return JSONResponse([_row(r) for r in res.all()])
+    res = await db.execute(_query(conds, cols, order_col, id_col, after, limit + 1, descending))
+    rows = res.all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][k], rows[-1][k + 1])
+    return JSONResponse([_row(r) for r in rows], headers=headers)
@@ -1,7 +1,11 @@
 import os
+import asyncio
 import hashlib
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import BinaryIO, Optional
+from typing import AsyncIterator, BinaryIO, Optional
+from urllib.parse import quote
 import aiofiles
 
 from services.api.core.config import settings
@@ -14,6 +18,35 @@ except Exception:
     BotoConfig = None
 
 
+READ_CHUNK = 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3: son part hariç part'lar >= 5 MB olmalı
+
+_IO_POOL: ThreadPoolExecutor | None = None
+
+
+def _io_pool() -> ThreadPoolExecutor:
+    """boto3 (senkron) çağrıları için paylaşılan, sınırlı thread pool."""
+    global _IO_POOL
+    if _IO_POOL is None:
+        workers = max(1, int(getattr(settings, "STORAGE_IO_WORKERS", 8) or 8))
+        _IO_POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-io")
+    return _IO_POOL
+
+
+async def _offload(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool(), lambda: fn(*args, **kwargs))
+
+
+def content_disposition(file_name: str | None) -> str:
+    """attachment başlığı: ASCII filename= yedeği + RFC 5987 filename*= (UTF-8, Türkçe karakterler)."""
+    name = file_name or "document"
+    # "rapor_şubat.pdf" -> "rapor_subat.pdf"; ayrıştırılamayan karakterler "_"
+    base = "".join(ch for ch in unicodedata.normalize("NFKD", name) if not unicodedata.combining(ch))
+    fallback = "".join(ch if " " <= ch <= "~" and ch not in '"\\' else "_" for ch in base)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
 @dataclass
 class StoredObject:
     key: str
@@ -31,6 +64,12 @@ class StorageBase:
     async def get_bytes(self, key: str) -> bytes:
         raise NotImplementedError
 
+    async def iter_bytes(self, key: str, chunk_size: int = READ_CHUNK) -> AsyncIterator[bytes]:
+        """Nesneyi parça parça okur (StreamingResponse için). Varsayılan: get_bytes + dilimleme."""
+        data = await self.get_bytes(key)
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
     def presign_get(self, key: str, expires_seconds: int | None = None) -> str:
         raise NotImplementedError
 
@@ -59,7 +98,7 @@ class LocalStorage(StorageBase):
         size = 0
         async with aiofiles.open(path, "wb") as f:
             while True:
-                chunk = fileobj.read(1024 * 1024)
+                chunk = await _offload(fileobj.read, READ_CHUNK)
                 if not chunk:
                     break
                 size += len(chunk)
@@ -72,12 +111,28 @@ class LocalStorage(StorageBase):
         async with aiofiles.open(path, "rb") as f:
             return await f.read()
 
+    async def iter_bytes(self, key: str, chunk_size: int = READ_CHUNK) -> AsyncIterator[bytes]:
+        path = self._full_path(key)
+        async with aiofiles.open(path, "rb") as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
     def presign_get(self, key: str, expires_seconds: int | None = None) -> str:
         # Local modda presigned yerine dosya yolunu döndürür (Streamlit indirme için kullanılabilir)
         return self._full_path(key)
 
 
 class S3Storage(StorageBase):
+    """S3 (veya S3 uyumlu: MinIO vb.) backend.
+
+    boto3 senkron olduğundan her çağrı paylaşılan thread pool'a devredilir. Büyük dosyalar
+    multipart yüklenir: bellekte en fazla bir part tutulur, sha256 akış halinde hesaplanır.
+    client parametresi ile (testte) S3 uyumlu bir stand-in verilebilir.
+    """
+
     def __init__(
         self,
         bucket: str,
@@ -85,18 +140,27 @@ class S3Storage(StorageBase):
         access_key: str,
         secret_key: str,
         prefix: str = "carbon-platform",
+        endpoint_url: str | None = None,
+        client=None,
+        part_size: int | None = None,
     ):
-        if boto3 is None:
-            raise RuntimeError("boto3 bulunamadı. requirements.txt içinde boto3 olmalı.")
         self.bucket = bucket
         self.prefix = (prefix or "").strip("/")
+        mb = int(getattr(settings, "S3_MULTIPART_CHUNK_MB", 8) or 8)
+        self.part_size = max(MIN_PART_SIZE, int(part_size or mb * 1024 * 1024))
 
+        if client is not None:
+            self.client = client
+            return
+        if boto3 is None:
+            raise RuntimeError("boto3 bulunamadı. requirements.txt içinde boto3 olmalı.")
         self.client = boto3.client(
             "s3",
             region_name=region,
+            endpoint_url=endpoint_url,
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            config=BotoConfig(signature_version="s3v4"),
+            config=BotoConfig(signature_version="s3v4", max_pool_connections=max(10, int(getattr(settings, "STORAGE_IO_WORKERS", 8) or 8))),
         )
 
     def _k(self, key: str) -> str:
@@ -107,27 +171,73 @@ class S3Storage(StorageBase):
 
     async def put_bytes(self, key: str, data: bytes) -> StoredObject:
         sha = hashlib.sha256(data).hexdigest()
-        self.client.put_object(Bucket=self.bucket, Key=self._k(key), Body=data)
+        await _offload(self.client.put_object, Bucket=self.bucket, Key=self._k(key), Body=data)
         return StoredObject(key=key, sha256=sha, size=len(data))
 
+    async def _read_part(self, fileobj: BinaryIO) -> bytes:
+        buf = bytearray()
+        while len(buf) < self.part_size:
+            chunk = await _offload(fileobj.read, min(READ_CHUNK, self.part_size - len(buf)))
+            if not chunk:
+                break
+            buf.extend(chunk)
+        return bytes(buf)
+
     async def put_fileobj(self, key: str, fileobj: BinaryIO) -> StoredObject:
         h = hashlib.sha256()
-        chunks = []
+        first = await self._read_part(fileobj)
+        h.update(first)
+        if len(first) < self.part_size:
+            # tek part'a sığdı: düz put_object
+            await _offload(self.client.put_object, Bucket=self.bucket, Key=self._k(key), Body=first)
+            return StoredObject(key=key, sha256=h.hexdigest(), size=len(first))
+
+        s3_key = self._k(key)
+        mpu = await _offload(self.client.create_multipart_upload, Bucket=self.bucket, Key=s3_key)
+        upload_id = mpu["UploadId"]
+        parts = []
         size = 0
-        while True:
-            chunk = fileobj.read(1024 * 1024)
-            if not chunk:
-                break
-            chunks.append(chunk)
-            size += len(chunk)
-            h.update(chunk)
-        data = b"".join(chunks)
-        self.client.put_object(Bucket=self.bucket, Key=self._k(key), Body=data)
+        try:
+            part, number = first, 1
+            while part:
+                res = await _offload(
+                    self.client.upload_part,
+                    Bucket=self.bucket, Key=s3_key, UploadId=upload_id, PartNumber=number, Body=part,
+                )
+                parts.append({"ETag": res["ETag"], "PartNumber": number})
+                size += len(part)
+                part = await self._read_part(fileobj)
+                h.update(part)
+                number += 1
+            await _offload(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket, Key=s3_key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            try:
+                await _offload(self.client.abort_multipart_upload, Bucket=self.bucket, Key=s3_key, UploadId=upload_id)
+            except Exception:
+                pass
+            raise
         return StoredObject(key=key, sha256=h.hexdigest(), size=size)
 
     async def get_bytes(self, key: str) -> bytes:
-        obj = self.client.get_object(Bucket=self.bucket, Key=self._k(key))
-        return obj["Body"].read()
+        obj = await _offload(self.client.get_object, Bucket=self.bucket, Key=self._k(key))
+        return await _offload(obj["Body"].read)
+
+    async def iter_bytes(self, key: str, chunk_size: int = READ_CHUNK) -> AsyncIterator[bytes]:
+        obj = await _offload(self.client.get_object, Bucket=self.bucket, Key=self._k(key))
+        body = obj["Body"]
+        try:
+            while True:
+                chunk = await _offload(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            close = getattr(body, "close", None)
+            if close is not None:
+                close()
 
     def presign_get(self, key: str, expires_seconds: int | None = None) -> str:
         exp = int(expires_seconds or settings.PRESIGN_EXPIRES_SECONDS)
@@ -149,6 +259,7 @@ def build_storage() -> StorageBase:
             access_key=settings.AWS_ACCESS_KEY_ID,
             secret_key=settings.AWS_SECRET_ACCESS_KEY,
             prefix=settings.AWS_S3_PREFIX or "carbon-platform",
+            endpoint_url=settings.S3_ENDPOINT_URL,
         )
     return LocalStorage(settings.LOCAL_S3_ROOT)
 
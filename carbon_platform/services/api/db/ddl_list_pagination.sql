@@ -0,0 +1,26 @@
+-- Liste endpoint'leri için keyset sayfalama: created_at kolonları + (tenant_id, [filtre,] sıralama kolonu, id) index'leri.
+-- Ürün/malzeme listeleri koda göre sıralanır (malzeme: ux_material_tenant_code yeterli).
+-- Mevcut satırlar created_at = now() alır (eşitlik id ile kırılır).
+-- CONCURRENTLY transaction içinde çalışmaz: psql ile tek tek (autocommit) uygulayın.
+
+ALTER TABLE monitoring_plan ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE production_record ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE export_record ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_product_tenant_code
+  ON product (tenant_id, product_code, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_monitoring_plan_tenant_created
+  ON monitoring_plan (tenant_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_prod_rec_ar_created
+  ON production_record (tenant_id, activity_record_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_export_period_created
+  ON export_record (tenant_id, facility_id, period_start, period_end, created_at, id);
+-- uploaded_at nullable: doküman listesi COALESCE(uploaded_at, epoch) ile sıralanır (routers/documents.py UPLOADED_KEY)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_tenant_uploaded_key
+  ON document (tenant_id, COALESCE(uploaded_at, '1970-01-01 00:00:00+00'::timestamptz), id);
+DROP INDEX CONCURRENTLY IF EXISTS ix_document_tenant_uploaded;
+
+-- ix_scenario_run (tenant_id, scenario_id, created_at) yerine id'li sürüm
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_scenario_run_created
+  ON scenario_run (tenant_id, scenario_id, created_at, id);
+DROP INDEX CONCURRENTLY IF EXISTS ix_scenario_run;
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Boolean, ForeignKey, Numeric, Text, Index
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, Numeric, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from services.api.db.base import Base
@@ -86,6 +86,7 @@ class Product(Base):
     __table_args__ = (
         Index("ux_product_tenant_facility_code", "tenant_id", "facility_id", "product_code", unique=True),
         Index("ix_product_tenant_name", "tenant_id", "name"),
+        Index("ix_product_tenant_code", "tenant_id", "product_code", "id"),
     )
 
 class Material(Base):
@@ -137,10 +138,12 @@ class MonitoringPlan(Base):
     effective_to: Mapped[str | None] = mapped_column(String(10))
 
     overall_notes_tr: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     __table_args__ = (
         Index("ux_monitoring_plan_version", "tenant_id", "facility_id", "version", unique=True),
         Index("ix_monitoring_plan_status", "tenant_id", "facility_id", "status"),
+        Index("ix_monitoring_plan_tenant_created", "tenant_id", "created_at", "id"),
     )
 
 class MonitoringMethod(Base):
@@ -284,8 +287,12 @@ class ProductionRecord(Base):
     quantity: Mapped[float] = mapped_column(Numeric(18, 3), nullable=False)
     unit: Mapped[str] = mapped_column(String(20), nullable=False, default="ton")
     doc_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
-    __table_args__ = (Index("ux_prod_rec_unique", "tenant_id", "activity_record_id", "product_id", unique=True),)
+    __table_args__ = (
+        Index("ux_prod_rec_unique", "tenant_id", "activity_record_id", "product_id", unique=True),
+        Index("ix_prod_rec_ar_created", "tenant_id", "activity_record_id", "created_at", "id"),
+    )
 
 class MaterialInput(Base):
     __tablename__ = "material_input"
@@ -318,8 +325,12 @@ class ExportRecord(Base):
     unit: Mapped[str] = mapped_column(String(20), nullable=False, default="ton")
     destination: Mapped[str | None] = mapped_column(String(80))
     customs_doc_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
-    __table_args__ = (Index("ix_export_facility_period", "tenant_id", "facility_id", "period_start", "period_end"),)
+    __table_args__ = (
+        Index("ix_export_facility_period", "tenant_id", "facility_id", "period_start", "period_end"),
+        Index("ix_export_period_created", "tenant_id", "facility_id", "period_start", "period_end", "created_at", "id"),
+    )
 
 # -----------------------------
 # Documents / Results / Evidence
@@ -335,6 +346,16 @@ class Document(Base):
     uploaded_by: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("app_user.id"), nullable=False)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
+    # liste sırası COALESCE(uploaded_at, epoch) (routers/documents.py UPLOADED_KEY); index aynı ifadeyle
+    __table_args__ = (
+        Index(
+            "ix_document_tenant_uploaded_key",
+            "tenant_id",
+            text("COALESCE(uploaded_at, '1970-01-01 00:00:00+00'::timestamptz)"),
+            "id",
+        ),
+    )
+
 class CalculationRun(Base):
     __tablename__ = "calculation_run"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=gen_uuid)
@@ -594,4 +615,4 @@ class ScenarioRun(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
-    __table_args__ = (Index("ix_scenario_run", "tenant_id", "scenario_id", "created_at"),)
+    __table_args__ = (Index("ix_scenario_run_created", "tenant_id", "scenario_id", "created_at", "id"),)
@@ -1,12 +1,76 @@
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 from sqlalchemy.orm import Session
 
 
-def parse_excel(file_path: str):
+EXCEL_CHUNK_ROWS = 5000
 
-    df = pd.read_excel(file_path)
 
-    rows = df.to_dict(orient="records")
+def _excel_cell(cell):
+    # pandas'ın openpyxl okuyucusuyla aynı dönüşüm (boş -> "", hata -> NaN, tam sayı float -> int)
+    v = cell.value
+    if v is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        iv = int(v)
+        return iv if iv == v else float(v)
+    return v
+
+
+def iter_excel_records(file_path: str, chunk_rows: int = EXCEL_CHUNK_ROWS) -> Iterator[list]:
+    """İlk sheet'i read-only openpyxl ile satır satır okur, chunk_rows'luk kayıt listeleri üretir.
+
+    NA/header işleme pd.read_excel ile aynıdır (TextParser); tip çıkarımı parça bazındadır.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        header = None
+        buf = []
+        blank = 0
+        for row in ws.rows:
+            vals = [_excel_cell(c) for c in row]
+            while vals and vals[-1] == "":
+                vals.pop()
+            if header is None:
+                header = vals
+                continue
+            if not vals:
+                blank += 1  # ara boş satırlar korunur, sondakiler atılır
+                continue
+            buf.extend([] for _ in range(blank))
+            blank = 0
+            buf.append(vals)
+            if len(buf) >= chunk_rows:
+                yield _records(header, buf)
+                buf = []
+        if buf:
+            yield _records(header, buf)
+    finally:
+        wb.close()
+
+
+def _records(header: list, rows: list) -> list:
+    width = max([len(header)] + [len(r) for r in rows])
+    header.extend([""] * (width - len(header)))
+    data = [header] + [r + [""] * (width - len(r)) for r in rows]
+    # pd.read_excel gibi skip_blank_lines=False: tek kolonluk sheet'te ara boş satır kayıt olarak kalır
+    return TextParser(data, header=0, skip_blank_lines=False).read().to_dict(orient="records")
+
+
+def parse_excel(file_path: str):
+
+    rows = []
+    for chunk in iter_excel_records(file_path):
+        rows.extend(chunk)
 
     return rows
 
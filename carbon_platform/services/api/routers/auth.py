@@ -1,4 +1,9 @@
+import hashlib
+import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
@@ -58,33 +63,88 @@ async def login(data: dict, db=Depends(get_db)):
     )
     return {"access_token": token, "token_type": "bearer", "roles": roles, "roles_str": roles_str}
 
-async def _decode_token(token: str) -> dict:
+# Doğrulanmış token claim'leri için süreç içi, sınırlı (LRU) TTL cache.
+# Anahtar token'ın sha256'sı (ham token bellekte tutulmaz); kayıt en geç token'ın exp anında düşer.
+_TOKEN_CACHE_TTL_S = float(os.getenv("AUTH_TOKEN_CACHE_TTL_S", "60"))
+_TOKEN_CACHE_MAX = int(os.getenv("AUTH_TOKEN_CACHE_MAX", "10000"))
+_TOKEN_CACHE: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+
+def invalidate_token_cache() -> None:
+    """Token claim cache'ini temizler (ör. rol değişikliği / secret rotasyonu sonrası)."""
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE.clear()
+
+
+def _verify_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"], audience=settings.JWT_AUDIENCE, issuer=settings.JWT_ISSUER)
-        return payload
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"], audience=settings.JWT_AUDIENCE, issuer=settings.JWT_ISSUER)
     except JWTError:
         raise HTTPException(status_code=401, detail="Token geçersiz veya süresi dolmuş")
 
+
+async def _decode_token(token: str) -> dict:
+    if _TOKEN_CACHE_TTL_S <= 0 or _TOKEN_CACHE_MAX <= 0:
+        return _verify_token(token)
+
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+    with _TOKEN_CACHE_LOCK:
+        hit = _TOKEN_CACHE.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _TOKEN_CACHE.move_to_end(key)
+                return dict(hit[1])
+            _TOKEN_CACHE.pop(key, None)
+
+    payload = _verify_token(token)
+    expires = now + _TOKEN_CACHE_TTL_S
+    try:
+        expires = min(expires, float(payload["exp"]))
+    except (KeyError, TypeError, ValueError):
+        pass
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE[key] = (expires, dict(payload))
+        _TOKEN_CACHE.move_to_end(key)
+        while len(_TOKEN_CACHE) > _TOKEN_CACHE_MAX:
+            _TOKEN_CACHE.popitem(last=False)
+    return payload
+
 async def get_current_context(token: Annotated[str, Depends(oauth2_scheme)]) -> dict:
     p = await _decode_token(token)
     if "tid" not in p or "uid" not in p:
         raise HTTPException(status_code=401, detail="Token eksik")
     return {"tid": p["tid"], "uid": p["uid"], "roles": p.get("roles", [])}
 
+# Üç session değişkeni tek statement / tek round trip ile (transaction-local: is_local=true,
+# pool'a dönen bağlantıda başka tenant'ın değeri kalmaz)
+_RLS_SET_SQL = text(
+    "SELECT set_config('app.tenant_id', :tid, true), "
+    "set_config('app.user_id', :uid, true), "
+    "set_config('app.roles', :roles, true)"
+)
+
+
+async def set_rls_context(db, ctx: dict) -> None:
+    await db.execute(_RLS_SET_SQL, {"tid": str(ctx["tid"]), "uid": str(ctx["uid"]), "roles": ",".join(ctx.get("roles", []))})
+
+async def apply_rls(db, ctx: dict) -> None:
+    """RLS açıksa session değişkenlerini kurar (endpoint dışı session'lar için de: NDJSON akışı)."""
+    if settings.RLS_ENABLED:
+        await set_rls_context(db, ctx)
+
 async def get_current_db_with_rls(
     ctx: Annotated[dict, Depends(get_current_context)],
     db=Depends(get_db)
 ):
     """
-    RLS session vars:
+    RLS session vars (tek round trip):
       app.tenant_id
       app.user_id
       app.roles
     """
-    if settings.RLS_ENABLED:
-        await db.execute(text("SELECT set_config('app.tenant_id', :tid, true)"), {"tid": ctx["tid"]})
-        await db.execute(text("SELECT set_config('app.user_id', :uid, true)"), {"uid": ctx["uid"]})
-        await db.execute(text("SELECT set_config('app.roles', :roles, true)"), {"roles": ",".join(ctx.get("roles", []))})
+    await apply_rls(db, ctx)
     return ctx, db
 
 @router.get("/me")
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import insert, select
+from sqlalchemy import insert
 from services.api.routers.auth import get_current_db_with_rls
 from services.api.db.models import Product, Material
 from services.api.schemas.catalog import ProductCreate, ProductOut, MaterialCreate, MaterialOut
 from services.api.core.audit import write_audit_log
+from services.api.core.listing import ListParams, as_str, list_params, list_response
 
 router = APIRouter()
 
@@ -33,23 +34,27 @@ async def create_product(data: ProductCreate, ctx_db=Depends(get_current_db_with
     )
 
 @router.get("/products", response_model=list[ProductOut])
-async def list_products(ctx_db=Depends(get_current_db_with_rls), facility_id: str | None = None):
+async def list_products(
+    ctx_db=Depends(get_current_db_with_rls),
+    facility_id: str | None = None,
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    q = select(Product).where(Product.tenant_id == ctx["tid"])
+    conds = [Product.tenant_id == ctx["tid"]]
     if facility_id:
-        q = q.where(Product.facility_id == facility_id)
-    res = await db.execute(q.order_by(Product.product_code.asc()))
-    items = res.scalars().all()
-    return [
-        ProductOut(
-            id=str(x.id),
-            facility_id=str(x.facility_id),
-            product_code=x.product_code,
-            name=x.name,
-            unit=x.unit,
-            cn_code=x.cn_code
-        ) for x in items
-    ]
+        conds.append(Product.facility_id == facility_id)
+    spec = {
+        "id": (Product.id, as_str),
+        "facility_id": (Product.facility_id, as_str),
+        "product_code": (Product.product_code, None),
+        "name": (Product.name, None),
+        "unit": (Product.unit, None),
+        "cn_code": (Product.cn_code, None),
+    }
+    # önceki sıra: ürün koduna göre
+    return await list_response(
+        db, conds=conds, spec=spec, order_col=Product.product_code, id_col=Product.id, params=params, ctx=ctx
+    )
 
 @router.post("/materials", response_model=MaterialOut)
 async def create_material(data: MaterialCreate, ctx_db=Depends(get_current_db_with_rls)):
@@ -75,16 +80,17 @@ async def create_material(data: MaterialCreate, ctx_db=Depends(get_current_db_wi
     )
 
 @router.get("/materials", response_model=list[MaterialOut])
-async def list_materials(ctx_db=Depends(get_current_db_with_rls)):
+async def list_materials(ctx_db=Depends(get_current_db_with_rls), params: ListParams = Depends(list_params)):
     ctx, db = ctx_db
-    res = await db.execute(select(Material).where(Material.tenant_id == ctx["tid"]).order_by(Material.material_code.asc()))
-    items = res.scalars().all()
-    return [
-        MaterialOut(
-            id=str(x.id),
-            material_code=x.material_code,
-            name=x.name,
-            unit=x.unit,
-            embedded_factor_id=str(x.embedded_factor_id) if x.embedded_factor_id else None,
-        ) for x in items
-    ]
+    spec = {
+        "id": (Material.id, as_str),
+        "material_code": (Material.material_code, None),
+        "name": (Material.name, None),
+        "unit": (Material.unit, None),
+        "embedded_factor_id": (Material.embedded_factor_id, as_str),
+    }
+    # önceki sıra: malzeme koduna göre
+    return await list_response(
+        db, conds=[Material.tenant_id == ctx["tid"]], spec=spec, order_col=Material.material_code, id_col=Material.id,
+        params=params, ctx=ctx,
+    )
@@ -1,15 +1,18 @@
 import json
+from collections import defaultdict
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import insert, select, delete
 from services.api.routers.auth import get_current_db_with_rls
+from services.api.core.listing import ListParams, as_float, as_str, list_params, list_response
 from services.api.schemas.cbam import (
     ProductionRecordCreate, MaterialInputCreate, ExportRecordCreate,
-    CBAMRunCreate, CBAMRunOut
+    CBAMRunCreate, CBAMRunOut, CBAMBatchRunCreate, CBAM_BATCH_MAX
 )
 from services.api.db.models import (
     ProductionRecord, MaterialInput, ExportRecord,
-    CalculationRun, Product, Material, EmissionFactor,
+    CalculationRun, Product, Material,
     CBAMReport, CBAMReportLine, ComplianceCheck
 )
 from services.api.core.audit import write_audit_log, canonical_json, sha256_text
@@ -37,20 +40,29 @@ async def add_production(data: ProductionRecordCreate, ctx_db=Depends(get_curren
     return {"id": str(pid)}
 
 @router.get("/production", response_model=list[dict])
-async def list_production(activity_record_id: str, ctx_db=Depends(get_current_db_with_rls)):
+async def list_production(
+    activity_record_id: str,
+    ctx_db=Depends(get_current_db_with_rls),
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    res = await db.execute(
-        select(ProductionRecord).where(ProductionRecord.tenant_id == ctx["tid"], ProductionRecord.activity_record_id == activity_record_id)
+    spec = {
+        "id": (ProductionRecord.id, as_str),
+        "activity_record_id": (ProductionRecord.activity_record_id, as_str),
+        "product_id": (ProductionRecord.product_id, as_str),
+        "quantity": (ProductionRecord.quantity, as_float),
+        "unit": (ProductionRecord.unit, None),
+        "doc_id": (ProductionRecord.doc_id, as_str),
+    }
+    return await list_response(
+        db,
+        conds=[ProductionRecord.tenant_id == ctx["tid"], ProductionRecord.activity_record_id == activity_record_id],
+        spec=spec,
+        order_col=ProductionRecord.created_at,
+        id_col=ProductionRecord.id,
+        params=params,
+        ctx=ctx,
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "activity_record_id": str(x.activity_record_id),
-        "product_id": str(x.product_id),
-        "quantity": float(x.quantity),
-        "unit": x.unit,
-        "doc_id": str(x.doc_id) if x.doc_id else None
-    } for x in items]
 
 @router.post("/material-inputs", response_model=dict)
 async def add_material_input(data: MaterialInputCreate, ctx_db=Depends(get_current_db_with_rls)):
@@ -107,108 +119,128 @@ async def add_export(data: ExportRecordCreate, ctx_db=Depends(get_current_db_wit
     return {"id": str(eid)}
 
 @router.get("/exports", response_model=list[dict])
-async def list_exports(facility_id: str, period_start: str, period_end: str, ctx_db=Depends(get_current_db_with_rls)):
+async def list_exports(
+    facility_id: str,
+    period_start: str,
+    period_end: str,
+    ctx_db=Depends(get_current_db_with_rls),
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    res = await db.execute(
-        select(ExportRecord).where(
-            ExportRecord.tenant_id == ctx["tid"],
-            ExportRecord.facility_id == facility_id,
-            ExportRecord.period_start == period_start,
-            ExportRecord.period_end == period_end
-        )
+    spec = {
+        "id": (ExportRecord.id, as_str),
+        "facility_id": (ExportRecord.facility_id, as_str),
+        "product_id": (ExportRecord.product_id, as_str),
+        "quantity": (ExportRecord.quantity, as_float),
+        "unit": (ExportRecord.unit, None),
+        "destination": (ExportRecord.destination, None),
+        "period_start": (ExportRecord.period_start, None),
+        "period_end": (ExportRecord.period_end, None),
+    }
+    conds = [
+        ExportRecord.tenant_id == ctx["tid"],
+        ExportRecord.facility_id == facility_id,
+        ExportRecord.period_start == period_start,
+        ExportRecord.period_end == period_end,
+    ]
+    return await list_response(
+        db, conds=conds, spec=spec, order_col=ExportRecord.created_at, id_col=ExportRecord.id, params=params, ctx=ctx
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "facility_id": str(x.facility_id),
-        "product_id": str(x.product_id),
-        "quantity": float(x.quantity),
-        "unit": x.unit,
-        "destination": x.destination,
-        "period_start": x.period_start,
-        "period_end": x.period_end
-    } for x in items]
 
-@router.post("/run", response_model=CBAMRunOut)
-async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls)):
-    ctx, db = ctx_db
+# -----------------------------
+# CBAM run: gruplanmış girdiler (run başına sabit sayıda sorgu)
+# -----------------------------
+async def _load_run_inputs(db, tenant_id: str, activity_record_ids: list[str]) -> dict:
+    """Bir veya birden çok activity record için tüm girdiler: sabit sayıda sorgu.
+
+    Dönen indexler:
+      productions[ar_id]              -> [ProductionRecord]
+      materials[(ar_id, product_id)]  -> [MaterialInput]
 
+    Emisyon faktörleri yüklenmez: hesap katalog alanlarını kullanır (önceki tüm-faktör sorgusu
+    sonuçta kullanılmıyordu).
+    """
     prod_res = await db.execute(
         select(ProductionRecord).where(
-            ProductionRecord.tenant_id == ctx["tid"],
-            ProductionRecord.activity_record_id == data.activity_record_id
+            ProductionRecord.tenant_id == tenant_id,
+            ProductionRecord.activity_record_id.in_(activity_record_ids)
         )
     )
-    productions = prod_res.scalars().all()
+    productions: dict[str, list] = defaultdict(list)
+    for p in prod_res.scalars().all():
+        productions[str(p.activity_record_id)].append(p)
 
     mat_res = await db.execute(
         select(MaterialInput).where(
-            MaterialInput.tenant_id == ctx["tid"],
-            MaterialInput.activity_record_id == data.activity_record_id
+            MaterialInput.tenant_id == tenant_id,
+            MaterialInput.activity_record_id.in_(activity_record_ids)
         )
     )
-    materials = mat_res.scalars().all()
-
-    prod_ids = {p.product_id for p in productions}
-    if not prod_ids:
-        raise HTTPException(status_code=400, detail="Üretim kaydı yok. Önce production girin.")
-
-    prod_catalog_res = await db.execute(
-        select(Product).where(Product.tenant_id == ctx["tid"], Product.id.in_(list(prod_ids)))
-    )
-    prod_catalog = {str(p.id): p for p in prod_catalog_res.scalars().all()}
+    materials: dict[tuple[str, str], list] = defaultdict(list)
+    mat_ids = set()
+    for m in mat_res.scalars().all():
+        materials[(str(m.activity_record_id), str(m.product_id))].append(m)
+        mat_ids.add(m.material_id)
+
+    prod_ids = {p.product_id for rows in productions.values() for p in rows}
+    prod_catalog = {}
+    if prod_ids:
+        prod_catalog_res = await db.execute(
+            select(Product).where(Product.tenant_id == tenant_id, Product.id.in_(list(prod_ids)))
+        )
+        prod_catalog = {str(p.id): p for p in prod_catalog_res.scalars().all()}
 
-    mat_ids = {m.material_id for m in materials}
     mat_catalog = {}
     if mat_ids:
         mat_catalog_res = await db.execute(
-            select(Material).where(Material.tenant_id == ctx["tid"], Material.id.in_(list(mat_ids)))
+            select(Material).where(Material.tenant_id == tenant_id, Material.id.in_(list(mat_ids)))
         )
         mat_catalog = {str(m.id): m for m in mat_catalog_res.scalars().all()}
 
-    ef_res = await db.execute(
-        select(EmissionFactor).where(EmissionFactor.tenant_id == ctx["tid"])
-    )
-    factors = ef_res.scalars().all()
+    return {
+        "productions": productions,
+        "materials": materials,
+        "prod_catalog": prod_catalog,
+        "mat_catalog": mat_catalog,
+    }
 
-    factor_index = {}
-    for f in factors:
-        key = f"{f.factor_type}:{f.scope}:{f.key}"
-        factor_index[key] = f
 
-    engine = CBAM_Product_Engine()
+def _compute_lines(activity_record_id: str, inputs: dict, engine: CBAM_Product_Engine) -> tuple[list[dict], Decimal]:
+    """O(P + M): her üretim kaydı yalnız kendi (ar, product) malzeme grubunu gezer."""
+    prod_catalog = inputs["prod_catalog"]
+    mat_catalog = inputs["mat_catalog"]
 
     out_lines = []
     total_embedded = Decimal("0")
 
-    for p in productions:
+    for p in inputs["productions"].get(str(activity_record_id), []):
         prod_obj = prod_catalog.get(str(p.product_id))
         if not prod_obj:
             continue
 
-        direct = Decimal(str(getattr(prod_obj, "direct_emissions_per_unit", 0) or 0)) * Decimal(str(p.quantity))
-        elec = Decimal(str(getattr(prod_obj, "electricity_emissions_per_unit", 0) or 0)) * Decimal(str(p.quantity))
-        process = Decimal(str(getattr(prod_obj, "process_emissions_per_unit", 0) or 0)) * Decimal(str(p.quantity))
+        qty = Decimal(str(p.quantity))
+        direct = Decimal(str(getattr(prod_obj, "direct_emissions_per_unit", 0) or 0)) * qty
+        elec = Decimal(str(getattr(prod_obj, "electricity_emissions_per_unit", 0) or 0)) * qty
+        process = Decimal(str(getattr(prod_obj, "process_emissions_per_unit", 0) or 0)) * qty
 
         prec_inputs = []
-        for m in materials:
-            if str(m.product_id) != str(p.product_id):
-                continue
+        for m in inputs["materials"].get((str(activity_record_id), str(p.product_id)), []):
             mat_obj = mat_catalog.get(str(m.material_id))
             if not mat_obj:
                 continue
-            embedded_per_unit = Decimal(str(getattr(mat_obj, "embedded_emissions_per_unit", 0) or 0))
+            m_qty = Decimal(str(m.quantity))
+            per_unit = Decimal(str(getattr(mat_obj, "embedded_emissions_per_unit", 0) or 0))
             prec_inputs.append(
                 PrecursorInput(
                     precursor_id=str(mat_obj.id),
-                    quantity=Decimal(str(m.quantity)),
-                    embedded_emissions=embedded_per_unit * Decimal(str(m.quantity))
+                    quantity=m_qty,
+                    embedded_emissions=per_unit * m_qty
                 )
             )
 
         prod_input = ProductionInput(
             product_id=str(p.product_id),
-            quantity=Decimal(str(p.quantity)),
+            quantity=qty,
             direct_emissions=direct,
             electricity_emissions=elec,
             process_emissions=process,
@@ -231,14 +263,22 @@ async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls))
             "intensity": float(result.intensity)
         })
 
+    return out_lines, total_embedded
+
+
+async def _persist_run(
+    db, ctx: dict, *, facility_id: str, activity_record_id: str, period_start: str, period_end: str,
+    ets_price, method, notes, out_lines: list[dict], total_embedded: Decimal
+) -> dict:
+    price = Decimal(str(ets_price))
     payload = {
-        "activity_record_id": data.activity_record_id,
+        "activity_record_id": activity_record_id,
         "lines": out_lines,
         "total_embedded_emissions": float(total_embedded),
-        "ets_price": float(data.ets_price),
-        "cbam_cost": float(total_embedded * Decimal(str(data.ets_price))),
-        "method": data.method,
-        "notes": data.notes
+        "ets_price": float(ets_price),
+        "cbam_cost": float(total_embedded * price),
+        "method": method,
+        "notes": notes
     }
     canonical = canonical_json(payload)
     payload_hash = sha256_text(canonical)
@@ -246,7 +286,7 @@ async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls))
     run_res = await db.execute(
         insert(CalculationRun).values(
             tenant_id=ctx["tid"],
-            facility_id=data.facility_id,
+            facility_id=facility_id,
             run_type="cbam",
             payload_json=canonical,
             payload_hash=payload_hash,
@@ -258,40 +298,45 @@ async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls))
     rep_res = await db.execute(
         insert(CBAMReport).values(
             tenant_id=ctx["tid"],
-            facility_id=data.facility_id,
-            activity_record_id=data.activity_record_id,
-            period_start=data.period_start,
-            period_end=data.period_end,
+            facility_id=facility_id,
+            activity_record_id=activity_record_id,
+            period_start=period_start,
+            period_end=period_end,
             run_id=run_id,
             total_embedded_emissions=total_embedded,
-            ets_price=Decimal(str(data.ets_price)),
-            cbam_cost=total_embedded * Decimal(str(data.ets_price)),
-            method=data.method,
-            notes=data.notes
+            ets_price=price,
+            cbam_cost=total_embedded * price,
+            method=method,
+            notes=notes
         ).returning(CBAMReport.id)
     )
     report_id = rep_res.scalar_one()
 
-    for line in out_lines:
+    if out_lines:
+        # tek executemany (satır başına round-trip yok)
         await db.execute(
-            insert(CBAMReportLine).values(
-                tenant_id=ctx["tid"],
-                report_id=report_id,
-                product_id=line["product_id"],
-                quantity=Decimal(str(line["quantity"])),
-                embedded_emissions=Decimal(str(line["embedded_emissions"])),
-                direct_emissions=Decimal(str(line["direct_emissions"])),
-                electricity_emissions=Decimal(str(line["electricity_emissions"])),
-                process_emissions=Decimal(str(line["process_emissions"])),
-                precursor_emissions=Decimal(str(line["precursor_emissions"])),
-                intensity=Decimal(str(line["intensity"]))
-            )
+            insert(CBAMReportLine),
+            [
+                {
+                    "tenant_id": ctx["tid"],
+                    "report_id": report_id,
+                    "product_id": line["product_id"],
+                    "quantity": Decimal(str(line["quantity"])),
+                    "embedded_emissions": Decimal(str(line["embedded_emissions"])),
+                    "direct_emissions": Decimal(str(line["direct_emissions"])),
+                    "electricity_emissions": Decimal(str(line["electricity_emissions"])),
+                    "process_emissions": Decimal(str(line["process_emissions"])),
+                    "precursor_emissions": Decimal(str(line["precursor_emissions"])),
+                    "intensity": Decimal(str(line["intensity"]))
+                }
+                for line in out_lines
+            ]
         )
 
     await db.execute(
         insert(ComplianceCheck).values(
             tenant_id=ctx["tid"],
-            facility_id=data.facility_id,
+            facility_id=facility_id,
             check_type="cbam_report_generated",
             status="pass",
             details_json=json.dumps({"report_id": str(report_id), "run_id": str(run_id)})
@@ -304,17 +349,111 @@ async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls))
         None, payload
     )
 
+    return {
+        "run_id": str(run_id),
+        "report_id": str(report_id),
+        "total_embedded_emissions": float(total_embedded),
+        "ets_price": float(ets_price),
+        "cbam_cost": float(total_embedded * price),
+        "payload_hash": payload_hash,
+        "lines": out_lines,
+    }
+
+
+@router.post("/run", response_model=CBAMRunOut)
+async def run_cbam(data: CBAMRunCreate, ctx_db=Depends(get_current_db_with_rls)):
+    ctx, db = ctx_db
+
+    inputs = await _load_run_inputs(db, ctx["tid"], [data.activity_record_id])
+    if not inputs["productions"].get(str(data.activity_record_id)):
+        raise HTTPException(status_code=400, detail="Üretim kaydı yok. Önce production girin.")
+
+    out_lines, total_embedded = _compute_lines(data.activity_record_id, inputs, CBAM_Product_Engine())
+    run = await _persist_run(
+        db, ctx,
+        facility_id=data.facility_id,
+        activity_record_id=data.activity_record_id,
+        period_start=data.period_start,
+        period_end=data.period_end,
+        ets_price=data.ets_price_eur_per_tco2,
+        method=data.method,
+        notes=data.notes,
+        out_lines=out_lines,
+        total_embedded=total_embedded,
+    )
+
     await db.commit()
 
     return CBAMRunOut(
-        run_id=str(run_id),
-        report_id=str(report_id),
-        total_embedded_emissions=float(total_embedded),
-        ets_price=float(data.ets_price),
-        cbam_cost=float(total_embedded * Decimal(str(data.ets_price))),
-        payload_hash=payload_hash
+        run_id=run["run_id"],
+        report_id=run["report_id"],
+        total_embedded_emissions=run["total_embedded_emissions"],
+        ets_price=run["ets_price"],
+        cbam_cost=run["cbam_cost"],
+        payload_hash=run["payload_hash"]
     )
 
+
+@router.post("/run/batch")
+async def run_cbam_batch(data: CBAMBatchRunCreate, ctx_db=Depends(get_current_db_with_rls)):
+    """Çok sayıda activity_record_id için CBAM run; sonuçlar NDJSON olarak akıtılır.
+
+    Girdiler sabit sayıda sorguyla (IN ...) bir kez yüklenir; her record için rapor yazılır ve
+    tek commit yapılır. RLS'li session yanıt gövdesi akmaya başlamadan kapandığından DB işi
+    endpoint içinde biter; akış, record başına bir satır + son özet satırıdır.
+    Üretim kaydı olmayan record'lar {"status": "skipped"} satırı üretir.
+    """
+    ctx, db = ctx_db
+
+    ar_ids = list(dict.fromkeys(str(x) for x in data.activity_record_ids))
+    if not ar_ids:
+        raise HTTPException(status_code=400, detail="activity_record_ids boş olamaz")
+    if len(ar_ids) > CBAM_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"En fazla {CBAM_BATCH_MAX} activity_record_id gönderilebilir")
+
+    inputs = await _load_run_inputs(db, ctx["tid"], ar_ids)
+    engine = CBAM_Product_Engine()
+
+    rows = []
+    for ar_id in ar_ids:
+        if not inputs["productions"].get(ar_id):
+            rows.append({"activity_record_id": ar_id, "status": "skipped", "detail": "Üretim kaydı yok"})
+            continue
+        out_lines, total_embedded = _compute_lines(ar_id, inputs, engine)
+        run = await _persist_run(
+            db, ctx,
+            facility_id=data.facility_id,
+            activity_record_id=ar_id,
+            period_start=data.period_start,
+            period_end=data.period_end,
+            ets_price=data.ets_price_eur_per_tco2,
+            method=data.method,
+            notes=data.notes,
+            out_lines=out_lines,
+            total_embedded=total_embedded,
+        )
+        if not data.include_lines:
+            run.pop("lines", None)
+        rows.append({"activity_record_id": ar_id, "status": "completed", **run})
+
+    await db.commit()
+
+    summary = {
+        "summary": True,
+        "requested": len(ar_ids),
+        "completed": sum(1 for r in rows if r["status"] == "completed"),
+        "skipped": sum(1 for r in rows if r["status"] == "skipped"),
+        "total_embedded_emissions": sum(r.get("total_embedded_emissions", 0.0) for r in rows),
+        "cbam_cost": sum(r.get("cbam_cost", 0.0) for r in rows),
+    }
+
+    def _ndjson():
+        for r in rows:
+            yield json.dumps(r, ensure_ascii=False) + "\n"
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
 @router.delete("/report/{report_id}", response_model=dict)
 async def delete_report(report_id: str, ctx_db=Depends(get_current_db_with_rls)):
     ctx, db = ctx_db
@@ -1,15 +1,21 @@
 import uuid
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import insert, select
 from services.api.routers.auth import get_current_db_with_rls
 from services.api.db.models import Document
-from services.api.core.storage import storage
+from services.api.core.storage import content_disposition, storage
 from services.api.schemas.documents import DocumentOut, PresignOut
 from services.api.core.audit import write_audit_log
+from services.api.core.listing import ListParams, as_str, coalesced_key, list_params, list_response
 from services.api.core.config import settings
 
 router = APIRouter()
 
+# uploaded_at nullable: NULL'lar epoch'a çekilir (en yeni önce sırada en sona düşer, keyset'te kaybolmaz)
+UPLOADED_KEY = coalesced_key(Document.uploaded_at, datetime(1970, 1, 1, tzinfo=timezone.utc))
+
 @router.post("/upload", response_model=DocumentOut)
 async def upload_document(
     ctx_db=Depends(get_current_db_with_rls),
@@ -50,17 +56,26 @@ async def upload_document(
     )
 
 @router.get("/", response_model=list[DocumentOut])
-async def list_documents(ctx_db=Depends(get_current_db_with_rls), doc_type: str | None = None):
+async def list_documents(
+    ctx_db=Depends(get_current_db_with_rls),
+    doc_type: str | None = None,
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    q = select(Document).where(Document.tenant_id == ctx["tid"])
+    conds = [Document.tenant_id == ctx["tid"]]
     if doc_type:
-        q = q.where(Document.doc_type == doc_type)
-    res = await db.execute(q.order_by(Document.uploaded_at.desc()))
-    items = res.scalars().all()
-    return [
-        DocumentOut(id=str(d.id), file_name=d.file_name, doc_type=d.doc_type, s3_key=d.s3_key, sha256=d.sha256)
-        for d in items
-    ]
+        conds.append(Document.doc_type == doc_type)
+    spec = {
+        "id": (Document.id, as_str),
+        "file_name": (Document.file_name, None),
+        "doc_type": (Document.doc_type, None),
+        "s3_key": (Document.s3_key, None),
+        "sha256": (Document.sha256, None),
+    }
+    # en yeni önce (önceki davranış: uploaded_at desc)
+    return await list_response(
+        db, conds=conds, spec=spec, order_col=UPLOADED_KEY, id_col=Document.id, params=params, ctx=ctx, descending=True
+    )
 
 @router.get("/{document_id}/presign", response_model=PresignOut)
 async def presign_document(document_id: str, ctx_db=Depends(get_current_db_with_rls)):
@@ -71,3 +86,17 @@ async def presign_document(document_id: str, ctx_db=Depends(get_current_db_with_
         raise HTTPException(status_code=404, detail="Doküman bulunamadı")
     url = storage.presign_get(doc.s3_key, expires_seconds=settings.PRESIGN_EXPIRES_SECONDS)
     return PresignOut(url=url, expires_seconds=settings.PRESIGN_EXPIRES_SECONDS)
+
+@router.get("/{document_id}/download")
+async def download_document(document_id: str, ctx_db=Depends(get_current_db_with_rls)):
+    """Dokümanı storage'dan parça parça akıtır (tüm dosya belleğe alınmaz)."""
+    ctx, db = ctx_db
+    res = await db.execute(select(Document).where(Document.tenant_id == ctx["tid"], Document.id == document_id))
+    doc = res.scalar_one_or_none()
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Doküman bulunamadı")
+    return StreamingResponse(
+        storage.iter_bytes(doc.s3_key),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": content_disposition(doc.file_name), "X-Content-SHA256": doc.sha256 or ""},
+    )
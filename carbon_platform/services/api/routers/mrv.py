@@ -9,9 +9,57 @@ from services.api.db.models import (
     Methodology, MonitoringPlan, MonitoringMethod, MeteringAsset, QAQCControl
 )
 from services.api.core.audit import write_audit_log
+from services.api.core.listing import ListParams, as_iso, as_str, list_params, list_response
 
 router = APIRouter()
 
+
+def _plan_out(x) -> dict:
+    return {
+        "id": str(x.id),
+        "facility_id": str(x.facility_id),
+        "version": x.version,
+        "status": x.status,
+        "effective_from": x.effective_from,
+        "effective_to": x.effective_to,
+        "overall_notes_tr": x.overall_notes_tr,
+        "created_at": as_iso(x.created_at),
+    }
+
+
+def _method_out(x) -> dict:
+    return {
+        "id": str(x.id),
+        "monitoring_plan_id": str(x.monitoring_plan_id),
+        "emission_source": x.emission_source,
+        "method_type": x.method_type,
+        "tier_level": x.tier_level,
+        "uncertainty_class": x.uncertainty_class,
+        "methodology_id": as_str(x.methodology_id),
+        "reference_standard": x.reference_standard,
+    }
+
+
+def _asset_out(x) -> dict:
+    return {
+        "id": str(x.id),
+        "facility_id": str(x.facility_id),
+        "asset_type": x.asset_type,
+        "serial_no": x.serial_no,
+        "calibration_schedule": x.calibration_schedule,
+        "last_calibration_doc_id": as_str(x.last_calibration_doc_id),
+    }
+
+
+def _control_out(x) -> dict:
+    return {
+        "id": str(x.id),
+        "monitoring_plan_id": str(x.monitoring_plan_id),
+        "control_type": x.control_type,
+        "frequency": x.frequency,
+        "acceptance_criteria_tr": x.acceptance_criteria_tr,
+    }
+
 # ----------------------------
 # Methodology Registry
 # ----------------------------
@@ -72,12 +120,10 @@ async def create_monitoring_plan(data: MonitoringPlanCreate, ctx_db=Depends(get_
         insert(MonitoringPlan).values(
             tenant_id=ctx["tid"],
             facility_id=data.facility_id,
-            name=data.name,
-            period_start=data.period_start,
-            period_end=data.period_end,
-            methodology_id=data.methodology_id,
-            status=data.status,
-            notes=data.notes
+            version=data.version,
+            effective_from=data.effective_from,
+            effective_to=data.effective_to,
+            overall_notes_tr=data.overall_notes_tr,
         ).returning(MonitoringPlan.id)
     )
     pid = res.scalar_one()
@@ -86,23 +132,28 @@ async def create_monitoring_plan(data: MonitoringPlanCreate, ctx_db=Depends(get_
     return {"id": str(pid)}
 
 @router.get("/monitoring-plans", response_model=list[dict])
-async def list_monitoring_plans(facility_id: str | None = None, ctx_db=Depends(get_current_db_with_rls)):
+async def list_monitoring_plans(
+    facility_id: str | None = None,
+    ctx_db=Depends(get_current_db_with_rls),
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    q = select(MonitoringPlan).where(MonitoringPlan.tenant_id == ctx["tid"])
+    conds = [MonitoringPlan.tenant_id == ctx["tid"]]
     if facility_id:
-        q = q.where(MonitoringPlan.facility_id == facility_id)
-    res = await db.execute(q)
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "facility_id": str(x.facility_id),
-        "name": x.name,
-        "period_start": x.period_start,
-        "period_end": x.period_end,
-        "methodology_id": str(x.methodology_id) if x.methodology_id else None,
-        "status": x.status,
-        "notes": x.notes
-    } for x in items]
+        conds.append(MonitoringPlan.facility_id == facility_id)
+    spec = {
+        "id": (MonitoringPlan.id, as_str),
+        "facility_id": (MonitoringPlan.facility_id, as_str),
+        "version": (MonitoringPlan.version, None),
+        "status": (MonitoringPlan.status, None),
+        "effective_from": (MonitoringPlan.effective_from, None),
+        "effective_to": (MonitoringPlan.effective_to, None),
+        "overall_notes_tr": (MonitoringPlan.overall_notes_tr, None),
+        "created_at": (MonitoringPlan.created_at, as_iso),
+    }
+    return await list_response(
+        db, conds=conds, spec=spec, order_col=MonitoringPlan.created_at, id_col=MonitoringPlan.id, params=params, ctx=ctx
+    )
 
 @router.delete("/monitoring-plans/{plan_id}", response_model=dict)
 async def delete_monitoring_plan(plan_id: str, ctx_db=Depends(get_current_db_with_rls)):
@@ -140,16 +191,7 @@ async def list_monitoring_methods(monitoring_plan_id: str, ctx_db=Depends(get_cu
     res = await db.execute(
         select(MonitoringMethod).where(MonitoringMethod.tenant_id == ctx["tid"], MonitoringMethod.monitoring_plan_id == monitoring_plan_id)
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "monitoring_plan_id": str(x.monitoring_plan_id),
-        "category": x.category,
-        "method": x.method,
-        "data_source": x.data_source,
-        "uncertainty": float(x.uncertainty) if x.uncertainty is not None else None,
-        "notes": x.notes
-    } for x in items]
+    return [_method_out(x) for x in res.scalars().all()]
 
 # ----------------------------
 # Metering Assets
@@ -178,15 +220,7 @@ async def list_metering_assets(facility_id: str, ctx_db=Depends(get_current_db_w
     res = await db.execute(
         select(MeteringAsset).where(MeteringAsset.tenant_id == ctx["tid"], MeteringAsset.facility_id == facility_id)
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "facility_id": str(x.facility_id),
-        "asset_name": x.asset_name,
-        "asset_type": x.asset_type,
-        "calibration_due": x.calibration_due,
-        "notes": x.notes
-    } for x in items]
+    return [_asset_out(x) for x in res.scalars().all()]
 
 # ----------------------------
 # QA/QC Controls
@@ -216,13 +250,43 @@ async def list_qaqc_controls(monitoring_plan_id: str, ctx_db=Depends(get_current
     res = await db.execute(
         select(QAQCControl).where(QAQCControl.tenant_id == ctx["tid"], QAQCControl.monitoring_plan_id == monitoring_plan_id)
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "monitoring_plan_id": str(x.monitoring_plan_id),
-        "control_name": x.control_name,
-        "frequency": x.frequency,
-        "owner": x.owner,
-        "evidence_required": bool(x.evidence_required),
-        "notes": x.notes
-    } for x in items]
+    return [_control_out(x) for x in res.scalars().all()]
+
+# ----------------------------
+# Facility bundle (UI: tek çağrıda plan + method + asset + control)
+# ----------------------------
+@router.get("/facilities/{facility_id}/bundle", response_model=dict)
+async def facility_mrv_bundle(facility_id: str, ctx_db=Depends(get_current_db_with_rls)):
+    """Tesisin izleme planları, planlara bağlı method/QA-QC kayıtları ve sayaçları.
+
+    UI'ın 4 ayrı GET'i yerine tek istek: tek auth/RLS kurulumu, plan başına sorgu yok
+    (method ve control'ler plan id'leri IN (...) ile tek sorguda).
+    """
+    ctx, db = ctx_db
+    plan_res = await db.execute(
+        select(MonitoringPlan).where(MonitoringPlan.tenant_id == ctx["tid"], MonitoringPlan.facility_id == facility_id)
+    )
+    plans = plan_res.scalars().all()
+    plan_ids = [p.id for p in plans]
+
+    methods, controls = [], []
+    if plan_ids:
+        m_res = await db.execute(
+            select(MonitoringMethod).where(MonitoringMethod.tenant_id == ctx["tid"], MonitoringMethod.monitoring_plan_id.in_(plan_ids))
+        )
+        methods = m_res.scalars().all()
+        c_res = await db.execute(
+            select(QAQCControl).where(QAQCControl.tenant_id == ctx["tid"], QAQCControl.monitoring_plan_id.in_(plan_ids))
+        )
+        controls = c_res.scalars().all()
+    a_res = await db.execute(
+        select(MeteringAsset).where(MeteringAsset.tenant_id == ctx["tid"], MeteringAsset.facility_id == facility_id)
+    )
+
+    return {
+        "facility_id": facility_id,
+        "monitoring_plans": [_plan_out(x) for x in plans],
+        "monitoring_methods": [_method_out(x) for x in methods],
+        "metering_assets": [_asset_out(x) for x in a_res.scalars().all()],
+        "qaqc_controls": [_control_out(x) for x in controls],
+    }
@@ -10,6 +10,7 @@ from services.api.db.models import (
     Scenario, ScenarioAssumption, ScenarioRun, Facility, EmissionFactor
 )
 from services.api.core.audit import write_audit_log, canonical_json, sha256_text
+from services.api.core.listing import ListParams, as_str, list_params, list_response
 from packages.calc_core.engines import Scenario_Engine
 
 router = APIRouter()
@@ -180,16 +181,25 @@ async def run_scenario(data: ScenarioRunCreate, ctx_db=Depends(get_current_db_wi
     return {"id": str(rid), "payload_hash": payload_hash}
 
 @router.get("/runs", response_model=list[dict])
-async def list_runs(scenario_id: str, ctx_db=Depends(get_current_db_with_rls)):
+async def list_runs(
+    scenario_id: str,
+    ctx_db=Depends(get_current_db_with_rls),
+    params: ListParams = Depends(list_params),
+):
     ctx, db = ctx_db
-    res = await db.execute(
-        select(ScenarioRun).where(ScenarioRun.tenant_id == ctx["tid"], ScenarioRun.scenario_id == scenario_id)
+    spec = {
+        "id": (ScenarioRun.id, as_str),
+        "scenario_id": (ScenarioRun.scenario_id, as_str),
+        "facility_id": (ScenarioRun.facility_id, as_str),
+        "payload_hash": (ScenarioRun.payload_hash, None),
+        "status": (ScenarioRun.status, None),
+    }
+    return await list_response(
+        db,
+        conds=[ScenarioRun.tenant_id == ctx["tid"], ScenarioRun.scenario_id == scenario_id],
+        spec=spec,
+        order_col=ScenarioRun.created_at,
+        id_col=ScenarioRun.id,
+        params=params,
+        ctx=ctx,
     )
-    items = res.scalars().all()
-    return [{
-        "id": str(x.id),
-        "scenario_id": str(x.scenario_id),
-        "facility_id": str(x.facility_id),
-        "payload_hash": x.payload_hash,
-        "status": x.status
-    } for x in items]
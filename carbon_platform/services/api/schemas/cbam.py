@@ -32,6 +32,8 @@ class CBAMRunCreate(BaseModel):
     period_start: str
     period_end: str
     ets_price_eur_per_tco2: float = 75.0
+    method: str = "default"
+    notes: str | None = None
 
     # CBAM-IR transitional header fields (audit ready)
     declarant_name: str | None = None
@@ -39,6 +41,18 @@ class CBAMRunCreate(BaseModel):
     installation_country: str | None = None
     methodology_note_tr: str | None = None
 
+CBAM_BATCH_MAX = 500
+
+class CBAMBatchRunCreate(BaseModel):
+    facility_id: str
+    activity_record_ids: list[str]
+    period_start: str
+    period_end: str
+    ets_price_eur_per_tco2: float = 75.0
+    method: str = "default"
+    notes: str | None = None
+    include_lines: bool = False
+
 class CBAMRunOut(BaseModel):
     report_id: str
     report_hash: str
@@ -0,0 +1,95 @@
+"""
+carbon_platform testleri için ortak hazırlık.
+
+- Kök dizinden (python -m pytest) çalıştırıldığında da `packages` / `services` import edilebilsin
+  diye carbon_platform dizini sys.path'e eklenir.
+- Bu ağaçta bulunmayan modüller (packages.calc_core.models / utils, services.api.db.base,
+  services.api.db.session, services.api.core.audit) için test-yerel, bellek içi karşılıklar kurulur. Gerçek modül varsa
+  dokunulmaz; stub'lar yalnızca testlerin import zinciri için gereken en küçük yüzeydir.
+"""
+import hashlib
+import importlib.util
+import json
+import sys
+import types
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _missing(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is None
+    except ModuleNotFoundError:
+        return True
+
+
+def _install(name: str, **attrs) -> None:
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+
+
+def _canonical_json(obj) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _sha256_text(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+class _Input(types.SimpleNamespace):
+    """calc_core girdi modelleri yerine: alanları kwargs ile taşır."""
+
+
+if _missing("packages.calc_core.models"):
+    _install(
+        "packages.calc_core.models",
+        FuelInput=_Input,
+        ElectricityInput=_Input,
+        ProcessInput=_Input,
+        CostInputs=_Input,
+        ProductionInput=_Input,
+        PrecursorInput=_Input,
+    )
+
+if _missing("packages.calc_core.utils"):
+    _install(
+        "packages.calc_core.utils",
+        d=lambda x: x if isinstance(x, Decimal) else Decimal(str(x)),
+        canonical_json=_canonical_json,
+        sha256_text=_sha256_text,
+    )
+
+if _missing("services.api.db.base"):
+    from sqlalchemy.orm import DeclarativeBase
+
+    class Base(DeclarativeBase):
+        pass
+
+    _install("services.api.db.base", Base=Base)
+
+if _missing("services.api.db.session"):
+
+    async def _get_db():
+        raise RuntimeError("test stub: services.api.db.session yok")
+        yield  # pragma: no cover
+
+    _install("services.api.db.session", get_db=_get_db)
+
+if _missing("services.api.core.audit"):
+    AUDIT_CALLS: list = []
+
+    async def _write_audit_log(db, tenant_id, user_id, action, entity_type, entity_id, before, after):
+        AUDIT_CALLS.append((action, entity_type, entity_id))
+
+    _install(
+        "services.api.core.audit",
+        write_audit_log=_write_audit_log,
+        canonical_json=_canonical_json,
+        sha256_text=_sha256_text,
+        AUDIT_CALLS=AUDIT_CALLS,
+    )
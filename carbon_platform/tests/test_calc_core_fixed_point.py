@@ -0,0 +1,92 @@
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+engines = pytest.importorskip("packages.calc_core.engines")
+
+from packages.calc_core.fixed_point import quantize_result, run_cbam_products_batch, run_ets_cbam_batch  # noqa: E402
+
+ETS = engines.ETS_CBAM_Engine()
+PROD = engines.CBAM_Product_Engine()
+
+# yuvarlama orta noktaları, negatif sıfır, üslü gösterim, 28 basamağı aşan değerler
+EDGE = ["0", "0.0000005", "0.0000015", "-0.0000004", "1E-7", "2.5e3", "123456789012345678.123456789", "99999999999999.9999995"]
+
+
+def _val(rng: random.Random) -> str:
+    if rng.random() < 0.15:
+        return rng.choice(EDGE)
+    return str(round(rng.uniform(-50, 5000), rng.randint(0, 7)))
+
+
+def _ets_inputs(rng: random.Random, n: int):
+    fuels = [
+        SimpleNamespace(fuel_type=f"f{i % 3}", quantity=_val(rng), ncv=_val(rng), emission_factor=_val(rng), oxidation_factor=_val(rng))
+        for i in range(n)
+    ]
+    electricity = [SimpleNamespace(kwh=_val(rng), grid_factor=_val(rng)) for _ in range(rng.randint(0, n))]
+    processes = [SimpleNamespace(process_type="p", production_qty=_val(rng), factor=_val(rng)) for _ in range(rng.randint(0, n))]
+    cost = SimpleNamespace(allowances=Decimal(_val(rng)), ets_price=Decimal(str(round(rng.uniform(0, 120), 2))))
+    production_total = rng.choice([None, Decimal("0"), Decimal(_val(rng))])
+    return fuels, electricity, processes, cost, production_total
+
+
+def _product_inputs(rng: random.Random, n: int):
+    pids = [f"P{i}" for i in range(rng.randint(1, 6))]
+    productions = [SimpleNamespace(product_id=p, quantity=str(round(rng.uniform(1, 1e5), rng.randint(0, 4)))) for p in pids]
+    precursors = [
+        SimpleNamespace(product_id=rng.choice(pids), material_id=f"M{i}", quantity=_val(rng), embedded_factor=_val(rng))
+        for i in range(n)
+    ]
+    exports = [
+        {"export_id": f"E{i}", "product_id": rng.choice(pids), "export_qty": Decimal(_val(rng)), "destination": "EU"}
+        for i in range(n)
+    ]
+    facility = {"facility_tco2e": rng.choice(["0", "-5", _val(rng), "12345.6789012345"])}
+    return facility, productions, precursors, exports, Decimal(str(round(rng.uniform(0, 120), 2)))
+
+
+def _published(result: dict, drop: tuple = ()) -> dict:
+    return {k: v for k, v in result.items() if k != "meta" and k not in drop}
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_ets_batch_matches_quantized_decimal(seed):
+    rng = random.Random(seed)
+    args = _ets_inputs(rng, rng.randint(0, 40))
+    expected = quantize_result(ETS.run(*args))
+
+    assert _published(ETS.run_batch(*args)) == expected
+    lean = ETS.run_batch(*args, breakdown=False)
+    assert _published(lean) == _published(expected, ("breakdown",)) == _published(run_ets_cbam_batch(*args))
+    assert lean["meta"]["arithmetic"].startswith("fixed_point") and lean["meta"]["breakdown"] is False
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_product_batch_matches_quantized_decimal(seed):
+    rng = random.Random(seed)
+    args = _product_inputs(rng, rng.randint(0, 40))
+    expected = quantize_result(PROD.run(*args))
+
+    assert _published(PROD.run_batch(*args)) == expected
+    lean = PROD.run_batch(*args, breakdown=False)
+    assert _published(lean) == _published(expected, ("precursors", "exports")) == _published(run_cbam_products_batch(*args))
+    assert lean["meta"]["arithmetic"].startswith("fixed_point")
+
+
+def test_facility_total_is_published_at_dp():
+    rng = random.Random(0)
+    _, productions, precursors, exports, price = _product_inputs(rng, 3)
+    res = PROD.run_batch({"facility_tco2e": "0"}, productions, precursors, exports, price, breakdown=False)
+    assert res["facility"]["facility_tco2e"] == "0.000000"
+
+
+def test_batch_falls_back_to_decimal_without_numpy(monkeypatch):
+    monkeypatch.setattr(engines, "FIXED_POINT_AVAILABLE", False)
+    args = _ets_inputs(random.Random(3), 10)
+    res = ETS.run_batch(*args, breakdown=False)
+    assert res["meta"]["arithmetic"] == "decimal"
+    assert res["totals"] == quantize_result(ETS.run(*args))["totals"]
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jose")
+pytest.importorskip("passlib")
+pytest.importorskip("aiosqlite")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+from services.api.db.models import Base, Material, MaterialInput, Product, ProductionRecord  # noqa: E402
+from services.api.routers import cbam  # noqa: E402
+from services.api.schemas.cbam import CBAMBatchRunCreate, CBAMRunCreate  # noqa: E402
+
+def _u(n: int) -> uuid.UUID:
+    # sqlite "UUID" kolonu NUMERIC affinity alır; yalnız rakamlı hex'ler int'e döner
+    return uuid.UUID(int=(0xA << 124) | n)
+
+
+TID = _u(1)
+OTHER_TID = _u(2)
+FAC = _u(10)
+AR1, AR2, AR3 = _u(101), _u(102), _u(103)
+P1, P2 = _u(201), _u(202)
+M1, M2 = _u(301), _u(302)
+
+
+class _Engine:
+    """compute_product: direct + electricity + process + precursor toplamı (router'ın beklediği arayüz)."""
+
+    def compute_product(self, x):
+        prec = sum((p.embedded_emissions for p in x.precursors), Decimal("0"))
+        embedded = x.direct_emissions + x.electricity_emissions + x.process_emissions + prec
+        return SimpleNamespace(
+            embedded_emissions=embedded,
+            direct_emissions=x.direct_emissions,
+            electricity_emissions=x.electricity_emissions,
+            process_emissions=x.process_emissions,
+            precursor_emissions=prec,
+            intensity=embedded / x.quantity,
+        )
+
+
+async def _with_db(fn, path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    tables = [Product.__table__, Material.__table__, ProductionRecord.__table__, MaterialInput.__table__]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=tables))
+    try:
+        async with AsyncSession(engine) as db:
+            db.add_all(
+                [
+                    Product(id=P1, tenant_id=TID, facility_id=FAC, product_code="P1", name="Klinker", unit="ton"),
+                    Product(id=P2, tenant_id=TID, facility_id=FAC, product_code="P2", name="Çimento", unit="ton"),
+                    Material(id=M1, tenant_id=TID, material_code="M1", name="Kireçtaşı", unit="ton"),
+                    Material(id=M2, tenant_id=TID, material_code="M2", name="Alçı", unit="ton"),
+                    ProductionRecord(id=_u(401), tenant_id=TID, activity_record_id=AR1, product_id=P1, quantity=100, unit="ton"),
+                    ProductionRecord(id=_u(402), tenant_id=TID, activity_record_id=AR1, product_id=P2, quantity=50, unit="ton"),
+                    ProductionRecord(id=_u(403), tenant_id=TID, activity_record_id=AR2, product_id=P1, quantity=10, unit="ton"),
+                    # başka tenant: yüklenmemeli
+                    ProductionRecord(id=_u(404), tenant_id=OTHER_TID, activity_record_id=AR1, product_id=P1, quantity=999, unit="ton"),
+                    MaterialInput(id=_u(501), tenant_id=TID, activity_record_id=AR1, product_id=P1, material_id=M1, quantity=3, unit="ton"),
+                    MaterialInput(id=_u(502), tenant_id=TID, activity_record_id=AR1, product_id=P2, material_id=M2, quantity=1, unit="ton"),
+                    MaterialInput(id=_u(503), tenant_id=TID, activity_record_id=AR2, product_id=P1, material_id=M1, quantity=2, unit="ton"),
+                ]
+            )
+            await db.commit()
+            return await fn(db)
+    finally:
+        await engine.dispose()
+
+
+class _CountingDB:
+    def __init__(self, db):
+        self.db = db
+        self.statements = 0
+        self.commits = 0
+
+    async def execute(self, *a, **kw):
+        self.statements += 1
+        return await self.db.execute(*a, **kw)
+
+    async def commit(self):
+        self.commits += 1
+        await self.db.commit()
+
+
+def _uuid_ids(load):
+    """asyncpg str id'leri kabul eder; sqlite'ın UUID bind'ı uuid.UUID ister."""
+
+    async def _load(db, tenant_id, ids):
+        return await load(db, tenant_id, [uuid.UUID(str(x)) for x in ids])
+
+    return _load
+
+
+def test_load_run_inputs_groups_by_record_in_fixed_queries(tmp_path):
+    async def run(db):
+        cdb = _CountingDB(db)
+        inputs = await _uuid_ids(cbam._load_run_inputs)(cdb, TID, [str(AR1), str(AR2), str(AR3)])
+        return inputs, cdb.statements
+
+    inputs, statements = asyncio.run(_with_db(run, tmp_path / "cbam.db"))
+    # production, material_input, product, material: record sayısından bağımsız
+    assert statements == 4
+    assert set(inputs) == {"productions", "materials", "prod_catalog", "mat_catalog"}
+    assert sorted(float(p.quantity) for p in inputs["productions"][str(AR1)]) == [50.0, 100.0]
+    assert [float(p.quantity) for p in inputs["productions"][str(AR2)]] == [10.0]
+    assert str(AR3) not in inputs["productions"]
+    assert {k: len(v) for k, v in inputs["materials"].items()} == {(str(AR1), str(P1)): 1, (str(AR1), str(P2)): 1, (str(AR2), str(P1)): 1}
+    assert set(inputs["prod_catalog"]) == {str(P1), str(P2)} and set(inputs["mat_catalog"]) == {str(M1), str(M2)}
+
+
+def test_compute_lines_uses_catalog_values_per_product_group():
+    prod = SimpleNamespace(id=P1, direct_emissions_per_unit="0.5", electricity_emissions_per_unit="0.1", process_emissions_per_unit=None)
+    mat = SimpleNamespace(id=M1, embedded_emissions_per_unit="2", embedded_factor_id=_u(900))
+    inputs = {
+        "productions": {str(AR1): [SimpleNamespace(product_id=P1, quantity=Decimal("100")), SimpleNamespace(product_id=P2, quantity=Decimal("5"))]},
+        "materials": {
+            (str(AR1), str(P1)): [SimpleNamespace(material_id=M1, quantity=Decimal("3"), embedded_factor_id=_u(901))],
+            (str(AR2), str(P1)): [SimpleNamespace(material_id=M1, quantity=Decimal("1000"), embedded_factor_id=None)],
+        },
+        "prod_catalog": {str(P1): prod},  # P2 katalogda yok -> satır atlanır
+        "mat_catalog": {str(M1): mat},
+    }
+    lines, total = cbam._compute_lines(str(AR1), inputs, _Engine())
+    assert lines == [
+        {
+            "product_id": str(P1),
+            "quantity": 100.0,
+            "embedded_emissions": 66.0,
+            "direct_emissions": 50.0,
+            "electricity_emissions": 10.0,
+            "process_emissions": 0.0,
+            # faktör id'leri yok sayılır: katalog embedded_emissions_per_unit * miktar (baseline)
+            "precursor_emissions": 6.0,
+            "intensity": 0.66,
+        }
+    ]
+    assert total == Decimal("66.0")
+
+
+def test_run_batch_streams_rows_and_commits_once(tmp_path, monkeypatch):
+    persisted = []
+
+    async def _persist(db, ctx, **kw):
+        persisted.append(kw)
+        price = Decimal(str(kw["ets_price"]))
+        return {
+            "run_id": f"run-{len(persisted)}",
+            "report_id": f"rep-{len(persisted)}",
+            "total_embedded_emissions": float(kw["total_embedded"]),
+            "ets_price": float(kw["ets_price"]),
+            "cbam_cost": float(kw["total_embedded"] * price),
+            "payload_hash": "h",
+            "lines": kw["out_lines"],
+        }
+
+    monkeypatch.setattr(cbam, "_persist_run", _persist)
+    monkeypatch.setattr(cbam, "CBAM_Product_Engine", _Engine)
+    monkeypatch.setattr(cbam, "_load_run_inputs", _uuid_ids(cbam._load_run_inputs))
+
+    async def run(db):
+        cdb = _CountingDB(db)
+        data = CBAMBatchRunCreate(
+            facility_id=str(FAC),
+            activity_record_ids=[str(AR1), str(AR3), str(AR1), str(AR2)],
+            period_start="2026-01-01",
+            period_end="2026-03-31",
+            ets_price_eur_per_tco2=80.0,
+        )
+        resp = await cbam.run_cbam_batch(data, ctx_db=({"tid": TID, "uid": _u(7)}, cdb))
+        body = b"".join([c if isinstance(c, bytes) else c.encode() async for c in resp.body_iterator])
+        return resp, body, cdb
+
+    resp, body, cdb = asyncio.run(_with_db(run, tmp_path / "cbam.db"))
+    assert resp.media_type == "application/x-ndjson"
+    rows = [json.loads(x) for x in body.decode("utf-8").splitlines()]
+    assert [(r.get("activity_record_id"), r.get("status")) for r in rows[:-1]] == [
+        (str(AR1), "completed"),
+        (str(AR3), "skipped"),
+        (str(AR2), "completed"),
+    ]
+    assert all("lines" not in r for r in rows[:-1])  # include_lines=False
+    summary = rows[-1]
+    assert summary["summary"] is True and (summary["requested"], summary["completed"], summary["skipped"]) == (3, 2, 1)
+    assert cdb.commits == 1 and cdb.statements == 4  # girdiler tek seferde; persist stub'lı
+    assert [p["activity_record_id"] for p in persisted] == [str(AR1), str(AR2)]
+    assert all(p["ets_price"] == 80.0 and p["method"] == "default" for p in persisted)
+
+
+def test_run_batch_rejects_empty_and_oversized_requests(monkeypatch):
+    monkeypatch.setattr(cbam, "CBAM_BATCH_MAX", 2)
+    ctx_db = ({"tid": TID, "uid": TID}, None)
+    for ids in ([], ["a", "b", "c"]):
+        data = CBAMBatchRunCreate(facility_id="f", activity_record_ids=ids, period_start="2026-01-01", period_end="2026-03-31")
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(cbam.run_cbam_batch(data, ctx_db=ctx_db))
+        assert e.value.status_code == 400
+
+
+def test_run_and_batch_schemas_share_price_field():
+    single = CBAMRunCreate(facility_id="f", activity_record_id="a", period_start="s", period_end="e", ets_price_eur_per_tco2=90)
+    batch = CBAMBatchRunCreate(facility_id="f", activity_record_ids=["a"], period_start="s", period_end="e", ets_price_eur_per_tco2=90)
+    assert single.ets_price_eur_per_tco2 == batch.ets_price_eur_per_tco2 == 90.0
+    assert (single.method, single.notes) == (batch.method, batch.notes) == ("default", None)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import DateTime, String, Uuid  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column  # noqa: E402
+
+from services.api.core import listing  # noqa: E402
+from services.api.core.listing import ListParams, as_iso, as_str, coalesced_key, list_response  # noqa: E402
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class _Item(_Base):
+    __tablename__ = "list_item"
+    id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True)
+    code: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    uploaded_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+SPEC = {"id": (_Item.id, as_str), "code": (_Item.code, None), "created_at": (_Item.created_at, as_iso)}
+N = 23
+
+
+async def _with_items(fn, path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(_Base.metadata.create_all)
+    t0 = datetime(2026, 1, 1)
+    async with AsyncSession(engine) as db:
+        # kod sırası ekleme sırasının tersi; iki satır aynı kodda (eşitlik id ile kırılır)
+        # uploaded_at: her 5. satır NULL, diğerleri ikişer ikişer aynı zamanda
+        db.add_all(
+            _Item(
+                id=uuid.UUID(int=i + 1),
+                code=f"C{(N - i) // 2:03d}",
+                created_at=t0 + timedelta(minutes=i),
+                uploaded_at=None if i % 5 == 0 else t0 + timedelta(minutes=i // 2),
+            )
+            for i in range(N)
+        )
+        await db.commit()
+        try:
+            return await fn(db)
+        finally:
+            await engine.dispose()
+
+
+def _params(**kw) -> ListParams:
+    return ListParams(**{"limit": None, "cursor": None, "fields": None, "format": "json", **kw})
+
+
+async def _list(db, order_col=_Item.code, **kw):
+    return await list_response(db, conds=[], spec=SPEC, order_col=order_col, id_col=_Item.id, params=_params(**kw))
+
+
+def _expected(key):
+    rows = sorted(range(N), key=lambda i: (key(i), uuid.UUID(int=i + 1)))
+    return [str(uuid.UUID(int=i + 1)) for i in rows]
+
+
+def test_without_limit_returns_everything_in_code_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(listing, "LIST_DEFAULT_LIMIT", 5)
+
+    async def run(db):
+        return await _list(db)
+
+    resp = asyncio.run(_with_items(run, tmp_path / "list.db"))
+    assert "x-next-cursor" not in resp.headers
+    assert [r["id"] for r in json.loads(resp.body)] == _expected(lambda i: f"C{(N - i) // 2:03d}")
+
+
+@pytest.mark.parametrize("order", ["code", "created_at"])
+def test_cursor_pages_cover_the_list_once(order, tmp_path):
+    col = getattr(_Item, order)
+
+    async def run(db):
+        ids, cursor = [], None
+        while True:
+            resp = await _list(db, order_col=col, limit=4, cursor=cursor)
+            ids += [r["id"] for r in json.loads(resp.body)]
+            cursor = resp.headers.get("x-next-cursor")
+            if cursor is None:
+                return ids
+
+    ids = asyncio.run(_with_items(run, tmp_path / "list.db"))
+    key = (lambda i: f"C{(N - i) // 2:03d}") if order == "code" else (lambda i: i)
+    assert ids == _expected(key)
+
+
+def test_ndjson_streams_in_pages_with_projection(monkeypatch, tmp_path):
+    monkeypatch.setattr(listing, "EXPORT_PAGE_SIZE", 5)
+
+    async def run(db):
+        resp = await _list(db, format="ndjson", fields=["code"])
+        await db.close()  # endpoint session'ı akış başlamadan kapanır
+        return [chunk async for chunk in resp.body_iterator]
+
+    chunks = asyncio.run(_with_items(run, tmp_path / "list.db"))
+    assert len(chunks) == 5  # 23 satır / 5'lik parçalar
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert [json.loads(x) for x in lines] == [{"code": f"C{(N - i) // 2:03d}"} for i in sorted(range(N), key=lambda i: ((N - i) // 2, i))]
+
+
+def test_nullable_key_pages_keep_null_rows(tmp_path):
+    # dokümanlar gibi: nullable kolon, en yeni önce; NULL'lar epoch'a çekilip en sona düşer
+    key = coalesced_key(_Item.uploaded_at, datetime(1970, 1, 1))
+
+    async def run(db):
+        ids, cursor = [], None
+        while True:
+            resp = await list_response(
+                db, conds=[], spec=SPEC, order_col=key, id_col=_Item.id, params=_params(limit=3, cursor=cursor), descending=True
+            )
+            ids += [r["id"] for r in json.loads(resp.body)]
+            cursor = resp.headers.get("x-next-cursor")
+            if cursor is None:
+                return ids
+
+    ids = asyncio.run(_with_items(run, tmp_path / "list.db"))
+    expected = sorted(range(N), key=lambda i: (-1 if i % 5 == 0 else i // 2, uuid.UUID(int=i + 1)), reverse=True)
+    assert ids == [str(uuid.UUID(int=i + 1)) for i in expected]
+    assert ids[-5:] == [str(uuid.UUID(int=i + 1)) for i in (20, 15, 10, 5, 0)]  # NULL'lı satırlar
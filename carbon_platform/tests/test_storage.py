@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("aiofiles")
+pytest.importorskip("pydantic_settings")
+
+os.environ.setdefault("LOCAL_S3_ROOT", tempfile.mkdtemp(prefix="carbon_s3_"))
+
+from services.api.core.storage import MIN_PART_SIZE, READ_CHUNK, S3Storage, content_disposition  # noqa: E402
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+        self.reads = []
+        self.closed = False
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self._buf.read(n)
+        self.reads.append(len(chunk))
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeS3:
+    """put_object / multipart / get_object alt kümesi (bellek içi)."""
+
+    def __init__(self, fail_on_part: int | None = None):
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.calls: list[str] = []
+        self.fail_on_part = fail_on_part
+        self.last_body: _Body | None = None
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append("put_object")
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append("create_multipart_upload")
+        uid = f"u{len(self.uploads)}"
+        self.uploads[uid] = {}
+        return {"UploadId": uid}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        if PartNumber == self.fail_on_part:
+            raise IOError("part failed")
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+
+    def get_object(self, Bucket, Key):
+        self.last_body = _Body(self.objects[Key])
+        return {"Body": self.last_body}
+
+
+def _storage(client: _FakeS3) -> S3Storage:
+    return S3Storage("b", "eu-central-1", "k", "s", prefix="p", client=client, part_size=MIN_PART_SIZE)
+
+
+def test_small_upload_uses_single_put_object():
+    client = _FakeS3()
+    data = b"x" * 1000
+    out = asyncio.run(_storage(client).put_fileobj("docs/a.pdf", io.BytesIO(data)))
+    assert client.calls == ["put_object"]
+    assert client.objects["p/docs/a.pdf"] == data
+    assert (out.key, out.size, out.sha256) == ("docs/a.pdf", len(data), hashlib.sha256(data).hexdigest())
+
+
+def test_large_upload_is_multipart_and_hashes_stream():
+    client = _FakeS3()
+    data = os.urandom(2 * MIN_PART_SIZE + 123)
+    out = asyncio.run(_storage(client).put_fileobj("docs/big.bin", io.BytesIO(data)))
+    assert client.calls == ["create_multipart_upload"] + ["upload_part"] * 3 + ["complete_multipart_upload"]
+    assert client.objects["p/docs/big.bin"] == data
+    assert out.size == len(data)
+    assert out.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_exact_part_size_upload_does_not_send_empty_part():
+    client = _FakeS3()
+    data = b"y" * MIN_PART_SIZE
+    asyncio.run(_storage(client).put_fileobj("k", io.BytesIO(data)))
+    assert client.calls.count("upload_part") == 1
+    assert client.objects["p/k"] == data
+
+
+def test_failed_part_aborts_multipart_upload():
+    client = _FakeS3(fail_on_part=2)
+    data = b"z" * (2 * MIN_PART_SIZE)
+    with pytest.raises(IOError):
+        asyncio.run(_storage(client).put_fileobj("k", io.BytesIO(data)))
+    assert client.calls[-1] == "abort_multipart_upload"
+    assert "p/k" not in client.objects and not client.uploads
+
+
+def test_iter_bytes_streams_in_chunks_and_closes_body():
+    client = _FakeS3()
+    data = os.urandom(2 * READ_CHUNK + 10)
+    client.objects["p/k"] = data
+
+    async def collect():
+        return [c async for c in _storage(client).iter_bytes("k")]
+
+    chunks = asyncio.run(collect())
+    assert b"".join(chunks) == data
+    assert [len(c) for c in chunks] == [READ_CHUNK, READ_CHUNK, 10]
+    assert max(client.last_body.reads) == READ_CHUNK and client.last_body.closed
+
+
+def test_download_header_is_latin1_safe_for_unicode_names():
+    h = content_disposition('rapor "şubat".pdf')
+    h.encode("latin-1")
+    assert h == "attachment; filename=\"rapor _subat_.pdf\"; filename*=UTF-8''rapor%20%22%C5%9Fubat%22.pdf"
+    assert content_disposition(None) == "attachment; filename=\"document\"; filename*=UTF-8''document"
@@ -9,6 +9,7 @@ from sqlalchemy import select
 from src.db.session import db, init_db
 from src.services.authz import current_user
 from src.db.cbam_registry import CbamCnMapping
+from src.ui import data_access as da
 
 
 def utcnow():
@@ -47,29 +48,7 @@ def _goods_options():
 
 
 def _load_rows(active_only: bool) -> pd.DataFrame:
-    with db() as s:
-        q = select(CbamCnMapping)
-        if active_only:
-            q = q.where(CbamCnMapping.active == True)  # noqa: E712
-        q = q.order_by(CbamCnMapping.active.desc(), CbamCnMapping.priority.desc(), CbamCnMapping.cn_pattern.desc())
-        rows = s.execute(q).scalars().all()
-
-    out = []
-    for r in rows:
-        out.append(
-            {
-                "id": r.id,
-                "cn_pattern": r.cn_pattern,
-                "match_type": r.match_type,
-                "cbam_good_key": r.cbam_good_key,
-                "cbam_good_name": r.cbam_good_name,
-                "priority": r.priority,
-                "active": bool(r.active),
-                "notes": r.notes or "",
-                "updated_at": (r.updated_at.isoformat(timespec="seconds") if getattr(r, "updated_at", None) else None),
-            }
-        )
-    return pd.DataFrame(out)
+    return pd.DataFrame(da.list_cn_mappings(active_only=active_only))
 
 
 def main():
@@ -147,6 +126,7 @@ def main():
             )
             s.add(r)
             s.commit()
+            da.invalidate_cn_registry()
 
         st.success("Kural eklendi ✅")
         st.rerun()
@@ -223,6 +203,7 @@ def main():
             r.updated_at = utcnow()
             s.add(r)
             s.commit()
+            da.invalidate_cn_registry()
 
         st.success("Kural güncellendi ✅")
         st.rerun()
@@ -237,6 +218,7 @@ def main():
             r.updated_at = utcnow()
             s.add(r)
             s.commit()
+            da.invalidate_cn_registry()
 
         st.success("Kural pasif edildi ✅")
         st.rerun()
@@ -249,6 +231,7 @@ def main():
                 if r:
                     s.delete(r)
                     s.commit()
+                    da.invalidate_cn_registry()
             st.success("Kural silindi ✅")
             st.rerun()
 
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from src.mrv.bulk_replay import bulk_replay
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Kilitli snapshot'ların toplu replay doğrulaması (verifier ziyareti öncesi)")
+    ap.add_argument("--company", type=int, help="Şirketin tüm kilitli snapshot'ları")
+    ap.add_argument("--snapshots", type=str, default="", help="Virgülle ayrılmış snapshot id'leri")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--chunk", type=int, default=0, help="Büyük grupları bu boyutta böl (0: bölme)")
+    ap.add_argument("--report", type=str, default=None, help="Rapor JSON yolu")
+    a = ap.parse_args()
+
+    ids = [int(x) for x in a.snapshots.split(",") if x.strip()] or None
+    if a.company is None and not ids:
+        ap.error("--company veya --snapshots gerekli")
+
+    rep = bulk_replay(company_id=a.company, snapshot_ids=ids, processes=a.processes, chunk=a.chunk, report_path=a.report)
+    print("BULK REPLAY:", "PASS" if rep["ok"] else "FAIL", f"({rep['passed']} pass / {rep['failed']} fail / {rep['errors']} error)")
+    print(json.dumps({k: v for k, v in rep.items() if k != "items"}, ensure_ascii=False, indent=2))
+    sys.exit(0 if rep["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+import os
+from src.db.session import init_db
+from src.services.worker import run_loop
+
+def main():
+    # Genel job kuyruğu worker'ı (excel_import, snapshot_chain_verify ...)
+    init_db()
+    run_loop(poll_seconds=float(os.getenv("WORKER_POLL_SECONDS", "2.0")), max_loops=int(os.getenv("WORKER_MAX_LOOPS", "10000")))
+
+if __name__ == "__main__":
+    main()
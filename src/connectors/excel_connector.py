@@ -13,11 +13,12 @@ from __future__ import annotations
 
 import hashlib
 import json
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
 from .excel_schema import SCHEMAS, ColumnSpec
+from .excel_stream import read_header, read_sheet
 
 
 def _norm(s: Any) -> str:
@@ -74,18 +75,26 @@ def validate_schema(df: pd.DataFrame, schema: List[ColumnSpec]) -> Tuple[bool, L
     return (len(missing) == 0, missing)
 
 
-def load_excel(file, dataset_type: str) -> Dict[str, Any]:
+def load_excel(
+    file,
+    dataset_type: str,
+    *,
+    sheet_name: str | int = 0,
+    chunk_rows: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """Excel'i streaming okur (excel_stream); şema satırlar okunmadan header üzerinden doğrulanır."""
     if dataset_type not in SCHEMAS:
         raise ValueError(f"Bilinmeyen dataset türü: {dataset_type}")
 
     schema = SCHEMAS[dataset_type]
-    df = pd.read_excel(file)
-    df = normalize_headers(df)
-
-    ok, missing = validate_schema(df, schema)
+    ok, missing = validate_schema(pd.DataFrame(columns=read_header(file, sheet_name)), schema)
     if not ok:
         raise ValueError(f"Eksik zorunlu kolonlar: {missing}")
 
+    df = read_sheet(file, sheet_name, chunk_rows=chunk_rows, progress=progress)
+    df = normalize_headers(df)
+
     dataset_hash = compute_dataset_hash(df)
 
     return {"dataset_type": dataset_type, "hash": dataset_hash, "dataframe": df}
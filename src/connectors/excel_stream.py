@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""Streaming Excel okuyucu (openpyxl read-only).
+
+pd.read_excel tüm sheet'i önce satır listesine, sonra DataFrame'e çevirir; büyük ERP dökümlerinde
+istek thread'i dakikalarca bloklanır ve bellek iki katına çıkar. Burada:
+
+- Sheet read-only modda satır satır okunur ve EXCEL_CHUNK_ROWS'luk DataFrame parçaları üretilir.
+- Hücre dönüşümü ve tip çıkarımı pandas'ın openpyxl okuyucusuyla aynıdır (boş hücre -> NaN,
+  tam sayı değerli float -> int, hata hücresi -> NaN, TextParser ile header/NA/tip çıkarımı);
+  parçalar birleştirildiğinde pd.read_excel ile aynı frame elde edilir.
+- Şema kontrolü için yalnızca header satırı okunabilir (read_header): hatalı dosya satırlar
+  okunmadan reddedilir.
+- Birden çok sheet EXCEL_PARALLEL_MIN_BYTES üstünde process havuzunda paralel okunur.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from src.services.observability import log_event
+
+EXCEL_CHUNK_ROWS = int(os.getenv("EXCEL_CHUNK_ROWS", "5000"))
+EXCEL_PARALLEL_MIN_BYTES = int(os.getenv("EXCEL_PARALLEL_MIN_BYTES", str(2 * 1024 * 1024)))
+EXCEL_PARSE_PROCESSES = int(os.getenv("EXCEL_PARSE_PROCESSES", "0"))  # 0: min(cpu, sheet sayısı)
+
+Source = Union[bytes, str, Path, Any]  # bytes, dosya yolu veya file-like
+SheetRef = Union[str, int]
+
+
+def _open(source: Source):
+    from openpyxl import load_workbook
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif hasattr(source, "seek"):
+        source.seek(0)
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def _sheet(wb, sheet_name: SheetRef):
+    if isinstance(sheet_name, int):
+        return wb.worksheets[sheet_name]
+    return wb[sheet_name]
+
+
+def _convert_cell(cell) -> Any:
+    # pandas.io.excel._openpyxl.OpenpyxlReader._convert_cell ile aynı kurallar
+    v = cell.value
+    if v is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        iv = int(v)
+        return iv if iv == v else float(v)
+    return v
+
+
+def _iter_rows(ws) -> Iterator[List[Any]]:
+    """Sheet satırları (sondaki boş hücreler kırpılmış); pandas gibi boyut bilgisine güvenilmez."""
+    ws.reset_dimensions()
+    for row in ws.rows:
+        out = [_convert_cell(c) for c in row]
+        while out and out[-1] == "":
+            out.pop()
+        yield out
+
+
+def _frame(header: List[Any], rows: List[List[Any]]) -> pd.DataFrame:
+    # pd.read_excel gibi skip_blank_lines=False: tek kolonluk sheet'te boş satır NaN satırı olarak kalır
+    return TextParser([header] + rows, header=0, skip_blank_lines=False).read()
+
+
+def _inferred_columns(df: pd.DataFrame, rows: List[List[Any]]) -> Set[Any]:
+    """object kalan ama metin hücreleri TextParser'da dönüşmüş kolonlar (ör. "True" + boş -> True/NaN).
+
+    Bu kolonların tipi dtype'tan ayırt edilemez; parçalar arası tutarsızlık değer üzerinden bulunur.
+    """
+    out: Set[Any] = set()
+    for j in range(df.shape[1]):
+        col = df.iloc[:, j]
+        if col.dtype != object:
+            continue
+        for raw, v in zip((r[j] for r in rows), col.to_numpy()):
+            if isinstance(raw, str) and not isinstance(v, str) and not pd.isna(v):
+                out.add(df.columns[j])
+                break
+    return out
+
+
+def sheet_names(source: Source) -> List[str]:
+    wb = _open(source)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_header(source: Source, sheet_name: SheetRef = 0) -> List[str]:
+    """Yalnızca header satırını okur (pd.read_excel'in üreteceği kolon adları).
+
+    Header'dan geniş veri satırları pd.read_excel'de ek "Unnamed: n" kolonları üretir; bunlar burada yoktur.
+    """
+    wb = _open(source)
+    try:
+        for row in _iter_rows(_sheet(wb, sheet_name)):
+            return [str(c) for c in _frame(row, []).columns]
+        return []
+    finally:
+        wb.close()
+
+
+def _chunks(source: Source, sheet_name: SheetRef, n: int) -> Iterator[pd.DataFrame]:
+    for df, _ in _parsed_chunks(source, sheet_name, n):
+        yield df
+
+
+def _parsed_chunks(source: Source, sheet_name: SheetRef, n: int) -> Iterator[Tuple[pd.DataFrame, Set[Any]]]:
+    """(parça, _inferred_columns) çiftleri. Ara boş satırlar NaN satırı olarak kalır, sondakiler kırpılır (pandas gibi)."""
+    wb = _open(source)
+    try:
+        rows = _iter_rows(_sheet(wb, sheet_name))
+        header = next(rows, None)
+        if header is None:
+            return
+        start = 0
+        buf: List[List[Any]] = []
+        blank = 0
+        yielded = False
+
+        def emit() -> Tuple[pd.DataFrame, Set[Any]]:
+            nonlocal start
+            width = max(len(r) for r in buf)
+            if width > len(header):
+                header.extend([""] * (width - len(header)))  # -> "Unnamed: n"
+            padded = [r + [""] * (len(header) - len(r)) for r in buf]
+            df = _frame(list(header), padded)
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            return df, _inferred_columns(df, padded)
+
+        for r in rows:
+            if not r:
+                blank += 1
+                continue
+            if blank:
+                buf.extend([] for _ in range(blank))
+                blank = 0
+            buf.append(r)
+            if len(buf) >= n:
+                yield emit()
+                buf = []
+                yielded = True
+        if buf:
+            yield emit()
+        elif not yielded:
+            yield _frame(header, []), set()
+    finally:
+        wb.close()
+
+
+def iter_sheet_chunks(source: Source, sheet_name: SheetRef = 0, *, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Sheet'i chunk_rows satırlık DataFrame parçaları halinde akıtır (index global satır sırası).
+
+    Tip çıkarımı parça bazındadır; sayı gibi görünen metinler ("1001") metin içeren bir kolonda
+    tek parçada sayıya dönebilir. Sheet düzeyinde pd.read_excel ile birebir tipler için read_sheet.
+    """
+    yield from _chunks(source, sheet_name, max(1, int(chunk_rows or EXCEL_CHUNK_ROWS)))
+
+
+def read_sheet(
+    source: Source,
+    sheet_name: SheetRef = 0,
+    *,
+    chunk_rows: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> pd.DataFrame:
+    """Sheet'i parça parça okuyup birleştirir; progress(okunan_satır) her parçadan sonra çağrılır.
+
+    Sonuç pd.read_excel(source, sheet_name) ile aynıdır: parçalar arasında tip çıkarımı farklı çıkan
+    kolonlar (ör. bir parçada "1001" -> int veya "True" -> bool, diğerinde metin) yalnız o kolonlar için
+    ikinci geçişte tüm sheet üzerinden yeniden çıkarılır.
+    """
+    n = max(1, int(chunk_rows or EXCEL_CHUNK_ROWS))
+    parts: List[pd.DataFrame] = []
+    inferred: List[Set[Any]] = []
+    rows = 0
+    for df, cols in _parsed_chunks(source, sheet_name, n):
+        parts.append(df)
+        inferred.append(cols)
+        rows += len(df)
+        if progress is not None:
+            progress(rows)
+    if not parts:
+        return pd.DataFrame()
+    if len(parts) == 1:
+        return parts[0]
+    parts = _align_all_na(parts)
+    out = pd.concat(parts, ignore_index=True)
+
+    # kolon başına parça çıkarımları: dtype + (object ise) metin hücrelerinin dönüşüp dönüşmediği
+    # (sonradan genişleyen "Unnamed: n" kolonu olmayan parça tamamı boş float64 kolon sayılır)
+    kinds: Dict[Any, Set[Any]] = {}
+    for df, cols in zip(parts, inferred):
+        for c in out.columns:
+            kinds.setdefault(c, set()).add((str(df[c].dtype), c in cols) if c in df.columns else ("float64", False))
+    conflict = [c for c in out.columns if len(kinds.get(c, ())) > 1]
+    if conflict:
+        fixed = _reparse_columns(source, sheet_name, [list(out.columns).index(c) for c in conflict], conflict)
+        for c in conflict:
+            out[c] = fixed[c].to_numpy()
+    return out
+
+
+def _reparse_columns(source: Source, sheet_name: SheetRef, positions: List[int], names: List[Any]) -> pd.DataFrame:
+    """Seçili kolonların ham hücreleriyle tek TextParser çağrısı (pd.read_excel'in kolon tip çıkarımı)."""
+    wb = _open(source)
+    try:
+        it = _iter_rows(_sheet(wb, sheet_name))
+        next(it, None)
+        data: List[List[Any]] = [list(names)]
+        blank = 0
+        for r in it:
+            if not r:
+                blank += 1
+                continue
+            data.extend([[""] * len(positions) for _ in range(blank)])
+            blank = 0
+            data.append([r[j] if j < len(r) else "" for j in positions])
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    finally:
+        wb.close()
+
+
+def _align_all_na(parts: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """Tamamı boş parça kolonlarını (float NaN) kolonun dolu parçalardaki tipine çevirir.
+
+    Tüm sheet okunduğunda bu satırlar o tipte NaN/NaT olur; concat'in all-NA tip kuralına bırakılmaz.
+    """
+    target: Dict[Any, Any] = {}
+    for df in parts:
+        for col in df.columns:
+            if col not in target and df[col].dtype.kind in "OMm" and df[col].notna().any():
+                target[col] = df[col].dtype
+    if not target:
+        return parts
+    out = []
+    for df in parts:
+        fix = {c: t for c, t in target.items() if c in df.columns and df[c].dtype != t and df[c].isna().all()}
+        out.append(df.astype(fix) if fix else df)
+    return out
+
+
+def _read_sheet_worker(path: str, sheet_name: str, chunk_rows: Optional[int]) -> pd.DataFrame:
+    return read_sheet(path, sheet_name, chunk_rows=chunk_rows)
+
+
+def read_sheets(
+    source: Source,
+    names: Sequence[str],
+    *,
+    processes: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Verilen sheet'leri okur; büyük workbook'larda her sheet ayrı process'te parse edilir.
+
+    Havuz kurulamazsa / çökerse seri okumaya düşülür.
+    """
+    names = list(names)
+    if isinstance(source, (bytes, bytearray)):
+        size = len(source)
+    elif isinstance(source, (str, Path)):
+        size = os.path.getsize(source)
+    else:
+        size = 0
+    workers = int(processes if processes is not None else (EXCEL_PARSE_PROCESSES or min(len(names), os.cpu_count() or 1)))
+    parallel = len(names) > 1 and workers > 1 and (processes is not None or size >= EXCEL_PARALLEL_MIN_BYTES)
+
+    if parallel:
+        tmp: Optional[str] = None
+        try:
+            # workbook worker'lara byte olarak kopyalanmaz; dosya yolu geçilir
+            if isinstance(source, (str, Path)):
+                path = str(source)
+            else:
+                data = source if isinstance(source, (bytes, bytearray)) else (source.seek(0), source.read())[1]
+                fd, tmp = tempfile.mkstemp(suffix=".xlsx")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                path = tmp
+            with ProcessPoolExecutor(max_workers=min(workers, len(names))) as ex:
+                futures = {name: ex.submit(_read_sheet_worker, path, name, chunk_rows) for name in names}
+                return {name: fut.result() for name, fut in futures.items()}
+        except Exception as e:
+            log_event("excel_parallel_read_failed", sheets=len(names), error=str(e)[:300])
+        finally:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    return {name: read_sheet(source, name, chunk_rows=chunk_rows) for name in names}
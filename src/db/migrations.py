@@ -33,6 +33,7 @@ def run_migrations(engine: Engine):
         _try(conn, "ALTER TABLE calculationsnapshots ADD COLUMN base_snapshot_id INTEGER")
         _try(conn, "ALTER TABLE calculationsnapshots ADD COLUMN scenario_meta_json TEXT DEFAULT '{}'")
         _try(conn, "ALTER TABLE calculationsnapshots ADD COLUMN price_evidence_json TEXT DEFAULT '[]'")
+        _try(conn, "ALTER TABLE calculationsnapshots ADD COLUMN perf_trace_json TEXT DEFAULT '{}'")
 
         # legacy compatibility
         _try(conn, "ALTER TABLE calculationsnapshots ADD COLUMN input_hash VARCHAR(64)")
@@ -128,6 +129,29 @@ def run_migrations(engine: Engine):
             """,
         )
 
+        # Snapshot hash-chain checkpoints + chain sırası için keyset index
+        _try(
+            conn,
+            """
+            CREATE TABLE IF NOT EXISTS snapshot_chain_checkpoints (
+                id INTEGER PRIMARY KEY,
+                project_id INTEGER NOT NULL,
+                block_size INTEGER NOT NULL,
+                block_index INTEGER NOT NULL,
+                first_snapshot_id INTEGER NOT NULL,
+                last_snapshot_id INTEGER NOT NULL,
+                last_created_at DATETIME,
+                n_snapshots INTEGER NOT NULL,
+                merkle_root VARCHAR(64) NOT NULL,
+                head_result_hash VARCHAR(64) DEFAULT '',
+                created_at DATETIME,
+                CONSTRAINT uq_snapshot_chain_checkpoint UNIQUE (project_id, block_size, block_index)
+            )
+            """,
+        )
+        _try(conn, "CREATE INDEX IF NOT EXISTS ix_snapshot_chain_checkpoints_project ON snapshot_chain_checkpoints (project_id)")
+        _try(conn, "CREATE INDEX IF NOT EXISTS ix_calculationsnapshots_project_created ON calculationsnapshots (project_id, created_at, id)")
+
         # ----------------------------
         # DB-level immutability triggers (SQLite)
         # ----------------------------
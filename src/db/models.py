@@ -316,6 +316,9 @@ class CalculationSnapshot(Base):
     # External evidence frozen for replay (e.g., carbon price)
     price_evidence_json = Column(Text, default="[]")
 
+    # Pipeline tracing (per-stage timing breakdown; hash'lere dahil değildir)
+    perf_trace_json = Column(Text, default="{}")
+
     created_by_user_id = Column(Integer, nullable=True)
 
     # Immutability
@@ -373,6 +376,31 @@ class SnapshotFactorLink(Base):
     created_at = Column(DateTime(timezone=True), default=utcnow)
 
 
+class SnapshotChainCheckpoint(Base):
+    """Doğrulanmış snapshot hash-chain blokları (src.mrv.chain_verifier).
+
+    Her satır bir projenin (created_at, id) sırasındaki block_size'lık tam bir bloğunu temsil eder:
+    blok içi yaprakların Merkle kökü + bloğun son snapshot'ı (incremental doğrulama buradan devam eder).
+    """
+    __tablename__ = "snapshot_chain_checkpoints"
+    __table_args__ = (UniqueConstraint("project_id", "block_size", "block_index", name="uq_snapshot_chain_checkpoint"),)
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    block_size = Column(Integer, nullable=False)
+    block_index = Column(Integer, nullable=False)
+
+    first_snapshot_id = Column(Integer, nullable=False)
+    last_snapshot_id = Column(Integer, nullable=False)
+    last_created_at = Column(DateTime(timezone=True), nullable=True)
+    n_snapshots = Column(Integer, nullable=False)
+
+    merkle_root = Column(String(64), nullable=False)
+    head_result_hash = Column(String(64), default="")  # bloğun son snapshot'ının result_hash'i
+
+    created_at = Column(DateTime(timezone=True), default=utcnow)
+
+
 class VerificationCase(Base):
     __tablename__ = "verificationcases"
 
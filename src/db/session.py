@@ -4,21 +4,250 @@ import importlib
 import os
 import pkgutil
 import re
+import threading
+import time
 from pathlib import Path
+from typing import Any, Dict
 
-from sqlalchemy import Column, Integer, MetaData, Table, create_engine
+from sqlalchemy import Column, Engine, Integer, MetaData, Table, create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import NoReferencedTableError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 DB_PATH = os.getenv("CME_DB_PATH", "/tmp/cme_demo.db")
-Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
 
-DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, "") or default)
+    except Exception:
+        return int(default)
+
+
+def resolve_database_url() -> str:
+    """DB bağlantı adresi.
+
+    Öncelik:
+      1) ENV: CME_DATABASE_URL (örn. postgresql+psycopg://user:pw@host/db)
+      2) ENV: CME_DB_PATH üzerinden SQLite dosyası (default /tmp/cme_demo.db)
+    """
+    url = (os.getenv("CME_DATABASE_URL") or "").strip()
+    if url:
+        return url
+    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    return f"sqlite:///{DB_PATH}"
+
+
+# ----------------------------
+# Pool metrics
+# ----------------------------
+class PoolMetrics:
+    """Process-level pool sayaçları (checkout/checkin/bekleme süresi)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.timeouts = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+
+    def on_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def on_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def on_wait(self, ms: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_total_ms += float(ms)
+            self.wait_max_ms = max(self.wait_max_ms, float(ms))
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            avg = (self.wait_total_ms / self.checkouts) if self.checkouts else 0.0
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total_ms, 3),
+                "wait_avg_ms": round(avg, 3),
+                "wait_max_ms": round(self.wait_max_ms, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool + bağlantı bekleme süresi ölçümü (pool_timeout'a yaklaşan istekleri görmek için)."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_metrics.on_wait((time.perf_counter() - t0) * 1000.0, timed_out=True)
+            raise
+        pool_metrics.on_wait((time.perf_counter() - t0) * 1000.0)
+        return conn
+
+
+# ----------------------------
+# Engine factory
+# ----------------------------
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and (url.database in (None, "", ":memory:") or "mode=memory" in str(url))
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """URL'e göre create_engine argümanları.
+
+    SQLite (dosya):
+      - check_same_thread=False, driver timeout = busy_timeout
+      - QueuePool (Streamlit + worker eşzamanlılığı için)
+    PostgreSQL / diğer:
+      - QueuePool: CME_DB_POOL_SIZE (10), CME_DB_MAX_OVERFLOW (20),
+        CME_DB_POOL_TIMEOUT (30s), CME_DB_POOL_RECYCLE (1800s)
+      - pool_pre_ping=True (kopmuş bağlantılar sessizce yenilenir)
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        busy_ms = _env_int("CME_SQLITE_BUSY_TIMEOUT_MS", 30000)
+        opts: Dict[str, Any] = {
+            "connect_args": {"check_same_thread": False, "timeout": busy_ms / 1000.0},
+        }
+        if not _is_memory_sqlite(url):
+            opts.update(
+                {
+                    "poolclass": MeteredQueuePool,
+                    "pool_size": _env_int("CME_DB_POOL_SIZE", 5),
+                    "max_overflow": _env_int("CME_DB_MAX_OVERFLOW", 10),
+                    "pool_timeout": _env_int("CME_DB_POOL_TIMEOUT", 30),
+                }
+            )
+        return opts
+
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": _env_int("CME_DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("CME_DB_MAX_OVERFLOW", 20),
+        "pool_timeout": _env_int("CME_DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("CME_DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Her yeni SQLite bağlantısında uygulanan PRAGMA'lar.
+
+    WAL: okuyucular yazarı bloklamaz ("database is locked" hatalarının ana kaynağı).
+    synchronous=NORMAL: WAL ile güvenli, commit başına fsync yükünü düşürür.
+    """
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": _env_int("CME_SQLITE_BUSY_TIMEOUT_MS", 30000),
+        "mmap_size": _env_int("CME_SQLITE_MMAP_BYTES", 256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    }
+
+
+def _install_sqlite_pragmas(eng: Engine) -> None:
+    pragmas = sqlite_pragmas()
+    memory = _is_memory_sqlite(eng.url)
+
+    @event.listens_for(eng, "connect")
+    def _on_connect(dbapi_conn, _record):  # pragma: no cover - driver callback
+        cur = dbapi_conn.cursor()
+        try:
+            for key, value in pragmas.items():
+                if memory and key in ("journal_mode", "mmap_size"):
+                    continue
+                try:
+                    cur.execute(f"PRAGMA {key}={value}")
+                except Exception:
+                    # read-only / eski SQLite sürümleri: best-effort
+                    pass
+        finally:
+            cur.close()
+
+
+def _install_pool_listeners(eng: Engine) -> None:
+    @event.listens_for(eng, "connect")
+    def _on_connect(_dbapi_conn, _record):
+        pool_metrics.on_connect()
+
+    @event.listens_for(eng, "checkout")
+    def _on_checkout(_dbapi_conn, _record, _proxy):
+        pool_metrics.on_checkout()
+
+    @event.listens_for(eng, "checkin")
+    def _on_checkin(_dbapi_conn, _record):
+        pool_metrics.on_checkin()
+
+
+def build_engine(database_url: str | None = None) -> Engine:
+    url = database_url or resolve_database_url()
+    eng = create_engine(url, **engine_options(url))
+    if eng.url.get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(eng)
+    _install_pool_listeners(eng)
+    return eng
+
+
+def configure_engine(database_url: str | None = None) -> Engine:
+    """Global engine + SessionLocal'ı (yeniden) kurar. Testler ve worker süreçleri için."""
+    global DATABASE_URL, engine, SessionLocal
+    old = globals().get("engine")
+    DATABASE_URL = database_url or resolve_database_url()
+    engine = build_engine(DATABASE_URL)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    if old is not None:
+        try:
+            old.dispose()
+        except Exception:
+            pass
+    return engine
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Pool checkout/wait sayaçları + anlık pool durumu (UI / support bundle için)."""
+    out = pool_metrics.snapshot()
+    out["backend"] = engine.url.get_backend_name()
+    try:
+        out["pool_status"] = engine.pool.status()
+    except Exception:
+        out["pool_status"] = ""
+    return out
+
+
+DATABASE_URL = resolve_database_url()
+engine = build_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
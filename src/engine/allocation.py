@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 from typing import Any, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
+from src.mrv.lineage import canonical_json
+
 
 def safe_float(x: Any, default: float = 0.0) -> float:
     try:
@@ -34,14 +37,23 @@ def validate_required_columns(df: pd.DataFrame, required: List[str], dataset_nam
         raise ValueError(f"{dataset_name}: zorunlu kolon(lar) eksik: {', '.join(missing)}")
 
 
+def _to_float_array(s: pd.Series, default: float = 0.0) -> np.ndarray:
+    """Vektörize safe_float: pd.to_numeric + dönüşmeyen hücreler için safe_float fallback."""
+    num = pd.to_numeric(s, errors="coerce")
+    bad = num.isna() & s.notna()
+    if bool(bad.any()):
+        num = num.copy()
+        num[bad] = s[bad].map(lambda v: safe_float(v, default))
+    return num.fillna(default).to_numpy(dtype=float)
+
+
 def validate_nonnegative(df: pd.DataFrame, cols: List[str], dataset_name: str = "dataset") -> None:
     if df is None or len(df) == 0:
         return
     for c in cols:
         if c not in df.columns:
             continue
-        bad = df[c].apply(lambda v: safe_float(v, 0.0) < 0.0)
-        if bool(bad.any()):
+        if bool((_to_float_array(df[c]) < 0.0).any()):
             raise ValueError(f"{dataset_name}: '{c}' kolonu negatif değer içeriyor.")
 
 
@@ -49,6 +61,7 @@ def allocation_map_from_df(production_df: pd.DataFrame) -> Dict[str, Dict[str, A
     """
     Production dataframe'den SKU/ürün map'i çıkarır.
     Orchestrator farklı şemalarla gelebileceği için best-effort çalışır.
+    Aynı SKU birden çok satırda geçerse son satır geçerlidir.
     """
     if production_df is None or len(production_df) == 0:
         return {}
@@ -64,27 +77,24 @@ def allocation_map_from_df(production_df: pd.DataFrame) -> Dict[str, Dict[str, A
     name_col = "product_name" if "product_name" in df.columns else ("name" if "name" in df.columns else None)
     cn_col = "cn_code" if "cn_code" in df.columns else ("cn" if "cn" in df.columns else None)
 
-    if not sku_col:
-        # sku yoksa, en azından index bazlı map üret
-        sku_col = "__row_id__"
-        df[sku_col] = df.index.astype(str)
+    def _txt(col: str | None) -> pd.Series:
+        if not col:
+            return pd.Series("", index=df.index)
+        return df[col].map(lambda v: str(v or "").strip())
 
-    if not qty_col:
-        qty_col = "__qty__"
-        df[qty_col] = 0.0
+    if sku_col:
+        skus = _txt(sku_col)
+    else:
+        # sku yoksa, en azından index bazlı map üret
+        skus = pd.Series(df.index.astype(str), index=df.index).str.strip()
 
-    out: Dict[str, Dict[str, Any]] = {}
-    for _, r in df.iterrows():
-        sku = str(r.get(sku_col) or "").strip()
-        if not sku:
-            continue
-        out[sku] = {
-            "sku": sku,
-            "quantity": safe_float(r.get(qty_col), 0.0),
-            "product_name": str(r.get(name_col) or "").strip() if name_col else "",
-            "cn_code": str(r.get(cn_col) or "").strip() if cn_col else "",
-        }
-    return out
+    qty = _to_float_array(df[qty_col]) if qty_col else np.zeros(len(df))
+    out_df = pd.DataFrame(
+        {"sku": skus, "quantity": qty, "product_name": _txt(name_col), "cn_code": _txt(cn_col)},
+        index=df.index,
+    )
+    out_df = out_df[out_df["sku"] != ""].drop_duplicates("sku", keep="last")
+    return {r["sku"]: r for r in out_df.to_dict(orient="records")}
 
 
 def allocate_energy_to_skus(production_df: pd.DataFrame, total_energy_kgco2: float) -> pd.DataFrame:
@@ -115,6 +125,119 @@ def allocate_energy_to_skus(production_df: pd.DataFrame, total_energy_kgco2: flo
     return df
 
 
+# method alias -> kanonik method
+_METHOD_ALIASES: Dict[str, str] = {
+    "quantity": "quantity",
+    "quantity_based": "quantity",
+    "quantity-based": "quantity",
+    "process-step": "process-step",
+    "process_step": "process-step",
+    "mass": "mass",
+    "mass_based": "mass",
+    "mass-based": "mass",
+    "economic": "economic",
+    "economic_value": "economic",
+    "economic-value": "economic",
+    "value": "economic",
+    "revenue": "economic",
+    "energy": "energy-content",
+    "energy-content": "energy-content",
+    "energy_content": "energy-content",
+}
+
+# kanonik method -> allocation basis ("process-step" MVP: quantity ile aynı davranır, placeholder)
+_METHOD_BASIS: Dict[str, str] = {
+    "quantity": "quantity",
+    "process-step": "quantity",
+    "mass": "mass",
+    "economic": "economic",
+    "energy-content": "energy",
+}
+
+# basis -> (doğrudan kolonlar [(kolon, çarpan)], birim başı kolonlar [kolon] (quantity ile çarpılır))
+_BASIS_COLUMNS: Dict[str, Tuple[List[Tuple[str, float]], List[str]]] = {
+    "mass": (
+        [("mass_t", 1.0), ("mass_tonnes", 1.0), ("net_mass_t", 1.0), ("weight_t", 1.0), ("mass", 1.0), ("weight", 1.0),
+         ("mass_kg", 0.001), ("net_mass_kg", 0.001), ("weight_kg", 0.001)],
+        ["mass_per_unit_t", "unit_mass_t"],
+    ),
+    "economic": (
+        [("economic_value_eur", 1.0), ("revenue_eur", 1.0), ("sales_value_eur", 1.0), ("value_eur", 1.0),
+         ("economic_value", 1.0), ("revenue", 1.0), ("sales_value", 1.0)],
+        ["unit_price_eur", "price_eur_per_unit", "unit_price", "price"],
+    ),
+    "energy": (
+        [("energy_content_gj", 1.0), ("energy_gj", 1.0), ("energy_content", 1.0)],
+        ["energy_content_gj_per_unit", "energy_intensity_gj_per_unit", "ncv_gj_per_unit"],
+    ),
+}
+
+
+def normalize_allocation_method(method: str | None) -> str:
+    m = str(method or "quantity").strip().lower().replace(" ", "_")
+    return _METHOD_ALIASES.get(m, "quantity")
+
+
+def basis_values(df: pd.DataFrame, basis: str, qty: np.ndarray) -> Tuple[np.ndarray, str, str]:
+    """Allocation bazı vektörünü çözer.
+
+    Dönen: (değerler, kullanılan basis, kaynak kolon). Basis kolonu yoksa ya da toplamı 0 ise
+    quantity'ye düşer (basis="quantity").
+    """
+    spec = _BASIS_COLUMNS.get(basis)
+    if spec is not None:
+        direct, per_unit = spec
+        for col, mult in direct:
+            if col in df.columns:
+                vals = np.clip(_to_float_array(df[col]), 0.0, None) * mult
+                if float(vals.sum()) > 0.0:
+                    return vals, basis, col
+        for col in per_unit:
+            if col in df.columns:
+                vals = np.clip(_to_float_array(df[col]), 0.0, None) * qty
+                if float(vals.sum()) > 0.0:
+                    return vals, basis, f"{col}*quantity"
+    return qty, "quantity", "quantity"
+
+
+def _group_shares(weights: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Her satırın kendi grubundaki payı (grup toplamı 0 ise 0)."""
+    sums = np.bincount(codes, weights=weights, minlength=n_groups)
+    denom = sums[codes]
+    out = np.zeros_like(weights)
+    np.divide(weights, denom, out=out, where=denom > 0.0)
+    return out
+
+
+def allocation_hash(allocation_df: pd.DataFrame, meta: Dict[str, Any]) -> str:
+    """Deterministik allocation hash'i.
+
+    Satırlar (sku, month) ile sıralanır; paylar/tCO2 değerleri 12 haneye yuvarlanıp little-endian
+    float64 olarak hash'lenir (satır bazlı JSON üretmeden 100k+ satırda hızlı).
+    """
+    header = {
+        k: meta.get(k)
+        for k in ("allocation_method", "allocation_basis", "basis_column", "scope1_tco2", "scope2_tco2", "total_tco2", "per_month")
+    }
+    h = hashlib.sha256(canonical_json(header).encode("utf-8"))
+    if allocation_df is None or len(allocation_df) == 0:
+        return h.hexdigest()
+    keys = allocation_df["sku"].astype(str)
+    if "month" in allocation_df.columns:
+        keys = keys + "\x1f" + allocation_df["month"].astype(str)
+    key_arr = keys.to_numpy(dtype=str)
+    cols = [
+        np.round(allocation_df[c].to_numpy(dtype=float), 12) + 0.0  # -0.0 -> 0.0
+        for c in ("quantity", "allocation_share", "alloc_scope1_tco2", "alloc_scope2_tco2")
+    ]
+    # aynı (sku, month) birden çok satırda geçebilir: değerler ikincil sıralama anahtarı
+    order = np.lexsort(tuple(reversed(cols)) + (key_arr,))
+    h.update("\x1e".join(key_arr[order].tolist()).encode("utf-8"))
+    for arr in cols:
+        h.update(arr[order].astype("<f8").tobytes())
+    return h.hexdigest()
+
+
 def allocate_product_emissions(
     production_df: pd.DataFrame,
     *,
@@ -124,18 +247,26 @@ def allocate_product_emissions(
     method: str = "quantity",
     sku_col: str | None = None,
     quantity_col: str | None = None,
+    emissions_by_month: Dict[str, Dict[str, float]] | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
-    Orchestrator tarafından çağrılabilecek ürün bazlı allocation.
+    Orchestrator tarafından çağrılabilecek ürün bazlı allocation (kolon bazlı / NumPy).
 
     - method:
-        - "quantity": quantity bazlı dağıtım
-        - "energy-content": MVP aşamasında quantity ile aynı davranır (placeholder)
+        - "quantity" (quantity_based): quantity bazlı dağıtım
+        - "mass": mass_t / mass_kg / weight_* kolonları (ya da mass_per_unit_t * quantity)
+        - "economic": economic_value_eur / revenue_eur / ... (ya da unit_price * quantity)
+        - "energy" (energy-content): energy_content_gj / energy_gj (ya da *_gj_per_unit * quantity)
         - "process-step": MVP aşamasında quantity ile aynı davranır (placeholder)
+      Basis kolonu bulunamazsa quantity'ye düşülür (meta.allocation_basis = "quantity").
+    - emissions_by_month: {"2025-01": {"scope1_tco2": .., "scope2_tco2": ..}, ...} verilirse ve
+      production'da month kolonu varsa her ayın emisyonu o ay içindeki paylarla dağıtılır
+      (SKU × ay allocation matrisi). Üretimi olmayan aylardaki emisyon yıllık paylarla dağıtılır
+      (meta.unmatched_months). Aksi halde toplamlar tüm satırlara global paylarla dağıtılır.
 
     Dönen:
-      - allocation_df: SKU bazında alloc_scope1_tco2, alloc_scope2_tco2, alloc_total_tco2, intensity
-      - meta: allocation metası (method, hash için inputlar vb.)
+      - allocation_df: satır bazında alloc_scope1_tco2, alloc_scope2_tco2, alloc_total_tco2, intensity
+      - meta: allocation metası (method, basis, allocation_hash vb.)
     """
     if production_df is None:
         production_df = pd.DataFrame()
@@ -156,47 +287,119 @@ def allocate_product_emissions(
         qty_c = "quantity"
         df[qty_c] = 0.0
 
-    df[sku_c] = df[sku_c].astype(str)
-    df[qty_c] = df[qty_c].apply(lambda v: safe_float(v, 0.0))
-    validate_nonnegative(df, [qty_c], "production.csv")
+    qty = _to_float_array(df[qty_c]) if len(df) else np.zeros(0)
+    if bool((qty < 0.0).any()):
+        raise ValueError(f"production.csv: '{qty_c}' kolonu negatif değer içeriyor.")
 
     # Emisyon toplamları
     s1 = safe_float(scope1_tco2, 0.0)
     s2 = safe_float(scope2_tco2, 0.0)
     tot = safe_float(total_tco2, s1 + s2) if total_tco2 is not None else (s1 + s2)
 
-    # method normalize
-    m = str(method or "quantity").strip().lower()
-    if m not in ("quantity", "energy-content", "process-step"):
-        m = "quantity"
-
-    # MVP: 3 method da quantity bazlı dağıtım yapar (placeholder)
-    total_qty = float(df[qty_c].sum()) if len(df) else 0.0
-    if total_qty <= 0.0:
-        df["alloc_scope1_tco2"] = 0.0
-        df["alloc_scope2_tco2"] = 0.0
-        df["alloc_total_tco2"] = 0.0
-        df["intensity_tco2_per_unit"] = 0.0
+    m = normalize_allocation_method(method)
+    weights, basis, basis_col = basis_values(df, _METHOD_BASIS[m], qty)
+
+    per_month = bool(emissions_by_month) and "month" in df.columns and len(df) > 0
+    n = len(df)
+    unmatched_months: List[str] = []
+    if per_month:
+        months = df["month"].map(lambda v: str(v or "").strip())
+        codes, uniques = pd.factorize(months, sort=True)
+        share = _group_shares(weights, codes, len(uniques))
+        month_w = np.bincount(codes, weights=weights, minlength=len(uniques))
+        matched = {str(u) for u, w in zip(uniques, month_w) if w > 0.0}
+        m_s1 = np.array([safe_float((emissions_by_month.get(u) or {}).get("scope1_tco2"), 0.0) for u in uniques])
+        m_s2 = np.array([safe_float((emissions_by_month.get(u) or {}).get("scope2_tco2"), 0.0) for u in uniques])
+        # Üretimi olmayan aylardaki emisyon düşürülmez: yıllık (global) paylarla dağıtılır
+        carry1 = carry2 = 0.0
+        for mo, v in emissions_by_month.items():
+            e1 = safe_float((v or {}).get("scope1_tco2"), 0.0)
+            e2 = safe_float((v or {}).get("scope2_tco2"), 0.0)
+            if str(mo).strip() not in matched and (e1 or e2):
+                carry1 += e1
+                carry2 += e2
+                unmatched_months.append(str(mo))
+        total_w = float(weights.sum())
+        g_share = weights / total_w if total_w > 0.0 else np.zeros(n)
+        alloc1 = share * m_s1[codes] + g_share * carry1
+        alloc2 = share * m_s2[codes] + g_share * carry2
+        alloc_tot = alloc1 + alloc2
+        s1 = float(sum(safe_float((v or {}).get("scope1_tco2"), 0.0) for v in emissions_by_month.values()))
+        s2 = float(sum(safe_float((v or {}).get("scope2_tco2"), 0.0) for v in emissions_by_month.values()))
+        tot = s1 + s2
     else:
-        share = df[qty_c] / total_qty
-        df["alloc_scope1_tco2"] = share * s1
-        df["alloc_scope2_tco2"] = share * s2
-        df["alloc_total_tco2"] = share * tot
-        df["intensity_tco2_per_unit"] = np.where(df[qty_c] > 0, df["alloc_total_tco2"] / df[qty_c], 0.0)
+        total_w = float(weights.sum()) if n else 0.0
+        share = weights / total_w if total_w > 0.0 else np.zeros(n)
+        alloc1 = share * s1
+        alloc2 = share * s2
+        alloc_tot = share * tot
+
+    intensity = np.zeros(n)
+    np.divide(alloc_tot, qty, out=intensity, where=qty > 0.0)
 
     # Dönüş kolonlarını standartla
-    out_cols = [sku_c, qty_c, "alloc_scope1_tco2", "alloc_scope2_tco2", "alloc_total_tco2", "intensity_tco2_per_unit"]
-    allocation_df = df[out_cols].copy()
-    allocation_df = allocation_df.rename(columns={sku_c: "sku", qty_c: "quantity"})
+    allocation_df = pd.DataFrame(
+        {
+            "sku": df[sku_c].astype(str).to_numpy() if n else np.array([], dtype=object),
+            "quantity": qty,
+            "alloc_scope1_tco2": alloc1,
+            "alloc_scope2_tco2": alloc2,
+            "alloc_total_tco2": alloc_tot,
+            "intensity_tco2_per_unit": intensity,
+        }
+    )
+    if per_month:
+        allocation_df.insert(1, "month", months.to_numpy())
+    allocation_df["allocation_basis_value"] = weights
+    allocation_df["allocation_share"] = share
 
     meta = {
         "allocation_method": m,
-        "allocation_basis": "quantity",
+        "allocation_basis": basis,
+        "basis_column": basis_col,
         "scope1_tco2": s1,
         "scope2_tco2": s2,
         "total_tco2": tot,
+        "per_month": per_month,
+        "unmatched_months": sorted(unmatched_months),
         "sku_col": sku_c,
         "quantity_col": qty_c,
     }
+    meta["allocation_hash"] = allocation_hash(allocation_df, meta)
 
     return allocation_df, meta
+
+
+# result_hash'e giren allocation satır kolonları (engine-3.0.0-packetA ile aynı şekil)
+RESULT_ALLOCATION_COLUMNS = ["sku", "quantity", "alloc_scope1_tco2", "alloc_scope2_tco2", "alloc_total_tco2", "intensity_tco2_per_unit"]
+_RESULT_METHODS = ("quantity", "energy-content", "process-step")
+
+
+def result_allocation_view(allocation_df: pd.DataFrame, meta: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Hash'lenen result bundle'a girecek (allocation_method, rows).
+
+    Kilitli snapshot'ların replay'i aynı girdilerle aynı result_hash'i üretmeli: basis kolonu
+    kullanılmadıysa method eski normalizasyonla ("mass" -> "quantity") raporlanır, satırlara yalnız
+    eski kolonlar (+ per_month açıksa month) girer. allocation_hash / basis / share bilgisi meta'da kalır.
+    """
+    m = str(meta.get("allocation_method") or "quantity")
+    if meta.get("allocation_basis") == "quantity" and m not in _RESULT_METHODS:
+        m = "quantity"
+    if allocation_df is None or len(allocation_df) == 0:
+        return m, []
+    cols = list(RESULT_ALLOCATION_COLUMNS)
+    if meta.get("per_month") and "month" in allocation_df.columns:
+        cols.insert(1, "month")
+    return m, allocation_df[cols].to_dict(orient="records")
+
+
+def allocation_matrix(allocation_df: pd.DataFrame, value_col: str = "alloc_total_tco2") -> pd.DataFrame:
+    """SKU × ay allocation matrisi (eksik hücreler 0). month kolonu yoksa tek kolon "all"."""
+    if allocation_df is None or len(allocation_df) == 0:
+        return pd.DataFrame()
+    months = allocation_df["month"] if "month" in allocation_df.columns else pd.Series("all", index=allocation_df.index)
+    sku_codes, skus = pd.factorize(allocation_df["sku"].astype(str), sort=True)
+    m_codes, m_uniques = pd.factorize(months.astype(str), sort=True)
+    mat = np.zeros((len(skus), len(m_uniques)))
+    np.add.at(mat, (sku_codes, m_codes), allocation_df[value_col].to_numpy(dtype=float))
+    return pd.DataFrame(mat, index=pd.Index(skus, name="sku"), columns=pd.Index(m_uniques, name="month"))
@@ -207,6 +207,7 @@ def cbam_compute(
     allocation_by_sku: dict | None = None,
     allocation_meta: dict | None = None,
     cbam_defaults_df: pd.DataFrame | None = None,
+    precursor_chain_propagation: bool = False,
 ) -> tuple[pd.DataFrame, dict]:
     """
     CBAM calculation engine (Step-3):
@@ -230,6 +231,8 @@ def cbam_compute(
       - energy_breakdown: totals from energy engine (direct_tco2, indirect_tco2) used as fallback allocation
       - materials_df: precursor relations or material EF sheet (parsed deterministically)
       - cbam_defaults_df: default intensities with evidence fields (optional)
+      - precursor_chain_propagation: multi-level precursor propagation (opt-in, see
+        compute_precursor_tco2_by_sku; changes results for multi-level BOMs)
 
     Output:
       - table (per row)
@@ -475,6 +478,7 @@ def cbam_compute(
         production_df=df,
         materials_df=materials_df,
         embedded_tco2_by_sku=embedded_by_sku,
+        propagate_chain=bool(precursor_chain_propagation),
     )
     df["precursor_tco2e"] = df["sku"].apply(lambda s: float(prec_map.get(str(s).strip(), 0.0) or 0.0))
 
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import json
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
-from src.mrv.lineage import sha256_json
+from src.mrv.lineage import _normalize
 
 
 def _norm(s: Any) -> str:
@@ -51,6 +54,60 @@ class PrecursorEdge:
         }
 
 
+def _to_float_series(s: pd.Series) -> pd.Series:
+    """Vektörize _to_float: pd.to_numeric ile dönüştürür, dönüşmeyen değerleri _to_float ile tamamlar."""
+    num = pd.to_numeric(s, errors="coerce")
+    bad = num.isna() & s.notna()
+    if bool(bad.any()):
+        num = num.copy()
+        num[bad] = s[bad].map(_to_float)
+    return num.fillna(0.0).astype(float)
+
+
+def _str_series(s: pd.Series, default: str = "") -> pd.Series:
+    """Vektörize `str(x or default).strip()` (satır bazlı davranışla aynı)."""
+    return s.map(lambda x: str(x or default).strip())
+
+
+def _edge_row_hashes(
+    skus: List[str], pskus: List[str], qtys: List[float], units: List[str], embs: List[float]
+) -> List[str]:
+    """sha256_json ile birebir aynı hash'leri toplu üretir.
+
+    canonical_json: sıralı anahtarlar, ayraçsız, float -> 12 haneli Decimal string. Tekrarlayan
+    float/string değerlerin normalize hali cache'lenir; dict kurma + recursive normalize maliyeti yok.
+    """
+    f_cache: Dict[float, str] = {}
+    s_cache: Dict[str, str] = {}
+
+    def f(x: float) -> str:
+        v = f_cache.get(x)
+        if v is None:
+            v = json.dumps(_normalize(float(x)))
+            f_cache[x] = v
+        return v
+
+    def t(x: str) -> str:
+        v = s_cache.get(x)
+        if v is None:
+            v = json.dumps(x, ensure_ascii=False)
+            s_cache[x] = v
+        return v
+
+    out: List[str] = []
+    for sku, psku, qty, unit, emb in zip(skus, pskus, qtys, units, embs):
+        payload = (
+            '{"precursor_embedded_tco2":' + f(emb)
+            + ',"precursor_quantity":' + f(qty)
+            + ',"precursor_quantity_unit":' + t(unit)
+            + ',"precursor_sku":' + t(psku)
+            + ',"sku":' + t(sku)
+            + "}"
+        )
+        out.append(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+    return out
+
+
 def parse_precursor_edges(materials_df: Optional[pd.DataFrame]) -> List[PrecursorEdge]:
     """
     Parse materials_df into precursor edges if it contains precursor fields.
@@ -63,6 +120,8 @@ def parse_precursor_edges(materials_df: Optional[pd.DataFrame]) -> List[Precurso
       - precursor_embedded_intensity_tco2_per_unit (optional)
       - emission_factor_kgco2e_per_unit (optional, multiplied by quantity and /1000)
       - month/facility_id ignored in aggregation
+
+    Kolon bazlı (vektörize) parse edilir; row hash'leri toplu üretilir.
     """
     if materials_df is None or len(materials_df) == 0:
         return []
@@ -89,58 +148,83 @@ def parse_precursor_edges(materials_df: Optional[pd.DataFrame]) -> List[Precurso
         # not a precursor sheet
         return []
 
-    if not unit_c:
-        df["__unit"] = "t"
-        unit_c = "__unit"
-
-    edges: List[PrecursorEdge] = []
-    for _, r in df.iterrows():
-        sku = str(r.get(sku_c) or "").strip()
-        psku = str(r.get(prec_c) or "").strip()
-        if not sku or not psku:
-            continue
-        qty = _to_float(r.get(qty_c))
-        unit = str(r.get(unit_c) or "t").strip()
-
-        embedded_tco2 = 0.0
-        if emb_c:
-            embedded_tco2 = _to_float(r.get(emb_c))
-        elif emb_i_c:
-            embedded_tco2 = _to_float(r.get(emb_i_c)) * max(0.0, qty)
-        elif ef_c:
-            embedded_tco2 = (_to_float(r.get(ef_c)) * max(0.0, qty)) / 1000.0
-
-        row_hash = sha256_json(
-            {
-                "sku": sku,
-                "precursor_sku": psku,
-                "precursor_quantity": float(qty),
-                "precursor_quantity_unit": unit,
-                "precursor_embedded_tco2": float(embedded_tco2),
-            }
-        )
-
-        edges.append(
-            PrecursorEdge(
-                sku=sku,
-                precursor_sku=psku,
-                precursor_quantity=float(qty),
-                precursor_quantity_unit=unit,
-                precursor_embedded_tco2=float(embedded_tco2),
-                source_row_hash=row_hash,
-            )
+    sku = _str_series(df[sku_c])
+    psku = _str_series(df[prec_c])
+    keep = (sku != "") & (psku != "")
+    if not bool(keep.any()):
+        return []
+    df = df[keep]
+    sku = sku[keep]
+    psku = psku[keep]
+
+    qty = _to_float_series(df[qty_c])
+    unit = _str_series(df[unit_c], "t") if unit_c else pd.Series("t", index=df.index)
+    qty_pos = qty.clip(lower=0.0)
+
+    if emb_c:
+        emb = _to_float_series(df[emb_c])
+    elif emb_i_c:
+        emb = _to_float_series(df[emb_i_c]) * qty_pos
+    elif ef_c:
+        emb = (_to_float_series(df[ef_c]) * qty_pos) / 1000.0
+    else:
+        emb = pd.Series(0.0, index=df.index)
+
+    skus = sku.tolist()
+    pskus = psku.tolist()
+    qtys = [float(x) for x in qty.tolist()]
+    units = unit.tolist()
+    embs = [float(x) for x in emb.tolist()]
+    hashes = _edge_row_hashes(skus, pskus, qtys, units, embs)
+
+    edges = [
+        PrecursorEdge(
+            sku=a,
+            precursor_sku=b,
+            precursor_quantity=q,
+            precursor_quantity_unit=u,
+            precursor_embedded_tco2=e,
+            source_row_hash=h,
         )
+        for a, b, q, u, e, h in zip(skus, pskus, qtys, units, embs, hashes)
+    ]
 
     # deterministic ordering
     edges.sort(key=lambda e: (e.sku, e.precursor_sku, e.source_row_hash))
     return edges
 
 
+def _topo_order(nodes: List[str], graph: Dict[str, List[str]]) -> Tuple[List[str], Optional[List[str]]]:
+    """Deterministik Kahn (min-heap): her adımda en küçük hazır düğüm. O((V+E) log V)."""
+    indeg: Dict[str, int] = {n: 0 for n in nodes}
+    for outs in graph.values():
+        for b in outs:
+            if b in indeg:
+                indeg[b] += 1
+    heap = [n for n, d in indeg.items() if d == 0]
+    heapq.heapify(heap)
+    out: List[str] = []
+    while heap:
+        n = heapq.heappop(heap)
+        out.append(n)
+        for b in graph.get(n, ()):
+            if b in indeg:
+                indeg[b] -= 1
+                if indeg[b] == 0:
+                    heapq.heappush(heap, b)
+    if len(out) != len(nodes):
+        # cycle: return remaining
+        done = set(out)
+        return out, sorted(n for n in nodes if n not in done)
+    return out, None
+
+
 def compute_precursor_tco2_by_sku(
     *,
     production_df: pd.DataFrame,
     materials_df: Optional[pd.DataFrame],
     embedded_tco2_by_sku: Optional[Dict[str, float]] = None,
+    propagate_chain: bool = False,
 ) -> Tuple[Dict[str, float], Dict[str, Any]]:
     """
     Compute precursor emissions per sku.
@@ -151,7 +235,11 @@ def compute_precursor_tco2_by_sku(
          then use embedded_tco2_by_sku[precursor_sku] scaled by precursor_quantity / produced_quantity_of_precursor
          (requires production_df quantity for precursor_sku). This is a simplified deterministic chain approach.
 
-    Cycle detection is applied in chain mode using SKU graph.
+    propagate_chain=True (opt-in; changes results for multi-level BOMs, so callers pair it with a
+    distinct engine version): the precursor's own resolved precursor emissions are added to its
+    embedded emissions. SKUs are resolved in reverse topological order, so chains propagate in one pass.
+
+    Cycle detection is applied in chain mode using SKU graph; SKUs on a cycle only get explicit emissions.
 
     Returns:
       precursor_map: sku -> precursor_tco2
@@ -172,42 +260,20 @@ def compute_precursor_tco2_by_sku(
             prod["sku"] = ""
     if "quantity" not in prod.columns:
         prod["quantity"] = 0.0
-    prod["sku"] = prod["sku"].astype(str).fillna("").apply(lambda x: str(x).strip())
-    prod["quantity"] = prod["quantity"].apply(_to_float)
+    prod["sku"] = prod["sku"].astype(str).str.strip()
+    prod["quantity"] = _to_float_series(prod["quantity"])
 
     qty_by_sku = prod.groupby("sku", dropna=False)["quantity"].sum().to_dict()
 
-    # Build graph
+    # Build graph + grouped edge index (edges already sorted -> per-sku lists stay sorted)
     graph: Dict[str, List[str]] = {}
+    edges_by_sku: Dict[str, List[PrecursorEdge]] = {}
     for e in edges:
         graph.setdefault(e.sku, []).append(e.precursor_sku)
-
-    def topo_sort(nodes: List[str]) -> Tuple[List[str], Optional[List[str]]]:
-        # deterministic Kahn
-        indeg: Dict[str, int] = {n: 0 for n in nodes}
-        for a, outs in graph.items():
-            for b in outs:
-                if b in indeg:
-                    indeg[b] += 1
-        q = sorted([n for n, d in indeg.items() if d == 0])
-        out: List[str] = []
-        while q:
-            n = q.pop(0)
-            out.append(n)
-            for b in sorted(graph.get(n, [])):
-                if b in indeg:
-                    indeg[b] -= 1
-                    if indeg[b] == 0:
-                        q.append(b)
-                        q.sort()
-        if len(out) != len(nodes):
-            # cycle: return remaining
-            cyc = sorted([n for n in nodes if n not in out])
-            return out, cyc
-        return out, None
+        edges_by_sku.setdefault(e.sku, []).append(e)
 
     nodes = sorted(set([e.sku for e in edges] + [e.precursor_sku for e in edges]))
-    order, cycle_nodes = topo_sort(nodes)
+    order, cycle_nodes = _topo_order(nodes, graph)
 
     precursor_map: Dict[str, float] = {k: 0.0 for k in nodes}
 
@@ -218,23 +284,25 @@ def compute_precursor_tco2_by_sku(
         precursor_map[e.sku] = precursor_map.get(e.sku, 0.0) + float(e.precursor_embedded_tco2 or 0.0)
 
     if chain_mode:
-        # compute additional from precursor sku emissions when row doesn't specify embedded
-        # We only add for edges where embedded was 0.0.
-        for sku in order:
-            # for each edge sku<-precursor
-            for e in [x for x in edges if x.sku == sku]:
+        emb_by_sku = embedded_tco2_by_sku or {}
+        cyclic = set(cycle_nodes or [])
+        # precursors first: a sku is resolved only after all of its precursors (propagate_chain)
+        for sku in (reversed(order) if propagate_chain else order):
+            for e in edges_by_sku.get(sku, ()):
                 if float(e.precursor_embedded_tco2 or 0.0) > 0.0:
                     continue
                 psku = e.precursor_sku
-                p_emb = float((embedded_tco2_by_sku or {}).get(psku, 0.0) or 0.0)
                 p_qty = float(qty_by_sku.get(psku, 0.0) or 0.0)
                 if p_qty <= 0.0:
                     continue
+                p_emb = float(emb_by_sku.get(psku, 0.0) or 0.0)
+                if propagate_chain and psku not in cyclic:
+                    p_emb += float(precursor_map.get(psku, 0.0) or 0.0)
                 share = max(0.0, float(e.precursor_quantity or 0.0)) / p_qty
                 precursor_map[sku] = precursor_map.get(sku, 0.0) + p_emb * share
 
     meta = {
-        "precursor_method": "explicit+chain" if chain_mode else "explicit",
+        "precursor_method": ("explicit+chain_propagated" if propagate_chain else "explicit+chain") if chain_mode else "explicit",
         "edges": [e.to_dict() for e in edges],
         "cycle_nodes": cycle_nodes or [],
     }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import contextvars
+from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -52,7 +54,38 @@ def _pick_latest_factor(rows: List[EmissionFactor]) -> Optional[EmissionFactor]:
     )[0]
 
 
+# Toplu replay gibi aynı faktör setini tekrar tekrar çözen işler için kapsamlı memo.
+# Yalnızca shared_factor_lookups() bloğu içinde aktiftir; normal hesaplamada DB her seferinde okunur.
+_factor_memo: contextvars.ContextVar[Optional[Dict[tuple, Any]]] = contextvars.ContextVar("cme_factor_memo", default=None)
+_MISS = object()
+
+
+@contextmanager
+def shared_factor_lookups():
+    """Blok içinde factor set / emission factor DB okumalarını paylaşır (iç içe kullanımda dıştaki memo geçerlidir)."""
+    token = _factor_memo.set({}) if _factor_memo.get() is None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _factor_memo.reset(token)
+
+
+def _memoized(key: tuple, load):
+    memo = _factor_memo.get()
+    if memo is None:
+        return load()
+    hit = memo.get(key, _MISS)
+    if hit is _MISS:
+        hit = memo[key] = load()
+    return hit
+
+
 def _get_active_factor_set_id(project_id: int, region: str = "TR") -> Optional[int]:
+    return _memoized(("factor_set", project_id, region), lambda: _load_active_factor_set_id(project_id, region))
+
+
+def _load_active_factor_set_id(project_id: int, region: str) -> Optional[int]:
     with db() as s:
         fs = (
             s.execute(
@@ -74,6 +107,10 @@ def _get_factor_record(
     factor_set_id: Optional[int] = None,
 ) -> Optional[EmissionFactor]:
     fsid = factor_set_id or _get_active_factor_set_id(project_id, region=region)
+    return _memoized(("factor", project_id, factor_type, region, fsid), lambda: _load_factor_record(project_id, factor_type, region, fsid))
+
+
+def _load_factor_record(project_id: int, factor_type: str, region: str, fsid: Optional[int]) -> Optional[EmissionFactor]:
     with db() as s:
         q = select(EmissionFactor).where(
             EmissionFactor.project_id == project_id,
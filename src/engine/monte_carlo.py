@@ -0,0 +1,291 @@
+"""Monte Carlo belirsizlik + fiyat simülasyonu (ETS / CBAM maliyet riski).
+
+Nokta tahmin (UncertaintyEngine, sqrt_sum_squares) yerine dağılım üretir:
+  - faaliyet verisi belirsizliği: ölçüm tier'ına göre (MRR Ek II: tier 1..4 -> ±7.5/5/2.5/1.5 %, %95 GA)
+  - emisyon faktörü belirsizliği: aynı factor_group'taki kaynaklar tek draw paylaşır (tam korelasyon)
+  - EUA fiyatı ve EUR/TRY kuru: ortalaması korunan log-normal, aralarında korelasyon (rho)
+
+Tüm örnekleme seed'li NumPy Generator ile yapılır; her chunk kendi SeedSequence çocuğunu
+kullanır. Aynı (seed, n_draws, chunk_size, girdiler) -> birebir aynı sonuç (audit için).
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.mrv.lineage import sha256_json
+from src.services.cbam_liability import cbam_certificates_and_amount
+
+
+# Faaliyet verisi tier -> %95 güven aralığı yarı genişliği (%)
+TIER_UNCERTAINTY_PCT: Dict[int, float] = {1: 7.5, 2: 5.0, 3: 2.5, 4: 1.5}
+
+_Z95 = 1.959963984540054
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0, 99.0)
+
+
+@dataclass(frozen=True)
+class UncertainSource:
+    """Tek bir emisyon kaynağı (akış): base_tco2 = faaliyet verisi × emisyon faktörü."""
+
+    name: str
+    base_tco2: float
+    scope: str = "direct"  # direct | indirect
+    activity_tier: int = 2
+    activity_uncertainty_pct: Optional[float] = None  # verilirse tier yerine kullanılır (%95 GA)
+    factor_uncertainty_pct: float = 0.0  # %95 GA
+    factor_group: str = ""  # aynı grup -> korelasyonlu faktör draw'u
+
+    def activity_sigma(self) -> float:
+        pct = self.activity_uncertainty_pct
+        if pct is None:
+            pct = TIER_UNCERTAINTY_PCT.get(int(self.activity_tier), TIER_UNCERTAINTY_PCT[1])
+        return max(0.0, float(pct)) / 100.0 / _Z95
+
+    def factor_sigma(self) -> float:
+        return max(0.0, float(self.factor_uncertainty_pct)) / 100.0 / _Z95
+
+
+@dataclass(frozen=True)
+class MarketModel:
+    eua_price_eur_per_t: float
+    fx_try_per_eur: float
+    eua_volatility: float = 0.35  # log-normal sigma (ufuk boyunca)
+    fx_volatility: float = 0.20
+    eua_fx_correlation: float = 0.0
+
+
+@dataclass(frozen=True)
+class CostModel:
+    reporting_year: int
+    free_allocation_tco2: float = 0.0
+    carbon_price_paid_eur_per_t: float = 0.0
+    # CBAM gömülü emisyon / toplam emisyon oranı (ihracat payı dahil)
+    embedded_to_total_ratio: float = 0.0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def _lognormal_mean_preserving(mean: float, sigma: float, z: np.ndarray) -> np.ndarray:
+    return float(mean) * np.exp(float(sigma) * z - 0.5 * float(sigma) ** 2)
+
+
+def _summarize(x: np.ndarray, percentiles: Sequence[float]) -> Dict[str, float]:
+    out = {"mean": float(np.mean(x)), "std": float(np.std(x, ddof=1)) if len(x) > 1 else 0.0}
+    for p, v in zip(percentiles, np.percentile(x, list(percentiles))):
+        out[f"p{p:g}"] = float(v)
+    return out
+
+
+def _var(x: np.ndarray, level: float, reference: float) -> Dict[str, float]:
+    """VaR: level yüzdeliğinin referans (nokta tahmin) üzerindeki kısmı; ES: kuyruk ortalaması."""
+    q = float(np.percentile(x, level))
+    tail = x[x >= q]
+    return {
+        f"var{level:g}": max(0.0, q - float(reference)),
+        f"es{level:g}": float(tail.mean()) if len(tail) else q,
+        f"p{level:g}": q,
+    }
+
+
+def simulate(
+    sources: Sequence[UncertainSource],
+    market: MarketModel,
+    cost: CostModel,
+    *,
+    n_draws: int = 100_000,
+    seed: int = 12345,
+    chunk_size: int = 20_000,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    var_level: float = 95.0,
+) -> Dict[str, Any]:
+    """Toplam emisyon ve ETS + CBAM maliyetini n_draws örnekle simüle eder.
+
+    Chunk'lar halinde (bellek: chunk_size × kaynak sayısı) vektörize hesaplanır; draw başına
+    yalnızca birkaç skaler saklanır.
+    """
+    srcs = list(sources)
+    n = max(1, int(n_draws))
+    chunk = max(1, int(chunk_size))
+
+    base = np.array([float(s.base_tco2) for s in srcs], dtype=float)
+    direct_mask = np.array([str(s.scope).lower() != "indirect" for s in srcs], dtype=bool)
+    sig_a = np.array([s.activity_sigma() for s in srcs], dtype=float)
+    groups = sorted({s.factor_group or s.name for s in srcs})
+    g_index = {g: i for i, g in enumerate(groups)}
+    src_group = np.array([g_index[s.factor_group or s.name] for s in srcs], dtype=np.int64)
+    # grup sigması: gruptaki en büyük faktör belirsizliği
+    sig_g = np.zeros(len(groups))
+    for s, gi in zip(srcs, src_group):
+        sig_g[gi] = max(sig_g[gi], s.factor_sigma())
+
+    rho = max(-1.0, min(1.0, float(market.eua_fx_correlation)))
+    base_total = float(base.sum())
+    base_direct = float(base[direct_mask].sum()) if len(base) else 0.0
+
+    totals = np.empty(n)
+    directs = np.empty(n)
+    eua = np.empty(n)
+    fx = np.empty(n)
+
+    n_chunks = (n + chunk - 1) // chunk
+    children = np.random.SeedSequence(int(seed)).spawn(n_chunks)
+    for ci, ss in enumerate(children):
+        lo = ci * chunk
+        hi = min(n, lo + chunk)
+        m = hi - lo
+        rng = np.random.default_rng(ss)
+
+        a = np.clip(1.0 + rng.standard_normal((m, len(srcs))) * sig_a, 0.0, None)
+        f = np.clip(1.0 + rng.standard_normal((m, len(groups))) * sig_g, 0.0, None)
+        em = base * a * f[:, src_group]
+        totals[lo:hi] = em.sum(axis=1)
+        directs[lo:hi] = em[:, direct_mask].sum(axis=1)
+
+        z = rng.standard_normal((m, 2))
+        z_fx = rho * z[:, 0] + np.sqrt(1.0 - rho * rho) * z[:, 1]
+        eua[lo:hi] = _lognormal_mean_preserving(market.eua_price_eur_per_t, market.eua_volatility, z[:, 0])
+        fx[lo:hi] = _lognormal_mean_preserving(market.fx_try_per_eur, market.fx_volatility, z_fx)
+
+    ets_eur = np.clip(directs - float(cost.free_allocation_tco2), 0.0, None) * eua
+    embedded = totals * max(0.0, float(cost.embedded_to_total_ratio))
+    _, cbam_eur = cbam_certificates_and_amount(
+        year=int(cost.reporting_year),
+        embedded_emissions_tco2=embedded,
+        eu_ets_price_eur_per_t=eua,
+        carbon_price_paid_eur_per_t=cost.carbon_price_paid_eur_per_t,
+    )
+    total_eur = ets_eur + cbam_eur
+    total_try = total_eur * fx
+
+    # nokta tahmin (tüm belirsizlikler ortalamada)
+    point_ets = max(0.0, base_direct - float(cost.free_allocation_tco2)) * float(market.eua_price_eur_per_t)
+    _, point_cbam = cbam_certificates_and_amount(
+        year=int(cost.reporting_year),
+        embedded_emissions_tco2=base_total * max(0.0, float(cost.embedded_to_total_ratio)),
+        eu_ets_price_eur_per_t=float(market.eua_price_eur_per_t),
+        carbon_price_paid_eur_per_t=cost.carbon_price_paid_eur_per_t,
+    )
+    point_eur = point_ets + float(point_cbam)
+    point_try = point_eur * float(market.fx_try_per_eur)
+
+    # analitik (hata yayılımı, sqrt-sum-squares) karşılaştırma: bağımsız kaynak varsayımı
+    abs_sigma = np.sqrt(np.sum((base * np.sqrt(sig_a**2 + sig_g[src_group] ** 2)) ** 2)) if len(base) else 0.0
+    analytic_pct = float(abs_sigma * _Z95 / base_total * 100.0) if base_total > 0 else 0.0
+
+    inputs = {
+        "sources": [asdict(s) for s in srcs],
+        "market": asdict(market),
+        "cost": asdict(cost),
+        "n_draws": n,
+        "seed": int(seed),
+        "chunk_size": chunk,
+    }
+    pcts = tuple(float(p) for p in percentiles)
+    out = {
+        "schema": "monte_carlo_cost.v1",
+        "inputs": inputs,
+        "input_hash": sha256_json(inputs),
+        "point_estimate": {
+            "total_tco2": base_total,
+            "direct_tco2": base_direct,
+            "total_cost_eur": point_eur,
+            "total_cost_try": point_try,
+        },
+        "emissions_tco2": _summarize(totals, pcts),
+        "emissions_uncertainty_pct_95": {
+            "monte_carlo": float((np.percentile(totals, 97.5) - np.percentile(totals, 2.5)) / 2.0 / base_total * 100.0)
+            if base_total > 0
+            else 0.0,
+            "analytic_sqrt_sum_squares": analytic_pct,
+        },
+        "eua_price_eur_per_t": _summarize(eua, pcts),
+        "fx_try_per_eur": _summarize(fx, pcts),
+        "ets_cost_eur": _summarize(ets_eur, pcts),
+        "cbam_cost_eur": _summarize(cbam_eur, pcts),
+        "total_cost_eur": {**_summarize(total_eur, pcts), **_var(total_eur, var_level, point_eur)},
+        "total_cost_try": {**_summarize(total_try, pcts), **_var(total_try, var_level, point_try)},
+    }
+    out["result_hash"] = sha256_json({k: v for k, v in out.items() if k != "inputs"})
+    return out
+
+
+def _stream_rows(results: Dict[str, Any]) -> tuple:
+    """(direct satırları, indirect satırları): results.energy (energy_emissions çıktısı) ya da breakdown.energy."""
+    energy = (results or {}).get("energy") or {}
+    breakdown = ((results or {}).get("breakdown") or {}).get("energy") or {}
+    direct = energy.get("direct_rows") or breakdown.get("fuel_rows") or []
+    indirect = energy.get("indirect_rows") or breakdown.get("electricity_rows") or []
+    return list(direct), list(indirect)
+
+
+def sources_from_results(results: Dict[str, Any], uncertainty_cfg: Dict[str, Any] | None = None) -> List[UncertainSource]:
+    """Snapshot results'tan kaynak listesi: kaynak akışı (source stream) başına bir kaynak.
+
+    - direct: energy.direct_rows yakıt türüne göre ("fuel:natural_gas", ...), faktör grubu = yakıt
+    - indirect: energy.indirect_rows elektrik yöntemine göre ("electricity:location", ...)
+    Her akışın faaliyet verisi bağımsız draw alır; scope toplamına tek draw, bağımsız akışların
+    belirsizliğini olduğundan büyük gösterir. Satırlar kpis scope toplamını karşılamıyorsa fark
+    "direct" / "indirect" artık kaynağı olarak eklenir; satır yoksa eski davranış (scope başına tek kaynak).
+
+    uncertainty_cfg örn (anahtar: akış adı > yakıt türü > scope):
+      {"activity_tier": {"direct": 3, "indirect": 4, "fuel:coal": 1},
+       "factor_uncertainty_pct": {"direct": 2.0, "indirect": 10.0, "natural_gas": 1.5}}
+    """
+    cfg = uncertainty_cfg or {}
+    tiers = cfg.get("activity_tier") or {}
+    fpct = cfg.get("factor_uncertainty_pct") or {}
+    kpis = (results or {}).get("kpis") or {}
+
+    def _fl(x: Any) -> float:
+        try:
+            return float(x or 0.0)
+        except Exception:
+            return 0.0
+
+    def _lookup(table: Dict[str, Any], keys: Sequence[str], default: Any) -> Any:
+        for k in keys:
+            if k in table and table[k] is not None:
+                return table[k]
+        return default
+
+    def _source(name: str, value: float, scope: str, kind: str) -> UncertainSource:
+        keys = (name, kind, scope)
+        return UncertainSource(
+            name=name,
+            base_tco2=value,
+            scope=scope,
+            activity_tier=int(_lookup(tiers, keys, 2) or 2),
+            factor_uncertainty_pct=_fl(_lookup(fpct, keys, 2.0 if scope == "direct" else 10.0)),
+            factor_group=name,
+        )
+
+    direct_rows, indirect_rows = _stream_rows(results)
+    streams: Dict[tuple, float] = {}
+    for scope, rows in (("direct", direct_rows), ("indirect", indirect_rows)):
+        for r in rows:
+            if not isinstance(r, dict):
+                continue
+            if scope == "direct":
+                kind = str(r.get("fuel_type") or "unknown").strip().lower() or "unknown"
+                name = f"fuel:{kind}"
+            else:
+                kind = str(r.get("method") or "location").strip().lower() or "location"
+                name = f"electricity:{kind}"
+            key = (scope, name, kind)
+            streams[key] = streams.get(key, 0.0) + _fl(r.get("tco2"))
+
+    out = []
+    for (scope, name, kind), v in sorted(streams.items()):
+        if v > 0.0:
+            out.append(_source(name, v, scope, kind))
+
+    # satırlarla karşılanmayan scope toplamı (eski snapshot'lar: satır yok -> tamamı)
+    for scope, key in (("direct", "scope1_tco2"), ("indirect", "scope2_tco2")):
+        covered = sum(v for (sc, _, _), v in streams.items() if sc == scope and v > 0.0)
+        rest = _fl(kpis.get(key)) - covered
+        if rest > 1e-9 * max(1.0, covered):
+            out.append(_source(scope, rest, scope, scope))
+    return out
@@ -4,17 +4,24 @@ from __future__ import annotations
 
 Kapsam:
 - Abatement cost curve (MACC) üretimi
-- Basit portföy seçimi (greedy):
-  - hedef azaltım (% veya tCO2)
-  - max CAPEX
+- Portföy seçimi:
+  - greedy (maliyet/tCO2 sırası; geriye dönük uyumlu varsayılan)
+  - exact: küçük kataloglar için DP knapsack, büyükler için LP gevşetme sınırlı branch-and-bound
+  - kısıtlar: hedef azaltım (% veya tCO2), max CAPEX, dışlayıcı gruplar (exclusive_group),
+    bağımlılıklar (requires), yıllık CAPEX bütçeleri (çok yıllı fazlama), süre limiti
 
 Not:
-- Harici solver yok (Streamlit Cloud uyumlu).
+- Harici solver yok (Streamlit Cloud uyumlu): saf Python + NumPy.
 - Deterministik: stable sort + id tie-break.
 """
 
-from dataclasses import dataclass
-from typing import Any, Dict, List
+import bisect
+import math
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 
 def _to_float(x: Any, default: float = 0.0) -> float:
@@ -35,6 +42,9 @@ class Option:
     opex_delta_eur_per_year: float
     lifetime_years: int
     notes: str = ""
+    exclusive_group: str = ""  # aynı gruptan en fazla bir önlem seçilebilir
+    requires: Tuple[str, ...] = field(default_factory=tuple)  # önkoşul önlem id'leri
+    earliest_year: int = 0  # fazlama: bu yıldan önce uygulanamaz (0 = kısıt yok)
 
     def annualized_cost_eur(self, discount_rate: float = 0.08) -> float:
         r = float(discount_rate)
@@ -62,9 +72,23 @@ class Option:
             "annualized_cost_eur": float(self.annualized_cost_eur(discount_rate=discount_rate)),
             "cost_per_tco2": float(self.cost_per_tco2(discount_rate=discount_rate)),
             "notes": self.notes,
+            "exclusive_group": self.exclusive_group,
+            "requires": list(self.requires),
+            "earliest_year": int(self.earliest_year),
         }
 
 
+def _as_id_tuple(x: Any) -> Tuple[str, ...]:
+    if x is None or x == "":
+        return ()
+    if isinstance(x, str):
+        return tuple(p.strip() for p in x.split(",") if p.strip())
+    try:
+        return tuple(str(p) for p in x if str(p).strip())
+    except TypeError:
+        return (str(x),)
+
+
 def build_options_from_measures(measures: List[Dict[str, Any]], total_tco2: float) -> List[Option]:
     opts: List[Option] = []
     for m in measures or []:
@@ -81,6 +105,9 @@ def build_options_from_measures(measures: List[Dict[str, Any]], total_tco2: floa
                 opex_delta_eur_per_year=_to_float(m.get("opex_delta_eur_per_year"), 0.0),
                 lifetime_years=int(_to_float(m.get("lifetime_years"), 10) or 10),
                 notes=str(m.get("description") or ""),
+                exclusive_group=str(m.get("exclusive_group") or ""),
+                requires=_as_id_tuple(m.get("requires")),
+                earliest_year=int(_to_float(m.get("earliest_year"), 0.0)),
             )
         )
     return opts
@@ -97,24 +124,15 @@ def compute_abatement_curve(options: List[Option], discount_rate: float = 0.08)
     return rows
 
 
-def optimize_portfolio(
-    options: List[Option],
-    *,
-    target_reduction_tco2: float | None,
-    max_capex_eur: float | None,
-    discount_rate: float = 0.08,
-) -> Dict[str, Any]:
-    opts = list(options or [])
-
-    for o in opts:
-        o.reduction_tco2 = float(max(0.0, o.reduction_tco2))
-        o.capex_eur = float(max(0.0, o.capex_eur))
+_EPS = 1e-9
+SOLVERS = ("greedy", "auto", "dp", "bnb")
+PAYLOAD_MAX_NODES = 200_000  # build_optimizer_payload varsayılan B&B düğüm bütçesi
+DP_MAX_ITEMS = 300
+DP_MAX_CELLS = 5_000_000  # grup sayısı × CAPEX birimi (DP tablosu üst sınırı)
 
-    opts.sort(key=lambda o: (o.cost_per_tco2(discount_rate=discount_rate), -o.reduction_tco2, str(o.id)))
-
-    target = float(target_reduction_tco2) if target_reduction_tco2 is not None else None
-    cap_max = float(max_capex_eur) if max_capex_eur is not None else None
 
+def _greedy_select(opts: List[Option], target: float | None, cap_max: float | None, discount_rate: float) -> List[Option]:
+    opts = sorted(opts, key=lambda o: (o.cost_per_tco2(discount_rate=discount_rate), -o.reduction_tco2, str(o.id)))
     selected: List[Option] = []
     used_capex = 0.0
     achieved = 0.0
@@ -131,10 +149,482 @@ def optimize_portfolio(
 
         if target is not None and achieved >= target - 1e-9:
             break
+    return selected
+
+
+class _Problem:
+    """Exact solver'ın karar sırasına dizilmiş, dizilere açılmış hali.
+
+    mode="max": max Σ azaltım (eşitlikte min yıllık maliyet), s.t. CAPEX
+    mode="min": min Σ yıllık maliyet, s.t. Σ azaltım >= hedef ve CAPEX
+    Slot = fazlama yılı (bütçe yoksa tek slot, kapasite = max CAPEX).
+    """
+
+    def __init__(
+        self,
+        opts: List[Option],
+        *,
+        mode: str,
+        discount_rate: float,
+        cap_max: float | None,
+        budgets: Dict[int, float] | None,
+    ):
+        self.mode = mode
+
+        def _key(o: Option) -> tuple:
+            r = float(o.reduction_tco2)
+            if mode == "max":
+                w = float(o.capex_eur)
+                ratio = (r / w if w > 0 else math.inf) if r > 0 else -1.0
+                return (-ratio, -r, str(o.id))
+            c = o.annualized_cost_eur(discount_rate=discount_rate)
+            return ((c / r) if r > 0 else math.inf, -r, str(o.id))
+
+        self.opts = sorted(opts, key=_key)
+        n = self.n = len(self.opts)
+        self.r = [float(o.reduction_tco2) for o in self.opts]
+        self.w = [float(o.capex_eur) for o in self.opts]
+        self.c = [float(o.annualized_cost_eur(discount_rate=discount_rate)) for o in self.opts]
+
+        self.pref_r = [0.0] * (n + 1)
+        self.pref_w = [0.0] * (n + 1)
+        self.pref_c = [0.0] * (n + 1)
+        self.neg_c = [0.0] * (n + 1)  # suffix Σ min(c, 0)
+        for i in range(n):
+            self.pref_r[i + 1] = self.pref_r[i] + self.r[i]
+            self.pref_w[i + 1] = self.pref_w[i] + self.w[i]
+            self.pref_c[i + 1] = self.pref_c[i] + self.c[i]
+        for i in range(n - 1, -1, -1):
+            self.neg_c[i] = self.neg_c[i + 1] + min(self.c[i], 0.0)
+        # min modunda c<=0 ve r>0 olan önlemler sıranın başında (c/r <= 0)
+        self.z = 0
+        while self.z < n and self.r[self.z] > 0 and self.c[self.z] <= 0:
+            self.z += 1
+
+        gnames = sorted({o.exclusive_group for o in self.opts if o.exclusive_group})
+        gidx = {g: i for i, g in enumerate(gnames)}
+        self.grp = [gidx[o.exclusive_group] if o.exclusive_group else -1 for o in self.opts]
+
+        if budgets:
+            self.slots: List[Tuple[Optional[int], float]] = [(int(y), max(0.0, float(v))) for y, v in sorted(budgets.items())]
+            total = sum(v for _, v in self.slots)
+            self.total_cap = min(total, cap_max) if cap_max is not None else total
+        else:
+            self.slots = [(None, math.inf if cap_max is None else float(cap_max))]
+            self.total_cap = math.inf if cap_max is None else float(cap_max)
+        self.allowed = [
+            tuple(si for si, (y, _) in enumerate(self.slots) if y is None or int(o.earliest_year or 0) <= y) for o in self.opts
+        ]
+
+        first: Dict[str, int] = {}
+        for i, o in enumerate(self.opts):
+            first.setdefault(str(o.id), i)
+        self.req = []
+        for o in self.opts:
+            ids = [str(x) for x in (o.requires or ())]
+            self.req.append(tuple(first[x] for x in ids) if all(x in first for x in ids) else None)
+        self.closure = [self._closure(i) for i in range(n)]
+        self.has_deps = any(self.req[i] for i in range(n))
+
+    def _closure(self, i: int) -> Optional[Tuple[int, ...]]:
+        """i + geçişli önkoşulları; karşılanamayan önkoşul varsa None."""
+        seen = {i}
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            reqs = self.req[j]
+            if reqs is None or not self.allowed[j]:
+                return None
+            for k in reqs:
+                if k not in seen:
+                    seen.add(k)
+                    stack.append(k)
+        return tuple(sorted(seen))
+
+    def upper_bound(self, pos: int, cap_rem: float) -> float:
+        """max modu: kalan önlemler üzerinde kesirli knapsack (Dantzig / LP gevşetme)."""
+        pw = self.pref_w
+        base = pw[pos]
+        k = bisect.bisect_right(pw, base + cap_rem, lo=pos) - 1
+        val = self.pref_r[k] - self.pref_r[pos]
+        if k < self.n and self.w[k] > 0:
+            val += (cap_rem - (pw[k] - base)) / self.w[k] * self.r[k]
+        return val
+
+    def lower_bound(self, pos: int, need: float) -> float:
+        """min modu: CAPEX ve grup kısıtı gevşetilmiş kesirli kapsama (LP) alt sınırı."""
+        lb = self.neg_c[pos]
+        if need <= _EPS:
+            return lb
+        pr = self.pref_r
+        s = max(pos, self.z)
+        need -= pr[s] - pr[pos]
+        if need <= _EPS:
+            return lb
+        if pr[self.n] - pr[s] < need - _EPS:
+            return math.inf
+        k = bisect.bisect_left(pr, pr[s] + need, lo=s + 1)
+        k = min(k, self.n)
+        part = need - (pr[k - 1] - pr[s])
+        lb += (self.pref_c[k - 1] - self.pref_c[s]) + (part / self.r[k - 1]) * self.c[k - 1]
+        return lb
+
+
+def _slot_of(masks: Tuple[int, ...], j: int) -> int:
+    for si, m in enumerate(masks):
+        if (m >> j) & 1:
+            return si
+    return -1
+
+
+def _branch_and_bound(
+    pb: _Problem,
+    *,
+    target: float | None,
+    deadline: float,
+    max_nodes: int,
+) -> Dict[str, Any]:
+    """Derinlik-öncelikli B&B. İlk dalış = kısıtlara uyan greedy; sonrası sınırla budanır."""
+    n = pb.n
+    mode = pb.mode
+    best_r, best_c = (-math.inf, math.inf) if mode == "max" else (0.0, math.inf)
+    best_masks: Optional[Tuple[int, ...]] = None
+    status = "optimal"
+    nodes = 0
+    tol_r = _EPS * max(1.0, pb.pref_r[n])
+    tol_c = _EPS * max(1.0, abs(pb.pref_c[n]))
+
+    caps0 = tuple(v for _, v in pb.slots)
+    # (pos, r, c, slot kapasiteleri, kalan toplam CAPEX, grup maskesi, seçili, dışlanan, slot maskeleri)
+    stack = [(0, 0.0, 0.0, caps0, pb.total_cap, 0, 0, 0, tuple(0 for _ in caps0))]
+    while stack:
+        nodes += 1
+        if nodes >= max_nodes:
+            status = "node_limit"
+            break
+        if (nodes & 255) == 0 and time.perf_counter() > deadline:
+            status = "time_limit"
+            break
 
-    portfolio_cost_ann = sum(o.annualized_cost_eur(discount_rate=discount_rate) for o in selected)
+        pos, cr, cc, caps, tot, gm, ch, ex, masks = stack.pop()
+        if mode == "max":
+            if cr > best_r + tol_r or (abs(cr - best_r) <= tol_r and cc < best_c - tol_c):
+                best_r, best_c, best_masks = cr, cc, masks
+        elif cr >= float(target) - tol_r and cc < best_c - tol_c:
+            best_r, best_c, best_masks = cr, cc, masks
+
+        while pos < n and ((ch >> pos) & 1 or (ex >> pos) & 1):
+            pos += 1
+        if pos >= n:
+            continue
 
+        if mode == "max":
+            if cr + pb.upper_bound(pos, min(tot, sum(caps))) <= best_r + tol_r:
+                continue
+        elif cc + pb.lower_bound(pos, float(target) - cr) >= best_c - tol_c:
+            continue
+
+        children = []
+        clo = pb.closure[pos]
+        if clo is not None:
+            add = [j for j in clo if not (ch >> j) & 1]
+            ok = not any((ex >> j) & 1 for j in add)
+            add_w = sum(pb.w[j] for j in add)
+            ok = ok and add_w <= tot + 1e-9
+            gm2 = gm
+            if ok:
+                for j in add:
+                    g = pb.grp[j]
+                    if g >= 0:
+                        if (gm2 >> g) & 1:
+                            ok = False
+                            break
+                        gm2 |= 1 << g
+            if ok:
+                # önkoşullar: en erken uygun slot (first-fit); önlemin kendisi: her uygun slot bir dal
+                caps_l = list(caps)
+                masks_l = list(masks)
+                floor_slot = 0
+                for j in add:
+                    if j == pos:
+                        continue
+                    lo = max((_slot_of(tuple(masks_l), k) for k in (pb.req[j] or ())), default=0)
+                    si = next((s for s in pb.allowed[j] if s >= lo and caps_l[s] >= pb.w[j] - 1e-9), None)
+                    if si is None:
+                        ok = False
+                        break
+                    caps_l[si] -= pb.w[j]
+                    masks_l[si] |= 1 << j
+                if ok:
+                    floor_slot = max((_slot_of(tuple(masks_l), k) for k in (pb.req[pos] or ())), default=0)
+                    d_r = sum(pb.r[j] for j in add)
+                    d_c = sum(pb.c[j] for j in add)
+                    ch2 = ch
+                    for j in add:
+                        ch2 |= 1 << j
+                    for si in pb.allowed[pos]:
+                        if si < floor_slot or caps_l[si] < pb.w[pos] - 1e-9:
+                            continue
+                        c2 = list(caps_l)
+                        c2[si] -= pb.w[pos]
+                        m2 = list(masks_l)
+                        m2[si] |= 1 << pos
+                        children.append((pos + 1, cr + d_r, cc + d_c, tuple(c2), tot - add_w, gm2, ch2, ex, tuple(m2)))
+
+        stack.append((pos + 1, cr, cc, caps, tot, gm, ch, ex | (1 << pos), masks))
+        stack.extend(reversed(children))  # en erken slot önce keşfedilir
+
+    if mode == "max":
+        root = pb.upper_bound(0, min(pb.total_cap, sum(caps0)))
+    else:
+        root = pb.lower_bound(0, float(target))
     return {
+        "masks": best_masks,
+        "reduction_tco2": best_r,
+        "annualized_cost_eur": best_c,
+        "status": status,
+        "nodes": nodes,
+        "root_bound": root,
+    }
+
+
+def _dp_knapsack(pb: _Problem) -> Optional[Dict[str, Any]]:
+    """Grup (multiple-choice) 0/1 knapsack, 1 EUR çözünürlük + gcd ölçekleme.
+
+    Uygulanamazsa (bağımlılık, fazlama, sınırsız bütçe, tablo çok büyük) None döner.
+    """
+    if pb.mode != "max" or pb.has_deps or len(pb.slots) != 1 or not math.isfinite(pb.total_cap):
+        return None
+    if pb.n > DP_MAX_ITEMS:
+        return None
+
+    cap_i = int(math.floor(pb.total_cap + 1e-6))
+    w_i = [int(round(w)) for w in pb.w]
+    unit = cap_i
+    for w in w_i:
+        unit = math.gcd(unit, w)
+    unit = max(1, unit)
+    units = cap_i // unit
+
+    groups: Dict[int, List[int]] = {}
+    singles: List[List[int]] = []
+    for i in range(pb.n):
+        if pb.closure[i] is None or pb.r[i] <= 0:
+            continue
+        if pb.grp[i] >= 0:
+            groups.setdefault(pb.grp[i], []).append(i)
+        else:
+            singles.append([i])
+    members = [groups[g] for g in sorted(groups)] + singles
+    if (len(members) + 1) * (units + 1) > DP_MAX_CELLS:
+        return None
+
+    best_r = np.zeros(units + 1)
+    best_c = np.zeros(units + 1)
+    tol = _EPS * max(1.0, pb.pref_r[pb.n])
+    picks: List[np.ndarray] = []
+    for grp in members:
+        new_r = best_r.copy()
+        new_c = best_c.copy()
+        pick = np.full(units + 1, -1, dtype=np.int32)
+        for m, i in enumerate(grp):
+            wu = w_i[i] // unit
+            if wu > units:
+                continue
+            cand_r = best_r[: units + 1 - wu] + pb.r[i]
+            cand_c = best_c[: units + 1 - wu] + pb.c[i]
+            cur_r = new_r[wu:]
+            cur_c = new_c[wu:]
+            better = (cand_r > cur_r + tol) | ((np.abs(cand_r - cur_r) <= tol) & (cand_c < cur_c - 1e-9))
+            cur_r[better] = cand_r[better]
+            cur_c[better] = cand_c[better]
+            pick[wu:][better] = m
+        picks.append(pick)
+        best_r, best_c = new_r, new_c
+
+    chosen: List[int] = []
+    k = units
+    for grp, pick in zip(reversed(members), reversed(picks)):
+        m = int(pick[k])
+        if m >= 0:
+            i = grp[m]
+            chosen.append(i)
+            k -= w_i[i] // unit
+    if sum(pb.w[i] for i in chosen) > pb.total_cap + 1e-6:  # yuvarlama taşması -> B&B
+        return None
+    mask = 0
+    for i in chosen:
+        mask |= 1 << i
+    return {
+        "masks": (mask,),
+        "reduction_tco2": float(best_r[units]),
+        "annualized_cost_eur": float(best_c[units]),
+        "status": "optimal",
+        "nodes": int(len(members)),
+        "root_bound": pb.upper_bound(0, pb.total_cap),
+        "dp_units": int(units),
+        "dp_unit_eur": int(unit),
+    }
+
+
+def _solve_exact(
+    opts: List[Option],
+    *,
+    target: float | None,
+    cap_max: float | None,
+    budgets: Dict[int, float] | None,
+    discount_rate: float,
+    solver: str,
+    time_limit_s: float | None,
+    max_nodes: int,
+) -> Tuple[List[Option], Dict[int, Optional[int]], Dict[str, Any]]:
+    t0 = time.perf_counter()
+    deadline = math.inf if time_limit_s is None else t0 + max(0.0, float(time_limit_s))
+    info: Dict[str, Any] = {"target_met": None}
+
+    res = None
+    pb = None
+    if target is not None:
+        pb = _Problem(opts, mode="min", discount_rate=discount_rate, cap_max=cap_max, budgets=budgets)
+        res = _branch_and_bound(pb, target=target, deadline=deadline, max_nodes=max_nodes)
+        info["method"] = "branch_and_bound"
+        info["objective"] = "min_annualized_cost"
+        info["target_met"] = res["masks"] is not None
+        if res["masks"] is None:
+            res = None  # hedef bu kısıtlarla ulaşılamaz (ya da limit içinde bulunamadı) -> max azaltım
+
+    if res is None:
+        pb = _Problem(opts, mode="max", discount_rate=discount_rate, cap_max=cap_max, budgets=budgets)
+        info["objective"] = "max_reduction"
+        if solver in ("auto", "dp"):
+            res = _dp_knapsack(pb)
+            info["method"] = "dp_knapsack" if res is not None else "branch_and_bound"
+        if res is None:
+            info["method"] = "branch_and_bound"
+            res = _branch_and_bound(pb, target=None, deadline=deadline, max_nodes=max_nodes)
+
+    masks = res["masks"] or tuple(0 for _ in pb.slots)
+    selected: List[Option] = []
+    years: Dict[int, Optional[int]] = {}  # id(option) -> uygulama yılı
+    for si, m in enumerate(masks):
+        for i in range(pb.n):
+            if (m >> i) & 1:
+                selected.append(pb.opts[i])
+                years[id(pb.opts[i])] = pb.slots[si][0]
+
+    best = float(sum(o.reduction_tco2 for o in selected)) if info["objective"] == "max_reduction" else float(
+        sum(o.annualized_cost_eur(discount_rate=discount_rate) for o in selected)
+    )
+    root = float(res["root_bound"])
+    gap = None
+    if math.isfinite(root) and abs(root) > 1e-12:
+        gap = abs(root - best) / abs(root) * 100.0
+    info.update(
+        {
+            "status": res["status"],
+            "optimal": res["status"] == "optimal",
+            "nodes": int(res["nodes"]),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+            "root_bound": root if math.isfinite(root) else None,
+            "root_gap_pct": gap,
+            "time_limit_s": float(time_limit_s) if time_limit_s is not None else None,
+            "max_nodes": int(max_nodes),
+        }
+    )
+    for k in ("dp_units", "dp_unit_eur"):
+        if k in res:
+            info[k] = res[k]
+    return selected, years, info
+
+
+def _requires_cycle(opts: Sequence[Option]) -> Optional[List[str]]:
+    """requires grafiğinde döngü varsa döngüdeki id'ler (a -> b -> a), yoksa None."""
+    deps: Dict[str, List[str]] = {}
+    for o in opts:
+        deps.setdefault(str(o.id), []).extend(str(x) for x in (o.requires or ()))
+    state: Dict[str, int] = {}  # 1: yolda, 2: bitti
+    for root in sorted(deps):
+        if state.get(root):
+            continue
+        path = [root]
+        stack = [iter(deps[root])]
+        state[root] = 1
+        while stack:
+            nxt = next(stack[-1], None)
+            if nxt is None:
+                state[path.pop()] = 2
+                stack.pop()
+                continue
+            if state.get(nxt) == 1:
+                return path[path.index(nxt):] + [nxt]
+            if nxt in deps and not state.get(nxt):
+                state[nxt] = 1
+                path.append(nxt)
+                stack.append(iter(deps[nxt]))
+    return None
+
+
+def optimize_portfolio(
+    options: List[Option],
+    *,
+    target_reduction_tco2: float | None,
+    max_capex_eur: float | None,
+    discount_rate: float = 0.08,
+    solver: str = "greedy",
+    time_limit_s: float | None = 5.0,
+    capex_budget_by_year: Dict[int, float] | None = None,
+    max_nodes: int = 2_000_000,
+) -> Dict[str, Any]:
+    """Portföy seçimi.
+
+    solver:
+      - "greedy": maliyet/tCO2 sırasıyla ekle (grup/bağımlılık/fazlama yok sayılır)
+      - "auto":   hedef yoksa ve uygunsa DP knapsack, aksi halde branch-and-bound
+      - "dp" / "bnb": yöntemi zorla (DP uygulanamazsa B&B)
+    Hedef verilirse exact mod min yıllık maliyetle hedefi karşılar; hedef bu kısıtlarla
+    ulaşılamazsa max azaltım portföyü döner (solver.target_met=False). Süre/düğüm limiti
+    dolarsa o ana kadarki en iyi çözüm döner (solver.optimal=False). time_limit_s=None: yalnız
+    düğüm limiti (sonuç duvar saatinden bağımsız, deterministik). Döngülü requires ValueError.
+    """
+    # negatif azaltım/capex sıfıra çekilir; çağıranın Option nesnelerine dokunulmaz
+    opts = [
+        replace(o, reduction_tco2=float(max(0.0, o.reduction_tco2)), capex_eur=float(max(0.0, o.capex_eur)))
+        for o in (options or [])
+    ]
+    solver = str(solver or "greedy").strip().lower()
+    if solver not in SOLVERS:
+        raise ValueError(f"Bilinmeyen solver: {solver} (beklenen: {', '.join(SOLVERS)})")
+    cycle = _requires_cycle(opts)
+    if cycle:
+        raise ValueError(f"Önkoşul döngüsü (requires): {' -> '.join(cycle)}")
+
+    target = float(target_reduction_tco2) if target_reduction_tco2 is not None else None
+    cap_max = float(max_capex_eur) if max_capex_eur is not None else None
+    budgets = {int(y): _to_float(v, 0.0) for y, v in (capex_budget_by_year or {}).items()} or None
+
+    years: Dict[int, Optional[int]] = {}
+    if solver == "greedy":
+        selected = _greedy_select(opts, target, cap_max, discount_rate)
+        info: Dict[str, Any] = {"method": "greedy"}
+    else:
+        selected, years, info = _solve_exact(
+            opts,
+            target=target,
+            cap_max=cap_max,
+            budgets=budgets,
+            discount_rate=discount_rate,
+            solver=solver,
+            time_limit_s=time_limit_s,
+            max_nodes=max_nodes,
+        )
+        # sunum sırası greedy ile aynı (maliyet/tCO2, id)
+        selected.sort(key=lambda o: (o.cost_per_tco2(discount_rate=discount_rate), -o.reduction_tco2, str(o.id)))
+
+    used_capex = float(sum(o.capex_eur for o in selected))
+    achieved = float(sum(o.reduction_tco2 for o in selected))
+    portfolio_cost_ann = sum(o.annualized_cost_eur(discount_rate=discount_rate) for o in selected)
+
+    out = {
         "target_reduction_tco2": target,
         "max_capex_eur": cap_max,
         "discount_rate": float(discount_rate),
@@ -146,7 +636,119 @@ def optimize_portfolio(
             "annualized_cost_eur": float(portfolio_cost_ann),
             "avg_cost_per_tco2": float(portfolio_cost_ann / achieved) if achieved > 1e-12 else None,
         },
+        "solver": info,
     }
+    if budgets and solver != "greedy":
+        by_year = {str(y): 0.0 for y in sorted(budgets)}
+        for o, row in zip(selected, out["selected"]):
+            y = years.get(id(o))
+            row["implementation_year"] = y
+            if y is not None:
+                by_year[str(y)] += float(o.capex_eur)
+        out["capex_budget_by_year"] = {str(y): float(v) for y, v in sorted(budgets.items())}
+        out["summary"]["capex_by_year"] = by_year
+    return out
+
+
+def generate_catalog(
+    n: int,
+    *,
+    seed: int = 7,
+    group_share: float = 0.3,
+    group_size: int = 3,
+    dependency_share: float = 0.0,
+) -> List[Option]:
+    """Benchmark/test için deterministik sentetik önlem kataloğu."""
+    rng = np.random.default_rng(int(seed))
+    n = int(n)
+    red = rng.lognormal(mean=6.0, sigma=1.0, size=n)
+    capex = np.round(red * rng.lognormal(mean=6.5, sigma=0.8, size=n), -3)
+    opex = np.round(red * rng.normal(loc=5.0, scale=30.0, size=n), 0)
+    life = rng.integers(5, 26, size=n)
+    grouped = rng.random(n) < float(group_share)
+    dep = rng.random(n) < float(dependency_share)
+
+    opts: List[Option] = []
+    g_count = 0
+    g_fill = 0
+    for i in range(n):
+        grp = ""
+        if grouped[i]:
+            grp = f"g{g_count:04d}"
+            g_fill += 1
+            if g_fill >= max(2, int(group_size)):
+                g_count += 1
+                g_fill = 0
+        req: Tuple[str, ...] = ()
+        if dep[i] and i > 0:
+            req = (f"m{int(rng.integers(0, i)):05d}",)
+        opts.append(
+            Option(
+                id=f"m{i:05d}",
+                title=f"Önlem {i}",
+                reduction_tco2=float(red[i]),
+                capex_eur=float(capex[i]),
+                opex_delta_eur_per_year=float(opex[i]),
+                lifetime_years=int(life[i]),
+                exclusive_group=grp,
+                requires=req,
+            )
+        )
+    return opts
+
+
+def _feasible(selected: Sequence[Dict[str, Any]]) -> bool:
+    ids = {str(r["id"]) for r in selected}
+    groups = [r.get("exclusive_group") for r in selected if r.get("exclusive_group")]
+    if len(groups) != len(set(groups)):
+        return False
+    return all(str(x) in ids for r in selected for x in (r.get("requires") or []))
+
+
+def benchmark_solvers(
+    sizes: Sequence[int] = (10, 50, 200, 1000, 2000),
+    *,
+    seed: int = 7,
+    budget_share: float = 0.25,
+    target_share: float | None = None,
+    time_limit_s: float = 5.0,
+    discount_rate: float = 0.08,
+) -> List[Dict[str, Any]]:
+    """Greedy vs exact: üretilmiş kataloglarda (10..2000 önlem) amaç değeri, süre, olurluk.
+
+    budget_share: max CAPEX = toplam CAPEX × pay. target_share verilirse hedef = toplam azaltım × pay
+    (min maliyet modu), yoksa bütçe altında max azaltım karşılaştırılır.
+    """
+    rows: List[Dict[str, Any]] = []
+    for n in sizes:
+        cat = generate_catalog(int(n), seed=seed)
+        cap = float(sum(o.capex_eur for o in cat)) * float(budget_share)
+        target = float(sum(o.reduction_tco2 for o in cat)) * float(target_share) if target_share is not None else None
+        row: Dict[str, Any] = {"n": int(n), "max_capex_eur": cap, "target_reduction_tco2": target}
+        for name in ("greedy", "auto"):
+            t0 = time.perf_counter()
+            res = optimize_portfolio(
+                cat,
+                target_reduction_tco2=target,
+                max_capex_eur=cap,
+                discount_rate=discount_rate,
+                solver=name,
+                time_limit_s=time_limit_s,
+            )
+            ms = (time.perf_counter() - t0) * 1000.0
+            key = "greedy" if name == "greedy" else "exact"
+            row[f"{key}_ms"] = round(ms, 3)
+            row[f"{key}_reduction_tco2"] = res["summary"]["reduction_tco2"]
+            row[f"{key}_annualized_cost_eur"] = res["summary"]["annualized_cost_eur"]
+            row[f"{key}_feasible"] = _feasible(res["selected"])
+            if key == "exact":
+                row["exact_method"] = res["solver"].get("method")
+                row["exact_status"] = res["solver"].get("status")
+                row["exact_nodes"] = res["solver"].get("nodes")
+        if target is None and row["greedy_reduction_tco2"] > 0:
+            row["reduction_gain_pct"] = (row["exact_reduction_tco2"] / row["greedy_reduction_tco2"] - 1.0) * 100.0
+        rows.append(row)
+    return rows
 
 
 def build_optimizer_payload(
@@ -159,6 +761,12 @@ def build_optimizer_payload(
     disc = _to_float(constraints.get("discount_rate"), 0.08)
     capex_max = constraints.get("max_capex_eur", None)
     target_pct = constraints.get("target_reduction_pct", None)
+    solver = str(constraints.get("solver") or "auto")
+    # varsayılan: süre limiti yok, yalnız düğüm limiti -> snapshot AI çıktısı makine hızından bağımsız
+    tl_raw = constraints.get("time_limit_s")
+    time_limit = _to_float(tl_raw, 0.0) if tl_raw is not None and str(tl_raw).strip() != "" else None
+    max_nodes = int(_to_float(constraints.get("max_nodes"), PAYLOAD_MAX_NODES) or PAYLOAD_MAX_NODES)
+    budgets = constraints.get("capex_budget_by_year") or None
 
     target_t = None
     if target_pct is not None and str(target_pct).strip() != "":
@@ -176,6 +784,10 @@ def build_optimizer_payload(
         target_reduction_tco2=target_t,
         max_capex_eur=capex_val,
         discount_rate=disc,
+        solver=solver,
+        time_limit_s=time_limit,
+        capex_budget_by_year=budgets if isinstance(budgets, dict) else None,
+        max_nodes=max_nodes,
     )
 
     return {
@@ -183,6 +795,10 @@ def build_optimizer_payload(
             "discount_rate": float(disc),
             "target_reduction_pct": target_pct,
             "max_capex_eur": capex_max,
+            "solver": solver,
+            "time_limit_s": time_limit,
+            "max_nodes": max_nodes,
+            "capex_budget_by_year": budgets if isinstance(budgets, dict) else None,
         },
         "abatement_curve": curve,
         "portfolio": portfolio,
@@ -6,7 +6,7 @@ from src.mrv.lineage import sha256_json
 from src.services.cbam_liability import compute_cbam_liability
 
 
-def _f(x: Any, default: float = 0.0) -> float:
+def to_float(x: Any, default: float = 0.0) -> float:
     try:
         if x is None:
             return default
@@ -15,7 +15,7 @@ def _f(x: Any, default: float = 0.0) -> float:
         return default
 
 
-def _pick_year(config: dict, results: dict) -> int:
+def pick_year(config: dict, results: dict) -> int:
     # Deterministik: config > results.input_bundle.period.year > 2026
     try:
         y = int((config or {}).get("reporting_year") or 0)
@@ -55,18 +55,18 @@ def simulate_cost_scenario(
     kpis = (results.get("kpis") or {}) if isinstance(results, dict) else {}
     cbam = (results.get("cbam") or {}) if isinstance(results, dict) else {}
 
-    base_total = _f(kpis.get("total_tco2"), _f((results.get("energy") or {}).get("total_tco2"), 0.0))
-    embedded = _f((((cbam or {}).get("totals") or {}).get("embedded_emissions_tco2")), base_total)
+    base_total = to_float(kpis.get("total_tco2"), to_float((results.get("energy") or {}).get("total_tco2"), 0.0))
+    embedded = to_float((((cbam or {}).get("totals") or {}).get("embedded_emissions_tco2")), base_total)
 
     # prices / assumptions (config.ai.prices.*)
     ai_cfg = (config.get("ai") or {}) if isinstance(config, dict) else {}
     prices = (ai_cfg.get("prices") or {}) if isinstance(ai_cfg, dict) else {}
 
-    eu_ets_price = _f(prices.get("eu_ets_price_eur_per_t"), _f(config.get("eu_ets_price_eur_per_t"), 0.0))
-    carbon_paid = _f(prices.get("carbon_price_paid_eur_per_t"), _f(config.get("carbon_price_paid_eur_per_t"), 0.0))
-    free_alloc = _f(prices.get("ets_free_allocation_tco2"), 0.0)
+    eu_ets_price = to_float(prices.get("eu_ets_price_eur_per_t"), to_float(config.get("eu_ets_price_eur_per_t"), 0.0))
+    carbon_paid = to_float(prices.get("carbon_price_paid_eur_per_t"), to_float(config.get("carbon_price_paid_eur_per_t"), 0.0))
+    free_alloc = to_float(prices.get("ets_free_allocation_tco2"), 0.0)
 
-    year = _pick_year(config, results)
+    year = pick_year(config, results)
 
     baseline_ets_cost = max(0.0, base_total - free_alloc) * eu_ets_price
     baseline_cbam = compute_cbam_liability(
@@ -83,9 +83,9 @@ def simulate_cost_scenario(
     for o in portfolio_selected or []:
         if not isinstance(o, dict):
             continue
-        red += _f(o.get("reduction_tco2"), 0.0)
-        capex += _f(o.get("capex_eur"), 0.0)
-        ann_cost += _f(o.get("annualized_cost_eur"), 0.0)
+        red += to_float(o.get("reduction_tco2"), 0.0)
+        capex += to_float(o.get("capex_eur"), 0.0)
+        ann_cost += to_float(o.get("annualized_cost_eur"), 0.0)
 
     red = max(0.0, red)
     scenario_total = max(0.0, base_total - red)
@@ -133,7 +133,7 @@ def simulate_cost_scenario(
         "delta": {
             "emissions_tco2": float(scenario_total - base_total),
             "ets_cost_eur": float(scenario_ets_cost - baseline_ets_cost),
-            "cbam_liability_eur": float(_f(baseline_cbam.get("liability_eur"), 0.0) - _f(scenario_cbam.get("liability_eur"), 0.0)) * -1.0,
+            "cbam_liability_eur": float(to_float(baseline_cbam.get("liability_eur"), 0.0) - to_float(scenario_cbam.get("liability_eur"), 0.0)) * -1.0,
         },
     }
 
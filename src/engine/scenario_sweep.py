@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.engine.scenario import pick_year, to_float
+from src.mrv.lineage import canonical_json, sha256_json
+from src.services.cbam_liability import cbam_certificates_and_amount
+
+
+# Sweep parametreleri (senaryo vektörünün kolonları) ve varsayılanları
+PARAM_DEFAULTS: Dict[str, float] = {
+    "energy_reduction_pct": 0.0,  # 0..1 (apply_scenarios ile aynı ölçek)
+    "renewable_share": 0.0,  # 0..1 elektriğin yenilenebilir (0 tCO2/MWh) payı
+    "eua_price_eur_per_t": 0.0,
+    "fx_try_per_eur": 1.0,
+    "export_mix_multiplier": 1.0,
+    "supplier_factor_multiplier": 1.0,  # precursor emisyonları
+}
+
+
+@dataclass(frozen=True)
+class BaseDecomposition:
+    """Senaryolardan bağımsız, bir kez hesaplanan baz emisyon ayrıştırması.
+
+    Senaryo parametreleri bu bileşenler üzerinde lineer çarpanlar olarak uygulanır:
+      direct'   = direct * (1 - energy_reduction)
+      indirect' = indirect * (1 - energy_reduction) * (1 - renewable_share)
+      embedded' = cbam_direct * (1 - red) + cbam_indirect * (1 - red) * (1 - rs) + precursor * supplier_mult
+      ets_cost  = max(direct' - free_allocation - banked, 0) * eua  (orchestrator ets_net_and_cost ile aynı)
+    """
+
+    direct_tco2: float
+    indirect_tco2: float
+    cbam_direct_tco2: float
+    cbam_indirect_tco2: float
+    cbam_precursor_tco2: float
+    export_share: float
+    free_allocation_tco2: float
+    carbon_price_paid_eur_per_t: float
+    reporting_year: int
+    base_eua_price_eur_per_t: float
+    base_fx_try_per_eur: float
+    banked_tco2: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def hash(self) -> str:
+        return sha256_json({"schema": "scenario_sweep.base.v1", "base": self.to_dict()})
+
+
+def decompose_results(results: dict, config: dict | None = None) -> BaseDecomposition:
+    """Snapshot results (orchestrator legacy_results) + config'ten baz ayrıştırmayı çıkarır."""
+    results = results or {}
+    config = config or {}
+    kpis = results.get("kpis") or {}
+    cbam = results.get("cbam") or {}
+
+    direct = to_float(kpis.get("scope1_tco2"), 0.0)
+    indirect = to_float(kpis.get("scope2_tco2"), 0.0)
+
+    c_direct = to_float(cbam.get("direct_tco2e"), 0.0)
+    c_indirect = to_float(cbam.get("indirect_tco2e"), 0.0)
+    c_prec = to_float(cbam.get("precursor_tco2e"), 0.0)
+
+    # AB'ye ihraç edilen gömülü emisyon payı (cbam_table satırlarından)
+    export_share = 1.0
+    table = results.get("cbam_table") or []
+    if table:
+        tdf = pd.DataFrame(table)
+        if "embedded_emissions_tco2e" in tdf.columns and "export_share" in tdf.columns:
+            emb = pd.to_numeric(tdf["embedded_emissions_tco2e"], errors="coerce").fillna(0.0)
+            shr = pd.to_numeric(tdf["export_share"], errors="coerce").fillna(0.0)
+            if float(emb.sum()) > 0.0:
+                export_share = float((emb * shr).sum() / emb.sum())
+
+    ai_cfg = (config.get("ai") or {}) if isinstance(config, dict) else {}
+    prices = (ai_cfg.get("prices") or {}) if isinstance(ai_cfg, dict) else {}
+    ets = ((results.get("ets") or {}).get("net_and_cost") or {}) if isinstance(results.get("ets"), dict) else {}
+    # ücretsiz tahsis / banked: orchestrator'ın kullandığı kaynak (config.ets -> ets.net_and_cost)
+    ets_cfg = (config.get("ets") or {}) if isinstance(config.get("ets"), dict) else {}
+    free_alloc = to_float(ets.get("free_alloc_tco2"), to_float(ets_cfg.get("free_alloc_t"), 0.0))
+    banked = to_float(ets.get("banked_tco2"), to_float(ets_cfg.get("banked_t"), 0.0))
+
+    return BaseDecomposition(
+        direct_tco2=direct,
+        indirect_tco2=indirect,
+        cbam_direct_tco2=c_direct,
+        cbam_indirect_tco2=c_indirect,
+        cbam_precursor_tco2=c_prec,
+        export_share=max(0.0, min(1.0, export_share)),
+        free_allocation_tco2=max(0.0, free_alloc),
+        carbon_price_paid_eur_per_t=to_float(prices.get("carbon_price_paid_eur_per_t"), to_float(config.get("carbon_price_paid_eur_per_t"), 0.0)),
+        reporting_year=pick_year(config, results),
+        base_eua_price_eur_per_t=to_float(prices.get("eu_ets_price_eur_per_t"), to_float(config.get("eu_ets_price_eur_per_t"), to_float(ets.get("price_eur_per_t"), 0.0))),
+        base_fx_try_per_eur=to_float(ets.get("fx_tl_per_eur"), 1.0) or 1.0,
+        banked_tco2=max(0.0, banked),
+    )
+
+
+def scenario_grid(**axes: Iterable[float]) -> pd.DataFrame:
+    """Eksenlerin kartezyen çarpımı -> senaryo parametre tablosu (deterministik sıra).
+
+    Örn: scenario_grid(energy_reduction_pct=[0, .1, .2], eua_price_eur_per_t=[60, 80, 100])
+    """
+    unknown = sorted(set(axes) - set(PARAM_DEFAULTS))
+    if unknown:
+        raise ValueError(f"Bilinmeyen senaryo parametresi: {', '.join(unknown)}")
+    names = [k for k in PARAM_DEFAULTS if k in axes]
+    values = [list(axes[k]) for k in names]
+    rows = list(itertools.product(*values)) if names else [()]
+    return pd.DataFrame(rows, columns=names)
+
+
+def _params_matrix(params: pd.DataFrame, base: BaseDecomposition) -> pd.DataFrame:
+    p = params.copy().reset_index(drop=True)
+    defaults = dict(PARAM_DEFAULTS)
+    defaults["eua_price_eur_per_t"] = base.base_eua_price_eur_per_t
+    defaults["fx_try_per_eur"] = base.base_fx_try_per_eur
+    for k, v in defaults.items():
+        if k not in p.columns:
+            p[k] = v
+        p[k] = pd.to_numeric(p[k], errors="coerce").fillna(v).astype(float)
+    return p
+
+
+def scenario_hashes(base_hash: str, params: pd.DataFrame) -> List[str]:
+    """Senaryo başına deterministik hash: sha256(base_hash + kanonik parametre vektörü)."""
+    cols = list(PARAM_DEFAULTS.keys())
+    return [
+        sha256_json({"base": base_hash, "params": dict(zip(cols, row))})
+        for row in params[cols].itertuples(index=False, name=None)
+    ]
+
+
+def _evaluate_chunk(args: tuple) -> List[Dict[str, Any]]:
+    fn, rows = args
+    return [dict(fn(r) or {}) for r in rows]
+
+
+def run_sweep(
+    base: BaseDecomposition,
+    params: pd.DataFrame,
+    *,
+    evaluator: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 256,
+) -> pd.DataFrame:
+    """N senaryo vektörünü tek bazdan dizi işlemleriyle değerlendirir; tidy tablo döner.
+
+    Lineer/parçalı-lineer kısım (emisyonlar, ETS maliyeti, CBAM yükümlülüğü) NumPy ile
+    vektörize hesaplanır. Lineer olmayan/ağır ek hesaplar için `evaluator` (modül seviyesinde,
+    picklable fonksiyon) verilebilir: her senaryo satırı (parametreler + vektörize çıktılar) ile
+    çağrılır, process pool'da chunk'lar halinde koşar ve dönen dict kolon olarak eklenir.
+    """
+    p = _params_matrix(params, base)
+    n = len(p)
+
+    red = np.clip(p["energy_reduction_pct"].to_numpy(), 0.0, 1.0)
+    rs = np.clip(p["renewable_share"].to_numpy(), 0.0, 1.0)
+    price = np.clip(p["eua_price_eur_per_t"].to_numpy(), 0.0, None)
+    fx = np.clip(p["fx_try_per_eur"].to_numpy(), 0.0, None)
+    export_mult = np.clip(p["export_mix_multiplier"].to_numpy(), 0.0, None)
+    supplier = np.clip(p["supplier_factor_multiplier"].to_numpy(), 0.0, None)
+
+    keep = 1.0 - red
+    direct = base.direct_tco2 * keep
+    indirect = base.indirect_tco2 * keep * (1.0 - rs)
+    total = direct + indirect
+
+    embedded = (
+        base.cbam_direct_tco2 * keep
+        + base.cbam_indirect_tco2 * keep * (1.0 - rs)
+        + base.cbam_precursor_tco2 * supplier
+    )
+    export_embedded = embedded * np.clip(base.export_share * export_mult, 0.0, 1.0)
+
+    ets_cost_eur = np.clip(direct - base.free_allocation_tco2 - base.banked_tco2, 0.0, None) * price
+
+    certificates, cbam_eur = cbam_certificates_and_amount(
+        year=int(base.reporting_year),
+        embedded_emissions_tco2=export_embedded,
+        eu_ets_price_eur_per_t=price,
+        carbon_price_paid_eur_per_t=base.carbon_price_paid_eur_per_t,
+    )
+
+    base_total = base.direct_tco2 + base.indirect_tco2
+    out = p.copy()
+    out["direct_tco2"] = direct
+    out["indirect_tco2"] = indirect
+    out["total_tco2"] = total
+    out["delta_tco2"] = total - base_total
+    out["embedded_tco2"] = embedded
+    out["export_embedded_tco2"] = export_embedded
+    out["ets_cost_eur"] = ets_cost_eur
+    out["ets_cost_try"] = ets_cost_eur * fx
+    out["cbam_certificates"] = certificates
+    out["cbam_liability_eur"] = cbam_eur
+    out["cbam_liability_try"] = cbam_eur * fx
+    out["total_cost_try"] = out["ets_cost_try"] + out["cbam_liability_try"]
+
+    if evaluator is not None and n > 0:
+        rows = out.to_dict(orient="records")
+        chunks = [(evaluator, rows[i : i + chunk_size]) for i in range(0, n, max(1, int(chunk_size)))]
+        workers = int(processes) if processes is not None else min(len(chunks), os.cpu_count() or 1)
+        if workers <= 1 or len(chunks) == 1:
+            parts = [_evaluate_chunk(c) for c in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                parts = list(ex.map(_evaluate_chunk, chunks))  # sıra korunur
+        extra = pd.DataFrame([r for part in parts for r in part], index=out.index)
+        for c in extra.columns:
+            out[c] = extra[c]
+
+    out.insert(0, "scenario_hash", scenario_hashes(base.hash(), p))
+    out.insert(0, "scenario_idx", np.arange(n))
+    return out
+
+
+def sweep_summary(base: BaseDecomposition, table: pd.DataFrame, *, top: int = 10) -> Dict[str, Any]:
+    """Sweep sonucu için kısa özet + tablonun deterministik hash'i (audit/snapshot metadata için)."""
+    cols = [c for c in table.columns if c != "scenario_idx"]
+    numeric = table[cols].select_dtypes(include=[np.number])
+    h = hashlib.sha256(canonical_json({"base": base.hash(), "cols": list(numeric.columns)}).encode("utf-8"))
+    h.update("|".join(table["scenario_hash"].astype(str).tolist()).encode("utf-8"))
+    h.update((np.round(numeric.to_numpy(dtype=float), 9) + 0.0).astype("<f8").tobytes())
+    payload: Dict[str, Any] = {"base_hash": base.hash(), "n_scenarios": int(len(table)), "table_hash": h.hexdigest()}
+    if len(table):
+        best = table.sort_values(["total_cost_try", "scenario_idx"]).head(int(top))
+        payload["lowest_cost"] = best[["scenario_idx", "scenario_hash", "total_cost_try", "total_tco2"]].to_dict(orient="records")
+    return payload
+
+
+def sweep_from_snapshot(
+    results: dict,
+    config: dict | None,
+    *,
+    axes: Dict[str, Sequence[float]],
+    evaluator: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    processes: Optional[int] = None,
+) -> pd.DataFrame:
+    base = decompose_results(results, config)
+    return run_sweep(base, scenario_grid(**axes), evaluator=evaluator, processes=processes)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 @dataclass
 class AbatementOption:
@@ -10,12 +10,32 @@ class AbatementOption:
     capex_try: float
     opex_delta_try: float
     notes: str
+    exclusive_group: str = ""  # aynı gruptan tek önlem (örn. ısı kaynağı: yakıt değişimi XOR elektrikleşme)
+    requires: Tuple[str, ...] = ()
 
 def default_library() -> List[AbatementOption]:
     return [
         AbatementOption("whr","Atık Isı Geri Kazanım", 5.0, 50_000_000, -2_000_000, "Çimento/çelikte yaygın."),
-        AbatementOption("fuel_switch","Yakıt Değişimi", 10.0, 10_000_000, 1_000_000, "Kömür->biyokütle/doğalgaz."),
+        AbatementOption("fuel_switch","Yakıt Değişimi", 10.0, 10_000_000, 1_000_000, "Kömür->biyokütle/doğalgaz.", exclusive_group="heat_source"),
         AbatementOption("efficiency","Enerji Verimliliği", 7.0, 5_000_000, -1_000_000, "Motor, fırın, izolasyon."),
-        AbatementOption("electrification","Elektrikleşme", 8.0, 20_000_000, 2_000_000, "Elektrik kaynaklı faktöre bağlı."),
-        AbatementOption("ccs","CCS (Karbon Yakalama)", 25.0, 200_000_000, 10_000_000, "Yüksek CAPEX, yüksek azaltım."),
+        AbatementOption("electrification","Elektrikleşme", 8.0, 20_000_000, 2_000_000, "Elektrik kaynaklı faktöre bağlı.", exclusive_group="heat_source"),
+        AbatementOption("ccs","CCS (Karbon Yakalama)", 25.0, 200_000_000, 10_000_000, "Yüksek CAPEX, yüksek azaltım.", requires=("efficiency",)),
+    ]
+
+def to_optimizer_measures(options: List[AbatementOption], *, fx_try_per_eur: float, lifetime_years: int = 15) -> List[Dict[str, Any]]:
+    """Kütüphane önlemlerini src.engine.optimizer.build_options_from_measures girdisine çevirir (TRY -> EUR)."""
+    fx = float(fx_try_per_eur) if fx_try_per_eur else 1.0
+    return [
+        {
+            "id": o.code,
+            "title": o.title,
+            "description": o.notes,
+            "expected_reduction_pct_of_total": o.typical_reduction_pct,
+            "capex_eur": o.capex_try / fx,
+            "opex_delta_eur_per_year": o.opex_delta_try / fx,
+            "lifetime_years": lifetime_years,
+            "exclusive_group": o.exclusive_group,
+            "requires": list(o.requires),
+        }
+        for o in options
     ]
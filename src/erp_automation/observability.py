@@ -2,8 +2,11 @@ from __future__ import annotations
 import json, sys, time
 from typing import Any
 
+from src.services.tracing import current_ids
+
 def log(event: str, **fields: Any) -> None:
     payload = {"ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "event": event}
+    payload.update(current_ids())
     payload.update(fields)
     sys.stdout.write(json.dumps(payload, ensure_ascii=False) + "\n")
     sys.stdout.flush()
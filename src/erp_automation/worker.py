@@ -3,6 +3,8 @@ import json, time, traceback
 from typing import Callable, Dict
 
 from src.erp_automation.job_queue import claim_next, finish
+from src.erp_automation.observability import log
+from src.services.tracing import start_trace
 
 _HANDLERS: Dict[str, Callable[[dict], dict]] = {}
 
@@ -17,13 +19,15 @@ def run_once() -> bool:
         payload = json.loads(j.payload_json or "{}")
     except Exception:
         payload = {}
-    try:
-        if j.kind not in _HANDLERS:
-            raise ValueError(f"Handler yok: {j.kind}")
-        res = _HANDLERS[j.kind](payload)
-        finish(j.id, True, result=res)
-    except Exception as e:
-        finish(j.id, False, result={}, error=str(e) + "\n" + traceback.format_exc()[:4000])
+    with start_trace(f"job.{j.kind}", job_id=int(j.id), kind=str(j.kind)) as tr:
+        try:
+            if j.kind not in _HANDLERS:
+                raise ValueError(f"Handler yok: {j.kind}")
+            res = _HANDLERS[j.kind](payload)
+            finish(j.id, True, result=res)
+        except Exception as e:
+            finish(j.id, False, result={}, error=str(e) + "\n" + traceback.format_exc()[:4000])
+    log("job_trace", job_id=int(j.id), kind=str(j.kind), trace_id=tr.trace_id, total_ms=tr.root.duration_ms if tr.root else None, stage_timings_ms=tr.stage_timings())
     return True
 
 def run_loop(poll_seconds: float = 2.0, max_loops: int = 1000):
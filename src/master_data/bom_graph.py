@@ -1,68 +1,230 @@
 from __future__ import annotations
 
+import heapq
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 
 @dataclass(frozen=True)
 class Edge:
     parent_id: int
     child_id: int
+    ratio: float = 1.0
+
+
+class BOMCycleError(ValueError):
+    pass
 
 
 class BOMGraph:
     """Deterministik BOM graph yardımcı sınıfı.
 
-    - cycle detection
-    - deterministic traversal (sorted)
+    - cycle detection (iteratif)
+    - deterministic traversal (sorted, iteratif DFS)
+    - memoized roll-up: kök başına gereken miktarlar ve bottom-up gömülü emisyon
+      (topolojik sıra ile O(V+E); yol sayısından bağımsız)
+    - path enumeration yalnızca üst sınırlı streaming generator olarak (iter_paths)
+
+    Aynı parent->child birden çok kez verilirse ratio'lar toplanır.
     """
 
-    def __init__(self, edges: Iterable[Edge]):
-        g: Dict[int, List[int]] = defaultdict(list)
+    def __init__(self, edges: Iterable[Edge], *, cache_subgraphs: bool = True):
+        g: Dict[int, Set[int]] = defaultdict(set)
+        ratios: Dict[Tuple[int, int], float] = defaultdict(float)
         for e in edges:
-            g[e.parent_id].append(e.child_id)
+            g[e.parent_id].add(e.child_id)
+            ratios[(e.parent_id, e.child_id)] += float(e.ratio if e.ratio is not None else 1.0)
 
         # deterministik: çocuk listelerini sırala
         self.graph: Dict[int, List[int]] = {k: sorted(v) for k, v in g.items()}
+        self.ratios: Dict[Tuple[int, int], float] = dict(ratios)
+        self.cache_subgraphs = bool(cache_subgraphs)
+        self._order: Optional[List[int]] = None
+        self._subgraph_cache: Dict[int, List[int]] = {}
 
     def has_cycle(self) -> bool:
-        visited: Set[int] = set()
-        stack: Set[int] = set()
-
-        def visit(n: int) -> bool:
-            if n in stack:
-                return True
-            if n in visited:
-                return False
-            visited.add(n)
-            stack.add(n)
+        _, cyclic = topological_order(self.graph)
+        return bool(cyclic)
+
+    def order(self) -> List[int]:
+        """Tüm düğümlerin topolojik sırası (parent önce). Döngü varsa BOMCycleError."""
+        if self._order is None:
+            order, cyclic = topological_order(self.graph)
+            if cyclic:
+                raise BOMCycleError(f"BOM döngü içeriyor: {cyclic[:10]}")
+            self._order = order
+        return self._order
+
+    def descendants(self, root: int) -> List[int]:
+        """root ve erişilebilen tüm düğümler, deterministik pre-order (iteratif DFS)."""
+        out: List[int] = []
+        seen: Set[int] = set()
+        stack = [int(root)]
+        while stack:
+            n = stack.pop()
+            if n in seen:
+                continue
+            seen.add(n)
+            out.append(n)
+            # küçük id önce ziyaret edilsin diye ters sırada it
+            for c in reversed(self.graph.get(n, [])):
+                if c not in seen:
+                    stack.append(c)
+        return out
+
+    def subgraph_order(self, root: int) -> List[int]:
+        """root alt grafiğinin topolojik sırası (cache'li)."""
+        root = int(root)
+        cached = self._subgraph_cache.get(root)
+        if cached is not None:
+            return cached
+        nodes = set(self.descendants(root))
+        order = [n for n in self.order() if n in nodes]
+        if self.cache_subgraphs:
+            self._subgraph_cache[root] = order
+        return order
+
+    def rollup_quantities(self, root: int, root_quantity: float = 1.0) -> Dict[int, float]:
+        """root'tan root_quantity üretmek için her düğümden gereken toplam miktar.
+
+        qty[child] = Σ qty[parent] * ratio(parent, child); diamond yapılarda paylar toplanır.
+        """
+        root = int(root)
+        qty: Dict[int, float] = {root: float(root_quantity)}
+        for n in self.subgraph_order(root):
+            q = qty.get(n, 0.0)
+            if q == 0.0:
+                continue
             for c in self.graph.get(n, []):
-                if visit(c):
-                    return True
-            stack.remove(n)
-            return False
+                qty[c] = qty.get(c, 0.0) + q * self.ratios.get((n, c), 1.0)
+        return qty
 
-        for node in sorted(self.graph.keys()):
-            if visit(node):
-                return True
-        return False
+    def rollup_embedded(self, own_tco2_per_unit: Dict[int, float], *, root: Optional[int] = None) -> Dict[int, float]:
+        """Bottom-up gömülü emisyon (birim başına).
+
+        embedded[n] = own[n] + Σ ratio(n, c) * embedded[c]
+        root verilirse yalnızca o alt graf hesaplanır.
+        """
+        order = self.subgraph_order(root) if root is not None else self.order()
+        emb: Dict[int, float] = {}
+        for n in reversed(order):
+            v = float(own_tco2_per_unit.get(n, 0.0) or 0.0)
+            for c in self.graph.get(n, []):
+                v += self.ratios.get((n, c), 1.0) * emb[c]
+            emb[n] = v
+        return emb
 
-    def topo_paths(self, root: int, depth_limit: int = 25) -> List[List[int]]:
-        """Root'tan başlayan tüm yolları deterministik döndürür."""
-        paths: List[List[int]] = []
+    def iter_paths(self, root: int, depth_limit: int = 25, max_paths: int = 10_000) -> Iterator[List[int]]:
+        """Root'tan yapraklara yolları deterministik sırayla üretir (streaming, en fazla max_paths).
 
-        def dfs(node: int, path: List[int], depth: int) -> None:
-            if depth > depth_limit:
-                return
+        depth_limit'i aşan dallar atlanır. Roll-up için yol enumerasyonu yerine
+        rollup_quantities / rollup_embedded kullanılmalıdır.
+        """
+        emitted = 0
+        path: List[int] = [int(root)]
+        # her seviye için (düğüm, sıradaki çocuk indeksi)
+        stack: List[Tuple[int, int]] = [(int(root), 0)]
+        while stack and emitted < max_paths:
+            node, i = stack[-1]
             children = self.graph.get(node, [])
-            if not children:
-                paths.append(path[:])
-                return
-            for c in children:
-                path.append(c)
-                dfs(c, path, depth + 1)
+            if not children and i == 0:
+                yield path[:]
+                emitted += 1
+                stack.pop()
                 path.pop()
+                continue
+            depth = len(stack) - 1
+            if i >= len(children) or depth >= depth_limit:
+                stack.pop()
+                path.pop()
+                continue
+            stack[-1] = (node, i + 1)
+            c = children[i]
+            stack.append((c, 0))
+            path.append(c)
+
+
+def topological_order(graph: Dict[int, Iterable[int]]) -> Tuple[List[int], List[int]]:
+    """İteratif (Kahn) topolojik sıra; recursion limitine takılmaz.
+
+    Dönen: (order, cyclic_nodes). Döngü yoksa cyclic_nodes boştur; varsa döngüde
+    ya da döngüden erişilen düğümler (sıralı) döner. En küçük id önce (deterministik).
+    """
+    indeg: Dict[int, int] = {}
+    for p, children in graph.items():
+        indeg.setdefault(p, 0)
+        for c in children:
+            indeg[c] = indeg.get(c, 0) + 1
+
+    heap = [n for n, d in indeg.items() if d == 0]
+    heapq.heapify(heap)
+    order: List[int] = []
+    while heap:
+        n = heapq.heappop(heap)
+        order.append(n)
+        for c in graph.get(n, ()):
+            indeg[c] -= 1
+            if indeg[c] == 0:
+                heapq.heappush(heap, c)
+
+    if len(order) == len(indeg):
+        return order, []
+    done = set(order)
+    return order, sorted(n for n in indeg if n not in done)
+
+
+class BOMAdjacencyIndex:
+    """Artımlı cycle kontrolü için parent -> children komşuluk indeksi.
+
+    Yeni parent->child kenarı ancak child'dan parent'a zaten bir yol varsa döngü oluşturur;
+    bu yüzden her eklemede tüm grafiği değil yalnızca child'dan erişilebilen alt grafiği
+    (iteratif DFS) gezeriz.
+
+    fingerprint: indeksin hangi DB durumundan kurulduğunu belirtir (aktif kenar sayısı,
+    en büyük id). Servis katmanı cache geçerliliğini bununla kontrol eder.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[int, int]] = (), fingerprint: Optional[Tuple[int, int]] = None):
+        self.children: Dict[int, Set[int]] = defaultdict(set)
+        for p, c in edges:
+            self.children[int(p)].add(int(c))
+        self.fingerprint = fingerprint
+
+    def has_edge(self, parent_id: int, child_id: int) -> bool:
+        return int(child_id) in self.children.get(int(parent_id), ())
+
+    def add_edge(self, parent_id: int, child_id: int) -> None:
+        self.children[int(parent_id)].add(int(child_id))
+
+    def remove_edge(self, parent_id: int, child_id: int) -> None:
+        kids = self.children.get(int(parent_id))
+        if kids is not None:
+            kids.discard(int(child_id))
+
+    def reaches(self, src: int, dst: int) -> bool:
+        """src'den dst'ye yönlü yol var mı (iteratif DFS)."""
+        src, dst = int(src), int(dst)
+        if src == dst:
+            return True
+        seen: Set[int] = {src}
+        stack = [src]
+        while stack:
+            n = stack.pop()
+            for c in self.children.get(n, ()):
+                if c == dst:
+                    return True
+                if c not in seen:
+                    seen.add(c)
+                    stack.append(c)
+        return False
+
+    def would_create_cycle(self, parent_id: int, child_id: int) -> bool:
+        if int(parent_id) == int(child_id):
+            return True
+        if self.has_edge(parent_id, child_id):
+            return False
+        return self.reaches(child_id, parent_id)
 
-        dfs(root, [root], 0)
-        return paths
+    def edge_count(self) -> int:
+        return sum(len(v) for v in self.children.values())
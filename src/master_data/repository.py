@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from src.db.models import Facility
@@ -106,12 +107,38 @@ class MasterDataRepository:
             .first()
         )
 
+    def list_active_bom_pairs(self, company_id: int) -> list[tuple[int, int]]:
+        rows = (
+            self.s.query(models.MasterBOMEdge.parent_product_id, models.MasterBOMEdge.child_product_id)
+            .filter(models.MasterBOMEdge.company_id == int(company_id), models.MasterBOMEdge.is_active.is_(True))
+            .all()
+        )
+        return [(int(p), int(c)) for p, c in rows]
+
+    def active_bom_fingerprint(self, company_id: int) -> tuple[int, int]:
+        """(aktif kenar sayısı, en büyük id) — adjacency cache geçerlilik kontrolü için."""
+        cnt, max_id = (
+            self.s.query(func.count(models.MasterBOMEdge.id), func.max(models.MasterBOMEdge.id))
+            .filter(models.MasterBOMEdge.company_id == int(company_id), models.MasterBOMEdge.is_active.is_(True))
+            .one()
+        )
+        return int(cnt or 0), int(max_id or 0)
+
     def create_edge(self, e: models.MasterBOMEdge) -> models.MasterBOMEdge:
         self.s.add(e)
         self.s.flush()
         return e
 
+    def create_edges(self, edges: list[models.MasterBOMEdge]) -> list[models.MasterBOMEdge]:
+        self.s.add_all(edges)
+        self.s.flush()
+        return edges
+
     # ---------- Change log ----------
     def add_change(self, ch: models.MasterDataChange) -> None:
         self.s.add(ch)
         self.s.flush()
+
+    def add_changes(self, changes: list[models.MasterDataChange]) -> None:
+        self.s.add_all(changes)
+        self.s.flush()
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import threading
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from src.master_data import models
-from src.master_data.bom_graph import BOMGraph, Edge
+from src.master_data.bom_graph import BOMAdjacencyIndex, topological_order
 from src.master_data.hashing import sha256_hex
 from src.master_data.repository import MasterDataRepository
 from src.master_data.schemas import BOMEdgeUpsert, CNCodeUpsert, FacilityUpsert, ProductUpsert
@@ -31,6 +33,54 @@ def _close_previous(prev_valid_from: datetime, new_valid_from: datetime) -> date
     return new_vf - timedelta(seconds=1)
 
 
+# company_id -> BOMAdjacencyIndex. Her kullanımda DB fingerprint'i ile doğrulanır; başka bir
+# süreç/oturum kenar eklediyse (ya da transaction rollback olduysa) indeks yeniden kurulur.
+_BOM_INDEX_CACHE: Dict[int, BOMAdjacencyIndex] = {}
+_BOM_INDEX_LOCK = threading.Lock()
+
+
+def invalidate_bom_index(company_id: int | None = None) -> None:
+    with _BOM_INDEX_LOCK:
+        if company_id is None:
+            _BOM_INDEX_CACHE.clear()
+        else:
+            _BOM_INDEX_CACHE.pop(int(company_id), None)
+
+
+# Commit edilmemiş BOM yazımları paylaşılan indekse yazılmaz: transaction boyunca Session.info'da
+# tutulur, başarılı commit'ten sonra cache'e işlenir; rollback/close'da atılır.
+_BOM_TX_KEY = "master_data.bom_index_tx"
+
+
+def _bom_tx(s: Session, company_id: int) -> Dict[str, Any]:
+    if not event.contains(s, "after_commit", _publish_bom_tx):
+        event.listen(s, "after_commit", _publish_bom_tx)
+        event.listen(s, "after_transaction_end", _discard_bom_tx)
+    txs = s.info.setdefault(_BOM_TX_KEY, {})
+    # base/fp: yazım öncesi/sonrası fingerprint; edges None -> commit'te invalidate; idx: transaction'a özel indeks
+    return txs.setdefault(int(company_id), {"base": None, "fp": None, "edges": [], "idx": None})
+
+
+def _publish_bom_tx(s: Session) -> None:
+    txs = s.info.pop(_BOM_TX_KEY, None) or {}
+    with _BOM_INDEX_LOCK:
+        for cid, tx in txs.items():
+            cached = _BOM_INDEX_CACHE.get(cid)
+            if tx["idx"] is not None:
+                _BOM_INDEX_CACHE[cid] = tx["idx"]
+            elif tx["edges"] is not None and cached is not None and cached.fingerprint == tx["base"]:
+                for p, c in tx["edges"]:
+                    cached.add_edge(p, c)
+                cached.fingerprint = tx["fp"]
+            else:
+                _BOM_INDEX_CACHE.pop(cid, None)
+
+
+def _discard_bom_tx(s: Session, transaction) -> None:
+    if transaction.parent is None:
+        s.info.pop(_BOM_TX_KEY, None)
+
+
 class MasterDataService:
     """Faz 1 Master Data Engine.
 
@@ -300,12 +350,36 @@ class MasterDataService:
     # ----------------------------
     # BOM
     # ----------------------------
+    def _bom_index(self) -> BOMAdjacencyIndex:
+        tx = (self.s.info.get(_BOM_TX_KEY) or {}).get(self.company_id)
+        if tx is not None:
+            # bu transaction'da BOM yazıldı: oturumun gördüğü (commit edilmemiş) durum yalnız burada
+            if tx["idx"] is None:
+                fp = self.repo.active_bom_fingerprint(self.company_id)
+                tx["idx"] = BOMAdjacencyIndex(self.repo.list_active_bom_pairs(self.company_id), fingerprint=fp)
+            return tx["idx"]
+        fp = self.repo.active_bom_fingerprint(self.company_id)
+        with _BOM_INDEX_LOCK:
+            idx = _BOM_INDEX_CACHE.get(self.company_id)
+        if idx is not None and idx.fingerprint == fp:
+            return idx
+        idx = BOMAdjacencyIndex(self.repo.list_active_bom_pairs(self.company_id), fingerprint=fp)
+        with _BOM_INDEX_LOCK:
+            _BOM_INDEX_CACHE[self.company_id] = idx
+        return idx
+
     def upsert_bom_edge(self, payload: BOMEdgeUpsert) -> Dict[str, Any]:
         if int(payload.parent_product_id) == int(payload.child_product_id):
             raise MasterDataValidationError("BOM: parent ve child aynı olamaz.")
 
         valid_from = _tz(payload.valid_from)
 
+        # cycle check (artımlı): child'dan parent'a yol varsa yeni kenar döngü oluşturur.
+        # Kontrol yazmadan önce yapılır; başarısız denemede DB'ye dokunulmaz.
+        idx = self._bom_index()
+        if idx.would_create_cycle(payload.parent_product_id, payload.child_product_id):
+            raise MasterDataValidationError("BOM döngü (cycle) oluşturuyor. İşlem iptal edildi.")
+
         # aynı pair için aktif edge var mı?
         prev = self.repo.get_active_edge(self.company_id, payload.parent_product_id, payload.child_product_id)
         prev_obj = self._edge_obj(prev) if prev else None
@@ -327,12 +401,16 @@ class MasterDataService:
         )
         self.repo.create_edge(e)
 
-        # cycle check: tüm aktif edge'lerle kontrol et
-        edges = self.repo.list_active_bom_edges(self.company_id)
-        g = BOMGraph([Edge(parent_id=x.parent_product_id, child_id=x.child_product_id) for x in edges])
-        if g.has_cycle():
-            # rollback edge
-            raise MasterDataValidationError("BOM döngü (cycle) oluşturuyor. İşlem iptal edildi.")
+        cnt = idx.fingerprint[0] if idx.fingerprint else 0
+        tx = _bom_tx(self.s, self.company_id)
+        if tx["base"] is None:
+            tx["base"] = idx.fingerprint
+        tx["fp"] = (cnt if prev else cnt + 1, int(e.id))
+        if tx["edges"] is not None:
+            tx["edges"].append((int(e.parent_product_id), int(e.child_product_id)))
+        if tx["idx"] is not None:
+            tx["idx"].add_edge(e.parent_product_id, e.child_product_id)
+            tx["idx"].fingerprint = tx["fp"]
 
         self._log_change(
             entity_type="bom",
@@ -344,6 +422,89 @@ class MasterDataService:
         )
         return {"edge_id": e.id, "version": e.version}
 
+    def bulk_upsert_bom_edges(self, payloads: Iterable[BOMEdgeUpsert]) -> Dict[str, Any]:
+        """ERP vb. kaynaklardan toplu BOM importu.
+
+        - Tüm kenar seti önce doğrulanır (self-loop, batch içi tekrar, mevcut + yeni kenarlarla
+          tek bir iteratif topolojik kontrol); hata varsa hiçbir şey yazılmaz.
+        - Yazım tek flush ile yapılır; commit/rollback çağıranın transaction'ındadır.
+        - Aynı parent->child için aktif kenar varsa yeni versiyon açılır (upsert_bom_edge ile aynı).
+        """
+        items = list(payloads)
+        if not items:
+            return {"created": 0, "updated": 0, "edge_ids": []}
+
+        seen: Dict[tuple, int] = {}
+        for i, p in enumerate(items):
+            pair = (int(p.parent_product_id), int(p.child_product_id))
+            if pair[0] == pair[1]:
+                raise MasterDataValidationError(f"BOM satır {i + 1}: parent ve child aynı olamaz ({pair[0]}).")
+            if pair in seen:
+                raise MasterDataValidationError(
+                    f"BOM satır {i + 1}: {pair[0]}->{pair[1]} kenarı batch içinde tekrar ediyor (satır {seen[pair] + 1})."
+                )
+            seen[pair] = i
+
+        existing = {
+            (int(x.parent_product_id), int(x.child_product_id)): x
+            for x in self.repo.list_active_bom_edges(self.company_id)
+        }
+
+        graph: Dict[int, set] = {}
+        for pr, ch in list(existing.keys()) + list(seen.keys()):
+            graph.setdefault(pr, set()).add(ch)
+        _, cyclic = topological_order(graph)
+        if cyclic:
+            sample = ", ".join(str(n) for n in cyclic[:10])
+            raise MasterDataValidationError(f"BOM döngü (cycle) oluşturuyor. İlgili ürün id'leri: {sample}. İşlem iptal edildi.")
+
+        new_edges: list = []
+        prev_objs: list = []
+        for p in items:
+            pair = (int(p.parent_product_id), int(p.child_product_id))
+            valid_from = _tz(p.valid_from)
+            prev = existing.get(pair)
+            prev_objs.append(self._edge_obj(prev) if prev else None)
+            if prev:
+                prev.is_active = False
+                prev.valid_to = _close_previous(prev.valid_from, valid_from)
+            new_edges.append(
+                models.MasterBOMEdge(
+                    company_id=self.company_id,
+                    parent_product_id=pair[0],
+                    child_product_id=pair[1],
+                    ratio=float(p.ratio),
+                    unit=(p.unit or "kg").strip(),
+                    valid_from=valid_from,
+                    valid_to=None,
+                    version=(int(prev.version) + 1) if prev else 1,
+                    is_active=True,
+                )
+            )
+        self.repo.create_edges(new_edges)
+
+        self.repo.add_changes(
+            [
+                self._change_row(
+                    entity_type="bom",
+                    entity_logical_id=f"{e.parent_product_id}->{e.child_product_id}",
+                    operation="update" if old is not None else "create",
+                    old_obj=old,
+                    new_obj=self._edge_obj(e),
+                    note="BOM ilişkisi toplu import ile kaydedildi.",
+                )
+                for e, old in zip(new_edges, prev_objs)
+            ]
+        )
+
+        # commit sonrası paylaşılan indeks düşürülür; bu transaction içinde oturuma özel indeks kurulur
+        tx = _bom_tx(self.s, self.company_id)
+        tx["edges"] = None
+        tx["idx"] = None
+
+        updated = sum(1 for o in prev_objs if o is not None)
+        return {"created": len(new_edges) - updated, "updated": updated, "edge_ids": [e.id for e in new_edges]}
+
     def list_bom_edges(self) -> list[Dict[str, Any]]:
         edges = self.repo.list_active_bom_edges(self.company_id)
         return [
@@ -388,7 +549,20 @@ class MasterDataService:
     # Helpers
     # ----------------------------
     def _log_change(self, *, entity_type: str, entity_logical_id: str, operation: str, old_obj: Any, new_obj: Any, note: str) -> None:
-        ch = models.MasterDataChange(
+        ch = self._change_row(
+            entity_type=entity_type,
+            entity_logical_id=entity_logical_id,
+            operation=operation,
+            old_obj=old_obj,
+            new_obj=new_obj,
+            note=note,
+        )
+        self.repo.add_change(ch)
+
+    def _change_row(
+        self, *, entity_type: str, entity_logical_id: str, operation: str, old_obj: Any, new_obj: Any, note: str
+    ) -> models.MasterDataChange:
+        return models.MasterDataChange(
             company_id=self.company_id,
             user_id=self.user_id,
             entity_type=str(entity_type),
@@ -398,7 +572,6 @@ class MasterDataService:
             new_hash=sha256_hex(new_obj) if new_obj is not None else "",
             note=str(note or ""),
         )
-        self.repo.add_change(ch)
 
     @staticmethod
     def _product_obj(p: models.MasterProduct | None) -> Dict[str, Any] | None:
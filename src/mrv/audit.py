@@ -26,6 +26,11 @@ def _safe_auditevent_kwargs(**kwargs: Any) -> dict[str, Any]:
     except Exception:
         # Mapper erişilemezse en güvenli dar set
         allowed = {"event_type", "details_json", "user_id", "company_id", "entity_type", "entity_id"}
+    # Şema varyantları: event_type/action, details_json/meta_json
+    if "event_type" in kwargs and "event_type" not in allowed and "action" in allowed:
+        kwargs.setdefault("action", kwargs["event_type"])
+    if "details_json" in kwargs and "details_json" not in allowed and "meta_json" in allowed:
+        kwargs.setdefault("meta_json", kwargs["details_json"])
     return {k: v for k, v in kwargs.items() if k in allowed}
 
 
@@ -37,10 +42,13 @@ def append_audit(
     company_id: int | None = None,
     entity_type: str = "",
     entity_id: int | None = None,
+    must_persist: bool = False,
 ) -> None:
-    """Audit log kaydı yazar.
+    """Audit log kaydı yazar (AuditSink üzerinden toplu/asenkron).
 
-    Önemli: Audit logging hiçbir zaman uygulamanın ana akışını (login vb.) durdurmamalı.
+    must_persist=True: kritik olaylar (snapshot kilitleme vb.) dönmeden önce DB'ye yazılır.
+    Önemli: Audit logging hiçbir zaman uygulamanın ana akışını (login vb.) durdurmamalı;
+    yazılamayan olaylar sink tarafından spool'a alınır, sessizce düşürülmez.
     """
     kwargs = _safe_auditevent_kwargs(
         event_type=str(event_type),
@@ -48,24 +56,13 @@ def append_audit(
         user_id=int(user_id) if user_id is not None else None,
         company_id=int(company_id) if company_id is not None else None,
         entity_type=str(entity_type or ""),
-        entity_id=int(entity_id) if entity_id is not None else None,
+        entity_id=str(entity_id) if entity_id is not None else "",
     )
 
     try:
-        ev = AuditEvent(**kwargs)
-    except TypeError:
-        # Son çare: minimum alanlarla dene
-        ev = AuditEvent(
-            **_safe_auditevent_kwargs(
-                event_type=str(event_type),
-                details_json=_safe_json(details),
-            )
-        )
+        from src.services.audit_sink import get_audit_sink
 
-    try:
-        with db() as s:
-            s.add(ev)
-            s.commit()
+        get_audit_sink().submit(AuditEvent, kwargs, must_persist=must_persist)
     except Exception:
         # Audit logging hiçbir zaman ana akışı durdurmamalı
         return
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from src.db.models import CalculationSnapshot, Project
+from src.db.session import db
+from src.mrv.lineage import sha256_json
+from src.mrv.replay import dataset_uris, replay_payload, snapshot_replay_payload
+
+BULK_REPLAY_REPORT_DIR = Path(os.getenv("BULK_REPLAY_REPORT_DIR", "./storage/reports"))
+
+
+def locked_snapshot_ids(company_id: int) -> List[int]:
+    """Şirketin tüm kilitli snapshot'ları (id sırası)."""
+    with db() as s:
+        rows = s.execute(
+            select(CalculationSnapshot.id)
+            .join(Project, Project.id == CalculationSnapshot.project_id)
+            .where(Project.company_id == int(company_id), CalculationSnapshot.locked.is_(True))
+            .order_by(CalculationSnapshot.id.asc())
+        ).scalars().all()
+    return [int(x) for x in rows]
+
+
+def _group_key(payload: Dict[str, Any], factor_set_hash: str) -> str:
+    ref = payload.get("activity_snapshot_ref") or {}
+    datasets = {
+        k: {"uri": str((ref.get(k) or {}).get("uri") or ""), "sha256": str((ref.get(k) or {}).get("sha256") or "")}
+        for k in ("energy", "production", "materials")
+    }
+    # Faktör çözümü proje bazlıdır: aynı factor set'i paylaşan snapshot'lar aynı proje içinde gruplanır
+    return sha256_json({"project_id": payload.get("project_id"), "datasets": datasets, "factor_set_hash": factor_set_hash})
+
+
+def plan_replay_groups(snapshot_ids: Sequence[int], *, chunk: int = 0) -> List[Dict[str, Any]]:
+    """Snapshot'ları ortak dataset hash'leri + factor ref'lerine göre gruplar.
+
+    Tek DB turunda payload'lar çıkarılır (results_json'dan yalnızca input_bundle tutulur);
+    bulunamayan id'ler "missing" grubunda raporlanır. chunk > 0 ise büyük gruplar bölünür
+    (tek gruptaki binlerce snapshot'ın tek worker'a düşmemesi için).
+    """
+    groups: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    ids = [int(x) for x in snapshot_ids]
+    found = set()
+    with db() as s:
+        for i in range(0, len(ids), 500):
+            for snap in s.execute(select(CalculationSnapshot).where(CalculationSnapshot.id.in_(ids[i : i + 500]))).scalars():
+                payload = snapshot_replay_payload(snap)
+                key = _group_key(payload, str(snap.factor_set_hash or ""))
+                groups.setdefault(key, {"group": key[:16], "payloads": []})["payloads"].append(payload)
+                found.add(int(snap.id))
+
+    out: List[Dict[str, Any]] = []
+    for g in groups.values():
+        g["payloads"].sort(key=lambda p: p["snapshot_id"])
+        n = int(chunk) if chunk and chunk > 0 else len(g["payloads"])
+        for j in range(0, len(g["payloads"]), n):
+            out.append({"group": g["group"], "payloads": g["payloads"][j : j + n]})
+    missing = [x for x in ids if x not in found]
+    if missing:
+        out.append({"group": "missing", "payloads": [], "missing": missing})
+    return out
+
+
+def _item(snapshot_id: int, group: str, *, status: str, elapsed_ms: float, rep: Dict[str, Any] | None = None, error: str = "") -> Dict[str, Any]:
+    rep = rep or {}
+    return {
+        "snapshot_id": int(snapshot_id),
+        "group": group,
+        "status": status,  # pass | fail | error
+        "input_hash_match": rep.get("input_hash_match"),
+        "result_hash_match": rep.get("result_hash_match"),
+        "result_hash_expected": rep.get("result_hash_expected"),
+        "result_hash_recomputed": rep.get("result_hash_recomputed"),
+        "elapsed_ms": round(float(elapsed_ms), 3),
+        "error": error,
+    }
+
+
+def replay_group(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Bir grubu replay eder: dataset'ler bir kez okunur, faktör okumaları paylaşılır.
+
+    Hiçbir snapshot hatası grubu durdurmaz; her snapshot için pass/fail/error satırı döner.
+    """
+    from src.engine.emissions import shared_factor_lookups
+    from src.services.workflow import load_csv_from_uri
+
+    group = str(task.get("group") or "")
+    items: List[Dict[str, Any]] = [
+        _item(sid, group, status="error", elapsed_ms=0.0, error="Snapshot bulunamadı.") for sid in task.get("missing") or []
+    ]
+    frames: Dict[str, Any] = {}
+    load_ms = 0.0
+
+    def _frame(uri: str):
+        nonlocal load_ms
+        if uri not in frames:
+            t0 = time.perf_counter()
+            frames[uri] = load_csv_from_uri(uri)
+            load_ms += (time.perf_counter() - t0) * 1000.0
+        # orchestrator DataFrame'i yerinde değiştirebilir: snapshot'lar arası izolasyon için kopya
+        return frames[uri].copy()
+
+    with shared_factor_lookups():
+        for payload in task.get("payloads") or []:
+            sid = int(payload["snapshot_id"])
+            t0 = time.perf_counter()
+            try:
+                e_uri, p_uri, m_uri = dataset_uris(payload)
+                rep = replay_payload(payload, _frame(e_uri), _frame(p_uri), _frame(m_uri) if m_uri else None)
+                ok = bool(rep.get("input_hash_match")) and bool(rep.get("result_hash_match"))
+                items.append(_item(sid, group, status="pass" if ok else "fail", elapsed_ms=(time.perf_counter() - t0) * 1000.0, rep=rep))
+            except Exception as e:
+                items.append(_item(sid, group, status="error", elapsed_ms=(time.perf_counter() - t0) * 1000.0, error=f"{type(e).__name__}: {e}"))
+
+    return {"group": group, "dataset_load_ms": round(load_ms, 3), "datasets_loaded": len(frames), "items": items}
+
+
+def _worker_init(database_url: str) -> None:
+    # fork sonrası parent'ın connection pool'u paylaşılmasın
+    from src.db.session import configure_engine
+
+    configure_engine(database_url)
+
+
+def bulk_replay(
+    *,
+    company_id: Optional[int] = None,
+    snapshot_ids: Optional[Sequence[int]] = None,
+    processes: Optional[int] = None,
+    chunk: int = 0,
+    report_path: Optional[str | Path] = None,
+) -> Dict[str, Any]:
+    """Çok sayıda kilitli snapshot'ı toplu replay eder ve konsolide rapor yazar.
+
+    - company_id verilirse şirketin tüm kilitli snapshot'ları, aksi halde snapshot_ids doğrulanır.
+    - Gruplar (ortak dataset + factor ref) process pool'a dağıtılır; processes<=1 ise süreç içinde koşar.
+    - Tek tek hatalar (ve çöken worker'lar) raporda "error" olarak yer alır, iş devam eder.
+    - Rapor JSON olarak report_path'e (varsayılan BULK_REPLAY_REPORT_DIR) yazılır ve döndürülür.
+    """
+    if snapshot_ids is None:
+        if company_id is None:
+            raise ValueError("company_id veya snapshot_ids gerekli.")
+        snapshot_ids = locked_snapshot_ids(int(company_id))
+
+    started = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    tasks = plan_replay_groups(snapshot_ids, chunk=chunk)
+
+    workers = int(processes) if processes is not None else min(len(tasks), os.cpu_count() or 1)
+    results: List[Dict[str, Any]] = []
+    if workers <= 1 or len(tasks) <= 1:
+        results = [replay_group(t) for t in tasks]
+    else:
+        from src.db import session as session_mod
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init, initargs=(session_mod.DATABASE_URL,)) as ex:
+            futures = {ex.submit(replay_group, t): t for t in tasks}
+            for fut in as_completed(futures):
+                t = futures[fut]
+                try:
+                    results.append(fut.result())
+                except Exception as e:
+                    err = f"{type(e).__name__}: {e}"
+                    results.append({
+                        "group": t["group"],
+                        "dataset_load_ms": 0.0,
+                        "datasets_loaded": 0,
+                        "items": [_item(p["snapshot_id"], t["group"], status="error", elapsed_ms=0.0, error=err) for p in t["payloads"]],
+                    })
+
+    items = sorted((it for r in results for it in r["items"]), key=lambda x: x["snapshot_id"])
+    counts = {k: sum(1 for it in items if it["status"] == k) for k in ("pass", "fail", "error")}
+    report: Dict[str, Any] = {
+        "schema": "bulk_replay.v1",
+        "company_id": company_id,
+        "started_at": started.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        "processes": max(1, workers),
+        "n_snapshots": len(items),
+        "n_groups": len(tasks),
+        "passed": counts["pass"],
+        "failed": counts["fail"],
+        "errors": counts["error"],
+        "ok": counts["fail"] == 0 and counts["error"] == 0,
+        "groups": sorted(
+            ({"group": r["group"], "snapshots": len(r["items"]), "dataset_load_ms": r["dataset_load_ms"], "datasets_loaded": r["datasets_loaded"]} for r in results),
+            key=lambda g: g["group"],
+        ),
+        "items": items,
+    }
+
+    if report_path is None:
+        stamp = started.strftime("%Y%m%dT%H%M%SZ")
+        report_path = BULK_REPLAY_REPORT_DIR / f"bulk_replay_{company_id if company_id is not None else 'adhoc'}_{stamp}.json"
+    try:
+        rp = Path(report_path)
+        rp.parent.mkdir(parents=True, exist_ok=True)
+        rp.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        report["report_path"] = str(rp)
+    except Exception:
+        report["report_path"] = ""
+    return report
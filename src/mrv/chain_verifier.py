@@ -0,0 +1,248 @@
+"""
+Snapshot hash-chain doğrulama.
+
+save_snapshot / run_full her snapshot'a, projenin (created_at sırasına göre) bir önceki snapshot'ının
+result_hash'ini previous_snapshot_hash olarak yazar. Zincir kuralı, (created_at, id) sırasında:
+  snap[0].previous_snapshot_hash boş, snap[i].previous_snapshot_hash == snap[i-1].result_hash
+
+- Yalnızca (id, created_at, result_hash, previous_snapshot_hash) keyset sayfalarıyla okunur; results_json yüklenmez.
+- Her tam blok (block_size snapshot) için yaprak hash'lerinin Merkle kökü checkpoint olarak saklanır.
+  Sonraki doğrulamalar son checkpoint'ten devam eder; deep=True tüm zinciri baştan tarar ve
+  saklanan kökleri yeniden hesaplananlarla karşılaştırır.
+- Checkpoint yalnızca kopuksuz doğrulanmış önek için yazılır (kopukluk sonrası bloklar checkpoint'lenmez).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+
+from src.db.models import CalculationSnapshot, Project, SnapshotChainCheckpoint
+from src.db.session import db
+
+CHAIN_BLOCK_SIZE = int(os.getenv("SNAPSHOT_CHAIN_BLOCK_SIZE", "256"))
+CHAIN_PAGE_SIZE = int(os.getenv("SNAPSHOT_CHAIN_PAGE_SIZE", "2000"))
+CHAIN_MAX_BREAKS = 100
+
+CHAIN_VERIFY_JOB_KIND = "snapshot_chain_verify"
+
+Row = Tuple[int, Optional[datetime], str, str]
+
+
+def leaf_hash(snapshot_id: int, result_hash: str, previous_snapshot_hash: str) -> bytes:
+    # created_at yaprağa girmez: backend'ler arası datetime serileştirmesi farklı olabilir; sıra zincirle sabitlenir
+    return hashlib.sha256(f"{int(snapshot_id)}|{result_hash or ''}|{previous_snapshot_hash or ''}".encode("utf-8")).digest()
+
+
+def merkle_root(leaves: List[bytes]) -> str:
+    """Çiftli sha256 Merkle kökü (tek sayıda düğümde son düğüm kendisiyle eşlenir)."""
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def iter_chain_rows(project_id: int, *, after: Optional[Tuple[Optional[datetime], int]] = None, page_size: int = CHAIN_PAGE_SIZE) -> Iterator[Row]:
+    """Projenin snapshot'larını (created_at, id) sırasında sayfa sayfa akıtır (yalnız 4 kolon)."""
+    cols = (
+        CalculationSnapshot.id,
+        CalculationSnapshot.created_at,
+        CalculationSnapshot.result_hash,
+        CalculationSnapshot.previous_snapshot_hash,
+    )
+    while True:
+        q = select(*cols).where(CalculationSnapshot.project_id == int(project_id))
+        if after is not None:
+            ts, sid = after
+            q = q.where(
+                or_(
+                    CalculationSnapshot.created_at > ts,
+                    and_(CalculationSnapshot.created_at == ts, CalculationSnapshot.id > int(sid)),
+                )
+            )
+        q = q.order_by(CalculationSnapshot.created_at.asc(), CalculationSnapshot.id.asc()).limit(int(page_size))
+        with db() as s:
+            rows = s.execute(q).all()
+        for r in rows:
+            yield int(r[0]), r[1], str(r[2] or ""), str(r[3] or "")
+        if len(rows) < int(page_size):
+            return
+        after = (rows[-1][1], int(rows[-1][0]))
+
+
+def _checkpoints(project_id: int, block_size: int) -> List[SnapshotChainCheckpoint]:
+    with db() as s:
+        return list(
+            s.execute(
+                select(SnapshotChainCheckpoint)
+                .where(SnapshotChainCheckpoint.project_id == int(project_id), SnapshotChainCheckpoint.block_size == int(block_size))
+                .order_by(SnapshotChainCheckpoint.block_index.asc())
+            ).scalars()
+        )
+
+
+def _prefix_intact(project_id: int, last: SnapshotChainCheckpoint, n_expected: int) -> Optional[str]:
+    """Checkpoint'lenmiş önek için ucuz bütünlük kontrolleri: uç snapshot aynı mı, önek satır sayısı aynı mı."""
+    with db() as s:
+        head = s.execute(
+            select(CalculationSnapshot.result_hash, CalculationSnapshot.created_at).where(CalculationSnapshot.id == int(last.last_snapshot_id))
+        ).first()
+        if head is None or str(head[0] or "") != str(last.head_result_hash or ""):
+            return "checkpoint_head_changed"
+        ts = head[1]
+        n = s.execute(
+            select(func.count())
+            .select_from(CalculationSnapshot)
+            .where(
+                CalculationSnapshot.project_id == int(project_id),
+                or_(CalculationSnapshot.created_at < ts, and_(CalculationSnapshot.created_at == ts, CalculationSnapshot.id <= int(last.last_snapshot_id))),
+            )
+        ).scalar_one()
+        if int(n) != int(n_expected):
+            return "checkpoint_prefix_count_changed"
+    return None
+
+
+def verify_chain(
+    project_id: int,
+    *,
+    block_size: Optional[int] = None,
+    deep: bool = False,
+    persist: bool = True,
+    page_size: int = CHAIN_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """Projenin snapshot hash-chain'ini doğrular; tam bloklar için checkpoint yazar.
+
+    Dönüş: ok, checked (taranan snapshot), checkpoints_reused/written, breaks (ilk CHAIN_MAX_BREAKS),
+    head_snapshot_id / head_result_hash, elapsed_ms.
+    """
+    t0 = time.perf_counter()
+    bs = max(1, int(block_size or CHAIN_BLOCK_SIZE))
+    stored = _checkpoints(project_id, bs)
+    by_index = {int(c.block_index): c for c in stored}
+
+    breaks: List[Dict[str, Any]] = []
+    after = None
+    expected_prev = ""
+    block_index = 0
+    reused = 0
+    head_id: Optional[int] = None
+    head_hash = ""
+
+    if stored and not deep:
+        last = stored[-1]
+        problem = _prefix_intact(project_id, last, sum(int(c.n_snapshots) for c in stored))
+        if problem is None and [int(c.block_index) for c in stored] == list(range(len(stored))):
+            after = (last.last_created_at, int(last.last_snapshot_id))
+            expected_prev = str(last.head_result_hash or "")
+            block_index = int(last.block_index) + 1
+            reused = len(stored)
+            head_id, head_hash = int(last.last_snapshot_id), expected_prev
+        elif problem is not None:
+            breaks.append({"snapshot_id": int(last.last_snapshot_id), "reason": problem})
+
+    to_write: List[Dict[str, Any]] = []
+    leaves: List[bytes] = []
+    first_id: Optional[int] = None
+    checked = 0
+    clean = not breaks
+
+    for sid, created_at, result_hash, prev in iter_chain_rows(project_id, after=after, page_size=page_size):
+        checked += 1
+        if prev != expected_prev:
+            clean = False
+            if len(breaks) < CHAIN_MAX_BREAKS:
+                breaks.append({"snapshot_id": sid, "reason": "previous_hash_mismatch", "expected_previous": expected_prev, "actual_previous": prev})
+        expected_prev = result_hash
+        head_id, head_hash = sid, result_hash
+
+        if first_id is None:
+            first_id = sid
+        leaves.append(leaf_hash(sid, result_hash, prev))
+        if len(leaves) < bs:
+            continue
+
+        root = merkle_root(leaves)
+        known = by_index.get(block_index)
+        if known is not None:
+            if known.merkle_root != root or int(known.last_snapshot_id) != sid:
+                clean = False
+                if len(breaks) < CHAIN_MAX_BREAKS:
+                    breaks.append({"snapshot_id": sid, "reason": "checkpoint_root_mismatch", "block_index": block_index})
+        elif clean:
+            to_write.append({
+                "project_id": int(project_id),
+                "block_size": bs,
+                "block_index": block_index,
+                "first_snapshot_id": int(first_id),
+                "last_snapshot_id": sid,
+                "last_created_at": created_at,
+                "n_snapshots": len(leaves),
+                "merkle_root": root,
+                "head_result_hash": result_hash,
+            })
+        block_index += 1
+        leaves, first_id = [], None
+
+    written = 0
+    if persist and to_write:
+        try:
+            with db() as s:
+                s.add_all([SnapshotChainCheckpoint(**row) for row in to_write])
+                s.commit()
+            written = len(to_write)
+        except Exception:
+            written = 0
+
+    return {
+        "project_id": int(project_id),
+        "ok": not breaks,
+        "block_size": bs,
+        "mode": "deep" if deep else "incremental",
+        "checked": checked,
+        "checkpoints_reused": reused,
+        "checkpoints_written": written,
+        "pending_in_tail": len(leaves),
+        "breaks": breaks,
+        "head_snapshot_id": head_id,
+        "head_result_hash": head_hash,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+    }
+
+
+def handle_chain_verify_job(payload: dict) -> dict:
+    """Worker job handler (kind=snapshot_chain_verify).
+
+    payload: {"project_id": int} | {"company_id": int} | {} (tüm projeler),
+             opsiyonel "deep": bool, "block_size": int
+    """
+    payload = payload or {}
+    if payload.get("project_id") is not None:
+        project_ids = [int(payload["project_id"])]
+    else:
+        q = select(Project.id).order_by(Project.id.asc())
+        if payload.get("company_id") is not None:
+            q = q.where(Project.company_id == int(payload["company_id"]))
+        with db() as s:
+            project_ids = [int(x) for x in s.execute(q).scalars().all()]
+
+    results = [
+        verify_chain(pid, block_size=payload.get("block_size"), deep=bool(payload.get("deep", False)))
+        for pid in project_ids
+    ]
+    return {
+        "ok": all(r["ok"] for r in results),
+        "projects": len(results),
+        "checked": sum(r["checked"] for r in results),
+        "broken_projects": [r["project_id"] for r in results if not r["ok"]],
+        "results": results,
+    }
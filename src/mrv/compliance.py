@@ -8,6 +8,7 @@ from src.db.models import EvidenceDocument
 from src.db.session import db
 from src.mrv.bundles import ComplianceCheck, InputBundle, QAFlag, ResultBundle
 from src.mrv.strict_validator import validate_strict
+from src.services.tracing import traced
 
 
 def _norm(s: Any) -> str:
@@ -136,6 +137,7 @@ def _cbam_completeness(cbam_reporting: Dict[str, Any]) -> Dict[str, Any]:
     return {"ok": len(errs) == 0, "errors": errs}
 
 
+@traced("compliance.evaluate")
 def evaluate_compliance(
     *,
     input_bundle: InputBundle,
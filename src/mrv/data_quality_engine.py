@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -24,14 +26,177 @@ def _to_float(x: Any) -> float:
 def _months_present(df: pd.DataFrame) -> List[str]:
     if df is None or df.empty or "month" not in df.columns:
         return []
-    return sorted({str(x) for x in df["month"].dropna().tolist()})
+    # str() yalnızca tekil değerlere uygulanır (satır başına değil)
+    return sorted({str(x) for x in df["month"].dropna().drop_duplicates().tolist()})
 
 
-def completeness_checks(*args, energy_df: pd.DataFrame | None = None, production_df: pd.DataFrame | None = None) -> Dict[str, Any]:
+def _float_values(s: pd.Series, coerced: pd.Series | None = None) -> pd.Series:
+    """Kolonu tek seferde float'a çevirir; ``s.apply(_to_float)`` ile aynı sonuç (NaN/çevrilemeyen -> 0.0)."""
+    kind = s.dtype.kind
+    if kind in "iufb":
+        return s.astype(float).fillna(0.0)
+    vals = s.to_numpy(dtype=object)
+    na = pd.isna(vals)
+    out = np.zeros(len(vals), dtype=float)
+    try:
+        # object -> float cast'i eleman başına float(x) semantiğidir ("1e3", "1_000", Decimal ...)
+        out[~na] = vals[~na].astype(float)
+    except (TypeError, ValueError):
+        # kirli kolon: to_numeric'in çevirebildikleri toplu cast, kalanlar (az sayıda) _to_float ile
+        if coerced is None:
+            coerced = pd.to_numeric(s, errors="coerce")
+        ok = ~na & coerced.notna().to_numpy()
+        rest = np.flatnonzero(~na & ~ok)
+        try:
+            out[ok] = vals[ok].astype(float)
+        except (TypeError, ValueError):
+            return pd.Series(np.fromiter((_to_float(x) for x in vals), dtype=float, count=len(vals)), index=s.index, dtype=float)
+        out[rest] = [_to_float(vals[i]) for i in rest]
+    return pd.Series(out, index=s.index, dtype=float)
+
+
+@dataclass
+class FrameProfile:
+    """DataFrame için paylaşılan kolon profili (DQ kontrolleri tek geçişte beslenir).
+
+    Eksiklik maskesi bir kez çıkarılır; kolonların sayısal dönüşümü, float (quantity) değerleri,
+    IQR sınırları ve ay kapsamı ilk istendiğinde hesaplanıp saklanır. Profil oluşturulduğu andaki
+    frame'i yansıtır; frame sonradan değiştirilirse yeni profil alınmalıdır.
+    """
+
+    df: pd.DataFrame = field(repr=False)
+    _na: Optional[pd.DataFrame] = field(default=None, init=False, repr=False)
+    _numeric_positions: Optional[List[int]] = field(default=None, init=False, repr=False)
+    _coerced: Dict[int, pd.Series] = field(default_factory=dict, init=False, repr=False)
+    _floats: Dict[Any, pd.Series] = field(default_factory=dict, init=False, repr=False)
+    _months: Optional[List[str]] = field(default=None, init=False, repr=False)
+
+    @property
+    def n_rows(self) -> int:
+        return int(len(self.df))
+
+    @property
+    def na_mask(self) -> pd.DataFrame:
+        if self._na is None:
+            self._na = self.df.isna()
+        return self._na
+
+    def missing_ratio(self) -> float:
+        """Kolon eksiklik oranlarının ortalaması (``df.isna().mean().mean()``)."""
+        if self.n_rows == 0:
+            return 1.0
+        return float(self.na_mask.mean().mean())
+
+    def _numeric_position_list(self) -> List[int]:
+        if self._numeric_positions is not None:
+            return self._numeric_positions
+        dup = self.df.columns.duplicated(keep=False)
+        na = self.na_mask.to_numpy()
+        out: List[int] = []
+        for j in range(self.df.shape[1]):
+            if dup[j]:
+                continue  # df[c] DataFrame döner; sayısal kabul edilmez
+            s = self.df.iloc[:, j]
+            if s.dtype.kind in "iufcb":
+                out.append(j)
+                continue
+            # ilk 50 dolu değer sayıya çevrilebiliyorsa sayısal kolon
+            head = s.iloc[np.flatnonzero(~na[:, j])[:50]]
+            try:
+                pd.to_numeric(head, errors="raise")
+                out.append(j)
+            except Exception:
+                continue
+        self._numeric_positions = out
+        return out
+
+    def numeric_columns(self) -> List[Any]:
+        return [self.df.columns[j] for j in self._numeric_position_list()]
+
+    def coerced(self, position: int) -> pd.Series:
+        """``pd.to_numeric(kolon, errors="coerce")`` (kolon başına bir kez)."""
+        if position not in self._coerced:
+            self._coerced[position] = pd.to_numeric(self.df.iloc[:, position], errors="coerce")
+        return self._coerced[position]
+
+    def floats(self, col: str = "quantity") -> pd.Series:
+        """``df[col].apply(_to_float)`` eşdeğeri, kolon başına bir kez hesaplanır."""
+        if col not in self._floats:
+            cols = self.df.columns
+            values = self.df[col]
+            if isinstance(values, pd.DataFrame):
+                # tekrarlı kolon adı: df[col] DataFrame döner; eski satır bazlı davranış aynen korunur
+                self._floats[col] = values.apply(_to_float)
+                return self._floats[col]
+            # IQR için yapılmış to_numeric dönüşümü varsa tekrar kullanılır
+            pos = cols.get_loc(col) if cols.is_unique else None
+            self._floats[col] = _float_values(values, self._coerced.get(pos) if isinstance(pos, int) else None)
+        return self._floats[col]
+
+    def months(self) -> List[str]:
+        if self._months is None:
+            self._months = _months_present(self.df)
+        return self._months
+
+    def iqr_outliers(self, *, max_columns: int = 8, k: float = 3.0, min_count: int = 20) -> Dict[Any, Dict[str, float]]:
+        """Sayısal kolonlar için IQR sınırları ve aykırı sayıları (tüm kolonlar tek quantile çağrısında).
+
+        ``min_count``'tan az dolu değeri olan veya IQR <= 0 olan kolonlar atlanır.
+        """
+        positions = self._numeric_position_list()[:max_columns]
+        if not positions:
+            return {}
+        num = pd.DataFrame({j: self.coerced(j) for j in positions})
+        counts = num.notna().sum()
+        num = num.loc[:, counts >= min_count]
+        if num.shape[1] == 0:
+            return {}
+        qs = num.quantile([0.25, 0.75])
+        q1, q3 = qs.loc[0.25], qs.loc[0.75]
+        iqr = q3 - q1
+        keep = iqr > 0
+        if not keep.any():
+            return {}
+        num, q1, q3, iqr = num.loc[:, keep], q1[keep], q3[keep], iqr[keep]
+        lower = q1 - k * iqr
+        upper = q3 + k * iqr
+        outliers = (num.lt(lower, axis=1) | num.gt(upper, axis=1)).sum()
+        return {
+            self.df.columns[j]: {
+                "q1": float(q1[j]),
+                "q3": float(q3[j]),
+                "lower": float(lower[j]),
+                "upper": float(upper[j]),
+                "outliers": int(outliers[j]),
+            }
+            for j in num.columns
+        }
+
+
+def profile_frame(df: pd.DataFrame) -> FrameProfile:
+    return FrameProfile(df)
+
+
+def _profile(df: pd.DataFrame | None, profile: FrameProfile | None) -> FrameProfile | None:
+    if not isinstance(df, pd.DataFrame):
+        return None
+    if profile is not None and profile.df is df:
+        return profile
+    return FrameProfile(df)
+
+
+def completeness_checks(
+    *args,
+    energy_df: pd.DataFrame | None = None,
+    production_df: pd.DataFrame | None = None,
+    energy_profile: FrameProfile | None = None,
+    production_profile: FrameProfile | None = None,
+) -> Dict[str, Any]:
     """Completeness kontrolleri: missing months/products/fuels.
 
     Legacy compatibility: callers may still pass ``(dataset_type, df)``. In that
     case the single dataframe is routed to the correct slot.
+    ``*_profile`` verilirse (profile_frame) kolon profili kontroller arasında paylaşılır.
     """
     if args:
         if len(args) == 2 and energy_df is None and production_df is None:
@@ -45,8 +210,10 @@ def completeness_checks(*args, energy_df: pd.DataFrame | None = None, production
             raise TypeError("completeness_checks expects either keyword dataframes or (dataset_type, df)")
     checks: List[Dict[str, Any]] = []
 
-    energy_months = _months_present(energy_df) if isinstance(energy_df, pd.DataFrame) else []
-    prod_months = _months_present(production_df) if isinstance(production_df, pd.DataFrame) else []
+    energy_profile = _profile(energy_df, energy_profile)
+    production_profile = _profile(production_df, production_profile)
+    energy_months = energy_profile.months() if energy_profile is not None else []
+    prod_months = production_profile.months() if production_profile is not None else []
 
     missing_energy_months = []
     missing_prod_months = []
@@ -71,8 +238,8 @@ def completeness_checks(*args, energy_df: pd.DataFrame | None = None, production
     missing_fuels = []
     if isinstance(energy_df, pd.DataFrame) and not energy_df.empty:
         if "fuel_type" in energy_df.columns:
-            fuels = sorted({_norm(x) for x in energy_df["fuel_type"].dropna().tolist()})
-            if not fuels:
+            # yalnızca en az bir dolu yakıt değeri aranır
+            if energy_df["fuel_type"].dropna().empty:
                 missing_fuels = ["fuel_type"]
         else:
             missing_fuels = ["fuel_type"]
@@ -89,13 +256,14 @@ def completeness_checks(*args, energy_df: pd.DataFrame | None = None, production
     # Products completeness
     missing_products = []
     if isinstance(production_df, pd.DataFrame) and not production_df.empty:
+        # normalize kolon adlarıyla konum bulunur (frame kopyalanmaz)
         cols = [c.lower().strip() for c in production_df.columns]
-        df = production_df.copy()
-        df.columns = cols
-        if "product_code" not in df.columns and "sku" not in df.columns:
+        key = "product_code" if "product_code" in cols else ("sku" if "sku" in cols else None)
+        if key is None:
             missing_products = ["product_code"]
         else:
-            codes = df["product_code"] if "product_code" in df.columns else df["sku"]
+            pos = [i for i, c in enumerate(cols) if c == key]
+            codes = production_df.iloc[:, pos[0]] if len(pos) == 1 else production_df.iloc[:, pos]
             if codes.dropna().empty:
                 missing_products = ["product_code"]
 
@@ -111,7 +279,13 @@ def completeness_checks(*args, energy_df: pd.DataFrame | None = None, production
     return {"checks": checks}
 
 
-def anomaly_checks(*args, energy_df: pd.DataFrame | None = None, production_df: pd.DataFrame | None = None) -> Dict[str, Any]:
+def anomaly_checks(
+    *args,
+    energy_df: pd.DataFrame | None = None,
+    production_df: pd.DataFrame | None = None,
+    energy_profile: FrameProfile | None = None,
+    production_profile: FrameProfile | None = None,
+) -> Dict[str, Any]:
     """Anomali kontrolleri: intensity spikes, numeric outliers (basit)."""
     if args:
         if len(args) == 2 and energy_df is None and production_df is None:
@@ -127,7 +301,7 @@ def anomaly_checks(*args, energy_df: pd.DataFrame | None = None, production_df:
 
     # Energy spike (quantity)
     if isinstance(energy_df, pd.DataFrame) and not energy_df.empty and "quantity" in energy_df.columns:
-        q = energy_df["quantity"].apply(_to_float)
+        q = _profile(energy_df, energy_profile).floats("quantity")
         if len(q) >= 6:
             med = float(q.median())
             maxv = float(q.max())
@@ -142,7 +316,7 @@ def anomaly_checks(*args, energy_df: pd.DataFrame | None = None, production_df:
 
     # Production spike
     if isinstance(production_df, pd.DataFrame) and not production_df.empty and "quantity" in production_df.columns:
-        q = production_df["quantity"].apply(_to_float)
+        q = _profile(production_df, production_profile).floats("quantity")
         if len(q) >= 6:
             med = float(q.median())
             maxv = float(q.max())
@@ -162,6 +336,8 @@ def cross_checks(
     *,
     energy_df: pd.DataFrame | None,
     production_df: pd.DataFrame | None,
+    energy_profile: FrameProfile | None = None,
+    production_profile: FrameProfile | None = None,
 ) -> Dict[str, Any]:
     """Basit cross-check: production vs energy (toplam trend uyumu)."""
     checks: List[Dict[str, Any]] = []
@@ -174,8 +350,8 @@ def cross_checks(
         and ("quantity" in energy_df.columns)
         and ("quantity" in production_df.columns)
     ):
-        e_sum = float(energy_df["quantity"].apply(_to_float).sum())
-        p_sum = float(production_df["quantity"].apply(_to_float).sum())
+        e_sum = float(_profile(energy_df, energy_profile).floats("quantity").sum())
+        p_sum = float(_profile(production_df, production_profile).floats("quantity").sum())
         # Çok kaba kontrol
         if p_sum <= 0 and e_sum > 0:
             checks.append(
@@ -213,9 +389,15 @@ def run_data_quality_engine(
     energy_df: pd.DataFrame | None,
     production_df: pd.DataFrame | None,
 ) -> Dict[str, Any]:
-    """DQ engine birleşik çıktısı."""
+    """DQ engine birleşik çıktısı (her dataframe bir kez profillenir, kontroller profili paylaşır)."""
+    frames = {
+        "energy_df": energy_df,
+        "production_df": production_df,
+        "energy_profile": _profile(energy_df, None),
+        "production_profile": _profile(production_df, None),
+    }
     out = {"checks": [], "qa_flags": []}
-    out["checks"].extend((completeness_checks(energy_df=energy_df, production_df=production_df).get("checks") or []))
-    out["qa_flags"].extend((anomaly_checks(energy_df=energy_df, production_df=production_df).get("qa_flags") or []))
-    out["checks"].extend((cross_checks(energy_df=energy_df, production_df=production_df).get("checks") or []))
+    out["checks"].extend((completeness_checks(**frames).get("checks") or []))
+    out["qa_flags"].extend((anomaly_checks(**frames).get("qa_flags") or []))
+    out["checks"].extend((cross_checks(**frames).get("checks") or []))
     return out
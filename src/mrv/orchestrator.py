@@ -9,7 +9,7 @@ from sqlalchemy.orm import joinedload
 
 from src.db.models import Methodology, MonitoringPlan, Project
 from src.db.session import db
-from src.engine.allocation import allocate_product_emissions, allocation_map_from_df
+from src.engine.allocation import allocate_product_emissions, allocation_map_from_df, result_allocation_view
 from src.engine.cbam import cbam_compute
 from src.engine.emissions import energy_emissions, resolve_factor_set_for_energy_df
 from src import config as app_config
@@ -17,9 +17,21 @@ from src.engine.ets import ets_net_and_cost, ets_verification_payload
 from src.mrv.bundles import FactorRef, InputBundle, MonitoringPlanRef, PriceRef, QAFlag, ResultBundle
 from src.mrv.lineage import sha256_json
 from src.services.cbam_xml import build_cbam_reporting
+from src.services.tracing import span, traced
 
 
 ENGINE_VERSION_PACKET_A = "engine-3.0.0-packetA"
+# config["cbam"]["precursor_chain_propagation"] açıkken: çok seviyeli precursor zincirleri yayılır
+# (sonuçlar değişir); bu snapshot'lar ayrı engine version ile kaydedilir, mevcut replay'ler etkilenmez.
+ENGINE_VERSION_PACKET_A_CHAIN = "engine-3.1.0-packetA-chain"
+
+
+def precursor_chain_propagation(config: Dict[str, Any] | None) -> bool:
+    return bool(((config or {}).get("cbam") or {}).get("precursor_chain_propagation", False))
+
+
+def engine_version_for_config(config: Dict[str, Any] | None) -> str:
+    return ENGINE_VERSION_PACKET_A_CHAIN if precursor_chain_propagation(config) else ENGINE_VERSION_PACKET_A
 
 
 def _to_float(x: Any, default: float = 0.0) -> float:
@@ -157,6 +169,43 @@ def _factor_refs_from_meta(factor_meta_rows: List[Dict[str, Any]]) -> List[Facto
     return refs
 
 
+@traced("run_orchestrator")
+def energy_stream_summary(energy_out: Dict[str, Any]) -> Dict[str, Any]:
+    """results_json'a yazılan enerji özeti: scope toplamları + akış bazlı toplamlar.
+
+    Ham satırlar (ay × yakıt, faktör meta'sı) kalıcı sonuca yazılmaz. ETS raporu, Monte Carlo
+    kaynakları ve azaltım önerileri satırları zaten yakıt türü / elektrik yöntemi bazında toplar;
+    direct_rows (fuel_type, unit) ve indirect_rows (method) başına tek satıra indirilir.
+    """
+    energy_out = energy_out or {}
+    direct: Dict[tuple, Dict[str, Any]] = {}
+    for r in energy_out.get("direct_rows") or []:
+        if not isinstance(r, dict):
+            continue
+        key = (str(r.get("fuel_type") or ""), str(r.get("unit") or ""))
+        agg = direct.setdefault(key, {"fuel_type": key[0], "unit": key[1], "quantity": 0.0, "gj": 0.0, "tco2": 0.0})
+        for k in ("quantity", "gj", "tco2"):
+            agg[k] += _to_float(r.get(k), 0.0)
+
+    indirect: Dict[str, Dict[str, Any]] = {}
+    for r in energy_out.get("indirect_rows") or []:
+        if not isinstance(r, dict):
+            continue
+        method = str(r.get("method") or "")
+        agg = indirect.setdefault(method, {"method": method, "mwh": 0.0, "tco2": 0.0})
+        for k in ("mwh", "tco2"):
+            agg[k] += _to_float(r.get(k), 0.0)
+
+    return {
+        "direct_tco2": _to_float(energy_out.get("direct_tco2"), 0.0),
+        "indirect_tco2": _to_float(energy_out.get("indirect_tco2"), 0.0),
+        "total_tco2": _to_float(energy_out.get("total_tco2"), 0.0),
+        "direct_rows": [direct[k] for k in sorted(direct)],
+        "indirect_rows": [indirect[k] for k in sorted(indirect)],
+        "used_default_factors": bool(energy_out.get("used_default_factors")),
+    }
+
+
 def run_orchestrator(
     *,
     project_id: int,
@@ -180,15 +229,17 @@ def run_orchestrator(
 
     scenario = scenario or {}
     config = config or {}
-
-    with db() as s:
-        project = s.execute(
-            select(Project)
-            .options(joinedload(Project.facility), joinedload(Project.company))
-            .where(Project.id == int(project_id))
-        ).scalars().first()
-        if not project:
-            raise ValueError("Proje bulunamadı.")
+    engine_version = engine_version_for_config(config)
+
+    with span("orchestrator.load_project"):
+        with db() as s:
+            project = s.execute(
+                select(Project)
+                .options(joinedload(Project.facility), joinedload(Project.company))
+                .where(Project.id == int(project_id))
+            ).scalars().first()
+            if not project:
+                raise ValueError("Proje bulunamadı.")
 
     period = _period_from_config(config)
     facility = _facility_from_project(project)
@@ -201,12 +252,14 @@ def run_orchestrator(
     market_override = (config or {}).get("market_grid_factor_override", None)
     market_override_f = float(market_override) if market_override is not None and str(market_override).strip() != "" else None
 
-    factor_bundle = resolve_factor_set_for_energy_df(
-        project_id=int(project_id),
-        df_energy=energy_df,
-        region=region or "TR",
-    )
-    factor_refs = _factor_refs_from_meta(list((factor_bundle or {}).get("refs") or []))
+    with span("orchestrator.factor_resolution") as sp:
+        factor_bundle = resolve_factor_set_for_energy_df(
+            project_id=int(project_id),
+            df_energy=energy_df,
+            region=region or "TR",
+        )
+        factor_refs = _factor_refs_from_meta(list((factor_bundle or {}).get("refs") or []))
+        sp.set(factor_refs=len(factor_refs))
 
     # Monitoring plan ref
     mp_ref = _latest_monitoring_plan_ref(facility.get("id"))
@@ -217,102 +270,125 @@ def run_orchestrator(
         fx_tl_per_eur=_to_float((config or {}).get("fx_tl_per_eur", 35.0), 35.0),
     )
 
-    config_hash = sha256_json(config)
-
-    input_bundle = InputBundle(
-        engine_version=ENGINE_VERSION_PACKET_A,
-        project_id=int(project_id),
-        period=period,
-        facility=facility,
-        product_mapping=product_mapping,
-        activity_snapshot_ref=activity_snapshot_ref or {},
-        monitoring_plan_ref=mp_ref,
-        factor_set_ref=factor_refs,
-        price_ref=price,
-        config=config,
-        config_hash=config_hash,
-        methodology_ref=_methodology_ref(methodology_id),
-        scenario=scenario,
-    )
+    with span("orchestrator.input_bundle_hash"):
+        config_hash = sha256_json(config)
+
+        input_bundle = InputBundle(
+            engine_version=engine_version,
+            project_id=int(project_id),
+            period=period,
+            facility=facility,
+            product_mapping=product_mapping,
+            activity_snapshot_ref=activity_snapshot_ref or {},
+            monitoring_plan_ref=mp_ref,
+            factor_set_ref=factor_refs,
+            price_ref=price,
+            config=config,
+            config_hash=config_hash,
+            methodology_ref=_methodology_ref(methodology_id),
+            scenario=scenario,
+        )
 
-    input_bundle_hash = input_bundle.input_bundle_hash()
+        input_bundle_hash = input_bundle.input_bundle_hash()
 
     # Core compute
-    energy_out = energy_emissions(
-        energy_df,
-        project_id=int(project_id),
-        region=region or "TR",
-        electricity_method=electricity_method,
-        market_grid_factor_override=market_override_f,
-        factor_set_lock=[fr.to_dict() for fr in factor_refs],
-    )
+    with span("orchestrator.energy_emissions") as sp:
+        energy_out = energy_emissions(
+            energy_df,
+            project_id=int(project_id),
+            region=region or "TR",
+            electricity_method=electricity_method,
+            market_grid_factor_override=market_override_f,
+            factor_set_lock=[fr.to_dict() for fr in factor_refs],
+        )
+        sp.set(rows=len(energy_df) if energy_df is not None else 0)
 
     # ETS cost + verification payload (mevcut davranış korunur)
-    ets_cfg = (config or {}).get("ets") or {}
-    free_alloc = _to_float(ets_cfg.get("free_alloc_t", 0.0), 0.0)
-    banked = _to_float(ets_cfg.get("banked_t", 0.0), 0.0)
-
-    ets_cost = ets_net_and_cost(
-        scope1_tco2=float(energy_out.get("direct_tco2", 0.0) or 0.0),
-        free_alloc_t=free_alloc,
-        banked_t=banked,
-        allowance_price_eur_per_t=price.eua_price_eur_per_t,
-        fx_tl_per_eur=price.fx_tl_per_eur,
-    )
+    with span("orchestrator.ets"):
+        ets_cfg = (config or {}).get("ets") or {}
+        free_alloc = _to_float(ets_cfg.get("free_alloc_t", 0.0), 0.0)
+        banked = _to_float(ets_cfg.get("banked_t", 0.0), 0.0)
+
+        ets_cost = ets_net_and_cost(
+            scope1_tco2=float(energy_out.get("direct_tco2", 0.0) or 0.0),
+            free_alloc_t=free_alloc,
+            banked_t=banked,
+            allowance_price_eur_per_t=price.eua_price_eur_per_t,
+            fx_tl_per_eur=price.fx_tl_per_eur,
+        )
 
-    mp_for_payload = mp_ref.to_dict() if mp_ref else None
-    ets_verif = ets_verification_payload(
-        fuel_rows=list(energy_out.get("fuel_rows", []) or []),
-        monitoring_plan=mp_for_payload,
-        uncertainty_notes=str((config or {}).get("uncertainty_notes", "") or ""),
-    )
+        mp_for_payload = mp_ref.to_dict() if mp_ref else None
+        ets_verif = ets_verification_payload(
+            fuel_rows=list(energy_out.get("fuel_rows", []) or []),
+            monitoring_plan=mp_for_payload,
+            uncertainty_notes=str((config or {}).get("uncertainty_notes", "") or ""),
+        )
 
     # 1.3 Allocation engine (deterministik)
-    alloc_cfg = (config or {}).get("allocation") or {}
-    alloc_method = str(alloc_cfg.get("method") or (config or {}).get("allocation_method") or "quantity_based")
-    allocation_df, allocation_meta = allocate_product_emissions(
-        production_df,
-        scope1_tco2=float(energy_out.get("direct_tco2", 0.0) or 0.0),
-        scope2_tco2=float(energy_out.get("indirect_tco2", 0.0) or 0.0),
-        method=alloc_method,
-    )
-    allocation_by_sku = allocation_map_from_df(allocation_df)
+    with span("orchestrator.allocation") as sp:
+        alloc_cfg = (config or {}).get("allocation") or {}
+        alloc_method = str(alloc_cfg.get("method") or (config or {}).get("allocation_method") or "quantity_based")
+        emissions_by_month = None
+        if bool(alloc_cfg.get("per_month")):
+            # SKU × ay allocation: her ayın enerji emisyonu o ayın üretim payına göre dağıtılır
+            emissions_by_month = {}
+            for key, rows in (("scope1_tco2", energy_out.get("direct_rows")), ("scope2_tco2", energy_out.get("indirect_rows"))):
+                for r in rows or []:
+                    mo = str((r or {}).get("month") or "").strip()
+                    bucket = emissions_by_month.setdefault(mo, {"scope1_tco2": 0.0, "scope2_tco2": 0.0})
+                    bucket[key] += float((r or {}).get("tco2") or 0.0)
+        allocation_df, allocation_meta = allocate_product_emissions(
+            production_df,
+            scope1_tco2=float(energy_out.get("direct_tco2", 0.0) or 0.0),
+            scope2_tco2=float(energy_out.get("indirect_tco2", 0.0) or 0.0),
+            method=alloc_method,
+            emissions_by_month=emissions_by_month,
+        )
+        allocation_by_sku = allocation_map_from_df(allocation_df)
+        # result_hash'e giren görünüm: allocation_hash / basis / share hash'lenen bundle dışında kalır
+        result_alloc_method, result_alloc_rows = result_allocation_view(allocation_df, allocation_meta)
+        cbam_alloc_meta = {"allocation_method": result_alloc_method, "allocation_hash": None}
+        sp.set(rows=len(production_df) if production_df is not None else 0, method=alloc_method)
 
     # CBAM compute
-    cbam_cfg = (config or {}).get("cbam") or {}
-    cbam_df, cbam_totals = cbam_compute(
-        production_df=production_df,
-        energy_breakdown=energy_out,
-        materials_df=materials_df,
-        eua_price_eur_per_t=price.eua_price_eur_per_t or app_config.get_eu_ets_reference_price_eur_per_t(),
-        reporting_year=int(cbam_cfg.get('reporting_year') or app_config.get_cbam_reporting_year()),
-        carbon_price_paid_eur_per_t=float(cbam_cfg.get('carbon_price_paid_eur_per_t') or (config or {}).get('carbon_price_paid_eur_per_t') or 0.0),
-        allocation_basis=str(cbam_cfg.get("allocation_basis", "quantity") or "quantity"),
-        allocation_by_sku=allocation_by_sku,
-        allocation_meta=allocation_meta,
-        cbam_defaults_df=cbam_defaults_df,
-    )
-    cbam_table = cbam_df.to_dict(orient="records") if cbam_df is not None and len(cbam_df) > 0 else []
+    with span("orchestrator.cbam_compute") as sp:
+        cbam_cfg = (config or {}).get("cbam") or {}
+        cbam_df, cbam_totals = cbam_compute(
+            production_df=production_df,
+            energy_breakdown=energy_out,
+            materials_df=materials_df,
+            eua_price_eur_per_t=price.eua_price_eur_per_t or app_config.get_eu_ets_reference_price_eur_per_t(),
+            reporting_year=int(cbam_cfg.get('reporting_year') or app_config.get_cbam_reporting_year()),
+            carbon_price_paid_eur_per_t=float(cbam_cfg.get('carbon_price_paid_eur_per_t') or (config or {}).get('carbon_price_paid_eur_per_t') or 0.0),
+            allocation_basis=str(cbam_cfg.get("allocation_basis", "quantity") or "quantity"),
+            allocation_by_sku=allocation_by_sku,
+            allocation_meta=cbam_alloc_meta,
+            cbam_defaults_df=cbam_defaults_df,
+            precursor_chain_propagation=precursor_chain_propagation(config),
+        )
+        cbam_table = cbam_df.to_dict(orient="records") if cbam_df is not None and len(cbam_df) > 0 else []
+        sp.set(rows=len(cbam_table))
 
     # 1.1 CBAM XML-ready reporting (results_json.cbam_reporting)
-    cbam_reporting = build_cbam_reporting(
-        period=period,
-        declarant={
-            "company_name": company.get("name", ""),
-            "company_id": company.get("id"),
-            "eori": str((config or {}).get("cbam_eori", "") or ""),
-            "country": str(facility.get("country") or region or ""),
-            "contact_email": str((config or {}).get("contact_email", "") or ""),
-        },
-        installation={
-            "facility_id": facility.get("id"),
-            "facility_name": facility.get("name"),
-            "country": str(facility.get("country") or region or ""),
-            "sector": str(facility.get("sector") or ""),
-        },
-        cbam_table=cbam_table,
-        methodology_note_tr=str((config or {}).get("cbam_methodology_note_tr", "") or ""),
-    )
+    with span("orchestrator.cbam_reporting"):
+        cbam_reporting = build_cbam_reporting(
+            period=period,
+            declarant={
+                "company_name": company.get("name", ""),
+                "company_id": company.get("id"),
+                "eori": str((config or {}).get("cbam_eori", "") or ""),
+                "country": str(facility.get("country") or region or ""),
+                "contact_email": str((config or {}).get("contact_email", "") or ""),
+            },
+            installation={
+                "facility_id": facility.get("id"),
+                "facility_name": facility.get("name"),
+                "country": str(facility.get("country") or region or ""),
+                "sector": str(facility.get("sector") or ""),
+            },
+            cbam_table=cbam_table,
+            methodology_note_tr=str((config or {}).get("cbam_methodology_note_tr", "") or ""),
+        )
 
     totals = {
         "scope1_tco2": float(energy_out.get("direct_tco2", 0.0) or 0.0),
@@ -328,9 +404,9 @@ def run_orchestrator(
             "electricity_rows": list(energy_out.get("electricity_rows", []) or []),
         },
         "allocation": {
-            "allocation_method": allocation_meta.get("allocation_method"),
-            "allocation_hash": allocation_meta.get("allocation_hash"),
-            "rows": allocation_df.to_dict(orient="records") if allocation_df is not None and len(allocation_df) > 0 else [],
+            "allocation_method": result_alloc_method,
+            "allocation_hash": None,  # legacy_results.allocation / deterministic.allocation_hash
+            "rows": result_alloc_rows,
         },
         "cbam": {
             "table": cbam_table,
@@ -368,7 +444,7 @@ def run_orchestrator(
     }
 
     tmp_rb = {
-        "engine_version": ENGINE_VERSION_PACKET_A,
+        "engine_version": engine_version,
         "input_bundle_hash": input_bundle_hash,
         "totals": totals,
         "breakdown": breakdown,
@@ -378,10 +454,11 @@ def run_orchestrator(
         "compliance_checks": [],
         "cost_outputs": cost_outputs,
     }
-    result_hash = sha256_json({"result": tmp_rb})
+    with span("orchestrator.result_hash"):
+        result_hash = sha256_json({"result": tmp_rb})
 
     result_bundle = ResultBundle(
-        engine_version=ENGINE_VERSION_PACKET_A,
+        engine_version=engine_version,
         input_bundle_hash=input_bundle_hash,
         result_hash=result_hash,
         totals=totals,
@@ -402,6 +479,8 @@ def run_orchestrator(
         "cbam_table": cbam_table,
         "cbam": cbam_totals or {},
         "cbam_reporting": cbam_reporting,
+        # akış bazlı toplamlar (ETS raporu, Monte Carlo kaynakları); ham satırlar yok, result_hash dışında
+        "energy": energy_stream_summary(energy_out),
         "allocation": allocation_meta,
         "ets": {
             "net_and_cost": ets_cost,
@@ -409,7 +488,7 @@ def run_orchestrator(
         },
         "input_bundle": input_bundle.to_canonical_dict(),
         "deterministic": {
-            "engine_version": ENGINE_VERSION_PACKET_A,
+            "engine_version": engine_version,
             "input_bundle_hash": input_bundle_hash,
             "result_hash": result_hash,
             "config_hash": config_hash,
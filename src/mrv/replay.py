@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
 
 from src.db.models import CalculationSnapshot
 from src.db.session import db
@@ -16,50 +18,62 @@ def _safe_json_loads(s: str, default):
         return default
 
 
-def replay(snapshot_id: int) -> Dict[str, Any]:
-    """
-    Snapshot Replay (audit-ready):
-
-    - snapshot içinden config + input_hashes + results alınır
-    - dataset uri ile tekrar okunur
-    - orchestrator aynı parametrelerle tekrar çalıştırılır
-    - input_hash/result_hash doğrulanır
-    """
-
+def load_replay_payload(snapshot_id: int) -> Dict[str, Any]:
+    """Replay için snapshot'tan gereken alanlar (results_json'dan yalnızca input_bundle tutulur)."""
     with db() as s:
         snap = s.get(CalculationSnapshot, int(snapshot_id))
         if not snap:
             raise ValueError("Snapshot bulunamadı.")
+        return snapshot_replay_payload(snap)
 
-        config = _safe_json_loads(snap.config_json, {})
-        input_hashes = _safe_json_loads(snap.input_hashes_json, {})
-        results = _safe_json_loads(snap.results_json, {})
 
-    input_bundle = (results or {}).get("input_bundle") or {}
-    activity_snapshot_ref = input_bundle.get("activity_snapshot_ref") or input_hashes or {}
+def snapshot_replay_payload(snap: CalculationSnapshot) -> Dict[str, Any]:
+    config = _safe_json_loads(snap.config_json, {})
+    input_hashes = _safe_json_loads(snap.input_hashes_json, {})
+    results = _safe_json_loads(snap.results_json, {})
 
-    # datasetleri uri üzerinden tekrar oku
-    from src.services.workflow import load_csv_from_uri
+    input_bundle = (results or {}).get("input_bundle") or {}
+    return {
+        "snapshot_id": int(snap.id),
+        "project_id": int(snap.project_id),
+        "engine_version": str(getattr(snap, "engine_version", "") or ""),
+        "methodology_id": int(snap.methodology_id) if snap.methodology_id is not None else None,
+        "config": config or {},
+        "activity_snapshot_ref": input_bundle.get("activity_snapshot_ref") or input_hashes or {},
+        "scenario": (input_bundle.get("scenario") or {}) if isinstance(input_bundle, dict) else {},
+        "input_hash": str(snap.input_hash or ""),
+        "result_hash": str(snap.result_hash or ""),
+    }
 
-    energy_uri = ((activity_snapshot_ref or {}).get("energy") or {}).get("uri") or ""
-    prod_uri = ((activity_snapshot_ref or {}).get("production") or {}).get("uri") or ""
-    mat_uri = ((activity_snapshot_ref or {}).get("materials") or {}).get("uri") or ""
 
+def dataset_uris(payload: Dict[str, Any]) -> Tuple[str, str, str]:
+    """(energy_uri, production_uri, materials_uri); energy/production zorunludur."""
+    ref = payload.get("activity_snapshot_ref") or {}
+    energy_uri = (ref.get("energy") or {}).get("uri") or ""
+    prod_uri = (ref.get("production") or {}).get("uri") or ""
+    mat_uri = (ref.get("materials") or {}).get("uri") or ""
     if not energy_uri or not prod_uri:
         raise ValueError("Replay için gerekli dataset URI'ları eksik (energy/production).")
+    return str(energy_uri), str(prod_uri), str(mat_uri)
 
-    energy_df = load_csv_from_uri(str(energy_uri))
-    prod_df = load_csv_from_uri(str(prod_uri))
-    materials_df = load_csv_from_uri(str(mat_uri)) if mat_uri else None
 
-    methodology_id = int(snap.methodology_id) if snap.methodology_id is not None else None
-    scenario = (input_bundle.get("scenario") or {}) if isinstance(input_bundle, dict) else {}
+def replay_payload(
+    payload: Dict[str, Any],
+    energy_df: pd.DataFrame,
+    prod_df: pd.DataFrame,
+    materials_df: Optional[pd.DataFrame] = None,
+) -> Dict[str, Any]:
+    """Önceden okunmuş dataset'lerle replay (toplu replay dataset'leri snapshot'lar arasında paylaşır)."""
+    config = payload.get("config") or {}
+    scenario = payload.get("scenario") or {}
+    methodology_id = payload.get("methodology_id")
+    activity_snapshot_ref = payload.get("activity_snapshot_ref") or {}
 
     # Replay orchestrator
     input_bundle2, result_bundle2, legacy2 = run_orchestrator(
-        project_id=int(snap.project_id),
-        config=config or {},
-        scenario=scenario or {},
+        project_id=int(payload["project_id"]),
+        config=config,
+        scenario=scenario,
         methodology_id=methodology_id,
         activity_snapshot_ref=activity_snapshot_ref,
         energy_df=energy_df,
@@ -74,24 +88,26 @@ def replay(snapshot_id: int) -> Dict[str, Any]:
     # Replay must use the same canonical engine version instead of relying on an optional
     # legacy_results top-level field, which may be absent in older/newer payloads.
     candidate_input_hash = compute_input_hash(
-        engine_version=str(getattr(snap, "engine_version", "") or ""),
-        config=config or {},
-        input_hashes=activity_snapshot_ref or {},
-        scenario=scenario or {},
+        engine_version=str(payload.get("engine_version") or ""),
+        config=config,
+        input_hashes=activity_snapshot_ref,
+        scenario=scenario,
         methodology_id=methodology_id,
         factor_set_ref=factor_set_ref,
         monitoring_plan_ref=monitoring_plan_ref,
     )
 
-    input_hash_match = str(candidate_input_hash) == str(snap.input_hash or "")
-    result_hash_match = str(result_bundle2.result_hash or "") == str(snap.result_hash or "")
+    expected_input = str(payload.get("input_hash") or "")
+    expected_result = str(payload.get("result_hash") or "")
+    input_hash_match = str(candidate_input_hash) == expected_input
+    result_hash_match = str(result_bundle2.result_hash or "") == expected_result
 
     return {
-        "snapshot_id": int(snapshot_id),
-        "input_hash_expected": str(snap.input_hash or ""),
+        "snapshot_id": int(payload["snapshot_id"]),
+        "input_hash_expected": expected_input,
         "input_hash_recomputed": str(candidate_input_hash),
         "input_hash_match": bool(input_hash_match),
-        "result_hash_expected": str(snap.result_hash or ""),
+        "result_hash_expected": expected_result,
         "result_hash_recomputed": str(result_bundle2.result_hash or ""),
         "result_hash_match": bool(result_hash_match),
         "preview": {
@@ -100,3 +116,27 @@ def replay(snapshot_id: int) -> Dict[str, Any]:
             "indirect_tco2": ((legacy2.get("energy") or {}).get("indirect_tco2")),
         },
     }
+
+
+def replay(snapshot_id: int) -> Dict[str, Any]:
+    """
+    Snapshot Replay (audit-ready):
+
+    - snapshot içinden config + input_hashes + results alınır
+    - dataset uri ile tekrar okunur
+    - orchestrator aynı parametrelerle tekrar çalıştırılır
+    - input_hash/result_hash doğrulanır
+
+    Çok sayıda snapshot için: src.mrv.bulk_replay.bulk_replay
+    """
+    payload = load_replay_payload(snapshot_id)
+
+    # datasetleri uri üzerinden tekrar oku
+    from src.services.workflow import load_csv_from_uri
+
+    energy_uri, prod_uri, mat_uri = dataset_uris(payload)
+    energy_df = load_csv_from_uri(energy_uri)
+    prod_df = load_csv_from_uri(prod_uri)
+    materials_df = load_csv_from_uri(mat_uri) if mat_uri else None
+
+    return replay_payload(payload, energy_df, prod_df, materials_df)
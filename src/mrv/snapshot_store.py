@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timezone
 from typing import Any, Dict
 
 from sqlalchemy import select
@@ -9,6 +8,7 @@ from sqlalchemy import select
 from src.db.session import db
 from src.db.models import CalculationSnapshot
 from src.mrv.lineage import sha256_json
+from src.services.snapshots import lock_snapshot
 
 
 def _safe_load(s: str | None, default):
@@ -96,14 +96,10 @@ def save_snapshot(
         s.commit()
         s.refresh(snap)
 
-        if lock_after_create:
-            snap.locked = True
-            snap.locked_at = datetime.now(timezone.utc)
-            snap.locked_by_user_id = int(created_by_user_id) if created_by_user_id is not None else None
-            s.commit()
-            s.refresh(snap)
-
-        return snap
+    if lock_after_create:
+        # kilit tek yoldan: must-persist "snapshot_locked" audit kaydı lock_snapshot'ta yazılır
+        return lock_snapshot(int(snap.id), created_by_user_id)
+    return snap
 
 
 def get_snapshot(snapshot_id: int) -> CalculationSnapshot | None:
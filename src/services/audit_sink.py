@@ -0,0 +1,268 @@
+"""
+Tamponlu (batched) audit yazıcısı.
+
+append_audit / log_access olay başına session açıp commit ediyordu (istek yolunda olay başına fsync).
+AuditSink olayları süreç içinde kuyruğa alır; arka plan thread'i boyut (AUDIT_BATCH_SIZE) veya süre
+(AUDIT_FLUSH_INTERVAL_S) eşiğinde tek transaction'da toplu INSERT (executemany) yapar.
+
+Garantiler:
+- must_persist=True: çağıran thread'de senkron yazılır (öncesindeki kuyruk önce boşaltılır, sıra korunur).
+  Kilitleme gibi kritik olaylar için.
+- Kuyruk doluysa olay düşürülmez; çağıran thread'de senkron yazılır (backpressure).
+- Yazılamayan olaylar fsync'li JSONL spool dosyasına (AUDIT_SPOOL_DIR) düşer ve log_event ile raporlanır;
+  replay_spool() ile DB'ye tekrar aktarılabilir.
+- Süreç kapanırken (atexit) kuyruk boşaltılır.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from src.db.session import db
+from src.services.observability import log_event
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "1.0"))
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "50000"))
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", "./storage/audit_spool")
+
+
+def _async_enabled() -> bool:
+    v = os.getenv("AUDIT_ASYNC")
+    if v is not None:
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    # test modunda (init_db tabloları temizler) varsayılan senkron
+    return os.getenv("CME_TEST_MODE") != "1"
+
+
+Item = Tuple[Any, Dict[str, Any]]  # (model sınıfı, kolon değerleri)
+
+
+def _json_default(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, datetime) else str(v)
+
+
+class AuditSink:
+    def __init__(
+        self,
+        *,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval_s: float = AUDIT_FLUSH_INTERVAL_S,
+        max_queue: int = AUDIT_QUEUE_MAX,
+        spool_dir: str = AUDIT_SPOOL_DIR,
+        asynchronous: Optional[bool] = None,
+    ) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = max(0.01, float(flush_interval_s))
+        self.max_queue = max(1, int(max_queue))
+        self.spool_dir = Path(spool_dir)
+        self.asynchronous = _async_enabled() if asynchronous is None else bool(asynchronous)
+
+        self._q: Deque[Item] = deque()
+        self._cv = threading.Condition()
+        self._write_lock = threading.Lock()  # batch yazımları ve senkron yazımlar sıralı
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._stopping = False
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "sync_writes": 0, "spooled": 0}
+
+    # -------- public --------
+    def submit(self, model: Any, values: Dict[str, Any], *, must_persist: bool = False) -> bool:
+        """Olayı kaydeder. True: DB'ye yazıldı veya kuyrukta; False: spool'a düştü."""
+        # olay zamanı kuyruğa alındığı an (flush zamanı değil)
+        ts_col = "at" if "at" in model.__table__.c else ("created_at" if "created_at" in model.__table__.c else None)
+        if ts_col and values.get(ts_col) is None:
+            values = {**values, ts_col: datetime.now(timezone.utc)}
+
+        if must_persist or not self.asynchronous or self._stopping:
+            return self._write_sync([(model, values)])
+
+        with self._cv:
+            if len(self._q) >= self.max_queue:
+                full = True
+            else:
+                full = False
+                self._q.append((model, values))
+                self.stats["enqueued"] += 1
+                if len(self._q) >= self.batch_size:
+                    self._cv.notify()
+        if full:
+            log_event("audit_sink_backpressure", queue=len(self._q))
+            return self._write_sync([(model, values)])
+        self._ensure_thread()
+        return True
+
+    def flush(self) -> None:
+        """Kuyruktaki tüm olayları çağıran thread'de yazar."""
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._q)
+
+    def shutdown(self) -> None:
+        self._stopping = True
+        with self._cv:
+            self._cv.notify_all()
+        t = self._thread
+        if t is not None and t.is_alive() and t is not threading.current_thread():
+            t.join(timeout=max(5.0, self.flush_interval_s * 2))
+        self.flush()
+
+    def replay_spool(self) -> int:
+        """Spool dosyalarındaki olayları DB'ye tekrar yazar; başarılı dosyalar silinir."""
+        from src.db.models import AuditEvent
+        from src.db.production_step1_models import AccessAuditLog
+
+        models = {AuditEvent.__tablename__: AuditEvent, AccessAuditLog.__tablename__: AccessAuditLog}
+        n = 0
+        for fp in sorted(self.spool_dir.glob("audit_spool_*.jsonl")):
+            items: List[Item] = []
+            for line in fp.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                model = models.get(rec.get("table"))
+                if model is None:
+                    continue
+                vals = dict(rec.get("values") or {})
+                for k, v in list(vals.items()):
+                    col = model.__table__.c.get(k)
+                    if col is not None and isinstance(v, str) and col.type.__class__.__name__ == "DateTime":
+                        try:
+                            vals[k] = datetime.fromisoformat(v)
+                        except Exception:
+                            pass
+                items.append((model, vals))
+            try:
+                self._insert(items)
+            except Exception as e:
+                log_event("audit_sink_replay_failed", file=str(fp), error=str(e)[:300])
+                continue
+            fp.unlink()
+            n += len(items)
+        return n
+
+    # -------- internals --------
+    def _ensure_thread(self) -> None:
+        # fork sonrası child'da thread yoktur: yeniden başlat
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cv:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                if len(self._q) < self.batch_size and not self._stopping:
+                    self._cv.wait(self.flush_interval_s)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _take(self, n: int) -> List[Item]:
+        with self._cv:
+            k = min(n, len(self._q))
+            return [self._q.popleft() for _ in range(k)]
+
+    def _insert(self, items: List[Item]) -> None:
+        # executemany kolon seti aynı satırları ister; eksik anahtarı None ile doldurmak kolon
+        # default'unu ezer (explicit NULL) -> satırlar (model, kolon seti) bazında gruplanır
+        groups: Dict[Tuple[Any, Tuple[str, ...]], List[Dict[str, Any]]] = {}
+        for model, vals in items:
+            groups.setdefault((model, tuple(sorted(vals))), []).append(vals)
+        with db() as s:
+            for (model, _cols), rows in groups.items():
+                s.execute(insert(model), rows)
+            s.commit()
+
+    def _write_batch(self, items: List[Item]) -> None:
+        with self._write_lock:
+            try:
+                self._insert(items)
+                self.stats["written"] += len(items)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                log_event("audit_sink_batch_failed", size=len(items), error=str(e)[:300])
+            # batch başarısız: tek tek dene, yine olmayanı spool'a yaz
+            for it in items:
+                try:
+                    self._insert([it])
+                    self.stats["written"] += 1
+                except Exception as e:
+                    self._spool([it], e)
+
+    def _write_sync(self, items: List[Item]) -> bool:
+        self.flush()  # sıra: önce kuyruktakiler
+        with self._write_lock:
+            try:
+                self._insert(items)
+                self.stats["written"] += len(items)
+                self.stats["sync_writes"] += 1
+                return True
+            except Exception as e:
+                self._spool(items, e)
+                return False
+
+    def _spool(self, items: List[Item], err: Exception) -> None:
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            fp = self.spool_dir / f"audit_spool_{os.getpid()}.jsonl"
+            with open(fp, "a", encoding="utf-8") as f:
+                for model, vals in items:
+                    f.write(json.dumps({"table": model.__tablename__, "values": vals}, ensure_ascii=False, default=_json_default) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats["spooled"] += len(items)
+            log_event("audit_sink_spooled", count=len(items), file=str(fp), error=str(err)[:300])
+        except Exception as e2:
+            # son çare: olay log akışına yazılır (sessizce kaybolmaz)
+            for model, vals in items:
+                log_event("audit_sink_lost", table=model.__tablename__, values=json.dumps(vals, ensure_ascii=False, default=_json_default), error=str(e2)[:300])
+
+
+_sink: Optional[AuditSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> AuditSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = AuditSink()
+    return _sink
+
+
+def set_audit_sink(sink: Optional[AuditSink]) -> None:
+    """Testler / özel konfigürasyon için global sink'i değiştirir (eskisi boşaltılır)."""
+    global _sink
+    with _sink_lock:
+        old, _sink = _sink, sink
+    if old is not None and old is not sink:
+        old.shutdown()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    if _sink is not None:
+        _sink.shutdown()
@@ -1,30 +1,487 @@
+"""Tiered cache: process içi LRU (L1) + opsiyonel kalıcı katman (L2).
+
+L1: boyut (byte) bazlı LRU, TTL destekli, thread-safe.
+L2: CME_CACHE_BACKEND ile seçilir
+  - "db"     : CacheEntry tablosu (default; eski davranış, süreçler arası paylaşım)
+  - "disk"   : CME_CACHE_DIR altında JSON dosyaları
+  - "memory" : L2 yok (sadece L1)
+
+Değerler L1'de de JSON string olarak tutulur: okuyan taraf her seferinde yeni bir
+obje alır (eski DB davranışıyla aynı), boyut hesabı da string uzunluğundan yapılır.
+
+Eski API korunur: cache_get(key), cache_set(key, value, ttl_seconds=300). Anahtarlar her zaman
+namespace önekiyle saklanır (default namespace dahil); önceki sürümün öneksiz L2 kayıtları
+okunmaz, TTL dolunca purge_expired ile temizlenir.
+"""
+
 from __future__ import annotations
+
+import hashlib
 import json
-from datetime import datetime, timezone, timedelta
-from sqlalchemy import select
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
 from src.db.session import db
-from src.db.production_step2_models import CacheEntry
-
-def cache_get(key:str):
-    now=datetime.now(timezone.utc)
-    with db() as s:
-        c=s.execute(select(CacheEntry).where(CacheEntry.key==str(key))).scalars().first()
-        if not c: return None
-        if c.expires_at and now > c.expires_at:
-            s.delete(c); s.commit()
-            return None
+
+DEFAULT_NAMESPACE = "default"
+# Kaçırılmış namespace'lerde '%' yalnız "%25" / "%3A" olarak geçer; "%default:" hiçbir
+# kullanıcı namespace'inden üretilemez -> cache_set("a:k") ile cache_set("k", namespace="a") çakışmaz.
+_DEFAULT_PREFIX = "%default:"
+
+
+def _ns_prefix(namespace: Optional[str]) -> str:
+    # ':' ayırıcıdır; namespace içindeki ':' / '%' kaçırılır ("a" ile "a:b" çakışmaz)
+    ns = str(namespace or DEFAULT_NAMESPACE)
+    if ns == DEFAULT_NAMESPACE:
+        return _DEFAULT_PREFIX
+    return ns.replace("%", "%25").replace(":", "%3A") + ":"
+
+
+def _full_key(key: str, namespace: Optional[str]) -> str:
+    return f"{_ns_prefix(namespace)}{key}"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _loads(raw: Optional[str]) -> Any:
+    try:
+        return json.loads(raw or "{}")
+    except Exception:
+        return None
+
+
+# ----------------------------
+# L1: memory LRU
+# ----------------------------
+class MemoryLRU:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 50_000):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries)
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            raw, exp = item
+            if exp and now > exp:
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return raw
+
+    def set(self, key: str, raw: str, ttl_seconds: Optional[float]) -> None:
+        size = len(raw)
+        if size > self.max_bytes:
+            return
+        exp = (time.monotonic() + float(ttl_seconds)) if ttl_seconds else 0.0
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (raw, exp)
+            self._bytes += size
+            while self._data and (self._bytes > self.max_bytes or len(self._data) > self.max_entries):
+                old_key = next(iter(self._data))
+                self._pop(old_key)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self, prefix: Optional[str] = None) -> None:
+        with self._lock:
+            if prefix is None:
+                self._data.clear()
+                self._bytes = 0
+                return
+            for k in [k for k in self._data if k.startswith(prefix)]:
+                self._pop(k)
+
+    def _pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[0])
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ----------------------------
+# L2 stores
+# ----------------------------
+class DBCacheStore:
+    """CacheEntry tablosu. Süresi dolmuş kayıt okuma yolunda silinmez (purge_expired ile toplu temizlik)."""
+
+    def _model(self):
+        from src.db.production_step2_models import CacheEntry
+
+        return CacheEntry
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        if not keys:
+            return {}
+        CacheEntry = self._model()
+        now = datetime.now(timezone.utc)
+        out: Dict[str, Tuple[str, Optional[float]]] = {}
+        with db() as s:
+            rows = s.execute(select(CacheEntry.key, CacheEntry.value_json, CacheEntry.expires_at).where(CacheEntry.key.in_(keys))).all()
+        for key, raw, exp in rows:
+            remaining = None
+            if exp is not None:
+                if exp.tzinfo is None:
+                    exp = exp.replace(tzinfo=timezone.utc)
+                remaining = (exp - now).total_seconds()
+                if remaining <= 0:
+                    continue
+            out[str(key)] = (raw or "{}", remaining)
+        return out
+
+    def set_many(self, items: Dict[str, str], ttl_seconds: Optional[float]) -> None:
+        if not items:
+            return
+        CacheEntry = self._model()
+        exp = (datetime.now(timezone.utc) + timedelta(seconds=float(ttl_seconds))) if ttl_seconds else None
+        with db() as s:
+            existing = {
+                c.key: c for c in s.execute(select(CacheEntry).where(CacheEntry.key.in_(list(items.keys())))).scalars().all()
+            }
+            for key, raw in items.items():
+                c = existing.get(key)
+                if c is None:
+                    s.add(CacheEntry(key=key, value_json=raw, expires_at=exp))
+                else:
+                    c.value_json = raw
+                    c.expires_at = exp
+            s.commit()
+
+    def delete(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        CacheEntry = self._model()
+        with db() as s:
+            s.execute(delete(CacheEntry).where(CacheEntry.key.in_(keys)))
+            s.commit()
+
+    def clear(self, prefix: Optional[str] = None) -> None:
+        CacheEntry = self._model()
+        with db() as s:
+            q = delete(CacheEntry)
+            if prefix is not None:
+                # LIKE joker karakterleri (_ %) prefix içinde kaçırılır
+                q = q.where(CacheEntry.key.startswith(prefix, autoescape=True))
+            s.execute(q)
+            s.commit()
+
+    def purge_expired(self) -> int:
+        CacheEntry = self._model()
+        with db() as s:
+            res = s.execute(delete(CacheEntry).where(CacheEntry.expires_at.is_not(None), CacheEntry.expires_at < datetime.now(timezone.utc)))
+            s.commit()
+            return int(res.rowcount or 0)
+
+
+class DiskCacheStore:
+    def __init__(self, base_dir: str = "./storage/cache"):
+        self.base = Path(base_dir)
+        self.base.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        h = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.base / h[:2] / f"{h}.json"
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        now = time.time()
+        out: Dict[str, Tuple[str, Optional[float]]] = {}
+        for key in keys:
+            p = self._path(key)
+            try:
+                env = json.loads(p.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            exp = env.get("expires_at")
+            remaining = None
+            if exp:
+                remaining = float(exp) - now
+                if remaining <= 0:
+                    continue
+            out[key] = (str(env.get("value_json") or "{}"), remaining)
+        return out
+
+    def set_many(self, items: Dict[str, str], ttl_seconds: Optional[float]) -> None:
+        exp = (time.time() + float(ttl_seconds)) if ttl_seconds else None
+        for key, raw in items.items():
+            p = self._path(key)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"key": key, "value_json": raw, "expires_at": exp}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, p)
+
+    def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def clear(self, prefix: Optional[str] = None) -> None:
+        for p in self.base.glob("*/*.json"):
+            try:
+                if prefix is not None:
+                    env = json.loads(p.read_text(encoding="utf-8"))
+                    if not str(env.get("key", "")).startswith(prefix):
+                        continue
+                p.unlink()
+            except Exception:
+                continue
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        n = 0
+        for p in self.base.glob("*/*.json"):
+            try:
+                exp = json.loads(p.read_text(encoding="utf-8")).get("expires_at")
+                if exp and float(exp) < now:
+                    p.unlink()
+                    n += 1
+            except Exception:
+                continue
+        return n
+
+
+# ----------------------------
+# Tiered cache
+# ----------------------------
+class _Flight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TieredCache:
+    def __init__(self, l1: Optional[MemoryLRU] = None, l2: Any = None):
+        self.l1 = l1 or MemoryLRU()
+        self.l2 = l2
+        self._stats_lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self.reset_stats()
+
+    # --- metrics ---
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "sets": 0, "singleflight_waits": 0, "l2_errors": 0}
+
+    def _bump(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] = self._stats.get(name, 0) + n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            st = dict(self._stats)
+        lookups = st["l1_hits"] + st["l2_hits"] + st["misses"]
+        st["lookups"] = lookups
+        st["hit_rate"] = round((st["l1_hits"] + st["l2_hits"]) / lookups, 4) if lookups else 0.0
+        st["l1_entries"] = len(self.l1)
+        st["l1_bytes"] = self.l1.size_bytes
+        st["l1_evictions"] = self.l1.evictions
+        st["l2_backend"] = type(self.l2).__name__ if self.l2 is not None else "none"
+        return st
+
+    # --- core ---
+    def get_many(self, keys: Iterable[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Bulunan anahtarlar -> değer. Bulunamayanlar sonuçta yer almaz."""
+        keys = [str(k) for k in keys]
+        out: Dict[str, Any] = {}
+        pending: Dict[str, str] = {}
+        for k in keys:
+            fk = _full_key(k, namespace)
+            raw = self.l1.get(fk)
+            if raw is not None:
+                out[k] = _loads(raw)
+                self._bump("l1_hits")
+            else:
+                pending[fk] = k
+
+        if pending and self.l2 is not None:
+            try:
+                found = self.l2.get_many(list(pending.keys()))
+            except Exception:
+                found = {}
+                self._bump("l2_errors")
+            for fk, (raw, remaining) in found.items():
+                self.l1.set(fk, raw, remaining)
+                out[pending.pop(fk)] = _loads(raw)
+                self._bump("l2_hits")
+
+        if pending:
+            self._bump("misses", len(pending))
+        return out
+
+    def get(self, key: str, namespace: Optional[str] = None, default: Any = None) -> Any:
+        return self.get_many([key], namespace=namespace).get(str(key), default)
+
+    def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[float] = 300, namespace: Optional[str] = None) -> None:
+        encoded = {_full_key(str(k), namespace): _dumps(v) for k, v in items.items()}
+        for fk, raw in encoded.items():
+            self.l1.set(fk, raw, ttl_seconds)
+        self._bump("sets", len(encoded))
+        if self.l2 is not None and encoded:
+            try:
+                self.l2.set_many(encoded, ttl_seconds)
+            except Exception:
+                self._bump("l2_errors")
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = 300, namespace: Optional[str] = None) -> None:
+        self.set_many({key: value}, ttl_seconds=ttl_seconds, namespace=namespace)
+
+    def delete(self, keys: Iterable[str], namespace: Optional[str] = None) -> None:
+        fks = [_full_key(str(k), namespace) for k in keys]
+        for fk in fks:
+            self.l1.delete(fk)
+        if self.l2 is not None and fks:
+            try:
+                self.l2.delete(fks)
+            except Exception:
+                self._bump("l2_errors")
+
+    def clear_namespace(self, namespace: str) -> None:
+        prefix = _ns_prefix(namespace)
+        self.l1.clear(prefix)
+        if self.l2 is not None:
+            try:
+                self.l2.clear(prefix)
+            except Exception:
+                self._bump("l2_errors")
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: Optional[float] = 300,
+        namespace: Optional[str] = None,
+    ) -> Any:
+        """Cache'te yoksa loader'ı çağırır. Aynı anahtar için eşzamanlı isteklerde loader tek sefer çalışır (single-flight)."""
+        hit = self.get_many([key], namespace=namespace)
+        if str(key) in hit:
+            return hit[str(key)]
+
+        fk = _full_key(str(key), namespace)
+        with self._flights_lock:
+            flight = self._flights.get(fk)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[fk] = flight
+
+        if not leader:
+            self._bump("singleflight_waits")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _loads(_dumps(flight.value))
+
         try:
-            return json.loads(c.value_json or "{}")
-        except Exception:
-            return None
-
-def cache_set(key:str, value:dict, ttl_seconds:int=300):
-    exp = datetime.now(timezone.utc) + timedelta(seconds=int(ttl_seconds))
-    with db() as s:
-        c=s.execute(select(CacheEntry).where(CacheEntry.key==str(key))).scalars().first()
-        if not c:
-            c=CacheEntry(key=str(key), value_json=json.dumps(value, ensure_ascii=False), expires_at=exp)
-            s.add(c); s.commit(); return
-        c.value_json=json.dumps(value, ensure_ascii=False)
-        c.expires_at=exp
-        s.commit()
+            value = loader()
+            self.set(key, value, ttl_seconds=ttl_seconds, namespace=namespace)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(fk, None)
+            flight.event.set()
+
+    def purge_expired(self) -> int:
+        if self.l2 is None or not hasattr(self.l2, "purge_expired"):
+            return 0
+        return int(self.l2.purge_expired())
+
+
+def _build_default_cache() -> TieredCache:
+    backend = (os.getenv("CME_CACHE_BACKEND") or "db").strip().lower()
+    max_mb = float(os.getenv("CME_CACHE_MAX_MB", "64") or 64)
+    l1 = MemoryLRU(max_bytes=int(max_mb * 1024 * 1024))
+    if backend == "memory":
+        return TieredCache(l1=l1, l2=None)
+    if backend == "disk":
+        return TieredCache(l1=l1, l2=DiskCacheStore(os.getenv("CME_CACHE_DIR", "./storage/cache")))
+    return TieredCache(l1=l1, l2=DBCacheStore())
+
+
+_cache: Optional[TieredCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _build_default_cache()
+    return _cache
+
+
+def set_cache(cache: Optional[TieredCache]) -> None:
+    """Process cache'ini değiştirir (testler / özel konfigürasyon). None -> env'den yeniden kurulur."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+# ----------------------------
+# Public function API (geriye uyumlu)
+# ----------------------------
+def cache_get(key: str, namespace: Optional[str] = None):
+    return get_cache().get(key, namespace=namespace)
+
+
+def cache_set(key: str, value: dict, ttl_seconds: int = 300, namespace: Optional[str] = None):
+    get_cache().set(key, value, ttl_seconds=ttl_seconds, namespace=namespace)
+
+
+def cache_get_many(keys: Iterable[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+    return get_cache().get_many(keys, namespace=namespace)
+
+
+def cache_set_many(items: Dict[str, Any], ttl_seconds: int = 300, namespace: Optional[str] = None) -> None:
+    get_cache().set_many(items, ttl_seconds=ttl_seconds, namespace=namespace)
+
+
+def cache_get_or_set(key: str, loader: Callable[[], Any], ttl_seconds: int = 300, namespace: Optional[str] = None):
+    return get_cache().get_or_set(key, loader, ttl_seconds=ttl_seconds, namespace=namespace)
+
+
+def cache_delete(key: str, namespace: Optional[str] = None) -> None:
+    get_cache().delete([key], namespace=namespace)
+
+
+def cache_clear_namespace(namespace: str) -> None:
+    get_cache().clear_namespace(namespace)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return get_cache().stats()
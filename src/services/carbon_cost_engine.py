@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, Tuple
 
 from src.services.cbam_liability import compute_cbam_liability
@@ -134,9 +134,10 @@ class CarbonCostReport:
     cbam: Dict[str, Any]
     totals: Dict[str, Any]
     assumptions: Dict[str, Any]
+    risk: Dict[str, Any] = field(default_factory=dict)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        out = {
             "schema": self.schema,
             "snapshot_id": self.snapshot_id,
             "project_id": self.project_id,
@@ -146,6 +147,57 @@ class CarbonCostReport:
             "totals": self.totals,
             "assumptions": self.assumptions,
         }
+        if self.risk:
+            out["risk"] = self.risk
+        return out
+
+
+def _monte_carlo_risk(
+    res: Dict[str, Any],
+    cfg: Dict[str, Any],
+    *,
+    year: int | None,
+    eua: float,
+    fx: float,
+    paid: float,
+    embedded: float,
+    ets_cost: Dict[str, Any],
+) -> Dict[str, Any]:
+    """config.uncertainty.monte_carlo açıksa ETS + CBAM maliyet dağılımı (percentile / VaR)."""
+    ucfg = _safe_dict(cfg.get("uncertainty"))
+    mc = ucfg.get("monte_carlo")
+    if not mc:
+        return {}
+    mc = mc if isinstance(mc, dict) else {}
+
+    from src.engine.monte_carlo import CostModel, MarketModel, simulate, sources_from_results
+
+    sources = sources_from_results(res, ucfg)
+    if not sources:
+        return {}
+    total = sum(s.base_tco2 for s in sources)
+    ets_block = _safe_dict(ets_cost) or _safe_dict(_safe_dict(res.get("ets")).get("net_and_cost"))
+    free = _to_float(ets_block.get("free_alloc_tco2"), 0.0) + _to_float(ets_block.get("banked_tco2"), 0.0)
+
+    out = simulate(
+        sources,
+        MarketModel(
+            eua_price_eur_per_t=float(eua),
+            fx_try_per_eur=float(fx) if fx > 0 else 1.0,
+            eua_volatility=_to_float(mc.get("eua_volatility"), 0.35),
+            fx_volatility=_to_float(mc.get("fx_volatility"), 0.20),
+            eua_fx_correlation=_to_float(mc.get("eua_fx_correlation"), 0.0),
+        ),
+        CostModel(
+            reporting_year=int(year or 0),
+            free_allocation_tco2=free,
+            carbon_price_paid_eur_per_t=float(paid),
+            embedded_to_total_ratio=(float(embedded) / total) if total > 0 else 0.0,
+        ),
+        n_draws=_to_int(mc.get("n_draws"), 100_000) or 100_000,
+        seed=_to_int(mc.get("seed"), 12345),
+    )
+    return out
 
 
 def compute_carbon_cost_report(
@@ -231,6 +283,7 @@ def compute_carbon_cost_report(
         cbam=cbam_out,
         totals={"total_cost_eur": totals_eur, "total_cost_tl": totals_tl},
         assumptions=assumptions,
+        risk=_monte_carlo_risk(res, cfg, year=year, eua=eua, fx=fx, paid=paid, embedded=embedded, ets_cost=ets_cost),
     )
 
 
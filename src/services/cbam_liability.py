@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict
 
+import numpy as np
+
 # EU ETS free allocation phase-out alignment for CBAM certificates (CBAM factor = remaining free allocation share)
 _CBAM_FACTOR = {
     2026: 0.975,
@@ -98,3 +100,28 @@ def compute_cbam_liability(
         certificates_required=certs,
         estimated_payable_amount_eur=amount,
     )
+
+
+def cbam_certificates_and_amount(
+    *,
+    year: int,
+    embedded_emissions_tco2: np.ndarray | float,
+    eu_ets_price_eur_per_t: np.ndarray | float,
+    carbon_price_paid_eur_per_t: float = 0.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """compute_cbam_liability ile aynı formülün dizi (NumPy) versiyonu.
+
+    Senaryo sweep / Monte Carlo gibi çok sayıda değerlendirme için.
+    Dönen: (certificates_required, estimated_payable_amount_eur)
+    """
+    ee = np.clip(np.asarray(embedded_emissions_tco2, dtype=float), 0.0, None)
+    price = np.clip(np.asarray(eu_ets_price_eur_per_t, dtype=float), 0.0, None)
+    paid = max(0.0, float(carbon_price_paid_eur_per_t or 0.0))
+
+    ee, price = np.broadcast_arrays(ee, price)
+    ratio = np.zeros(price.shape)
+    np.divide(paid, price, out=ratio, where=price > 0.0)
+    ratio = np.minimum(1.0, ratio)
+
+    certs = np.clip(ee * cbam_payable_share(int(year)) * (1.0 - ratio), 0.0, None)
+    return certs, certs * price
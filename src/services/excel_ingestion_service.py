@@ -11,23 +11,36 @@ Amaç:
 Not:
 - Core pipeline CSV ingest ile zaten çalışıyor (src/ui/consultant.py).
 - Burada Excel'i CSV'ye çevirip aynı formatı üretiriz; engine değişmeden çalışır.
+- Excel streaming okunur (src/connectors/excel_stream.py). EXCEL_ASYNC_MIN_BYTES üstündeki dosyalar
+  submit_excel_import ile "excel_import" job'u olarak worker'da işlenir; ilerleme job_status ile izlenir.
 """
 
 from __future__ import annotations
 
 import io
 import json
+import os
+from pathlib import Path
 from typing import Any, Dict, Tuple
 
 import pandas as pd
 
 from src.connectors.excel_connector import load_excel, normalize_headers, compute_dataset_hash
-from src.db.models import DatasetUpload
+from src.db.models import DatasetUpload, Project
 from src.db.session import db
+from src.mrv.audit import append_audit
 from src.mrv.lineage import sha256_bytes
-from src.services.ingestion import data_quality_assess, validate_csv
+from src.services.ingestion import data_quality_assess, read_xlsx_sheets, validate_csv
+from src.services.job_queue import enqueue, report_progress
 from src.services.storage import UPLOAD_DIR, write_bytes
 
+EXCEL_IMPORT_JOB_KIND = "excel_import"
+EXCEL_ASYNC_MIN_BYTES = int(os.getenv("EXCEL_ASYNC_MIN_BYTES", str(5 * 1024 * 1024)))
+
+# Çok sheet'li MRV template (energy, production, materials, cbam_defaults)
+MRV_TEMPLATE = "mrv_template"
+MRV_TEMPLATE_REQUIRED = ("energy", "production")
+
 
 def _safe_name(name: str) -> str:
     name = (name or "").strip().replace(" ", "_")
@@ -101,10 +114,11 @@ def ingest_excel_to_datasetupload(
     xlsx_bytes: bytes,
     original_filename: str,
     uploaded_by_user_id: int | None = None,
+    progress=None,
 ) -> Dict[str, Any]:
-    # Read + schema validate + deterministic hash
+    # Read (streaming) + schema validate + deterministic hash
     bio = io.BytesIO(xlsx_bytes)
-    result = load_excel(bio, dataset_type)
+    result = load_excel(bio, dataset_type, progress=progress)
     df = result["dataframe"]
     df = _map_to_core_csv(dataset_type, df)
 
@@ -165,3 +179,139 @@ def ingest_excel_to_datasetupload(
         "data_quality_report": dq_report,
         "rows": int(len(df)),
     }
+
+
+def ingest_sheet_dataframe(
+    *,
+    project_id: int,
+    dataset_type: str,
+    df: pd.DataFrame,
+    original_filename: str,
+    uploaded_by_user_id: int | None = None,
+) -> Dict[str, Any]:
+    """MRV template sheet'ini CSV yüklemesiyle aynı adımlarla kaydeder (consultant CSV upload akışı)."""
+    dtype = (dataset_type or "").strip().lower()
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+    df = pd.read_csv(io.BytesIO(csv_bytes))
+    errs = validate_csv(dtype, df)
+    if errs:
+        return {"dataset_type": dtype, "validated": False, "core_validation_errors": errs, "rows": int(len(df))}
+
+    score, report = data_quality_assess(dtype, df)
+    storage_uri, sha = _save_upload_dedup(project_id=int(project_id), dataset_type=dtype, file_name=f"{dtype}.csv", file_bytes=csv_bytes)
+
+    with db() as s:
+        du = DatasetUpload(
+            project_id=int(project_id),
+            dataset_type=dtype,
+            original_filename=f"{dtype}.csv",
+            storage_uri=str(storage_uri),
+            sha256=str(sha),
+            schema_version="v1",
+            data_quality_score=float(score),
+            data_quality_report_json=json.dumps(report, ensure_ascii=False),
+            meta_json=json.dumps({"source": "excel", "xlsx_filename": original_filename, "converted_to": "csv"}, ensure_ascii=False),
+        )
+        s.add(du)
+        s.commit()
+        s.refresh(du)
+        p = s.get(Project, int(project_id))
+        company_id = int(p.company_id) if p is not None and p.company_id is not None else None
+
+    append_audit(
+        "dataset_uploaded",
+        {"project_id": int(project_id), "dataset_type": dtype, "sha256": str(sha), "dq_score": int(score)},
+        user_id=uploaded_by_user_id,
+        company_id=company_id,
+        entity_type="dataset_upload",
+        entity_id=int(du.id),
+    )
+    return {
+        "dataset_upload_id": int(du.id),
+        "dataset_type": dtype,
+        "sha256": str(sha),
+        "validated": True,
+        "data_quality_score": int(score),
+        "rows": int(len(df)),
+    }
+
+
+def submit_excel_import(
+    *,
+    project_id: int,
+    dataset_type: str,
+    xlsx_bytes: bytes,
+    original_filename: str,
+    uploaded_by_user_id: int | None = None,
+    run_async: bool | None = None,
+) -> Dict[str, Any]:
+    """Excel import'unu boyuta göre senkron çalıştırır veya worker job'u olarak kuyruğa alır.
+
+    dataset_type: SCHEMAS'taki tek dataset türü veya MRV_TEMPLATE (çok sheet).
+    Dönüş: {"mode": "sync", "result": ...} | {"mode": "job", "job_id": ...}
+    """
+    use_job = len(xlsx_bytes) >= EXCEL_ASYNC_MIN_BYTES if run_async is None else bool(run_async)
+    payload = {
+        "project_id": int(project_id),
+        "dataset_type": str(dataset_type),
+        "original_filename": str(original_filename),
+        "uploaded_by_user_id": uploaded_by_user_id,
+    }
+    if not use_job:
+        return {"mode": "sync", "result": _run_excel_import(payload, xlsx_bytes)}
+
+    # dosya job payload'una gömülmez; storage'a yazılıp yolu verilir
+    sha = sha256_bytes(xlsx_bytes)
+    fp = UPLOAD_DIR / f"project_{int(project_id)}" / "_pending" / f"{sha[:16]}_{_safe_name(original_filename)}"
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes(fp, xlsx_bytes)
+    job = enqueue(EXCEL_IMPORT_JOB_KIND, {**payload, "path": str(fp.as_posix()), "sha256": sha}, project_id=int(project_id))
+    return {"mode": "job", "job_id": int(job.id)}
+
+
+def _run_excel_import(payload: Dict[str, Any], xlsx_bytes: bytes) -> Dict[str, Any]:
+    project_id = int(payload["project_id"])
+    dtype = str(payload.get("dataset_type") or "")
+    fname = str(payload.get("original_filename") or "upload.xlsx")
+    user_id = payload.get("uploaded_by_user_id")
+
+    if dtype != MRV_TEMPLATE:
+        res = ingest_excel_to_datasetupload(
+            project_id=project_id,
+            dataset_type=dtype,
+            xlsx_bytes=xlsx_bytes,
+            original_filename=fname,
+            uploaded_by_user_id=user_id,
+            progress=lambda rows: report_progress(stage="reading", dataset_type=dtype, rows_read=int(rows)),
+        )
+        report_progress(stage="done", dataset_type=dtype, rows_read=int(res.get("rows") or 0))
+        return res
+
+    report_progress(stage="reading", sheets_done=0)
+    sheets = read_xlsx_sheets(xlsx_bytes)
+    missing = [k for k in MRV_TEMPLATE_REQUIRED if k not in sheets]
+    if missing:
+        raise ValueError(f"XLSX içinde eksik sheet var: {missing}. Gerekli: {list(MRV_TEMPLATE_REQUIRED)}")
+    results = []
+    for i, (key, df) in enumerate(sheets.items()):
+        report_progress(stage="ingesting", sheet=key, sheets_done=i, sheets_total=len(sheets), rows=int(len(df)))
+        results.append(
+            ingest_sheet_dataframe(project_id=project_id, dataset_type=key, df=df, original_filename=fname, uploaded_by_user_id=user_id)
+        )
+    # geçersiz sheet'ler kaydedilmez (CSV upload akışı gibi); diğerleri kaydedilir, hatalar sonuçta döner
+    errors = {r["dataset_type"]: r["core_validation_errors"] for r in results if not r.get("validated")}
+    report_progress(stage="done", sheets_done=len(sheets), sheets_total=len(sheets), sheets_failed=len(errors))
+    return {"dataset_type": MRV_TEMPLATE, "validated": not errors, "errors": errors, "sheets": results}
+
+
+def handle_excel_import_job(payload: dict) -> dict:
+    """Worker job handler (kind=excel_import). payload: submit_excel_import'un kuyruğa yazdığı alanlar + path."""
+    fp = Path(str(payload["path"]))
+    try:
+        return _run_excel_import(payload, fp.read_bytes())
+    finally:
+        # başarısız job'da da staging dosyası kalmaz (yeniden denemek için dosya tekrar yüklenir)
+        try:
+            fp.unlink()
+        except OSError:
+            pass
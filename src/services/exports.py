@@ -15,21 +15,22 @@ import pandas as pd
 
 from src.mrv.lineage import sha256_bytes
 from src.services.storage import EVIDENCE_DOCS_CATEGORIES
+from src.services.tracing import traced
 
 
-def build_xlsx_from_results(results_json: str) -> bytes:
-    """Sonuç JSON'undan XLSX üretir.
+# Sayfa sırası ve adları sabittir (indirilen dosyaların düzeni değişmemeli)
+_XLSX_SHEETS = ("KPIs", "CBAM_Table", "CBAM_Goods", "ETS_Activity")
+
+# pandas.ExcelWriter başlık stili (bold + ince kenarlık + ortalı); streaming yazımda da aynısı uygulanır
+_XLSX_HEADER_STYLE = {
+    "font": {"bold": True},
+    "border": {"style": "thin"},
+    "alignment": {"horizontal": "center", "vertical": "top"},
+}
 
-    Not: Bu fonksiyon DB'ye ihtiyaç duymaz. Streamlit Cloud ortamında import
-    sırası / model uyumsuzluğu gibi problemler yüzünden uygulama açılışının
-    bozulmaması için bağımsız tutulur.
-    """
-    results = {}
-    try:
-        results = json.loads(results_json) if results_json else {}
-    except Exception:
-        results = {}
 
+def _xlsx_sheet_rows(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Sonuç dict'inden sayfa -> satır listesi (build_xlsx_from_results ile aynı kaynaklar)."""
     kpis = results.get("kpis", {}) or {}
     table = results.get("cbam_table", []) or []
 
@@ -45,28 +46,127 @@ def build_xlsx_from_results(results_json: str) -> bytes:
     except Exception:
         ets_activity = []
 
+    sheets: Dict[str, Any] = {"KPIs": [kpis], "CBAM_Table": table}
+    # CBAM_Goods / ETS_Activity yalnızca dolu ise yazılır
+    if isinstance(cbam_goods, list) and cbam_goods:
+        sheets["CBAM_Goods"] = cbam_goods
+    if isinstance(ets_activity, list) and ets_activity:
+        sheets["ETS_Activity"] = ets_activity
+    return sheets
+
+
+def _parse_results(results_json: Any) -> Dict[str, Any]:
+    if isinstance(results_json, dict):
+        return results_json
+    try:
+        out = json.loads(results_json) if results_json else {}
+    except Exception:
+        out = {}
+    return out if isinstance(out, dict) else {}
+
+
+def _xlsx_columns(rows: List[Any]) -> List[Any]:
+    """pd.DataFrame(list_of_dicts) ile aynı kolon sırası: anahtarların ilk görüldüğü sıra."""
+    cols: Dict[Any, None] = {}
+    for r in rows:
+        if isinstance(r, dict):
+            for k in r:
+                if k not in cols:
+                    cols[k] = None
+        elif 0 not in cols:
+            cols[0] = None
+    return list(cols)
+
+
+def _xlsx_value(v: Any) -> Any:
+    if v is None or isinstance(v, (bool, int, float, str)):
+        if isinstance(v, float) and v != v:  # NaN -> boş hücre (pandas davranışı)
+            return None
+        return v
+    return str(v)  # dict/list vb.: pandas yolu da str() yazar
+
+
+def write_xlsx_from_results(results_json: Any, path: str | Path) -> Path:
+    """Sonuçları sabit bellekle XLSX dosyasına yazar (openpyxl write-only modu).
+
+    DataFrame kurulmaz: satırlar sonuç listelerinden doğrudan sayfaya akar, hücreler
+    openpyxl tarafından geçici dosyaya serialize edilir. Sayfa adları/kolon düzeni
+    pandas yolu (build_xlsx_from_results(streaming=False)) ile aynıdır.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    sheets = _xlsx_sheet_rows(_parse_results(results_json))
+    side = Side(style=_XLSX_HEADER_STYLE["border"]["style"])
+    font = Font(**_XLSX_HEADER_STYLE["font"])
+    border = Border(left=side, right=side, top=side, bottom=side)
+    align = Alignment(**_XLSX_HEADER_STYLE["alignment"])
+
+    wb = Workbook(write_only=True)
+    for name in _XLSX_SHEETS:
+        if name not in sheets:
+            continue
+        rows = sheets[name]
+        ws = wb.create_sheet(title=name)
+        cols = _xlsx_columns(rows)
+        if not cols:
+            continue
+        header = []
+        for c in cols:
+            cell = WriteOnlyCell(ws, value=_xlsx_value(c))
+            cell.font, cell.border, cell.alignment = font, border, align
+            header.append(cell)
+        ws.append(header)
+        for r in rows:
+            if isinstance(r, dict):
+                ws.append([_xlsx_value(r.get(c)) for c in cols])
+            else:
+                ws.append([_xlsx_value(r)])
+
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(str(out))
+    return out
+
+
+def build_xlsx_from_results(results_json: Any, *, streaming: bool = True) -> bytes:
+    """Sonuç JSON'undan XLSX üretir.
+
+    Not: Bu fonksiyon DB'ye ihtiyaç duymaz. Streamlit Cloud ortamında import
+    sırası / model uyumsuzluğu gibi problemler yüzünden uygulama açılışının
+    bozulmaması için bağımsız tutulur.
+
+    streaming=True (varsayılan): write-only openpyxl ile geçici dosyaya yazılır (100k+ satırda
+    bellek sabit kalır). streaming=False: eski pandas.ExcelWriter yolu.
+    """
+    if streaming:
+        import tempfile
+
+        with tempfile.TemporaryDirectory(prefix="xlsx_export_") as td:
+            return write_xlsx_from_results(results_json, Path(td) / "export.xlsx").read_bytes()
+
+    sheets = _xlsx_sheet_rows(_parse_results(results_json))
     out = io.BytesIO()
     # openpyxl bağımlılığı requirements.txt içinde olmalı (pandas ExcelWriter engine="openpyxl")
     with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        pd.DataFrame([kpis]).to_excel(writer, index=False, sheet_name="KPIs")
-        pd.DataFrame(table).to_excel(writer, index=False, sheet_name="CBAM_Table")
-
-        if isinstance(cbam_goods, list) and cbam_goods:
-            pd.DataFrame(cbam_goods).to_excel(writer, index=False, sheet_name="CBAM_Goods")
-
-        if isinstance(ets_activity, list) and ets_activity:
-            pd.DataFrame(ets_activity).to_excel(writer, index=False, sheet_name="ETS_Activity")
+        for name in _XLSX_SHEETS:
+            if name in sheets:
+                pd.DataFrame(sheets[name]).to_excel(writer, index=False, sheet_name=name)
 
     return out.getvalue()
 
 
 def build_zip(snapshot_id: int, results_json: str) -> bytes:
     """Snapshot sonuçları için ZIP (JSON + XLSX) üretir."""
-    xlsx_bytes = build_xlsx_from_results(results_json)
+    import tempfile
+
     out = io.BytesIO()
-    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        z.writestr(f"snapshot_{snapshot_id}_results.json", results_json or "{}")
-        z.writestr(f"snapshot_{snapshot_id}_export.xlsx", xlsx_bytes)
+    with tempfile.TemporaryDirectory(prefix="xlsx_export_") as td:
+        xlsx_path = write_xlsx_from_results(results_json, Path(td) / "export.xlsx")
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr(f"snapshot_{snapshot_id}_results.json", results_json or "{}")
+            z.write(xlsx_path, arcname=f"snapshot_{snapshot_id}_export.xlsx")
     return out.getvalue()
 
 
@@ -142,7 +242,19 @@ def _ensure_pdf_for_snapshot(snapshot: Any) -> Tuple[bytes, str]:
         Methodology = None  # type: ignore
         DatasetUpload = None  # type: ignore
 
-    from src.services.reporting import build_pdf
+    from src.services.reporting import build_pdf_cached, cached_pdf
+
+    # Kilitli snapshot: sonuç değişmez -> render cache'i (result_hash + şablon + dil) önce denenir,
+    # hit'te results_json ayrıştırılmaz ve PDF yeniden üretilmez.
+    sid = int(getattr(snapshot, "id", 0) or 0)
+    result_hash = str(getattr(snapshot, "result_hash", "") or "") if bool(getattr(snapshot, "locked", False)) else ""
+    if result_hash:
+        pdf_bytes = cached_pdf(result_hash, sid, "evidence")
+        if pdf_bytes:
+            pdf_hash = sha256_bytes(pdf_bytes)
+            # render atlanır ama rapor kaydı ve audit izi cache'ten bağımsız yazılır
+            _record_pdf_report(snapshot, pdf_bytes, pdf_hash, cache_hit=True)
+            return pdf_bytes, pdf_hash
 
     results = {}
     try:
@@ -200,10 +312,10 @@ def _ensure_pdf_for_snapshot(snapshot: Any) -> Tuple[bytes, str]:
                     .scalars()
                     .first()
                 )
-                if r and getattr(r, "storage_uri", None):
-                    pdf_bytes = _safe_read_bytes(str(getattr(r, "storage_uri", "")))
+                if r and getattr(r, "file_path", None):
+                    pdf_bytes = _safe_read_bytes(str(getattr(r, "file_path", "")))
                     if pdf_bytes:
-                        return pdf_bytes, getattr(r, "sha256", sha256_bytes(pdf_bytes))
+                        return pdf_bytes, (getattr(r, "file_hash", "") or sha256_bytes(pdf_bytes))
     except Exception:
         pass
 
@@ -240,40 +352,75 @@ def _ensure_pdf_for_snapshot(snapshot: Any) -> Tuple[bytes, str]:
     except Exception:
         dq = {}
 
-    pdf_bytes = build_pdf(
-        title=title,
-        kpis=kpis,
-        cbam_table=cbam_table,
-        cfg=cfg,
-        cbam_section=cbam_section,
-        ets_section=ets_section,
-        dq=dq,
-        methodology=meth_payload,
-    )
-    pdf_hash = sha256_bytes(pdf_bytes)
-
-    # best-effort: Report kaydı
+    report_data = {
+        "kpis": kpis,
+        "config": cfg,
+        "cbam_table": cbam_table,
+        "scenario": scenario,
+        "cbam": cbam_section,
+        "ets": ets_section,
+        "data_quality": dq,
+        "methodology": meth_payload,
+    }
+    pdf_bytes, pdf_hash, _ = build_pdf_cached(sid, title, report_data, result_hash=result_hash, variant="evidence")
+
+    _record_pdf_report(snapshot, pdf_bytes, pdf_hash, cache_hit=False)
+    return pdf_bytes, pdf_hash
+
+
+def _record_pdf_report(snapshot: Any, pdf_bytes: bytes, pdf_hash: str, *, cache_hit: bool) -> None:
+    """best-effort: PDF'i storage/reports'a yazar ve Report kaydını ekler / tazeler.
+
+    Aynı hash'li son kayıt varsa yeni satır açılmaz, dosya ve created_at güncellenir.
+    Render cache hit'inde build_pdf'in "pdf_built" audit olayı oluşmadığından "pdf_cache_hit" yazılır.
+    """
+    from src.db.session import db
+    from sqlalchemy import select
+
+    sid = getattr(snapshot, "id", None)
     try:
-        if Report is not None:
-            uri = str(Path("./storage/reports") / f"snapshot_{getattr(snapshot, 'id', 'na')}_report.pdf")
-            Path(uri).parent.mkdir(parents=True, exist_ok=True)
-            Path(uri).write_bytes(pdf_bytes)
-            with db() as s:
-                r = Report(
-                    snapshot_id=getattr(snapshot, "id", None),
-                    report_type="pdf",
-                    storage_uri=uri,
-                    sha256=pdf_hash,
-                    created_at=datetime.now(timezone.utc),
+        from src.db.models import Report
+
+        uri = str(Path("./storage/reports") / f"snapshot_{sid or 'na'}_report.pdf")
+        Path(uri).parent.mkdir(parents=True, exist_ok=True)
+        Path(uri).write_bytes(pdf_bytes)
+        with db() as s:
+            r = (
+                s.execute(
+                    select(Report)
+                    .where(Report.snapshot_id == sid, Report.report_type == "pdf")
+                    .order_by(Report.created_at.desc(), Report.id.desc())
+                    .limit(1)
                 )
+                .scalars()
+                .first()
+            )
+            if r is None or r.file_hash != pdf_hash:
+                r = Report(project_id=getattr(snapshot, "project_id", None), snapshot_id=sid, report_type="pdf")
                 s.add(r)
-                s.commit()
+            r.file_path = uri
+            r.file_hash = pdf_hash
+            r.meta_json = json.dumps({"cache_hit": bool(cache_hit)}, ensure_ascii=False)
+            r.created_at = datetime.now(timezone.utc)
+            s.commit()
     except Exception:
         pass
 
-    return pdf_bytes, pdf_hash
+    if cache_hit:
+        try:
+            from src.mrv.audit import append_audit
+
+            append_audit(
+                "pdf_cache_hit",
+                {"snapshot_id": sid, "sha256": pdf_hash},
+                entity_type="snapshot",
+                entity_id=sid,
+            )
+        except Exception:
+            pass
 
 
+@traced("evidence_pack.build")
 def build_evidence_pack(snapshot_id: int) -> bytes:
     """Evidence Pack ZIP üretir (manifest + inputs + snapshot + report + evidence docs).
 
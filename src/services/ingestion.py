@@ -5,7 +5,7 @@ from typing import Any
 
 import pandas as pd
 
-from src.mrv.data_quality_engine import anomaly_checks, completeness_checks
+from src.mrv.data_quality_engine import anomaly_checks, completeness_checks, profile_frame
 
 
 def _norm(s: Any) -> str:
@@ -93,8 +93,11 @@ def data_quality_assess(dataset_type: str, df: pd.DataFrame) -> tuple[int, dict]
         report["checks"].append({"id": cid, "status": status, "details": details})
         penalties += int(penalty)
 
+    # Kolon profili tek geçişte çıkarılır; tüm kontroller paylaşır
+    prof = profile_frame(df)
+
     # Missingness
-    miss_ratio = float(df.isna().mean().mean()) if n_rows > 0 else 1.0
+    miss_ratio = prof.missing_ratio()
     if miss_ratio > 0.20:
         add_check("missingness", "warn", {"missing_ratio": miss_ratio}, penalty=15)
     elif miss_ratio > 0.05:
@@ -109,42 +112,28 @@ def data_quality_assess(dataset_type: str, df: pd.DataFrame) -> tuple[int, dict]
     else:
         add_check("schema", "pass", {"errors": []}, penalty=0)
 
-    # Numeric outliers (IQR)
-    df2 = df.copy()
-    numeric_cols = []
-    for c in df2.columns:
-        try:
-            if _is_numeric_series(df2[c]):
-                numeric_cols.append(c)
-        except Exception:
-            continue
-
-    outlier_count = 0
-    for c in numeric_cols[:8]:
-        vals = pd.to_numeric(df2[c], errors="coerce").dropna()
-        if len(vals) < 20:
-            continue
-        q1 = vals.quantile(0.25)
-        q3 = vals.quantile(0.75)
-        iqr = q3 - q1
-        if iqr <= 0:
-            continue
-        lower = q1 - 3.0 * iqr
-        upper = q3 + 3.0 * iqr
-        outlier_count += int(((vals < lower) | (vals > upper)).sum())
+    # Numeric outliers (IQR, ilk 8 sayısal kolon)
+    numeric_cols = prof.numeric_columns()
+    outlier_count = sum(int(v["outliers"]) for v in prof.iqr_outliers(max_columns=8, k=3.0, min_count=20).values())
 
     if outlier_count > 0:
         add_check("outliers_iqr", "warn", {"outlier_count": outlier_count}, penalty=min(10, 3 + outlier_count // 10))
     else:
         add_check("outliers_iqr", "pass", {"outlier_count": 0}, penalty=0)
 
-    # Completeness + anomalies
-    for chk in (completeness_checks(dtype, df).get("checks") or []):
+    # Completeness + anomalies (tek dataset: dataset tipine göre ilgili slota yönlendirilir)
+    frames: dict = {}
+    if dtype == "energy":
+        frames = {"energy_df": df, "energy_profile": prof}
+    elif dtype == "production":
+        frames = {"production_df": df, "production_profile": prof}
+
+    for chk in (completeness_checks(**frames).get("checks") or []):
         stt = str(chk.get("status") or "pass")
         pen = 25 if stt == "fail" else (10 if stt == "warn" else 0)
         add_check(str(chk.get("id") or "completeness"), stt, chk.get("details") or {}, penalty=pen)
 
-    for chk in (anomaly_checks(dtype, df).get("qa_flags") or []):
+    for chk in (anomaly_checks(**frames).get("qa_flags") or []):
         stt = str(chk.get("status") or "pass")
         pen = 15 if stt == "fail" else (5 if stt == "warn" else 0)
         add_check(str(chk.get("id") or "anomaly"), stt, chk.get("details") or {}, penalty=pen)
@@ -167,15 +156,16 @@ def normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
     return df2
 
 
-def read_xlsx_sheets(xlsx_bytes: bytes) -> dict[str, pd.DataFrame]:
-    """Beklenen sheet isimleri: energy, production, materials, cbam_defaults"""
-    import io
+def read_xlsx_sheets(xlsx_bytes: bytes, *, processes: int | None = None) -> dict[str, pd.DataFrame]:
+    """Beklenen sheet isimleri: energy, production, materials, cbam_defaults
+
+    Sheet'ler streaming okunur (openpyxl read-only); büyük workbook'larda her sheet ayrı process'te parse edilir.
+    """
+    from src.connectors.excel_stream import read_sheets, sheet_names
 
-    xf = pd.ExcelFile(io.BytesIO(xlsx_bytes))
+    names = [n for n in sheet_names(xlsx_bytes) if _norm(n) in ("energy", "production", "materials", "cbam_defaults")]
+    frames = read_sheets(xlsx_bytes, names, processes=processes)
     out: dict[str, pd.DataFrame] = {}
-    for name in xf.sheet_names:
-        key = _norm(name)
-        if key in ("energy", "production", "materials", "cbam_defaults"):
-            df = pd.read_excel(xf, sheet_name=name)
-            out[key] = df
+    for name in names:
+        out[_norm(name)] = frames[name]
     return out
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import json
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from typing import Any, Iterator
 
 from sqlalchemy import select
 
@@ -9,6 +12,10 @@ from src.db.job_models import Job
 from src.db.session import db
 
 
+# worker'ın o an çalıştırdığı job (handler'lar report_progress ile ilerleme yazar)
+_current_job_id: ContextVar[int | None] = ContextVar("current_job_id", default=None)
+
+
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -62,3 +69,52 @@ def finish(job_id: int, ok: bool, result: dict | None = None, error: str = "") -
 def list_jobs(limit: int = 100) -> list[Job]:
     with db() as s:
         return list(s.execute(select(Job).order_by(Job.id.desc()).limit(int(limit))).scalars().all())
+
+
+@contextmanager
+def bind_job(job_id: int) -> Iterator[None]:
+    token = _current_job_id.set(int(job_id))
+    try:
+        yield
+    finally:
+        _current_job_id.reset(token)
+
+
+def set_progress(job_id: int, **progress: Any) -> None:
+    """Çalışan job'un ilerlemesini result_json["progress"] altına yazar (finish sonucu üzerine yazar)."""
+    with db() as s:
+        job = s.get(Job, int(job_id))
+        if not job or job.status != "running":
+            return
+        job.result_json = json.dumps({"progress": progress}, ensure_ascii=False, sort_keys=True, default=str)
+        job.updated_at = _utcnow()
+        s.commit()
+
+
+def report_progress(**progress: Any) -> None:
+    """Handler içinden: bağlı job varsa ilerlemeyi yazar, yoksa (senkron çağrı) no-op. Best-effort."""
+    job_id = _current_job_id.get()
+    if job_id is None:
+        return
+    try:
+        set_progress(job_id, **progress)
+    except Exception:
+        pass
+
+
+def job_status(job_id: int) -> dict:
+    """UI/API polling: status, progress (çalışırken) veya result (bitince), error."""
+    with db() as s:
+        job = s.get(Job, int(job_id))
+        if not job:
+            return {"job_id": int(job_id), "status": "missing"}
+        try:
+            res = json.loads(job.result_json or "{}")
+        except Exception:
+            res = {}
+        out = {"job_id": int(job.id), "kind": str(job.job_type), "status": str(job.status), "error": str(job.error or "")}
+        if job.status in ("queued", "running"):
+            out["progress"] = res.get("progress") or {}
+        else:
+            out["result"] = res
+        return out
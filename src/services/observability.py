@@ -5,6 +5,8 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict
 
+from src.services.tracing import current_ids
+
 logger = logging.getLogger("carbon_platform")
 if not logger.handlers:
     h = logging.StreamHandler()
@@ -16,6 +18,7 @@ def log_event(event: str, **fields: Any) -> None:
     payload: Dict[str, Any] = {
         "ts": datetime.now(timezone.utc).isoformat(),
         "event": event,
+        **current_ids(),
         **fields,
     }
     logger.info(json.dumps(payload, ensure_ascii=False, sort_keys=True))
@@ -1,34 +1,433 @@
+"""Performans benchmark altyapısı.
+
+- BenchmarkCase / run_benchmarks: geriye uyumlu basit API (Final Kapanış sayfası kullanır).
+  Artık warmup + tekrar + yüzdelik (p50/p90/p95/p99) + tracemalloc peak bellek ölçer.
+- synthetic_*: energy / production / materials / cbam_defaults için deterministik (seed'li)
+  sentetik veri üreticileri (SIZES: 1k / 100k / 1M satır).
+- default_cases(size): motorun sıcak yolları için hazır case listesi
+  (energy_emissions, cbam_compute, allocate_product_emissions, compute_precursor_tco2_by_sku,
+  sha256_json; snapshot_id verilirse build_evidence_pack ve replay).
+- Baseline: save_baseline / load_baseline / compare_to_baseline ile JSON baseline'a göre
+  regresyon (p50 artışı > eşik) işaretlenir.
+
+CLI:
+    python -m src.services.performance_benchmark --size 1k --baseline storage/bench/baseline_1k.json
+    python -m src.services.performance_benchmark --size 100k --baseline ... --update-baseline
+"""
+
 from __future__ import annotations
 
+import argparse
+import gc
 import json
+import math
+import os
+import sys
 import time
+import tracemalloc
 from dataclasses import dataclass
-from typing import Any, Dict, List, Callable
+from pathlib import Path
+from typing import Any, Dict, List, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+SIZES: Dict[str, int] = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Büyük veri setlerinde tekrar sayısı düşürülür (1M satırda tek ölçüm yeterli).
+DEFAULT_REPEATS: Dict[str, int] = {"1k": 5, "100k": 3, "1m": 1}
+DEFAULT_WARMUP: Dict[str, int] = {"1k": 1, "100k": 1, "1m": 0}
+
+DEFAULT_REGRESSION_THRESHOLD_PCT = float(os.getenv("CME_BENCH_REGRESSION_PCT", "20"))
 
 
 @dataclass
 class BenchmarkCase:
     name: str
     fn: Callable[[], Any]
+    warmup: Optional[int] = None
+    repeats: Optional[int] = None
+    setup: Optional[Callable[[], Any]] = None
+    rows: Optional[int] = None
+
+
+def _percentile(sorted_vals: List[float], pct: float) -> float:
+    """Lineer interpolasyonlu yüzdelik (numpy 'linear' ile aynı)."""
+    if not sorted_vals:
+        return 0.0
+    if len(sorted_vals) == 1:
+        return float(sorted_vals[0])
+    k = (len(sorted_vals) - 1) * (pct / 100.0)
+    lo = int(math.floor(k))
+    hi = int(math.ceil(k))
+    if lo == hi:
+        return float(sorted_vals[lo])
+    return float(sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo))
+
+
+def _run_case(c: BenchmarkCase, *, warmup: int, repeats: int, track_memory: bool) -> Dict[str, Any]:
+    timings: List[float] = []
+    peak_kb: Optional[float] = None
+    ok = True
+    err = ""
+    try:
+        if c.setup is not None:
+            c.setup()
+        for _ in range(max(0, warmup)):
+            c.fn()
+        for _ in range(max(1, repeats)):
+            gc.collect()
+            t0 = time.perf_counter()
+            c.fn()
+            timings.append(time.perf_counter() - t0)
+        if track_memory:
+            # Bellek ölçümü ayrı bir koşuda yapılır; tracemalloc zaman ölçümünü bozmasın.
+            started = False
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            try:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                c.fn()
+                peak_kb = round((tracemalloc.get_traced_memory()[1] - base) / 1024.0, 1)
+            finally:
+                if started:
+                    tracemalloc.stop()
+    except Exception as e:
+        ok = False
+        err = f"{type(e).__name__}: {e}"[:500]
+
+    vals = sorted(timings)
+    total = float(sum(vals))
+    out: Dict[str, Any] = {
+        "name": c.name,
+        "ok": ok,
+        # geriye uyumluluk: "seconds" medyan koşu süresi
+        "seconds": round(_percentile(vals, 50), 6),
+        "error": err,
+        "warmup": int(max(0, warmup)),
+        "repeats": len(vals),
+        "rows": c.rows,
+        "min_ms": round(vals[0] * 1000.0, 3) if vals else None,
+        "max_ms": round(vals[-1] * 1000.0, 3) if vals else None,
+        "mean_ms": round(total / len(vals) * 1000.0, 3) if vals else None,
+        "p50_ms": round(_percentile(vals, 50) * 1000.0, 3) if vals else None,
+        "p90_ms": round(_percentile(vals, 90) * 1000.0, 3) if vals else None,
+        "p95_ms": round(_percentile(vals, 95) * 1000.0, 3) if vals else None,
+        "p99_ms": round(_percentile(vals, 99) * 1000.0, 3) if vals else None,
+        "peak_mem_kb": peak_kb,
+    }
+    if c.rows and vals and total > 0:
+        out["rows_per_sec"] = round(c.rows / (total / len(vals)), 1)
+    return out
 
 
-def run_benchmarks(cases: List[BenchmarkCase]) -> Dict[str, Any]:
+def run_benchmarks(
+    cases: List[BenchmarkCase],
+    *,
+    warmup: int = 0,
+    repeats: int = 1,
+    track_memory: bool = True,
+) -> Dict[str, Any]:
+    """Case'leri çalıştırır. Case üzerinde warmup/repeats tanımlıysa o değer önceliklidir."""
     results = []
-    started = time.time()
+    started = time.perf_counter()
     for c in cases:
-        t0 = time.time()
-        ok = True
-        err = ""
-        try:
-            _ = c.fn()
-        except Exception as e:
-            ok = False
-            err = str(e)
-        dt = time.time() - t0
-        results.append({"name": c.name, "ok": ok, "seconds": round(dt, 6), "error": err})
-    total = time.time() - started
+        results.append(
+            _run_case(
+                c,
+                warmup=c.warmup if c.warmup is not None else warmup,
+                repeats=c.repeats if c.repeats is not None else repeats,
+                track_memory=track_memory,
+            )
+        )
+    total = time.perf_counter() - started
     return {
         "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "total_seconds": round(total, 6),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
         "cases": results,
     }
+
+
+# ----------------------------
+# Sentetik veri üreticileri
+# ----------------------------
+_FUELS = ["natural_gas", "diesel", "coal", "lpg", "fuel_oil", "electricity"]
+_CN_CODES = ["72081000", "72142000", "73089059", "76011000", "76042910", "25232900", "31021010", "28041000"]
+
+
+def _n_skus(n_rows: int) -> int:
+    return int(max(10, min(50_000, n_rows // 20)))
+
+
+def synthetic_energy(n_rows: int, *, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    fuel_idx = rng.integers(0, len(_FUELS), size=n_rows)
+    fuels = np.array(_FUELS, dtype=object)[fuel_idx]
+    qty = np.round(rng.uniform(1.0, 5_000.0, size=n_rows), 3)
+    units = np.where(fuels == "electricity", "MWh", np.where(fuels == "natural_gas", "Nm3", "t"))
+    months = np.array([f"2025-{m:02d}" for m in range(1, 13)], dtype=object)[rng.integers(0, 12, size=n_rows)]
+    return pd.DataFrame({"month": months, "fuel_type": fuels, "quantity": qty, "unit": units})
+
+
+def synthetic_production(n_rows: int, *, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    n_sku = _n_skus(n_rows)
+    sku_idx = rng.integers(0, n_sku, size=n_rows)
+    skus = np.char.add("SKU-", sku_idx.astype(str)).astype(object)
+    cn = np.array(_CN_CODES, dtype=object)[sku_idx % len(_CN_CODES)]
+    qty = np.round(rng.uniform(1.0, 1_000.0, size=n_rows), 3)
+    export = np.round(qty * rng.uniform(0.0, 1.0, size=n_rows), 3)
+    return pd.DataFrame(
+        {
+            "sku": skus,
+            "cn_code": cn,
+            "quantity": qty,
+            "unit": "t",
+            "export_to_eu_quantity": export,
+        }
+    )
+
+
+def synthetic_materials(n_rows: int, *, seed: int = 42) -> pd.DataFrame:
+    """Asiklik precursor kenarları: precursor SKU indeksi her zaman ürün SKU indeksinden küçük."""
+    rng = np.random.default_rng(seed + 2)
+    n_sku = _n_skus(n_rows)
+    child = rng.integers(1, n_sku, size=n_rows)
+    parent = (rng.random(size=n_rows) * child).astype(np.int64)
+    qty = np.round(rng.uniform(0.1, 50.0, size=n_rows), 3)
+    # yarısı explicit embedded tCO2, yarısı chain moduna bırakılır
+    emb = np.where(rng.random(size=n_rows) < 0.5, np.round(qty * 1.8, 6), 0.0)
+    return pd.DataFrame(
+        {
+            "sku": np.char.add("SKU-", child.astype(str)).astype(object),
+            "precursor_sku": np.char.add("SKU-", parent.astype(str)).astype(object),
+            "precursor_quantity": qty,
+            "precursor_quantity_unit": "t",
+            "precursor_embedded_tco2": emb,
+        }
+    )
+
+
+def synthetic_cbam_defaults(n_rows: int, *, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 3)
+    cn = np.array(_CN_CODES, dtype=object)[rng.integers(0, len(_CN_CODES), size=n_rows)]
+    return pd.DataFrame(
+        {
+            "cn_code": cn,
+            "direct_intensity_tco2_per_unit": np.round(rng.uniform(0.1, 3.0, size=n_rows), 6),
+            "indirect_intensity_tco2_per_unit": np.round(rng.uniform(0.0, 1.0, size=n_rows), 6),
+            "unit": "t",
+            "source": "synthetic",
+            "version": np.char.add("v", (np.arange(n_rows) % 7).astype(str)).astype(object),
+            "valid_from": "2025-01-01",
+            "priority": rng.integers(0, 5, size=n_rows),
+        }
+    )
+
+
+def synthetic_factor_lock() -> Dict[str, Dict[str, Any]]:
+    """energy_emissions için sabit faktör kilidi (DB faktörlerinden bağımsız, deterministik)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for f in _FUELS:
+        if f == "electricity":
+            continue
+        out[f"ncv:{f}"] = {"factor_type": f"ncv:{f}", "value": 0.0364, "source": "BENCH"}
+        out[f"ef:{f}"] = {"factor_type": f"ef:{f}", "value": 0.0561, "source": "BENCH"}
+        out[f"of:{f}"] = {"factor_type": f"of:{f}", "value": 1.0, "source": "BENCH"}
+    out["grid:location"] = {"factor_type": "grid:location", "value": 0.42, "source": "BENCH"}
+    out["grid:market"] = {"factor_type": "grid:market", "value": 0.38, "source": "BENCH"}
+    return out
+
+
+# ----------------------------
+# Hazır case listesi
+# ----------------------------
+def default_cases(
+    size: str = "1k",
+    *,
+    n_rows: Optional[int] = None,
+    seed: int = 42,
+    project_id: int = 0,
+    snapshot_id: Optional[int] = None,
+    repeats: Optional[int] = None,
+    warmup: Optional[int] = None,
+) -> List[BenchmarkCase]:
+    """Motor sıcak yolları için case listesi.
+
+    energy_emissions faktör çözümü için DB'ye gider (tablolar mevcut olmalı).
+    build_evidence_pack / replay yalnızca snapshot_id verilirse eklenir.
+    """
+    key = str(size).lower()
+    n = int(n_rows if n_rows is not None else SIZES.get(key, 1_000))
+    rep = repeats if repeats is not None else DEFAULT_REPEATS.get(key, 3)
+    wu = warmup if warmup is not None else DEFAULT_WARMUP.get(key, 1)
+
+    from src.engine.allocation import allocate_product_emissions
+    from src.engine.cbam import cbam_compute
+    from src.engine.cbam_precursor import compute_precursor_tco2_by_sku
+    from src.engine.emissions import energy_emissions
+    from src.mrv.lineage import sha256_json
+
+    energy_df = synthetic_energy(n, seed=seed)
+    production_df = synthetic_production(n, seed=seed)
+    materials_df = synthetic_materials(n, seed=seed)
+    defaults_df = synthetic_cbam_defaults(max(10, n // 100), seed=seed)
+    lock = synthetic_factor_lock()
+    energy_breakdown = {"direct_tco2": 12_500.0, "indirect_tco2": 3_400.0, "total_tco2": 15_900.0}
+    embedded_by_sku = {s: 1.5 for s in production_df["sku"].unique().tolist()}
+    hash_payload = production_df.head(min(n, 100_000)).to_dict(orient="records")
+
+    def _case(name: str, fn: Callable[[], Any]) -> BenchmarkCase:
+        return BenchmarkCase(name=f"{name}[{key}]", fn=fn, warmup=wu, repeats=rep, rows=n)
+
+    cases = [
+        _case(
+            "energy_emissions",
+            lambda: energy_emissions(energy_df, project_id=project_id, factor_set_lock=lock),
+        ),
+        _case(
+            "allocate_product_emissions",
+            lambda: allocate_product_emissions(production_df, scope1_tco2=12_500.0, scope2_tco2=3_400.0),
+        ),
+        _case(
+            "compute_precursor_tco2_by_sku",
+            lambda: compute_precursor_tco2_by_sku(
+                production_df=production_df, materials_df=materials_df, embedded_tco2_by_sku=embedded_by_sku
+            ),
+        ),
+        _case(
+            "cbam_compute",
+            lambda: cbam_compute(
+                production_df=production_df,
+                energy_breakdown=energy_breakdown,
+                materials_df=materials_df,
+                eua_price_eur_per_t=80.0,
+                reporting_year=2025,
+                cbam_defaults_df=defaults_df,
+            ),
+        ),
+        _case("sha256_json", lambda: sha256_json(hash_payload)),
+    ]
+
+    if snapshot_id is not None:
+        from src.mrv.replay import replay
+        from src.services.exports import build_evidence_pack
+
+        sid = int(snapshot_id)
+        # snapshot boyutu sentetik değil; satır sayısı raporlanmaz.
+        cases.append(BenchmarkCase(name="build_evidence_pack", fn=lambda: build_evidence_pack(sid), warmup=wu, repeats=rep))
+        cases.append(BenchmarkCase(name="replay", fn=lambda: replay(sid), warmup=wu, repeats=rep))
+
+    return cases
+
+
+# ----------------------------
+# Baseline karşılaştırma
+# ----------------------------
+def save_baseline(report: Dict[str, Any], path: str) -> str:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return str(p)
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    p = Path(path)
+    if not p.exists():
+        return None
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]],
+    *,
+    threshold_pct: float = DEFAULT_REGRESSION_THRESHOLD_PCT,
+    metric: str = "p50_ms",
+) -> Dict[str, Any]:
+    """Her case için metric (varsayılan p50_ms) değişimini hesaplar.
+
+    Artış > threshold_pct ise regression, azalış > threshold_pct ise improvement.
+    Baseline'da olmayan case'ler "new" olarak listelenir.
+    """
+    base_by_name = {c.get("name"): c for c in ((baseline or {}).get("cases") or [])}
+    rows: List[Dict[str, Any]] = []
+    regressions: List[str] = []
+    for c in report.get("cases") or []:
+        name = c.get("name")
+        cur = c.get(metric)
+        b = base_by_name.get(name)
+        if not c.get("ok"):
+            rows.append({"name": name, "status": "error", "current": cur, "baseline": None, "delta_pct": None})
+            regressions.append(name)
+            continue
+        if b is None or b.get(metric) in (None, 0):
+            rows.append({"name": name, "status": "new", "current": cur, "baseline": None, "delta_pct": None})
+            continue
+        base_v = float(b[metric])
+        delta = (float(cur) - base_v) / base_v * 100.0
+        status = "ok"
+        if delta > threshold_pct:
+            status = "regression"
+            regressions.append(name)
+        elif delta < -threshold_pct:
+            status = "improvement"
+        rows.append({"name": name, "status": status, "current": cur, "baseline": base_v, "delta_pct": round(delta, 2)})
+    return {
+        "metric": metric,
+        "threshold_pct": float(threshold_pct),
+        "ok": not regressions,
+        "regressions": regressions,
+        "cases": rows,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="CME motor benchmark suite")
+    ap.add_argument("--size", default="1k", choices=sorted(SIZES.keys()))
+    ap.add_argument("--repeats", type=int, default=None)
+    ap.add_argument("--warmup", type=int, default=None)
+    ap.add_argument("--snapshot-id", type=int, default=None)
+    ap.add_argument("--baseline", default="")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--threshold-pct", type=float, default=DEFAULT_REGRESSION_THRESHOLD_PCT)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args(argv)
+
+    from src.db.session import init_db
+
+    init_db()
+    cases = default_cases(args.size, snapshot_id=args.snapshot_id, repeats=args.repeats, warmup=args.warmup)
+    report = run_benchmarks(cases)
+
+    exit_code = 0
+    if args.baseline:
+        if args.update_baseline:
+            save_baseline(report, args.baseline)
+        else:
+            cmp = compare_to_baseline(report, load_baseline(args.baseline), threshold_pct=args.threshold_pct)
+            report["baseline_comparison"] = cmp
+            exit_code = 0 if cmp["ok"] else 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
@@ -11,6 +12,7 @@ from reportlab.pdfgen import canvas
 
 from src.mrv.lineage import sha256_bytes
 from src.services.storage import REPORT_DIR
+from src.services.storage_backend import StorageBackend, get_storage_backend
 
 # append_audit repo'da var ama bazı ortamlarda import sorunu olmasın diye güvenli kullanalım
 try:
@@ -19,10 +21,17 @@ except Exception:  # pragma: no cover
     append_audit = None
 
 
+# PDF düzeni değiştiğinde artırın: render cache anahtarının parçasıdır (eski PDF'ler yeniden üretilir)
+REPORT_TEMPLATE_VERSION = "pdf_report.v1"
+REPORT_LANG = "tr"
+
+
+@lru_cache(maxsize=1)
 def _register_fonts() -> bool:
     """
     Repo kökünde DejaVuSans.ttf ve DejaVuSans-Bold.ttf dosyaları beklenir.
     Streamlit Cloud'da font yoksa Helvetica fallback kullanılır.
+    TTF ayrıştırma pahalıdır: süreç başına bir kez yapılır (sonuç cache'lenir).
     """
     try:
         pdfmetrics.registerFont(TTFont("DejaVuSans", "DejaVuSans.ttf"))
@@ -485,3 +494,70 @@ def build_pdf(snapshot_id: int, report_title: str, report_data: dict) -> tuple[s
             pass
 
     return str(fp), pdf_sha
+
+
+def report_cache_key(
+    result_hash: str,
+    snapshot_id: int,
+    variant: str = "",
+    *,
+    template_version: str = REPORT_TEMPLATE_VERSION,
+    lang: str = REPORT_LANG,
+) -> str:
+    """Render edilmiş PDF'in storage anahtarı.
+
+    (result_hash, şablon versiyonu, dil) içeriği belirler; PDF snapshot id'sini ve başlığı da
+    bastığı için bunlar `variant` özetine girer.
+    """
+    v = sha256_bytes(f"{int(snapshot_id)}|{variant}".encode("utf-8"))[:16]
+    return f"report_cache/{result_hash}/{template_version}_{lang}_{v}.pdf"
+
+
+def cached_pdf(
+    result_hash: str,
+    snapshot_id: int,
+    variant: str = "",
+    *,
+    storage: Optional[StorageBackend] = None,
+) -> bytes:
+    """Render cache'inde PDF varsa bytes döner, yoksa b"" (best-effort)."""
+    if not result_hash:
+        return b""
+    storage = storage or get_storage_backend()
+    try:
+        return storage.get_bytes(storage.uri_for(report_cache_key(result_hash, snapshot_id, variant))) or b""
+    except Exception:
+        return b""
+
+
+def build_pdf_cached(
+    snapshot_id: int,
+    report_title: str,
+    report_data: dict,
+    *,
+    result_hash: str,
+    variant: Optional[str] = None,
+    storage: Optional[StorageBackend] = None,
+) -> Tuple[bytes, str, bool]:
+    """Kilitli snapshot raporları için render cache'i (StorageBackend üzerinden).
+
+    Cache'te varsa PDF render edilmez; yoksa build_pdf ile üretilip cache'e yazılır.
+    variant verilmezse başlık kullanılır. result_hash boşsa cache atlanır.
+    Dönüş: (pdf_bytes, sha256, cache_hit)
+    """
+    variant = report_title if variant is None else variant
+    if result_hash:
+        storage = storage or get_storage_backend()
+        data = cached_pdf(result_hash, snapshot_id, variant, storage=storage)
+        if data:
+            return data, sha256_bytes(data), True
+
+    uri, sha = build_pdf(snapshot_id, report_title, report_data)
+    data = Path(uri).read_bytes()
+
+    if result_hash:
+        try:
+            storage.put_bytes(report_cache_key(result_hash, snapshot_id, variant), data, content_type="application/pdf")
+        except Exception:
+            pass
+    return data, sha, False
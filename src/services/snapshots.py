@@ -6,6 +6,7 @@ from sqlalchemy import select
 
 from src.db.models import CalculationSnapshot
 from src.db.session import db
+from src.mrv.audit import append_audit
 
 
 def lock_snapshot(snapshot_id: int, user_id: int | None = None) -> CalculationSnapshot:
@@ -23,7 +24,17 @@ def lock_snapshot(snapshot_id: int, user_id: int | None = None) -> CalculationSn
 
         s.commit()
         s.refresh(snap)
-        return snap
+
+    # kritik olay: kuyruğa değil, dönmeden önce DB'ye
+    append_audit(
+        "snapshot_locked",
+        {"snapshot_id": int(snap.id), "result_hash": str(snap.result_hash or "")},
+        user_id=user_id,
+        entity_type="snapshot",
+        entity_id=int(snap.id),
+        must_persist=True,
+    )
+    return snap
 
 
 def ensure_not_locked(snapshot: CalculationSnapshot):
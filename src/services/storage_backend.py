@@ -19,6 +19,10 @@ class StorageBackend:
     def get_bytes(self, uri: str) -> bytes:
         raise NotImplementedError
 
+    def uri_for(self, key: str) -> str:
+        """put_bytes(key, ...) ile yazılacak nesnenin URI'si (içerik adresli cache lookup'ı için)."""
+        raise NotImplementedError
+
 
 class LocalStorageBackend(StorageBackend):
     def __init__(self, base_dir: str = "./storage/blob"):
@@ -32,6 +36,9 @@ class LocalStorageBackend(StorageBackend):
         p.write_bytes(data)
         return StorageLocation(uri=str(p), backend="local")
 
+    def uri_for(self, key: str) -> str:
+        return str(self.base / key)
+
     def get_bytes(self, uri: str) -> bytes:
         try:
             p = Path(str(uri))
@@ -70,6 +77,9 @@ class S3StorageBackend(StorageBackend):
         self.s3.put_object(Bucket=self.bucket, Key=k, Body=data, ContentType=content_type)
         return StorageLocation(uri=f"s3://{self.bucket}/{k}", backend="s3")
 
+    def uri_for(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._key(key)}"
+
     def get_bytes(self, uri: str) -> bytes:
         # uri: s3://bucket/key
         if not uri.startswith("s3://"):
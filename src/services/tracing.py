@@ -0,0 +1,305 @@
+"""Hafif pipeline tracing: context-manager span'ler + süre / satır sayısı / bellek farkı.
+
+Kullanım:
+    with start_trace("run_full", project_id=1) as tr:
+        with span("factor_resolution") as sp:
+            ...
+            sp.set(rows=len(df))
+    tr.to_dict()          # snapshot metadata'ya yazılabilir özet
+    tr.stage_timings()    # {"factor_resolution": 12.3, ...} (ms)
+
+- Aktif trace yokken span() no-op'a yakın çalışır (sadece perf_counter), prod yolunu yavaşlatmaz.
+- trace_id / span_id contextvars ile taşınır; observability.log_event bunları log satırına ekler
+  (correlation ID).
+- Bellek: tracemalloc açıksa (CME_TRACE_MEMORY=1 ya da dışarıdan başlatılmışsa) Python heap farkı,
+  değilse süreç peak RSS artışı raporlanır.
+- Export: CME_TRACE_DIR tanımlıysa her trace bitişinde <dir>/<trace_id>.json (düz JSON) ve
+  <trace_id>.otlp.json (OpenTelemetry OTLP/JSON uyumlu) yazılır.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:  # POSIX
+    import resource as _resource
+except Exception:  # pragma: no cover - Windows
+    _resource = None
+
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("cme_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("cme_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return uuid.uuid4().hex[: n_bytes * 2]
+
+
+def _rss_peak_kb() -> Optional[int]:
+    if _resource is None:
+        return None
+    try:
+        return int(_resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss)
+    except Exception:
+        return None
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent_id",
+        "trace_id",
+        "attrs",
+        "start_ns",
+        "end_ns",
+        "_t0",
+        "duration_ms",
+        "mem_delta_kb",
+        "mem_kind",
+        "_mem0",
+        "status",
+        "error",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = str(name)
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.trace_id = trace_id
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.mem_delta_kb: Optional[float] = None
+        self.mem_kind = ""
+        self._mem0: Optional[float] = None
+        self.status = "ok"
+        self.error = ""
+        if tracemalloc.is_tracing():
+            self.mem_kind = "tracemalloc"
+            self._mem0 = tracemalloc.get_traced_memory()[0] / 1024.0
+        else:
+            rss = _rss_peak_kb()
+            if rss is not None:
+                self.mem_kind = "rss_peak"
+                self._mem0 = float(rss)
+
+    def set(self, **attrs: Any) -> "Span":
+        """Span'e öznitelik ekler (örn. rows=len(df))."""
+        self.attrs.update(attrs)
+        return self
+
+    def _finish(self, exc: Optional[BaseException]) -> None:
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000.0, 3)
+        self.end_ns = time.time_ns()
+        if self._mem0 is not None:
+            if self.mem_kind == "tracemalloc" and tracemalloc.is_tracing():
+                self.mem_delta_kb = round(tracemalloc.get_traced_memory()[0] / 1024.0 - self._mem0, 1)
+            elif self.mem_kind == "rss_peak":
+                rss = _rss_peak_kb()
+                self.mem_delta_kb = round(float(rss) - self._mem0, 1) if rss is not None else None
+        if exc is not None:
+            self.status = "error"
+            self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": self.duration_ms,
+            "mem_delta_kb": self.mem_delta_kb,
+            "mem_kind": self.mem_kind,
+            "status": self.status,
+            "error": self.error,
+            "attrs": dict(self.attrs),
+        }
+
+
+class Trace:
+    def __init__(self, name: str, attrs: Dict[str, Any], trace_id: Optional[str] = None):
+        self.name = str(name)
+        self.trace_id = trace_id or _new_id(16)
+        self.attrs = dict(attrs or {})
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._started_tracemalloc = False
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Span adı -> toplam süre (ms). Aynı ad birden çok kez geçerse toplanır."""
+        out: Dict[str, float] = {}
+        for sp in self.spans:
+            if sp is self.root or sp.duration_ms is None:
+                continue
+            out[sp.name] = round(out.get(sp.name, 0.0) + float(sp.duration_ms), 3)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": dict(self.attrs),
+            "total_ms": root.duration_ms if root else None,
+            "status": root.status if root else "ok",
+            "stage_timings_ms": self.stage_timings(),
+            "spans": [sp.to_dict() for sp in self.spans],
+        }
+
+    def to_otlp(self, service_name: str = "cme_demo") -> Dict[str, Any]:
+        """OpenTelemetry OTLP/JSON (ExportTraceServiceRequest) formatı."""
+
+        def _attr(k: str, v: Any) -> Dict[str, Any]:
+            if isinstance(v, bool):
+                val: Dict[str, Any] = {"boolValue": v}
+            elif isinstance(v, int):
+                val = {"intValue": str(v)}
+            elif isinstance(v, float):
+                val = {"doubleValue": v}
+            else:
+                val = {"stringValue": str(v)}
+            return {"key": str(k), "value": val}
+
+        spans = []
+        for sp in self.spans:
+            attrs = dict(sp.attrs)
+            if sp.mem_delta_kb is not None:
+                attrs[f"cme.mem_delta_kb.{sp.mem_kind}"] = float(sp.mem_delta_kb)
+            item = {
+                "traceId": self.trace_id,
+                "spanId": sp.span_id,
+                "name": sp.name,
+                "kind": 1,
+                "startTimeUnixNano": str(sp.start_ns),
+                "endTimeUnixNano": str(sp.end_ns or sp.start_ns),
+                "attributes": [_attr(k, v) for k, v in sorted(attrs.items())],
+                "status": {"code": 2, "message": sp.error} if sp.status == "error" else {"code": 1},
+            }
+            if sp.parent_id:
+                item["parentSpanId"] = sp.parent_id
+            spans.append(item)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attr("service.name", service_name)]},
+                    "scopeSpans": [{"scope": {"name": "src.services.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_ids() -> Dict[str, str]:
+    """Log korelasyonu için aktif trace_id/span_id (yoksa boş dict)."""
+    tr = _current_trace.get()
+    if tr is None:
+        return {}
+    sp = _current_span.get()
+    out = {"trace_id": tr.trace_id}
+    if sp is not None:
+        out["span_id"] = sp.span_id
+    return out
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Aktif trace altında alt span açar. Trace yoksa ölçüm yapılır ama hiçbir yere kaydedilmez."""
+    tr = _current_trace.get()
+    parent = _current_span.get()
+    sp = Span(name, tr.trace_id if tr else "", parent.span_id if parent else None, attrs)
+    if tr is not None:
+        tr.spans.append(sp)
+    token = _current_span.set(sp)
+    exc: Optional[BaseException] = None
+    try:
+        yield sp
+    except BaseException as e:
+        exc = e
+        raise
+    finally:
+        sp._finish(exc)
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, *, export: Optional[bool] = None, **attrs: Any) -> Iterator[Trace]:
+    """Kök trace açar.
+
+    İç içe çağrılırsa (örn. job içinde run_full) aynı trace_id ile alt trace açılır: kendi root'u,
+    attrs'ı ve to_dict() özeti olur; bitince span'leri üst trace'e eklenir (job trace'i de görür).
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        child = Trace(name, attrs, trace_id=existing.trace_id)
+        c_token = _current_trace.set(child)
+        try:
+            with span(name, **attrs) as root:
+                child.root = root
+                yield child
+        finally:
+            _current_trace.reset(c_token)
+            existing.spans.extend(child.spans)
+        return
+
+    tr = Trace(name, attrs)
+    if os.getenv("CME_TRACE_MEMORY") == "1" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        tr._started_tracemalloc = True
+
+    t_token = _current_trace.set(tr)
+    try:
+        with span(name, **attrs) as root:
+            tr.root = root
+            yield tr
+    finally:
+        _current_trace.reset(t_token)
+        if tr._started_tracemalloc:
+            tracemalloc.stop()
+        out_dir = os.getenv("CME_TRACE_DIR", "")
+        if export or (export is None and out_dir):
+            try:
+                export_trace(tr, out_dir or "./storage/traces")
+            except Exception:
+                pass
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Fonksiyonu span ile sarar (aktif trace varsa kayda geçer)."""
+
+    def deco(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def export_trace(tr: Trace, out_dir: str) -> Dict[str, str]:
+    """Trace'i düz JSON + OTLP/JSON olarak diske yazar."""
+    d = Path(out_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    p_json = d / f"{tr.trace_id}.json"
+    p_otlp = d / f"{tr.trace_id}.otlp.json"
+    p_json.write_text(json.dumps(tr.to_dict(), ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    p_otlp.write_text(json.dumps(tr.to_otlp(), ensure_ascii=False, default=str), encoding="utf-8")
+    return {"json": str(p_json), "otlp": str(p_otlp)}
@@ -2,7 +2,9 @@ from __future__ import annotations
 import json, time, traceback
 from typing import Callable, Dict, Any
 
-from src.services.job_queue import claim_next, finish
+from src.services.job_queue import bind_job, claim_next, finish
+from src.services.observability import log_event
+from src.services.tracing import start_trace
 
 # Job handlers registry
 _HANDLERS: Dict[str, Callable[[dict], dict]] = {}
@@ -10,6 +12,18 @@ _HANDLERS: Dict[str, Callable[[dict], dict]] = {}
 def register(kind:str, fn:Callable[[dict], dict])->None:
     _HANDLERS[str(kind)] = fn
 
+def _snapshot_chain_verify(payload:dict)->dict:
+    from src.mrv.chain_verifier import handle_chain_verify_job
+    return handle_chain_verify_job(payload)
+
+def _excel_import(payload:dict)->dict:
+    from src.services.excel_ingestion_service import handle_excel_import_job
+    return handle_excel_import_job(payload)
+
+# Yerleşik job'lar
+register("snapshot_chain_verify", _snapshot_chain_verify)
+register("excel_import", _excel_import)
+
 def run_once()->bool:
     j = claim_next()
     if not j:
@@ -18,13 +32,16 @@ def run_once()->bool:
         payload = json.loads(j.payload_json or "{}")
     except Exception:
         payload = {}
-    try:
-        if j.kind not in _HANDLERS:
-            raise ValueError(f"Handler yok: {j.kind}")
-        res = _HANDLERS[j.kind](payload)
-        finish(j.id, True, result=res)
-    except Exception as e:
-        finish(j.id, False, result={}, error=str(e) + "\n" + traceback.format_exc()[:4000])
+    with start_trace(f"job.{j.kind}", job_id=int(j.id), kind=str(j.kind)) as tr:
+        try:
+            if j.kind not in _HANDLERS:
+                raise ValueError(f"Handler yok: {j.kind}")
+            with bind_job(int(j.id)):
+                res = _HANDLERS[j.kind](payload)
+            finish(j.id, True, result=res)
+        except Exception as e:
+            finish(j.id, False, result={}, error=str(e) + "\n" + traceback.format_exc()[:4000])
+    log_event("job_trace", job_id=int(j.id), kind=str(j.kind), trace_id=tr.trace_id, total_ms=tr.root.duration_ms if tr.root else None, stage_timings_ms=tr.stage_timings())
     return True
 
 def run_loop(poll_seconds:float=1.0, max_loops:int=1000):
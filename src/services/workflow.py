@@ -10,6 +10,8 @@ from src.db.session import db
 from src.mrv.audit import append_audit
 from src.mrv.compliance import evaluate_compliance
 from src.mrv.lineage import sha256_json
+from src.services.observability import log_event
+from src.services.tracing import current_trace, span, start_trace
 
 
 def _run_phase3_ai(project_id: int, legacy_results: dict, config: dict) -> dict:
@@ -203,7 +205,7 @@ def _latest_snapshot_hash(project_id: int) -> str | None:
             s.execute(
                 select(CalculationSnapshot)
                 .where(CalculationSnapshot.project_id == int(project_id))
-                .order_by(CalculationSnapshot.created_at.desc())
+                .order_by(CalculationSnapshot.created_at.desc(), CalculationSnapshot.id.desc())
                 .limit(1)
             )
             .scalars()
@@ -275,6 +277,19 @@ def create_snapshot(
     return snap
 
 
+def _store_perf_trace(snapshot_id: int, trace: dict) -> None:
+    """Aşama süreleri snapshot metadata'sına (perf_trace_json) yazılır. Hash'leri etkilemez."""
+    try:
+        with db() as s:
+            sn = s.get(CalculationSnapshot, int(snapshot_id))
+            if not sn or bool(getattr(sn, "locked", False)):
+                return
+            sn.perf_trace_json = json.dumps(trace or {}, ensure_ascii=False, sort_keys=True, default=str)
+            s.commit()
+    except Exception:
+        pass
+
+
 def run_full(
     project_id: int,
     config: dict,
@@ -289,32 +304,69 @@ def run_full(
     - evaluate_compliance(...) doğru imzayla çağrılır
     - results_json.compliance_checks[] / results_json.qa_flags[] standardize edildi
     - Snapshot reuse deterministik candidate_hash ile yapılır
+
+    Tracing: tüm aşamalar tek trace altında ölçülür; yeni snapshot'ta perf_trace_json'a yazılır.
+    Job içinde çağrılırsa alt trace olarak ölçülür; yine snapshot'a yazılır ve job trace'ine eklenir.
     """
+    with start_trace("run_full", project_id=int(project_id)) as tr:
+        snap = _run_full(
+            project_id=project_id,
+            config=config,
+            scenario=scenario,
+            methodology_id=methodology_id,
+            created_by_user_id=created_by_user_id,
+        )
+
+    if tr.root is not None:
+        trace = tr.to_dict()
+        if not tr.attrs.get("reused"):
+            _store_perf_trace(int(snap.id), trace)
+        log_event(
+            "run_full_trace",
+            trace_id=tr.trace_id,
+            snapshot_id=int(snap.id),
+            reused=bool(tr.attrs.get("reused")),
+            total_ms=trace.get("total_ms"),
+            stage_timings_ms=trace.get("stage_timings_ms"),
+        )
+    return snap
+
+
+def _run_full(
+    *,
+    project_id: int,
+    config: dict,
+    scenario: dict | None,
+    methodology_id: int | None,
+    created_by_user_id: int | None,
+) -> CalculationSnapshot:
     scenario = scenario or {}
 
-    from src.mrv.orchestrator import ENGINE_VERSION_PACKET_A, run_orchestrator  # circular import için local import
+    from src.mrv.orchestrator import engine_version_for_config, run_orchestrator  # circular import için local import
 
-    energy_u = latest_upload(project_id, "energy")
-    prod_u = latest_upload(project_id, "production")
-    materials_u = latest_upload(project_id, "materials")
-    cbam_defaults_u = latest_upload(project_id, "cbam_defaults")
+    with span("run_full.load_inputs") as sp:
+        energy_u = latest_upload(project_id, "energy")
+        prod_u = latest_upload(project_id, "production")
+        materials_u = latest_upload(project_id, "materials")
+        cbam_defaults_u = latest_upload(project_id, "cbam_defaults")
 
-    if not energy_u:
-        raise ValueError("energy.csv yüklenmemiş.")
-    if not prod_u:
-        raise ValueError("production.csv yüklenmemiş.")
+        if not energy_u:
+            raise ValueError("energy.csv yüklenmemiş.")
+        if not prod_u:
+            raise ValueError("production.csv yüklenmemiş.")
 
-    input_hashes = _input_hashes_payload(project_id, energy_u, prod_u, materials_u, cbam_defaults_u)
+        input_hashes = _input_hashes_payload(project_id, energy_u, prod_u, materials_u, cbam_defaults_u)
 
-    energy_df = load_csv_from_uri(str(getattr(energy_u, "storage_uri", "") or ""))
-    prod_df = load_csv_from_uri(str(getattr(prod_u, "storage_uri", "") or ""))
-    materials_df = None
-    cbam_defaults_df = None
-    if materials_u and str(getattr(materials_u, "storage_uri", "") or ""):
-        materials_df = load_csv_from_uri(str(getattr(materials_u, "storage_uri", "") or ""))
+        energy_df = load_csv_from_uri(str(getattr(energy_u, "storage_uri", "") or ""))
+        prod_df = load_csv_from_uri(str(getattr(prod_u, "storage_uri", "") or ""))
+        materials_df = None
+        cbam_defaults_df = None
+        if materials_u and str(getattr(materials_u, "storage_uri", "") or ""):
+            materials_df = load_csv_from_uri(str(getattr(materials_u, "storage_uri", "") or ""))
 
-    if cbam_defaults_u and str(getattr(cbam_defaults_u, "storage_uri", "") or ""):
-        cbam_defaults_df = load_csv_from_uri(str(getattr(cbam_defaults_u, "storage_uri", "") or ""))
+        if cbam_defaults_u and str(getattr(cbam_defaults_u, "storage_uri", "") or ""):
+            cbam_defaults_df = load_csv_from_uri(str(getattr(cbam_defaults_u, "storage_uri", "") or ""))
+        sp.set(rows=sum(len(x) for x in (energy_df, prod_df, materials_df, cbam_defaults_df) if x is not None))
 
     input_bundle, result_bundle, legacy_results = run_orchestrator(
         project_id=int(project_id),
@@ -329,27 +381,31 @@ def run_full(
     )
 
     # Reuse key
-    ib = legacy_results.get("input_bundle", {}) or {}
-    factor_set_ref = ib.get("factor_set_ref", []) or []
-    monitoring_plan_ref = ib.get("monitoring_plan_ref", None)
-
-    candidate_hash = _compute_result_hash(
-        ENGINE_VERSION_PACKET_A,
-        (config or {}),
-        input_hashes,
-        scenario,
-        methodology_id,
-        factor_set_ref,
-        monitoring_plan_ref,
-    )
+    with span("run_full.reuse_check"):
+        ib = legacy_results.get("input_bundle", {}) or {}
+        factor_set_ref = ib.get("factor_set_ref", []) or []
+        monitoring_plan_ref = ib.get("monitoring_plan_ref", None)
+
+        candidate_hash = _compute_result_hash(
+            engine_version_for_config(config),
+            (config or {}),
+            input_hashes,
+            scenario,
+            methodology_id,
+            factor_set_ref,
+            monitoring_plan_ref,
+        )
 
-    existing = _try_reuse_snapshot(project_id, input_hash=candidate_hash, result_hash=result_bundle.result_hash)
-    if existing:
-        try:
-            append_audit("snapshot_reused", {"snapshot_id": existing.id, "result_hash": candidate_hash})
-        except Exception:
-            pass
-        return existing
+        existing = _try_reuse_snapshot(project_id, input_hash=candidate_hash, result_hash=result_bundle.result_hash)
+        if existing:
+            tr = current_trace()
+            if tr is not None:
+                tr.attrs["reused"] = True
+            try:
+                append_audit("snapshot_reused", {"snapshot_id": existing.id, "result_hash": candidate_hash})
+            except Exception:
+                pass
+            return existing
 
     # Compliance evaluation (A3)
     compliance_checks, qa_flags_extra = evaluate_compliance(
@@ -380,27 +436,29 @@ def run_full(
     results_json["deterministic"] = det
 
     # Faz 3 AI outputs
-    try:
-        ai_payload = _run_phase3_ai(int(project_id), legacy_results, (config or {}))
-        if ai_payload:
-            results_json["ai"] = ai_payload
-    except Exception:
-        pass
+    with span("run_full.ai"):
+        try:
+            ai_payload = _run_phase3_ai(int(project_id), legacy_results, (config or {}))
+            if ai_payload:
+                results_json["ai"] = ai_payload
+        except Exception:
+            pass
 
-    prev_hash = _latest_snapshot_hash(project_id)
+    with span("run_full.db_write"):
+        prev_hash = _latest_snapshot_hash(project_id)
 
-    snap = create_snapshot(
-        project_id=int(project_id),
-        engine_version=ENGINE_VERSION_PACKET_A,
-        input_hash=candidate_hash,
-        result_hash=str(result_bundle.result_hash),
-        config=(config or {}),
-        input_hashes=input_hashes,
-        results_json=results_json,
-        methodology_id=methodology_id,
-        created_by_user_id=created_by_user_id,
-        previous_snapshot_hash=prev_hash,
-    )
+        snap = create_snapshot(
+            project_id=int(project_id),
+            engine_version=engine_version_for_config(config),
+            input_hash=candidate_hash,
+            result_hash=str(result_bundle.result_hash),
+            config=(config or {}),
+            input_hashes=input_hashes,
+            results_json=results_json,
+            methodology_id=methodology_id,
+            created_by_user_id=created_by_user_id,
+            previous_snapshot_hash=prev_hash,
+        )
 
     try:
         append_audit("snapshot_created", {"snapshot_id": snap.id, "result_hash": candidate_hash})
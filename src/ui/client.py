@@ -10,10 +10,12 @@ from sqlalchemy import select
 from src.db.models import CalculationSnapshot, Facility, Project
 from src.db.session import db
 from src.mrv.audit import append_audit, infer_company_id_for_snapshot
+from src.mrv.lineage import sha256_bytes
 from src.services import projects as prj
 from src.services.alerts import list_open_alerts_for_user
 from src.services.exports import build_evidence_pack, build_xlsx_from_results
-from src.services.reporting import build_pdf
+from src.services.reporting import build_pdf_cached, cached_pdf
+from src.ui import data_access as da
 
 
 def _read_results(snapshot: CalculationSnapshot) -> dict:
@@ -32,6 +34,10 @@ def _fmt_tr(x, digits=2) -> str:
 
 
 def _snapshot_kpis(snap: CalculationSnapshot) -> dict:
+    pre = getattr(snap, "kpis", None)
+    if isinstance(pre, dict):
+        # data_access.list_snapshots(with_summary=True) KPI'ları önceden çıkarır
+        return dict(pre)
     r = _read_results(snap)
     k = (r.get("kpis") or {}) if isinstance(r, dict) else {}
     cbam = (r.get("cbam") or {}) if isinstance(r, dict) else {}
@@ -59,7 +65,7 @@ def _facility_name_for_project(project_id: int) -> str:
         return "-"
 
 
-def _trend_dataframe(snaps: list[CalculationSnapshot]) -> pd.DataFrame:
+def _trend_dataframe(snaps: list[CalculationSnapshot], fac_names: dict[int, str] | None = None) -> pd.DataFrame:
     rows = []
     for sn in snaps:
         k = _snapshot_kpis(sn)
@@ -69,7 +75,7 @@ def _trend_dataframe(snaps: list[CalculationSnapshot]) -> pd.DataFrame:
                 "tarih_str": sn.created_at.strftime("%Y-%m-%d") if hasattr(sn.created_at, "strftime") else str(sn.created_at),
                 "snapshot_id": sn.id,
                 "project_id": sn.project_id,
-                "tesis": _facility_name_for_project(sn.project_id),
+                "tesis": fac_names.get(int(sn.project_id), "-") if fac_names is not None else _facility_name_for_project(sn.project_id),
                 **k,
             }
         )
@@ -128,7 +134,8 @@ def client_app(user):
 
     company_id = prj.require_company_id(user)
 
-    snaps = prj.list_shared_snapshots_for_user(user, limit=400)
+    snaps = da.list_snapshots(company_id, shared_only=not prj.is_consultant(user), with_summary=True, limit=400)
+    fac_names = da.facility_names_by_project(company_id)
     append_audit(
         "client_dashboard_viewed",
         {"snapshots_visible": len(snaps)},
@@ -164,7 +171,7 @@ def client_app(user):
     st.divider()
 
     # Filters
-    df_all = _trend_dataframe(snaps)
+    df_all = _trend_dataframe(snaps, fac_names)
     facs = sorted(list(set(df_all["tesis"].tolist())))
     years = sorted(list(set([int(getattr(s.created_at, "year", 0) or 0) for s in snaps if getattr(s, "created_at", None)])))
     years = [y for y in years if y > 0]
@@ -195,10 +202,9 @@ def client_app(user):
     latest_snap = None
     if len(df_f) > 0:
         latest_id = int(df_f.sort_values("tarih", ascending=False).iloc[0]["snapshot_id"])
-        with db() as s:
-            latest_snap = s.get(CalculationSnapshot, latest_id)
+        latest_snap = da.get_snapshot(company_id, latest_id)
     if latest_snap is None:
-        latest_snap = snaps[0]
+        latest_snap = da.get_snapshot(company_id, int(snaps[0].id))
 
     latest_k = _snapshot_kpis(latest_snap)
 
@@ -224,7 +230,7 @@ def client_app(user):
     st.subheader("Tesis Bazlı Risk Sıralaması")
     by_fac = defaultdict(list)
     for sn in snaps:
-        by_fac[_facility_name_for_project(sn.project_id)].append(sn)
+        by_fac[fac_names.get(int(sn.project_id), "-")].append(sn)
 
     fac_rows = []
     for fac, items in by_fac.items():
@@ -330,13 +336,11 @@ def client_app(user):
     labels = []
     id_map = []
     for sn in snaps[:200]:
-        r = _read_results(sn)
-        scen = (r.get("scenario") or {}) if isinstance(r, dict) else {}
-        kind = "Senaryo" if scen else "Baseline"
-        name = scen.get("name") if scen else ""
+        kind = "Senaryo" if getattr(sn, "is_scenario", False) else "Baseline"
+        name = getattr(sn, "scenario_name", "")
         lock_tag = "🔒" if getattr(sn, "locked", False) else ""
         chain_tag = "⛓️" if getattr(sn, "previous_snapshot_hash", None) else ""
-        fac = _facility_name_for_project(sn.project_id)
+        fac = fac_names.get(int(sn.project_id), "-")
         labels.append(f"{lock_tag}{chain_tag} ID:{sn.id} • {fac} • {kind}{(' — ' + name) if name else ''} • {sn.created_at}")
         id_map.append(sn.id)
 
@@ -349,9 +353,8 @@ def client_app(user):
     left_id = id_map[labels.index(left_sel)]
     right_id = id_map[labels.index(right_sel)]
 
-    with db() as s:
-        left_snap = s.get(CalculationSnapshot, int(left_id))
-        right_snap = s.get(CalculationSnapshot, int(right_id))
+    left_snap = da.get_snapshot(company_id, int(left_id))
+    right_snap = da.get_snapshot(company_id, int(right_id))
 
     if left_snap and right_snap:
         append_audit(
@@ -383,6 +386,11 @@ def client_app(user):
         rcol1, rcol2, rcol3 = st.columns(3)
 
         def _download_pdf_for_snapshot(sn: CalculationSnapshot, title_suffix: str):
+            title = f"Rapor — {title_suffix}"
+            result_hash = (sn.result_hash or "") if getattr(sn, "locked", False) else ""
+            data = cached_pdf(result_hash, sn.id, title)
+            if data:
+                return data, sha256_bytes(data)
             results = _read_results(sn)
             try:
                 cfg = json.loads(sn.config_json or "{}")
@@ -395,12 +403,7 @@ def client_app(user):
                 "scenario": results.get("scenario", {}),
                 "methodology": results.get("methodology", None),
             }
-            title = f"Rapor — {title_suffix}"
-            uri, sha = build_pdf(sn.id, title, payload)
-            from pathlib import Path
-
-            p = Path(str(uri))
-            data = p.read_bytes() if p.exists() else b""
+            data, sha, _ = build_pdf_cached(sn.id, title, payload, result_hash=result_hash)
             return data, sha
 
         with rcol1:
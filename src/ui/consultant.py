@@ -17,12 +17,17 @@ from src.services import projects as prj
 from src.services.exports import build_evidence_pack, build_zip, build_xlsx_from_results
 from src.services.ingestion import data_quality_assess, validate_csv
 from src.mrv.replay import replay
+from src.engine.scenario_sweep import decompose_results, run_sweep, scenario_grid, sweep_summary
 from src.services.snapshots import lock_snapshot, set_snapshot_shared_with_client
 from src.services.reporting import build_pdf
 from src.services.storage import EVIDENCE_DOCS_CATEGORIES, EVIDENCE_DOCS_DIR, UPLOAD_DIR, write_bytes
 from src.services.workflow import run_full
 from src.services.templates_xlsx import build_mrv_template_xlsx
 from src.services.ingestion import read_xlsx_sheets
+from src.services.excel_ingestion_service import EXCEL_ASYNC_MIN_BYTES, MRV_TEMPLATE, submit_excel_import
+from src.services.job_queue import job_status
+from src.services.worker import run_once
+from src.ui import data_access as da
 
 
 def _hash_pw(pw: str) -> str:
@@ -41,6 +46,18 @@ def _fmt_tr(x, digits=2) -> str:
         return "0"
 
 
+def _parse_floats(txt: str) -> list:
+    """Liste girdisi: "0, 10; 20" -> [0.0, 10.0, 20.0] (ayırıcı virgül / noktalı virgül / boşluk)."""
+    out = []
+    for tok in str(txt or "").replace(";", ",").replace(" ", ",").split(","):
+        if tok.strip():
+            try:
+                out.append(float(tok.strip()))
+            except ValueError:
+                raise ValueError(f"Sayı bekleniyordu: {tok.strip()}")
+    return out
+
+
 def _read_results(snapshot: CalculationSnapshot) -> dict:
     try:
         return json.loads(snapshot.results_json) if snapshot.results_json else {}
@@ -199,6 +216,7 @@ def _render_project_setup(user):
                     entity_type="facility",
                     entity_id=int(fac.id),
                 )
+                da.invalidate(company_id, da.KIND_PROJECTS)
                 st.success(f"Tesis oluşturuldu: {fac.name} (#{fac.id})")
                 st.rerun()
             except Exception as e:
@@ -234,6 +252,7 @@ def _render_project_setup(user):
                     entity_type="project",
                     entity_id=int(project.id),
                 )
+                da.invalidate(company_id, da.KIND_PROJECTS)
                 st.success(f"Proje oluşturuldu: {project.name} (#{project.id})")
                 st.rerun()
             except Exception as e:
@@ -301,6 +320,7 @@ def consultant_app(user):
     pmap = {f"{p.name} (#{p.id})": int(p.id) for p in projs}
     plabel = st.selectbox("Proje seç", list(pmap.keys()))
     project_id = pmap[plabel]
+    company_id = prj.require_company_id(user)
 
     tabs = st.tabs(
         [
@@ -355,6 +375,7 @@ def consultant_app(user):
                 )
                 s.add(du)
                 s.commit()
+            da.invalidate(company_id, da.KIND_UPLOADS)
 
             append_audit(
                 "dataset_uploaded",
@@ -395,7 +416,56 @@ def consultant_app(user):
         with colx1:
             xfile = st.file_uploader("MRV Template XLSX yükle", type=["xlsx"], key=f"xlsx_{project_id}")
 
-        if xfile is not None:
+        job_key = f"xlsx_job_{project_id}"
+        if st.session_state.get(job_key):
+            js = job_status(int(st.session_state[job_key]))
+            prog = js.get("progress") or {}
+            if js["status"] in ("queued", "running"):
+                total = int(prog.get("sheets_total") or 0)
+                done = int(prog.get("sheets_done") or 0)
+                st.progress(done / total if total else 0.0, text=f"XLSX job #{js['job_id']}: {js['status']} {prog.get('stage', '')} {prog.get('sheet', '')}")
+                if st.button("Durumu yenile", key=f"btn_xlsx_job_refresh_{project_id}"):
+                    st.rerun()
+                if js["status"] == "queued":
+                    st.caption("Job kuyrukta. Worker process'i (python scripts/run_worker.py) çalışmıyorsa bu oturumda çalıştırılabilir.")
+                    if st.button("Worker yoksa burada çalıştır", key=f"btn_xlsx_job_run_{project_id}"):
+                        with st.spinner("XLSX içe aktarılıyor..."):
+                            run_once()
+                        st.rerun()
+            else:
+                if js["status"] == "succeeded":
+                    da.invalidate(company_id, da.KIND_UPLOADS)
+                    res = js.get("result") or {}
+                    if res.get("validated") is False:
+                        errs = res.get("errors") or {res.get("dataset_type", ""): res.get("core_validation_errors") or []}
+                        st.error(f"XLSX job #{js['job_id']} tamamlandı, ancak bazı sheet'ler doğrulamadan geçmedi ve kaydedilmedi:")
+                        for sheet, sheet_errs in errs.items():
+                            st.error(f"{sheet}: " + " | ".join(map(str, sheet_errs)))
+                    else:
+                        st.success(f"XLSX job #{js['job_id']} tamamlandı ✅")
+                    st.json(res)
+                else:
+                    st.error(f"XLSX job #{js['job_id']} başarısız: {js.get('error', '')[:500]}")
+                st.session_state.pop(job_key, None)
+
+        if xfile is not None and len(xfile.getvalue()) >= EXCEL_ASYNC_MIN_BYTES:
+            # büyük workbook: session'ı bloklamadan worker'da işlenir
+            if not st.session_state.get(job_key) and st.button("Büyük XLSX: arka planda içe aktar", type="primary", key=f"btn_xlsx_job_{project_id}"):
+                try:
+                    sub = submit_excel_import(
+                        project_id=int(project_id),
+                        dataset_type=MRV_TEMPLATE,
+                        xlsx_bytes=xfile.getvalue(),
+                        original_filename=str(xfile.name),
+                        uploaded_by_user_id=getattr(user, "id", None),
+                        run_async=True,
+                    )
+                    st.session_state[job_key] = int(sub["job_id"])
+                    st.rerun()
+                except Exception as e:
+                    st.error("XLSX job oluşturulamadı")
+                    st.exception(e)
+        elif xfile is not None:
             import io
 
             try:
@@ -446,6 +516,7 @@ def consultant_app(user):
                         user_id=getattr(user, "id", None),
                         notes=str(ev_notes or ""),
                     )
+                    da.invalidate(company_id, da.KIND_EVIDENCE)
                     append_audit(
                         "evidence_document_uploaded",
                         {"project_id": int(project_id), "doc_id": int(doc.id), "category": str(cat)},
@@ -458,12 +529,7 @@ def consultant_app(user):
                     st.rerun()
 
         with right:
-            with db() as s:
-                docs = (
-                    s.execute(select(EvidenceDocument).where(EvidenceDocument.project_id == int(project_id)).order_by(EvidenceDocument.uploaded_at.desc()))
-                    .scalars()
-                    .all()
-                )
+            docs = da.list_evidence_docs(company_id, project_id)
             if docs:
                 st.dataframe(
                     pd.DataFrame(
@@ -493,6 +559,7 @@ def consultant_app(user):
             try:
                 snap_id = run_full(project_id=project_id, created_by_user_id=getattr(user, "id", None))
                 _ensure_scenario_metadata_in_snapshot(snap_id)
+                da.invalidate(company_id, da.KIND_SNAPSHOTS)
                 st.success(f"Snapshot üretildi: #{snap_id}")
                 st.rerun()
             except Exception as e:
@@ -502,18 +569,44 @@ def consultant_app(user):
     # Scenarios
     with tabs[3]:
         st.subheader("Senaryolar (MVP)")
-        st.caption("Bu demo sürümünde senaryo parametreleri engine sonuç JSON'u üzerinden görüntülenir.")
-        st.info("Faz 3'te optimizer + scenario runner genişletilecek.")
+        st.caption("Seçilen snapshot sonucu baz alınarak senaryo ızgarası (enerji azaltımı × yenilenebilir pay × EUA fiyatı) hesaplanır.")
+        snaps = da.list_snapshots(company_id, project_id=project_id)
+        if not snaps:
+            st.info("Henüz snapshot yok.")
+        else:
+            labels = [f"#{sn.id} • {str(sn.created_at)[:19]}" for sn in snaps[:200]]
+            sel = st.selectbox("Baz snapshot", labels, key=f"sweep_snap_{project_id}")
+            sid = int(sel.split("•")[0].replace("#", "").strip())
+            c1, c2, c3 = st.columns(3)
+            red_txt = c1.text_input("Enerji azaltımı (%)", value="0, 10, 20", key=f"sweep_red_{project_id}")
+            rs_txt = c2.text_input("Yenilenebilir elektrik payı (%)", value="0, 50", key=f"sweep_rs_{project_id}")
+            eua_txt = c3.text_input("EUA fiyatı (€/t, boş: snapshot)", value="", key=f"sweep_eua_{project_id}")
+            if st.button("Senaryo taramasını çalıştır", use_container_width=True):
+                try:
+                    sn = da.get_snapshot(company_id, sid)
+                    if sn is None:
+                        raise ValueError("Snapshot bulunamadı.")
+                    axes = {
+                        "energy_reduction_pct": [v / 100.0 for v in _parse_floats(red_txt)] or [0.0],
+                        "renewable_share": [v / 100.0 for v in _parse_floats(rs_txt)] or [0.0],
+                    }
+                    if _parse_floats(eua_txt):
+                        axes["eua_price_eur_per_t"] = _parse_floats(eua_txt)
+                    base = decompose_results(json.loads(sn.results_json or "{}"), json.loads(sn.config_json or "{}"))
+                    table = run_sweep(base, scenario_grid(**axes))
+                    st.dataframe(
+                        table[[c for c in table.columns if c != "scenario_hash"]],
+                        use_container_width=True,
+                        hide_index=True,
+                    )
+                    st.json(sweep_summary(base, table, top=5))
+                except ValueError as e:
+                    st.error(str(e))
 
     # Reports & downloads
     with tabs[4]:
         st.subheader("Raporlar ve İndirme")
-        with db() as s:
-            snaps = (
-                s.execute(select(CalculationSnapshot).where(CalculationSnapshot.project_id == int(project_id)).order_by(CalculationSnapshot.created_at.desc()))
-                .scalars()
-                .all()
-            )
+        snaps = da.list_snapshots(company_id, project_id=project_id)
 
         if not snaps:
             st.info("Henüz snapshot yok.")
@@ -522,8 +615,7 @@ def consultant_app(user):
             sel = st.selectbox("Snapshot seç", labels)
             sid = int(sel.split("•")[0].replace("#", "").strip())
 
-            with db() as s:
-                sn = s.get(CalculationSnapshot, sid)
+            sn = da.get_snapshot(company_id, sid)
 
             if sn:
 
@@ -546,7 +638,8 @@ def consultant_app(user):
                 with colB:
                     if st.button("Snapshot'ı Kilitle (Immutable)", disabled=bool(sn.locked), use_container_width=True):
                         try:
-                            sn2 = lock_snapshot(int(sn.id), user=user)
+                            sn2 = lock_snapshot(int(sn.id), user_id=getattr(user, "id", None))
+                            da.invalidate(company_id, da.KIND_SNAPSHOTS)
                             st.success("Snapshot kilitlendi. Artık değiştirilemez ve silinemez ✅")
                             st.rerun()
                         except Exception as e:
@@ -556,7 +649,8 @@ def consultant_app(user):
                     shared = st.toggle("Client ile Paylaş", value=bool(sn.shared_with_client))
                     if shared != bool(sn.shared_with_client):
                         try:
-                            set_snapshot_shared_with_client(int(sn.id), bool(shared), user=user)
+                            set_snapshot_shared_with_client(int(sn.id), bool(shared))
+                            da.invalidate(company_id, da.KIND_SNAPSHOTS)
                             st.success("Paylaşım ayarı güncellendi ✅")
                             st.rerun()
                         except Exception as e:
@@ -611,12 +705,7 @@ def consultant_app(user):
     with tabs[5]:
         st.subheader("Geçmiş")
         st.caption("Uploads / snapshots kayıtlarını DB’den listeler.")
-        with db() as s:
-            ups = (
-                s.execute(select(DatasetUpload).where(DatasetUpload.project_id == int(project_id)).order_by(DatasetUpload.uploaded_at.desc()))
-                .scalars()
-                .all()
-            )
+        ups = da.list_uploads(company_id, project_id)
         if ups:
             st.dataframe(
                 pd.DataFrame(
@@ -0,0 +1,302 @@
+"""UI veri erişim katmanı (Streamlit cache'li, tenant-scoped).
+
+Sayfalar her widget etkileşiminde baştan çalışır; bu modül sık okunan listeleri
+st.cache_data ile saklar. Cache anahtarı daima company_id içerir (tenant izolasyonu).
+
+Invalidation:
+  - Her (kind, company_id) için process-level bir "generation" sayacı tutulur.
+  - Cache'li fonksiyonlar bu sayacı argüman olarak alır; yazma sonrası invalidate()
+    sayacı artırır, böylece sadece o tenant'ın o türdeki kayıtları yeniden okunur.
+  - Başka süreçlerden (worker) gelen yazmalar TTL ile (CACHE_TTL_SECONDS) görünür olur.
+
+Dönen satırlar ORM objesi değil SimpleNamespace'tir (pickle edilebilir, session'a bağlı değil);
+mevcut UI kodundaki attribute erişimi (sn.id, sn.locked, ...) aynen çalışır.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+from sqlalchemy import desc, select
+
+from src.db.models import CalculationSnapshot, DatasetUpload, EvidenceDocument, Facility, Project
+from src.db.session import db
+
+CACHE_TTL_SECONDS = 120
+
+KIND_UPLOADS = "uploads"
+KIND_EVIDENCE = "evidence"
+KIND_SNAPSHOTS = "snapshots"
+KIND_PROJECTS = "projects"
+KIND_CN_REGISTRY = "cn_registry"
+
+_GLOBAL_SCOPE = 0
+
+_generations: Dict[tuple, int] = {}
+_gen_lock = threading.Lock()
+
+
+def generation(kind: str, company_id: int) -> int:
+    with _gen_lock:
+        return _generations.get((str(kind), int(company_id)), 0)
+
+
+def invalidate(company_id: int, *kinds: str) -> None:
+    """Yazma sonrası ilgili tenant'ın cache'ini geçersiz kılar (upload, snapshot create/lock/share, ...)."""
+    with _gen_lock:
+        for kind in kinds:
+            key = (str(kind), int(company_id))
+            _generations[key] = _generations.get(key, 0) + 1
+
+
+def invalidate_for_project(project_id: int, *kinds: str) -> None:
+    cid = company_id_for_project(int(project_id))
+    if cid is not None:
+        invalidate(int(cid), *kinds)
+
+
+def company_id_for_project(project_id: int) -> Optional[int]:
+    with db() as s:
+        cid = s.execute(select(Project.company_id).where(Project.id == int(project_id))).scalar()
+    return int(cid) if cid is not None else None
+
+
+def _project_ids_for_company(s, company_id: int) -> List[int]:
+    return [int(x) for x in s.execute(select(Project.id).where(Project.company_id == int(company_id))).scalars().all()]
+
+
+def _read_json(raw: Any, default: Any) -> Any:
+    try:
+        return json.loads(raw) if raw else default
+    except Exception:
+        return default
+
+
+# ----------------------------
+# Projects / facilities
+# ----------------------------
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _facility_names_by_project(company_id: int, gen: int) -> Dict[int, str]:
+    with db() as s:
+        rows = s.execute(
+            select(Project.id, Facility.name)
+            .select_from(Project)
+            .outerjoin(Facility, Facility.id == Project.facility_id)
+            .where(Project.company_id == int(company_id))
+        ).all()
+    return {int(pid): (str(fname) if fname is not None else "(tesis yok)") for pid, fname in rows}
+
+
+def facility_names_by_project(company_id: int) -> Dict[int, str]:
+    """project_id -> tesis adı (tek sorgu; proje başına ayrı lookup yerine)."""
+    return _facility_names_by_project(int(company_id), generation(KIND_PROJECTS, company_id))
+
+
+# ----------------------------
+# Uploads / evidence
+# ----------------------------
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _list_uploads(company_id: int, project_id: int, limit: int, gen: int) -> List[SimpleNamespace]:
+    with db() as s:
+        if int(project_id) not in _project_ids_for_company(s, company_id):
+            return []
+        rows = s.execute(
+            select(
+                DatasetUpload.id,
+                DatasetUpload.dataset_type,
+                DatasetUpload.original_filename,
+                DatasetUpload.data_quality_score,
+                DatasetUpload.uploaded_at,
+                DatasetUpload.sha256,
+            )
+            .where(DatasetUpload.project_id == int(project_id))
+            .order_by(DatasetUpload.uploaded_at.desc())
+            .limit(int(limit))
+        ).all()
+    return [
+        SimpleNamespace(id=r[0], dataset_type=r[1], original_filename=r[2], data_quality_score=r[3], uploaded_at=r[4], sha256=r[5])
+        for r in rows
+    ]
+
+
+def list_uploads(company_id: int, project_id: int, limit: int = 300) -> List[SimpleNamespace]:
+    return _list_uploads(int(company_id), int(project_id), int(limit), generation(KIND_UPLOADS, company_id))
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _list_evidence_docs(company_id: int, project_id: int, limit: int, gen: int) -> List[SimpleNamespace]:
+    with db() as s:
+        if int(project_id) not in _project_ids_for_company(s, company_id):
+            return []
+        rows = s.execute(
+            select(
+                EvidenceDocument.id,
+                EvidenceDocument.category,
+                EvidenceDocument.original_filename,
+                EvidenceDocument.uploaded_at,
+                EvidenceDocument.sha256,
+                EvidenceDocument.notes,
+            )
+            .where(EvidenceDocument.project_id == int(project_id))
+            .order_by(EvidenceDocument.uploaded_at.desc())
+            .limit(int(limit))
+        ).all()
+    return [
+        SimpleNamespace(id=r[0], category=r[1], original_filename=r[2], uploaded_at=r[3], sha256=r[4], notes=r[5]) for r in rows
+    ]
+
+
+def list_evidence_docs(company_id: int, project_id: int, limit: int = 300) -> List[SimpleNamespace]:
+    return _list_evidence_docs(int(company_id), int(project_id), int(limit), generation(KIND_EVIDENCE, company_id))
+
+
+# ----------------------------
+# Snapshots
+# ----------------------------
+def _snapshot_summary(sn: CalculationSnapshot, results: dict) -> Dict[str, Any]:
+    k = (results.get("kpis") or {}) if isinstance(results, dict) else {}
+    cbam = (results.get("cbam") or {}) if isinstance(results, dict) else {}
+    totals = (cbam.get("totals") or {}) if isinstance(cbam, dict) else {}
+    scen = (results.get("scenario") or {}) if isinstance(results, dict) else {}
+    return {
+        "kpis": {
+            "direct_tco2": float(k.get("direct_tco2", 0.0) or 0.0),
+            "indirect_tco2": float(k.get("indirect_tco2", 0.0) or 0.0),
+            "total_tco2": float(k.get("total_tco2", 0.0) or 0.0),
+            "cbam_cost_eur": float(k.get("cbam_cost_eur", 0.0) or 0.0),
+            "ets_cost_tl": float(k.get("ets_cost_tl", 0.0) or 0.0),
+            "precursor_tco2": float(totals.get("precursor_tco2", 0.0) or 0.0),
+        },
+        "scenario_name": str(scen.get("name") or "") if isinstance(scen, dict) else "",
+        "is_scenario": bool(scen),
+    }
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _list_snapshots(
+    company_id: int,
+    project_id: Optional[int],
+    shared_only: bool,
+    with_summary: bool,
+    limit: int,
+    gen: int,
+) -> List[SimpleNamespace]:
+    with db() as s:
+        proj_ids = _project_ids_for_company(s, company_id)
+        if not proj_ids:
+            return []
+        if project_id is not None and int(project_id) not in proj_ids:
+            return []
+        q = select(CalculationSnapshot).where(CalculationSnapshot.project_id.in_(proj_ids))
+        if project_id is not None:
+            q = q.where(CalculationSnapshot.project_id == int(project_id))
+        if shared_only:
+            q = q.where(CalculationSnapshot.shared_with_client == True)  # noqa: E712
+        snaps = s.execute(q.order_by(desc(CalculationSnapshot.created_at)).limit(int(limit))).scalars().all()
+
+        out: List[SimpleNamespace] = []
+        for sn in snaps:
+            row = SimpleNamespace(
+                id=int(sn.id),
+                project_id=int(sn.project_id),
+                created_at=sn.created_at,
+                locked=bool(sn.locked),
+                shared_with_client=bool(sn.shared_with_client),
+                input_hash=str(getattr(sn, "input_hash", "") or ""),
+                result_hash=str(getattr(sn, "result_hash", "") or ""),
+                previous_snapshot_hash=getattr(sn, "previous_snapshot_hash", None),
+            )
+            if with_summary:
+                for key, value in _snapshot_summary(sn, _read_json(sn.results_json, {})).items():
+                    setattr(row, key, value)
+            out.append(row)
+    return out
+
+
+def list_snapshots(
+    company_id: int,
+    *,
+    project_id: Optional[int] = None,
+    shared_only: bool = False,
+    with_summary: bool = False,
+    limit: int = 200,
+) -> List[SimpleNamespace]:
+    """Snapshot listesi (results_json olmadan). with_summary=True: KPI + senaryo adı önceden çıkarılır."""
+    return _list_snapshots(
+        int(company_id),
+        int(project_id) if project_id is not None else None,
+        bool(shared_only),
+        bool(with_summary),
+        int(limit),
+        generation(KIND_SNAPSHOTS, company_id),
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=64)
+def _get_snapshot(company_id: int, snapshot_id: int, gen: int) -> Optional[SimpleNamespace]:
+    with db() as s:
+        sn = s.get(CalculationSnapshot, int(snapshot_id))
+        if not sn:
+            return None
+        owner = s.execute(select(Project.company_id).where(Project.id == int(sn.project_id))).scalar()
+        if owner is None or int(owner) != int(company_id):
+            return None
+        return SimpleNamespace(
+            id=int(sn.id),
+            project_id=int(sn.project_id),
+            created_at=sn.created_at,
+            locked=bool(sn.locked),
+            shared_with_client=bool(sn.shared_with_client),
+            input_hash=str(getattr(sn, "input_hash", "") or ""),
+            result_hash=str(getattr(sn, "result_hash", "") or ""),
+            previous_snapshot_hash=getattr(sn, "previous_snapshot_hash", None),
+            results_json=sn.results_json or "{}",
+            config_json=sn.config_json or "{}",
+        )
+
+
+def get_snapshot(company_id: int, snapshot_id: int) -> Optional[SimpleNamespace]:
+    """Tek snapshot (results_json dahil). Başka tenant'a ait ise None."""
+    return _get_snapshot(int(company_id), int(snapshot_id), generation(KIND_SNAPSHOTS, company_id))
+
+
+# ----------------------------
+# CN registry
+# ----------------------------
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _list_cn_mappings(active_only: bool, gen: int) -> List[dict]:
+    from src.db.cbam_registry import CbamCnMapping
+
+    with db() as s:
+        q = select(CbamCnMapping)
+        if active_only:
+            q = q.where(CbamCnMapping.active == True)  # noqa: E712
+        q = q.order_by(CbamCnMapping.active.desc(), CbamCnMapping.priority.desc(), CbamCnMapping.cn_pattern.desc())
+        rows = s.execute(q).scalars().all()
+        return [
+            {
+                "id": r.id,
+                "cn_pattern": r.cn_pattern,
+                "match_type": r.match_type,
+                "cbam_good_key": r.cbam_good_key,
+                "cbam_good_name": r.cbam_good_name,
+                "priority": r.priority,
+                "active": bool(r.active),
+                "notes": r.notes or "",
+                "updated_at": (r.updated_at.isoformat(timespec="seconds") if getattr(r, "updated_at", None) else None),
+            }
+            for r in rows
+        ]
+
+
+def list_cn_mappings(active_only: bool = False) -> List[dict]:
+    """CN registry global (tenant'a bağlı değil)."""
+    return _list_cn_mappings(bool(active_only), generation(KIND_CN_REGISTRY, _GLOBAL_SCOPE))
+
+
+def invalidate_cn_registry() -> None:
+    invalidate(_GLOBAL_SCOPE, KIND_CN_REGISTRY)
@@ -11,16 +11,7 @@ def _set_test_db(path: str):
     import src.db.session as session_mod
 
     session_mod.DB_PATH = path
-    session_mod.DATABASE_URL = f"sqlite:///{path}"
-    session_mod.engine.dispose()
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-
-    session_mod.engine = create_engine(
-        session_mod.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-    )
-    session_mod.SessionLocal = sessionmaker(bind=session_mod.engine, autoflush=False, autocommit=False)
+    session_mod.configure_engine(f"sqlite:///{path}")
     return session_mod
 
 
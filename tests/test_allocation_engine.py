@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engine.allocation import (
+    RESULT_ALLOCATION_COLUMNS,
+    allocate_product_emissions,
+    allocation_map_from_df,
+    allocation_matrix,
+    result_allocation_view,
+)
+
+
+def _prod():
+    return pd.DataFrame(
+        {
+            "sku": ["A", "B", "A", "B"],
+            "month": ["2025-01", "2025-01", "2025-02", "2025-02"],
+            "quantity": [10.0, 30.0, 20.0, 20.0],
+            "mass_kg": [1000.0, 1000.0, 2000.0, 0.0],
+            "revenue_eur": [100.0, 300.0, 0.0, 600.0],
+            "energy_content_gj_per_unit": [1.0, 2.0, 1.0, 2.0],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "method,basis,weights",
+    [
+        ("quantity_based", "quantity", [10, 30, 20, 20]),
+        ("mass", "mass", [1, 1, 2, 0]),
+        ("economic", "economic", [100, 300, 0, 600]),
+        ("energy-content", "energy", [10, 60, 20, 40]),
+    ],
+)
+def test_basis_methods(method, basis, weights):
+    df, meta = allocate_product_emissions(_prod(), scope1_tco2=80.0, scope2_tco2=20.0, method=method)
+    w = np.array(weights, dtype=float)
+    assert meta["allocation_basis"] == basis
+    assert np.allclose(df["alloc_total_tco2"], 100.0 * w / w.sum())
+    assert df["alloc_total_tco2"].sum() == pytest.approx(100.0)
+
+
+def test_missing_basis_falls_back_to_quantity_and_hash_is_deterministic():
+    prod = _prod()[["sku", "quantity"]]
+    df1, m1 = allocate_product_emissions(prod, scope1_tco2=5.0, method="mass")
+    assert m1["allocation_basis"] == "quantity" and m1["allocation_method"] == "mass"
+    _, m2 = allocate_product_emissions(prod.iloc[::-1], scope1_tco2=5.0, method="mass")
+    assert m1["allocation_hash"] == m2["allocation_hash"]
+    _, m3 = allocate_product_emissions(prod, scope1_tco2=5.1, method="mass")
+    assert m3["allocation_hash"] != m1["allocation_hash"]
+
+
+def test_per_month_matrix():
+    by_month = {"2025-01": {"scope1_tco2": 40.0, "scope2_tco2": 0.0}, "2025-02": {"scope1_tco2": 10.0, "scope2_tco2": 10.0}}
+    df, meta = allocate_product_emissions(_prod(), method="quantity", emissions_by_month=by_month)
+    assert meta["per_month"] and meta["total_tco2"] == 60.0
+    mat = allocation_matrix(df)
+    assert mat.loc["A", "2025-01"] == pytest.approx(10.0)
+    assert mat.loc["B", "2025-02"] == pytest.approx(10.0)
+
+
+def test_negative_quantity_rejected_and_map_last_row_wins():
+    with pytest.raises(ValueError):
+        allocate_product_emissions(pd.DataFrame({"sku": ["A"], "quantity": [-1]}))
+    m = allocation_map_from_df(pd.DataFrame({"sku": ["A", "A"], "quantity": ["1", "x"]}))
+    assert m == {"A": {"sku": "A", "quantity": 0.0, "product_name": "", "cn_code": ""}}
+
+
+def test_per_month_carries_unmatched_months_to_annual_basis():
+    by_month = {
+        "2025-01": {"scope1_tco2": 40.0, "scope2_tco2": 0.0},
+        "2025-03": {"scope1_tco2": 16.0, "scope2_tco2": 4.0},  # üretim yok
+    }
+    df, meta = allocate_product_emissions(_prod(), method="quantity", emissions_by_month=by_month)
+    assert meta["unmatched_months"] == ["2025-03"]
+    assert meta["total_tco2"] == 60.0
+    assert df["alloc_total_tco2"].sum() == pytest.approx(60.0)
+    # A: 2025-01 payı 10/40 * 40 + yıllık payı 30/80 * 20
+    assert allocation_matrix(df).loc["A"].sum() == pytest.approx(10.0 + 7.5)
+
+
+def test_result_view_keeps_hashed_shape():
+    prod = _prod()[["sku", "quantity"]]
+    df, meta = allocate_product_emissions(prod, scope1_tco2=5.0, method="mass")
+    method, rows = result_allocation_view(df, meta)
+    assert method == "quantity"
+    assert list(rows[0]) == RESULT_ALLOCATION_COLUMNS
+    df, meta = allocate_product_emissions(_prod(), method="economic", emissions_by_month={"2025-01": {"scope1_tco2": 1.0}})
+    method, rows = result_allocation_view(df, meta)
+    assert method == "economic" and list(rows[0])[:2] == ["sku", "month"]
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+from src.db.models import CalculationSnapshot, Company, DatasetUpload, Facility, Project
+from src.db.session import db, init_db
+from src.mrv.bulk_replay import bulk_replay, plan_replay_groups
+from src.mrv.lineage import sha256_bytes
+from src.services.snapshots import lock_snapshot
+from src.services.workflow import run_full
+
+
+def _upload(project_id: int, dataset_type: str, path: Path, text: str) -> None:
+    path.write_text(text, encoding="utf-8")
+    with db() as s:
+        s.add(DatasetUpload(project_id=project_id, dataset_type=dataset_type, storage_uri=str(path), sha256=sha256_bytes(path.read_bytes()), original_filename=path.name))
+        s.commit()
+
+
+def test_bulk_replay_groups_and_reports_failures(tmp_path: Path):
+    init_db()
+    with db() as s:
+        c = Company(name="BulkCo")
+        s.add(c)
+        s.commit()
+        f = Facility(company_id=c.id, name="Tesis B", country="TR", sector="Steel")
+        s.add(f)
+        s.commit()
+        p = Project(company_id=c.id, facility_id=f.id, name="Proje B", description="")
+        s.add(p)
+        s.commit()
+        company_id, project_id = int(c.id), int(p.id)
+
+    _upload(project_id, "energy", tmp_path / "energy.csv", "energy_carrier,scope,activity_amount,emission_factor_kgco2_per_unit\nnatural_gas,1,1000,2.00\nelectricity,2,5000,0.40\n")
+    _upload(project_id, "production", tmp_path / "production.csv", "sku,quantity,export_to_eu_quantity,input_emission_factor_kg_per_unit,cbam_covered,cn_code,product_name\nSKU-A,1000,200,1.20,1,7201,Steel\n")
+
+    cfg = {"period": {"year": 2025}, "eua_price_eur_per_t": 70.0, "fx_tl_per_eur": 35.0}
+    good = run_full(project_id=project_id, config=cfg, scenario={}, methodology_id=None, created_by_user_id=None)
+    bad = run_full(project_id=project_id, config={**cfg, "eua_price_eur_per_t": 80.0}, scenario={}, methodology_id=None, created_by_user_id=None)
+    with db() as s:
+        s.get(CalculationSnapshot, int(bad.id)).result_hash = "0" * 64
+        s.commit()
+    lock_snapshot(int(good.id))
+    lock_snapshot(int(bad.id))
+
+    groups = plan_replay_groups([int(good.id), int(bad.id)])
+    assert len(groups) == 1 and len(groups[0]["payloads"]) == 2
+
+    report_path = tmp_path / "bulk.json"
+    rep = bulk_replay(company_id=company_id, processes=1, report_path=report_path)
+    assert (rep["n_snapshots"], rep["passed"], rep["failed"], rep["errors"]) == (2, 1, 1, 0)
+    assert rep["groups"][0]["datasets_loaded"] == 2
+    by_id = {it["snapshot_id"]: it for it in rep["items"]}
+    assert by_id[int(good.id)]["status"] == "pass"
+    assert by_id[int(bad.id)]["status"] == "fail" and by_id[int(bad.id)]["result_hash_match"] is False
+    assert json.loads(report_path.read_text(encoding="utf-8"))["failed"] == 1
+
+    # eksik id ayrı satırda hata olarak raporlanır, diğerleri yine doğrulanır (process pool üzerinden)
+    rep2 = bulk_replay(snapshot_ids=[int(good.id), 987654], processes=2, report_path=tmp_path / "bulk2.json")
+    assert rep2["passed"] == 1 and rep2["errors"] == 1 and rep2["ok"] is False
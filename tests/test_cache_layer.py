@@ -0,0 +1,112 @@
+import threading
+import time
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.orm import declarative_base
+
+import src.db.session as session_mod
+from src.services.cache_layer import DBCacheStore, DiskCacheStore, MemoryLRU, TieredCache
+
+
+def test_lru_evicts_by_size():
+    lru = MemoryLRU(max_bytes=30)
+    lru.set("a", "x" * 10, None)
+    lru.set("b", "y" * 10, None)
+    lru.get("a")  # a en son kullanılan
+    lru.set("c", "z" * 15, None)
+    assert lru.get("b") is None
+    assert lru.get("a") == "x" * 10
+    assert lru.size_bytes <= 30
+
+
+def test_tiered_cache_namespaces_bulk_and_l2_fallback(tmp_path):
+    cache = TieredCache(l1=MemoryLRU(), l2=DiskCacheStore(str(tmp_path)))
+    cache.set_many({"k1": {"v": 1}, "k2": {"v": 2}}, ttl_seconds=60, namespace="t1")
+    assert cache.get("k1", namespace="t2") is None
+
+    cache.l1.clear()
+    got = cache.get_many(["k1", "k2", "k3"], namespace="t1")
+    assert got == {"k1": {"v": 1}, "k2": {"v": 2}}
+    st = cache.stats()
+    assert st["l2_hits"] == 2 and st["misses"] == 2
+
+    # artık L1'den
+    assert cache.get("k1", namespace="t1") == {"v": 1}
+    assert cache.stats()["l1_hits"] == 1
+
+    cache.clear_namespace("t1")
+    assert cache.get("k2", namespace="t1") is None
+
+
+def test_get_or_set_single_flight():
+    cache = TieredCache(l1=MemoryLRU(), l2=None)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"x": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"x": 42}] * 8
+
+
+_TestBase = declarative_base()
+
+
+class _TestCacheEntry(_TestBase):
+    # production_step2_models ana metadata'ya ikinci bir "jobs" tablosu ekler; burada izole tablo
+    __tablename__ = "cache_entries_ns_test"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(300), unique=True, nullable=False)
+    value_json = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class _TestDBStore(DBCacheStore):
+    def _model(self):
+        return _TestCacheEntry
+
+
+def test_db_clear_namespace_escapes_like_and_separator():
+    _TestBase.metadata.create_all(session_mod.engine)
+    cache = TieredCache(l1=MemoryLRU(), l2=_TestDBStore())
+    names = ("a_b", "axb", "a%", "a", "a:b", "a1")
+    for ns in names:
+        cache.set("k", {"ns": ns}, ttl_seconds=60, namespace=ns)
+    cache.clear_namespace("a_b")
+    cache.clear_namespace("a%")
+    cache.clear_namespace("a")
+    cache.l1.clear()
+    assert cache.stats()["l2_errors"] == 0
+    left = {ns for ns in names if cache.get("k", namespace=ns) is not None}
+    assert left == {"axb", "a:b", "a1"}
+
+
+def test_default_namespace_does_not_collide_with_named_namespaces(tmp_path):
+    cache = TieredCache(l1=MemoryLRU(), l2=DiskCacheStore(str(tmp_path)))
+    cache.set("a:k", {"v": "default"}, ttl_seconds=60)
+    cache.set("k", {"v": "a"}, ttl_seconds=60, namespace="a")
+    cache.set("k", {"v": "%default"}, ttl_seconds=60, namespace="%default")
+    for _ in range(2):  # L1 ve L2'den aynı sonuç
+        assert cache.get("a:k") == {"v": "default"}
+        assert cache.get("a:k", namespace="default") == {"v": "default"}
+        assert cache.get("k", namespace="a") == {"v": "a"}
+        assert cache.get("k", namespace="%default") == {"v": "%default"}
+        assert cache.get("k") is None
+        cache.l1.clear()
+
+    cache.clear_namespace("a")
+    assert cache.get("a:k") == {"v": "default"}
+    cache.clear_namespace("default")
+    cache.l1.clear()
+    assert cache.get("a:k") is None
+    assert cache.get("k", namespace="%default") == {"v": "%default"}
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from src.engine.cbam_precursor import compute_precursor_tco2_by_sku, parse_precursor_edges
+from src.mrv.lineage import sha256_json
+
+
+def test_row_hash_matches_sha256_json():
+    mat = pd.DataFrame(
+        {
+            "sku": ["A", "A", "B"],
+            "precursor_sku": ["B", "C", "Ç-ş"],
+            "precursor_quantity": [1.5, "2", None],
+            "precursor_embedded_tco2": [0.1 + 0.2, 0.0, 3.0],
+        }
+    )
+    edges = parse_precursor_edges(mat)
+    assert [e.sku for e in edges] == ["A", "A", "B"]
+    for e in edges:
+        d = e.to_dict()
+        d.pop("source_row_hash")
+        assert e.source_row_hash == sha256_json(d)
+
+
+def _chain_inputs():
+    # A <- B <- C ; C has its own embedded emissions only
+    prod = pd.DataFrame({"sku": ["A", "B", "C"], "quantity": [10.0, 20.0, 40.0]})
+    mat = pd.DataFrame(
+        {
+            "sku": ["A", "B"],
+            "precursor_sku": ["B", "C"],
+            "precursor_quantity": [10.0, 20.0],
+            "precursor_embedded_tco2": [0.0, 0.0],
+        }
+    )
+    return prod, mat, {"A": 1.0, "B": 4.0, "C": 8.0}
+
+
+def test_multi_level_chain_keeps_single_level_semantics_by_default():
+    prod, mat, emb = _chain_inputs()
+    pm, meta = compute_precursor_tco2_by_sku(production_df=prod, materials_df=mat, embedded_tco2_by_sku=emb)
+    assert pm["B"] == 8.0 * 20.0 / 40.0
+    # A uses half of B's output -> half of B's own embedded only (engine-3.0.0 davranışı)
+    assert pm["A"] == 4.0 * 10.0 / 20.0
+    assert meta["precursor_method"] == "explicit+chain" and meta["cycle_nodes"] == []
+
+
+def test_multi_level_chain_propagates_in_one_pass_when_enabled():
+    prod, mat, emb = _chain_inputs()
+    pm, meta = compute_precursor_tco2_by_sku(production_df=prod, materials_df=mat, embedded_tco2_by_sku=emb, propagate_chain=True)
+    assert pm["B"] == 8.0 * 20.0 / 40.0
+    # A uses half of B's output -> half of B's full embedded (own + precursor)
+    assert pm["A"] == (4.0 + 4.0) * 10.0 / 20.0
+    assert meta["precursor_method"] == "explicit+chain_propagated"
+
+
+def test_cycle_nodes_reported():
+    prod = pd.DataFrame({"sku": ["A", "B"], "quantity": [1.0, 1.0]})
+    mat = pd.DataFrame({"sku": ["A", "B"], "precursor_sku": ["B", "A"], "precursor_quantity": [1.0, 1.0]})
+    _, meta = compute_precursor_tco2_by_sku(production_df=prod, materials_df=mat, embedded_tco2_by_sku={})
+    assert meta["cycle_nodes"] == ["A", "B"]
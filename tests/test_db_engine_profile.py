@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+
+def test_sqlite_engine_uses_wal_and_pragmas(db_session):
+    import src.db.session as session_mod
+
+    with session_mod.engine.connect() as conn:
+        assert str(conn.execute(text("PRAGMA journal_mode")).scalar()).lower() == "wal"
+        # NORMAL == 1
+        assert int(conn.execute(text("PRAGMA synchronous")).scalar()) == 1
+        assert int(conn.execute(text("PRAGMA busy_timeout")).scalar()) >= 1000
+
+    m = session_mod.get_pool_metrics()
+    assert m["backend"] == "sqlite"
+    assert m["checkouts"] >= 1
+    assert m["checkins"] >= 1
+
+
+def test_postgres_engine_options_use_tuned_queue_pool(monkeypatch):
+    from src.db.session import MeteredQueuePool, engine_options
+
+    monkeypatch.setenv("CME_DB_POOL_SIZE", "7")
+    opts = engine_options("postgresql+psycopg://u:p@localhost:5432/cme")
+    assert opts["poolclass"] is MeteredQueuePool
+    assert opts["pool_size"] == 7
+    assert opts["pool_pre_ping"] is True
+    assert opts["pool_recycle"] > 0
+
+
+@pytest.mark.skipif(not os.getenv("CME_TEST_POSTGRES_URL"), reason="CME_TEST_POSTGRES_URL yok (lokal Postgres container)")
+def test_postgres_engine_roundtrip():
+    from src.db.session import build_engine
+
+    eng = build_engine(os.environ["CME_TEST_POSTGRES_URL"])
+    try:
+        with eng.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+    finally:
+        eng.dispose()
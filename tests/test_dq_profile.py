@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from src.mrv.data_quality_engine import _to_float, profile_frame, run_data_quality_engine
+from src.services.ingestion import data_quality_assess
+
+
+def _energy(n: int = 120) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    q = rng.lognormal(3, 0.5, n).astype(object)
+    q[::17] = None
+    q[5] = "abc"
+    q[6] = "1_000"
+    q[7] = " 12 "
+    x = rng.normal(size=n)
+    x[::25] = 80.0
+    return pd.DataFrame(
+        {
+            "month": [f"2025-{(i % 12) + 1:02d}" for i in range(n)],
+            "facility_id": 1,
+            "fuel_type": "natural_gas",
+            "fuel": "natural_gas",
+            "quantity": q,
+            "fuel_unit": "m3",
+            "x": x,
+        }
+    )
+
+
+def _legacy_outliers(df: pd.DataFrame) -> int:
+    n = 0
+    for c in df.columns:
+        try:
+            pd.to_numeric(df[c].dropna().head(50), errors="raise")
+        except Exception:
+            continue
+        vals = pd.to_numeric(df[c], errors="coerce").dropna()
+        if len(vals) < 20:
+            continue
+        q1, q3 = vals.quantile(0.25), vals.quantile(0.75)
+        iqr = q3 - q1
+        if iqr > 0:
+            n += int(((vals < q1 - 3 * iqr) | (vals > q3 + 3 * iqr)).sum())
+    return n
+
+
+def test_profile_matches_row_wise_conversions():
+    df = _energy()
+    prof = profile_frame(df)
+    assert prof.floats("quantity").tolist() == df["quantity"].apply(_to_float).tolist()
+    assert prof.missing_ratio() == float(df.isna().mean().mean())
+    assert prof.numeric_columns() == ["facility_id", "x"]
+    assert sum(v["outliers"] for v in prof.iqr_outliers().values()) == _legacy_outliers(df)
+    assert prof.months() == sorted({str(m) for m in df["month"]})
+
+
+def test_assess_and_engine_outputs_are_stable():
+    df = _energy()
+    score, rep = data_quality_assess("energy", df)
+    ids = [c["id"] for c in rep["checks"]]
+    assert ids == ["missingness", "schema", "outliers_iqr", "completeness", "completeness", "completeness", "anomaly"]
+    assert rep["checks"][2]["details"]["outlier_count"] == _legacy_outliers(df) > 0
+    assert score == 100 - min(10, 3 + _legacy_outliers(df) // 10)
+
+    prod = pd.DataFrame({"month": df["month"][:60], "product_code": "CEM", "quantity": 0.0})
+    out = run_data_quality_engine(energy_df=df, production_df=prod)
+    by_id = {c["check_id"]: c for c in out["checks"]}
+    assert by_id["DQ.COMP.MONTHS.MATCH"]["status"] == "PASS"
+    cross = by_id["DQ.CROSS.PRODUCTION.ZERO_ENERGY.NONZERO"]
+    assert cross["details"]["energy_total"] == float(df["quantity"].apply(_to_float).sum())
+
+
+def test_duplicate_quantity_labels_match_row_wise_engine():
+    e = pd.DataFrame(np.arange(16, dtype=float).reshape(8, 2), columns=["quantity", "quantity"])
+    e.insert(0, "month", [f"2025-{i + 1:02d}" for i in range(8)])
+    p = pd.DataFrame({"month": e["month"], "quantity": [1.0] * 8})
+    prof = profile_frame(e)
+    assert prof.floats("quantity").tolist() == e["quantity"].apply(_to_float).tolist()
+    assert prof.numeric_columns() == []
+    out = run_data_quality_engine(energy_df=e, production_df=p)
+    by_id = {c["check_id"]: c for c in out["checks"]}
+    assert by_id["DQ.CROSS.PRODUCTION.ENERGY.BASIC"]["details"] == {"energy_total": 0.0, "production_total": 8.0}
+    assert out["qa_flags"] == []
+    score, rep = data_quality_assess("energy", e)
+    assert rep["checks"][0]["id"] == "missingness"
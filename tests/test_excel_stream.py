@@ -0,0 +1,173 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from src.connectors.excel_connector import load_excel
+from src.connectors.excel_stream import iter_sheet_chunks, read_sheet, read_sheets
+from src.db.job_models import Job
+from src.db.models import Company, DatasetUpload, Facility, Project
+from src.db.session import db, init_db
+from src.services import excel_ingestion_service, worker
+from src.services.excel_ingestion_service import MRV_TEMPLATE, submit_excel_import
+from src.services.ingestion import read_xlsx_sheets
+from src.services.job_queue import job_status
+
+
+def _xlsx(sheets: dict) -> bytes:
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for r in rows:
+            ws.append(r)
+    b = io.BytesIO()
+    wb.save(b)
+    return b.getvalue()
+
+
+def _energy_rows(n: int) -> list:
+    rows = [["month", "facility_id", "fuel_type", "fuel_quantity", "fuel_unit", "code", "day"]]
+    for i in range(n):
+        rows.append([f"2025-{i % 12 + 1:02d}", "F001", "natural_gas", None if i % 9 == 0 else i * 1.5, "Nm3", str(1000 + i), datetime(2025, 1, 1) + timedelta(days=i)])
+    rows.append([None] * 7)  # ara boş satır
+    rows.append(["2025-12", "F001", "coal", 3, "t", "A-1", None])
+    return rows
+
+
+def test_chunked_read_matches_read_excel():
+    b = _xlsx({"energy": _energy_rows(40)})
+    expected = pd.read_excel(io.BytesIO(b))
+    for chunk_rows in (1, 7, 5000):
+        pd.testing.assert_frame_equal(read_sheet(b, chunk_rows=chunk_rows), expected)
+    chunks = list(iter_sheet_chunks(b, chunk_rows=10))
+    assert [len(c) for c in chunks] == [10, 10, 10, 10, 2]
+    assert chunks[-1].index[0] == 40
+
+
+def test_blank_rows_and_mixed_inference_match_read_excel():
+    one_col = _xlsx({"s": [["code"], ["A"], [None], ["B"]]})
+    for chunk_rows in (1, 2, 5000):
+        got = read_sheet(one_col, chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(got, pd.read_excel(io.BytesIO(one_col)))
+    assert len(got) == 3
+
+    # "True"+boş tek parçada object(True, NaN) olur; dtype aynı (object) olsa da değerden yakalanır
+    mixed = _xlsx({"s": [["flag", "v"], ["True", 1], [None, 2], ["abc", 3], [None, None], ["1001", 4]]})
+    for chunk_rows in (1, 2, 3):
+        got = read_sheet(mixed, chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(got, pd.read_excel(io.BytesIO(mixed)))
+    assert got["flag"].tolist()[0] == "True"
+
+
+def test_chunked_read_fuzz_against_read_excel():
+    rng = np.random.default_rng(11)
+    pool = [None, None, "", "True", "False", "abc", "1001", "1.5", "NA", 7, 2.5, True, datetime(2025, 3, 1)]
+    for _ in range(25):
+        width = int(rng.integers(1, 4))
+        rows = [[f"c{j}" for j in range(width)]]
+        for _ in range(int(rng.integers(1, 12))):
+            rows.append([pool[int(rng.integers(len(pool)))] for _ in range(int(rng.integers(0, width + 2)))])
+        b = _xlsx({"s": rows})
+        expected = pd.read_excel(io.BytesIO(b))
+        for chunk_rows in (1, 2, 3, 5000):
+            pd.testing.assert_frame_equal(read_sheet(b, chunk_rows=chunk_rows), expected)
+
+
+def test_load_excel_rejects_bad_schema_and_reads_sheets_in_parallel():
+    with pytest.raises(ValueError, match="Eksik zorunlu kolonlar"):
+        load_excel(io.BytesIO(_xlsx({"energy": [["month", "x"], ["2025-01", 1]]})), "energy")
+
+    b = _xlsx({"energy": _energy_rows(30), "Notes": [["a"], [1]], "production": [["month", "facility_id", "product_code", "quantity", "unit"], ["2025-01", "F001", "CEM", 5, "t"]]})
+    seq = read_xlsx_sheets(b)
+    assert list(seq) == ["energy", "production"]
+    par = read_sheets(b, ["energy", "production"], processes=2)
+    for name in ("energy", "production"):
+        pd.testing.assert_frame_equal(par[name], pd.read_excel(io.BytesIO(b), sheet_name=name))
+        pd.testing.assert_frame_equal(seq[name], par[name])
+
+
+def _project() -> int:
+    with db() as s:
+        c = Company(name="XlsxCo")
+        s.add(c)
+        s.commit()
+        f = Facility(company_id=c.id, name="Tesis X")
+        s.add(f)
+        s.commit()
+        p = Project(company_id=c.id, facility_id=f.id, name="Proje X")
+        s.add(p)
+        s.commit()
+        return int(p.id)
+
+
+def test_large_template_import_runs_as_job_with_progress(tmp_path, monkeypatch):
+    init_db()
+    monkeypatch.setattr(excel_ingestion_service, "UPLOAD_DIR", tmp_path)
+    pid = _project()
+    b = _xlsx({"energy": _energy_rows(20), "production": [["month", "facility_id", "product_code", "quantity", "unit"], ["2025-01", "F001", "CEM", 5, "t"]]})
+    sub = submit_excel_import(project_id=pid, dataset_type=MRV_TEMPLATE, xlsx_bytes=b, original_filename="mrv.xlsx", run_async=True)
+    assert sub["mode"] == "job"
+    assert job_status(sub["job_id"])["status"] == "queued"
+
+    seen = []
+    orig = worker._HANDLERS["excel_import"]
+
+    def _spy(payload):
+        from src.services import job_queue
+
+        real = job_queue.set_progress
+
+        def _rec(job_id, **progress):
+            real(job_id, **progress)
+            seen.append(job_status(job_id)["progress"])
+
+        job_queue.set_progress = _rec
+        try:
+            return orig(payload)
+        finally:
+            job_queue.set_progress = real
+
+    worker.register("excel_import", _spy)
+    try:
+        while worker.run_once():
+            pass
+    finally:
+        worker.register("excel_import", orig)
+
+    st = job_status(sub["job_id"])
+    assert st["status"] == "succeeded", st["error"]
+    assert [r["dataset_type"] for r in st["result"]["sheets"]] == ["energy", "production"]
+    assert any(p.get("stage") == "ingesting" for p in seen) and seen[-1]["stage"] == "done"
+    with db() as s:
+        assert s.query(DatasetUpload).filter(DatasetUpload.project_id == pid).count() == 2
+        assert json.loads(s.get(Job, sub["job_id"]).payload_json)["dataset_type"] == MRV_TEMPLATE
+    assert not list(tmp_path.glob("project_*/_pending/*"))
+
+
+def test_import_job_surfaces_invalid_sheets_and_cleans_staging(tmp_path, monkeypatch):
+    init_db()
+    monkeypatch.setattr(excel_ingestion_service, "UPLOAD_DIR", tmp_path)
+    pid = _project()
+
+    # production sheet'inde zorunlu kolon eksik: kaydedilmez, hata job sonucunda döner
+    b = _xlsx({"energy": _energy_rows(5), "production": [["month", "facility_id", "quantity"], ["2025-01", "F001", 5]]})
+    sub = submit_excel_import(project_id=pid, dataset_type=MRV_TEMPLATE, xlsx_bytes=b, original_filename="mrv.xlsx", run_async=True)
+    while worker.run_once():
+        pass
+    res = job_status(sub["job_id"])["result"]
+    assert res["validated"] is False
+    assert list(res["errors"]) == ["production"] and res["errors"]["production"]
+    with db() as s:
+        assert s.query(DatasetUpload).filter(DatasetUpload.project_id == pid).count() == 1
+
+    # job hata verse de staging dosyası silinir
+    bad = submit_excel_import(project_id=pid, dataset_type=MRV_TEMPLATE, xlsx_bytes=_xlsx({"energy": _energy_rows(3)}), original_filename="eksik.xlsx", run_async=True)
+    while worker.run_once():
+        pass
+    assert job_status(bad["job_id"])["status"] == "failed"
+    assert not list(tmp_path.glob("project_*/_pending/*"))
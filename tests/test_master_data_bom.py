@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.master_data import models as md_models  # noqa: F401  (tabloları metadata'ya ekler)
+from src.master_data.bom_graph import BOMAdjacencyIndex, BOMGraph, Edge, topological_order
+from src.master_data.schemas import BOMEdgeUpsert
+from src.master_data.service import _BOM_INDEX_CACHE, MasterDataService, invalidate_bom_index
+from src.master_data.validator import MasterDataValidationError
+
+
+def _edge(p, c):
+    return BOMEdgeUpsert(parent_product_id=p, child_product_id=c, ratio=1.0, valid_from=datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+
+@pytest.fixture()
+def svc(db_session):
+    from src.db.models import Company
+
+    c = Company(name="BOM Co")
+    db_session.add(c)
+    db_session.commit()
+    invalidate_bom_index()
+    return MasterDataService(db_session, company_id=c.id)
+
+
+def test_deep_chain_has_no_recursion_limit():
+    n = 20_000
+    g = BOMGraph([Edge(i, i + 1) for i in range(n)])
+    assert not g.has_cycle()
+    g2 = BOMGraph([Edge(i, i + 1) for i in range(n)] + [Edge(n, 0)])
+    assert g2.has_cycle()
+    order, cyclic = topological_order({1: [2, 3], 2: [3]})
+    assert order == [1, 2, 3] and cyclic == []
+
+
+def test_adjacency_index_reachability():
+    idx = BOMAdjacencyIndex([(1, 2), (2, 3)])
+    assert idx.would_create_cycle(3, 1)
+    assert not idx.would_create_cycle(1, 3)
+    assert not idx.would_create_cycle(1, 2)  # mevcut kenar (yeni versiyon)
+
+
+def test_upsert_incremental_cycle_check(svc):
+    svc.upsert_bom_edge(_edge(1, 2))
+    svc.upsert_bom_edge(_edge(2, 3))
+    with pytest.raises(MasterDataValidationError):
+        svc.upsert_bom_edge(_edge(3, 1))
+    out = svc.upsert_bom_edge(_edge(1, 2))
+    assert out["version"] == 2
+    assert len(svc.list_bom_edges()) == 2
+
+
+def test_bom_index_cache_ignores_rolled_back_edges(svc, db_session):
+    svc.upsert_bom_edge(_edge(1, 2))
+    db_session.commit()
+    assert _BOM_INDEX_CACHE[svc.company_id].has_edge(1, 2)
+
+    svc.upsert_bom_edge(_edge(2, 3))
+    assert not _BOM_INDEX_CACHE[svc.company_id].has_edge(2, 3)  # commit öncesi paylaşılan indeks değişmez
+    db_session.rollback()
+    assert not _BOM_INDEX_CACHE[svc.company_id].has_edge(2, 3)
+
+    # rollback sonrası id yeniden kullanılabilir: fingerprint eşleşse de 2->3 indekse girmemiş olmalı
+    svc.upsert_bom_edge(_edge(2, 4))
+    db_session.commit()
+    idx = _BOM_INDEX_CACHE[svc.company_id]
+    assert idx.has_edge(2, 4) and not idx.has_edge(2, 3)
+    assert idx.fingerprint == svc.repo.active_bom_fingerprint(svc.company_id)
+    svc.upsert_bom_edge(_edge(3, 1))  # 2->3 olmadığı için döngü yok
+    db_session.commit()
+    assert len(svc.list_bom_edges()) == 3
+
+
+def test_bulk_upsert_validates_whole_set(svc):
+    svc.upsert_bom_edge(_edge(1, 2))
+    res = svc.bulk_upsert_bom_edges([_edge(2, 3), _edge(3, 4), _edge(1, 2)])
+    assert res["created"] == 2 and res["updated"] == 1
+    assert len(svc.list_bom_edges()) == 3
+
+    with pytest.raises(MasterDataValidationError):
+        svc.bulk_upsert_bom_edges([_edge(4, 5), _edge(5, 1)])
+    with pytest.raises(MasterDataValidationError):
+        svc.bulk_upsert_bom_edges([_edge(6, 7), _edge(6, 7)])
+    assert len(svc.list_bom_edges()) == 3
+
+    # bulk sonrası artımlı kontrol yeni kenarları görür
+    with pytest.raises(MasterDataValidationError):
+        svc.upsert_bom_edge(_edge(4, 1))
+
+
+def _diamond_ladder(levels):
+    # her seviyede iki düğüm; yol sayısı 2**levels
+    edges = []
+    for k in range(levels):
+        a, b = 2 * k + 1, 2 * k + 2
+        for nxt in (2 * k + 3, 2 * k + 4):
+            edges.append(Edge(a, nxt, 1.0))
+            edges.append(Edge(b, nxt, 1.0))
+    edges += [Edge(0, 1, 1.0), Edge(0, 2, 1.0)]
+    return BOMGraph(edges)
+
+
+def test_rollup_is_linear_on_diamonds():
+    g = _diamond_ladder(40)  # 2**40 yol; enumerate edilemez
+    qty = g.rollup_quantities(0, 1.0)
+    assert qty[1] == 1.0 and qty[3] == 2.0 and qty[5] == 4.0
+    emb = g.rollup_embedded({n: 0.0 for n in qty} | {81: 1.0, 82: 1.0})
+    assert emb[79] == 2.0 and emb[0] == 2.0 ** 41
+    assert g.subgraph_order(3) is g.subgraph_order(3)
+
+
+def test_iter_paths_streams_with_cap_and_depth_limit():
+    g = _diamond_ladder(40)
+    paths = list(g.iter_paths(0, depth_limit=100, max_paths=5))
+    assert len(paths) == 5 and paths[0][0] == 0
+    g2 = BOMGraph([Edge(1, 2), Edge(1, 3), Edge(2, 4)])
+    assert list(g2.iter_paths(1)) == [[1, 2, 4], [1, 3]]
+    assert list(g2.iter_paths(1, depth_limit=1)) == [[1, 3]]
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from src.engine.monte_carlo import CostModel, MarketModel, UncertainSource, simulate, sources_from_results
+from src.compliance.ets_engine import build_ets_reporting_dataset
+from src.mrv.orchestrator import energy_stream_summary
+from src.services.carbon_cost_engine import compute_carbon_cost_report
+
+
+def _run(**kw):
+    sources = [
+        UncertainSource("gas", 8000.0, activity_tier=3, factor_uncertainty_pct=2.0, factor_group="gas"),
+        UncertainSource("coal", 2000.0, activity_tier=1, factor_uncertainty_pct=5.0, factor_group="coal"),
+        UncertainSource("grid", 3000.0, scope="indirect", activity_tier=4, factor_uncertainty_pct=10.0),
+    ]
+    market = MarketModel(eua_price_eur_per_t=80.0, fx_try_per_eur=35.0, eua_fx_correlation=0.3)
+    cost = CostModel(reporting_year=2030, free_allocation_tco2=1000.0, embedded_to_total_ratio=0.4)
+    return simulate(sources, market, cost, **kw)
+
+
+def test_reproducible_from_seed():
+    a = _run(n_draws=30_000, seed=7, chunk_size=7_000)
+    b = _run(n_draws=30_000, seed=7, chunk_size=7_000)
+    c = _run(n_draws=30_000, seed=8, chunk_size=7_000)
+    assert a["result_hash"] == b["result_hash"]
+    assert a["result_hash"] != c["result_hash"]
+
+
+def test_distribution_is_centered_and_var_positive():
+    r = _run(n_draws=100_000, seed=1)
+    em = r["emissions_tco2"]
+    assert em["mean"] == pytest.approx(13000.0, rel=5e-3)
+    assert em["p5"] < em["p50"] < em["p95"]
+    # analitik ve MC %95 belirsizliği yakın
+    u = r["emissions_uncertainty_pct_95"]
+    assert u["monte_carlo"] == pytest.approx(u["analytic_sqrt_sum_squares"], rel=0.1)
+    assert r["eua_price_eur_per_t"]["mean"] == pytest.approx(80.0, rel=1e-2)
+    assert r["total_cost_eur"]["var95"] > 0
+    assert r["total_cost_eur"]["es95"] >= r["total_cost_eur"]["p95"]
+
+
+def test_carbon_cost_report_risk_block():
+    res = {"kpis": {"scope1_tco2": 5000.0, "scope2_tco2": 1000.0}, "cbam": {"embedded_emissions_tco2e": 2000.0}}
+    cfg = {"year": 2030, "fx_tl_per_eur": 35.0, "eua_price_eur_per_t": 90.0,
+           "uncertainty": {"monte_carlo": {"n_draws": 5000, "seed": 3}}}
+    rep = compute_carbon_cost_report(snapshot_id=1, project_id=1, results_json=res, config=cfg).to_dict()
+    assert rep["risk"]["inputs"]["n_draws"] == 5000
+    assert np.isfinite(rep["risk"]["total_cost_try"]["p95"])
+    plain = compute_carbon_cost_report(snapshot_id=1, project_id=1, results_json=res, config={"year": 2030}).to_dict()
+    assert "risk" not in plain
+
+
+def test_sources_are_built_per_stream():
+    res = {
+        "kpis": {"scope1_tco2": 110.0, "scope2_tco2": 40.0},
+        "energy": {
+            "direct_rows": [
+                {"month": "2025-01", "fuel_type": "natural_gas", "tco2": 60.0},
+                {"month": "2025-02", "fuel_type": "natural_gas", "tco2": 20.0},
+                {"month": "2025-01", "fuel_type": "Coal", "tco2": 20.0},
+            ],
+            "indirect_rows": [{"month": "2025-01", "mwh": 100.0, "tco2": 40.0, "method": "location"}],
+        },
+    }
+    srcs = sources_from_results(res, {"activity_tier": {"fuel:coal": 1, "direct": 3}, "factor_uncertainty_pct": {"natural_gas": 1.5}})
+    by_name = {s.name: s for s in srcs}
+    assert sorted(by_name) == ["direct", "electricity:location", "fuel:coal", "fuel:natural_gas"]
+    assert by_name["fuel:natural_gas"].base_tco2 == 80.0 and by_name["fuel:natural_gas"].factor_uncertainty_pct == 1.5
+    assert by_name["fuel:coal"].activity_tier == 1 and by_name["fuel:natural_gas"].activity_tier == 3
+    assert by_name["direct"].base_tco2 == pytest.approx(10.0)  # satırlarla karşılanmayan kısım
+    assert sum(s.base_tco2 for s in srcs) == pytest.approx(150.0)
+    # satır yoksa scope başına tek kaynak
+    assert [s.name for s in sources_from_results({"kpis": res["kpis"]})] == ["direct", "indirect"]
+
+
+def test_persisted_energy_summary_keeps_stream_results():
+    raw = {
+        "direct_tco2": 100.0,
+        "indirect_tco2": 40.0,
+        "total_tco2": 140.0,
+        "direct_rows": [
+            {"month": m, "fuel_type": ft, "unit": "m3", "quantity": q, "gj": q * 0.038, "tco2": t, "factor_meta": {"ef": {"id": 1}}}
+            for m, ft, q, t in [("2025-01", "natural_gas", 500.0, 60.0), ("2025-02", "natural_gas", 200.0, 20.0), ("2025-01", "Coal", 80.0, 20.0)]
+        ],
+        "indirect_rows": [
+            {"month": m, "mwh": 50.0, "tco2": 20.0, "method": "location", "factor_meta": {}} for m in ("2025-01", "2025-02")
+        ],
+        "factor_refs": [{"factor_type": "natural_gas"}],
+    }
+    summary = energy_stream_summary(raw)
+    assert (summary["direct_tco2"], summary["indirect_tco2"], summary["total_tco2"]) == (100.0, 40.0, 140.0)
+    assert len(summary["direct_rows"]) == 2 and len(summary["indirect_rows"]) == 1
+    assert all("month" not in r and "factor_meta" not in r for r in summary["direct_rows"] + summary["indirect_rows"])
+
+    kpis = {"scope1_tco2": 100.0, "scope2_tco2": 40.0}
+    cfg = {"activity_tier": {"fuel:coal": 1}}
+    full = sources_from_results({"kpis": kpis, "energy": raw}, cfg)
+    assert sources_from_results({"kpis": kpis, "energy": summary}, cfg) == full
+
+    def _streams(energy):
+        rep = build_ets_reporting_dataset(project_id=1, snapshot_id=1, results={"kpis": kpis, "energy": energy}, config={})
+        return [{k: s[k] for k in ("stream_id", "activity_data", "unit", "emissions_tco2")} for s in rep["source_streams"]]
+
+    assert _streams(summary) == _streams(raw)
@@ -0,0 +1,107 @@
+import itertools
+
+from src.engine.optimizer import Option, benchmark_solvers, build_optimizer_payload, generate_catalog, optimize_portfolio
+from src.erp.intelligence.abatement_library import default_library, to_optimizer_measures
+
+
+def _brute_max_reduction(cat, cap):
+    best = 0.0
+    for k in range(len(cat) + 1):
+        for comb in itertools.combinations(cat, k):
+            if sum(o.capex_eur for o in comb) > cap + 1e-6:
+                continue
+            groups = [o.exclusive_group for o in comb if o.exclusive_group]
+            ids = {o.id for o in comb}
+            if len(groups) != len(set(groups)) or any(r not in ids for o in comb for r in o.requires):
+                continue
+            best = max(best, sum(o.reduction_tco2 for o in comb))
+    return best
+
+
+def test_exact_beats_greedy_when_cap_blocks_combination():
+    opts = [
+        Option("a", "A", reduction_tco2=60, capex_eur=60, opex_delta_eur_per_year=0, lifetime_years=10),
+        Option("b", "B", reduction_tco2=50, capex_eur=50, opex_delta_eur_per_year=-1, lifetime_years=10),
+        Option("c", "C", reduction_tco2=50, capex_eur=50, opex_delta_eur_per_year=-1, lifetime_years=10),
+    ]
+    greedy = optimize_portfolio(opts, target_reduction_tco2=None, max_capex_eur=100)
+    exact = optimize_portfolio(opts, target_reduction_tco2=None, max_capex_eur=100, solver="auto")
+    assert exact["summary"]["reduction_tco2"] == 100.0
+    assert exact["summary"]["reduction_tco2"] >= greedy["summary"]["reduction_tco2"]
+    assert exact["solver"]["optimal"] is True
+
+
+def test_exact_matches_brute_force_with_groups_and_dependencies():
+    for seed in range(8):
+        cat = generate_catalog(9, seed=seed, dependency_share=0.25)
+        cap = sum(o.capex_eur for o in cat) * 0.3
+        for solver in ("dp", "bnb"):
+            res = optimize_portfolio(cat, target_reduction_tco2=None, max_capex_eur=cap, solver=solver)
+            assert abs(res["summary"]["reduction_tco2"] - _brute_max_reduction(cat, cap)) < 1e-6
+
+
+def test_phasing_respects_yearly_budgets_and_earliest_year():
+    opts = [
+        Option("x", "X", reduction_tco2=10, capex_eur=80, opex_delta_eur_per_year=0, lifetime_years=10),
+        Option("y", "Y", reduction_tco2=9, capex_eur=80, opex_delta_eur_per_year=0, lifetime_years=10, earliest_year=2027),
+        Option("z", "Z", reduction_tco2=1, capex_eur=20, opex_delta_eur_per_year=0, lifetime_years=10, earliest_year=2027),
+    ]
+    res = optimize_portfolio(
+        opts,
+        target_reduction_tco2=None,
+        max_capex_eur=None,
+        solver="auto",
+        capex_budget_by_year={2026: 100, 2027: 100},
+    )
+    years = {r["id"]: r["implementation_year"] for r in res["selected"]}
+    assert years == {"x": 2026, "y": 2027, "z": 2027}
+    assert res["summary"]["capex_by_year"] == {"2026": 80.0, "2027": 100.0}
+
+
+def test_library_exclusivity_flows_through_payload():
+    measures = to_optimizer_measures(default_library(), fx_try_per_eur=35.0)
+    payload = build_optimizer_payload(total_tco2=100_000, measures=measures, constraints={"max_capex_eur": 3_000_000})
+    ids = {r["id"] for r in payload["portfolio"]["selected"]}
+    assert not {"fuel_switch", "electrification"} <= ids
+    assert payload["portfolio"]["solver"]["method"] in ("dp_knapsack", "branch_and_bound")
+
+
+def test_benchmark_time_limit_returns_feasible_incumbent():
+    rows = benchmark_solvers(sizes=(10, 300), time_limit_s=0.2)
+    for r in rows:
+        assert r["exact_feasible"]
+        assert r["exact_reduction_tco2"] >= r["greedy_reduction_tco2"] - 1e-6 or not r["greedy_feasible"]
+
+
+def test_cyclic_requires_rejected():
+    import pytest
+
+    opts = [
+        Option("o0", "A", reduction_tco2=10, capex_eur=1, opex_delta_eur_per_year=0, lifetime_years=10, requires=("o1",)),
+        Option("o1", "B", reduction_tco2=10, capex_eur=1, opex_delta_eur_per_year=0, lifetime_years=10, requires=("o0",)),
+        Option("o2", "C", reduction_tco2=10, capex_eur=1, opex_delta_eur_per_year=0, lifetime_years=10, requires=("o0",)),
+    ]
+    for solver in ("greedy", "auto", "bnb"):
+        with pytest.raises(ValueError, match="o0 -> o1 -> o0"):
+            optimize_portfolio(opts, target_reduction_tco2=None, max_capex_eur=10, solver=solver)
+    with pytest.raises(ValueError):
+        optimize_portfolio(opts[2:] + [Option("o0", "S", 1, 1, 0, 10, requires=("o0",))], target_reduction_tco2=None, max_capex_eur=10)
+
+
+def test_payload_default_is_exact_without_wall_clock_limit():
+    measures = to_optimizer_measures(default_library(), fx_try_per_eur=35.0)
+    payload = build_optimizer_payload(total_tco2=100_000, measures=measures, constraints={"target_reduction_pct": 20})
+    info = payload["portfolio"]["solver"]
+    assert payload["constraints"]["solver"] == "auto" and payload["constraints"]["time_limit_s"] is None
+    assert info["time_limit_s"] is None and info["status"] in ("optimal", "node_limit")
+
+
+def test_optimize_does_not_mutate_caller_options():
+    opts = [
+        Option("a", "A", reduction_tco2=-5, capex_eur=-10, opex_delta_eur_per_year=0, lifetime_years=10),
+        Option("b", "B", reduction_tco2=40, capex_eur=30, opex_delta_eur_per_year=0, lifetime_years=10),
+    ]
+    for solver in ("greedy", "auto"):
+        res = optimize_portfolio(opts, target_reduction_tco2=None, max_capex_eur=100, solver=solver)
+        assert res["summary"]["reduction_tco2"] == 40.0
+        assert (opts[0].reduction_tco2, opts[0].capex_eur) == (-5, -10)
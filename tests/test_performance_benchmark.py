@@ -0,0 +1,42 @@
+from src.services.performance_benchmark import (
+    BenchmarkCase,
+    compare_to_baseline,
+    default_cases,
+    run_benchmarks,
+    synthetic_materials,
+    synthetic_production,
+)
+
+
+def test_run_benchmarks_reports_percentiles_and_memory():
+    report = run_benchmarks([BenchmarkCase("alloc", lambda: [0] * 50_000, warmup=1, repeats=4)])
+    c = report["cases"][0]
+    assert c["ok"] and c["repeats"] == 4 and c["warmup"] == 1
+    assert c["min_ms"] <= c["p50_ms"] <= c["p95_ms"] <= c["max_ms"]
+    assert c["peak_mem_kb"] > 0
+    # legacy keys preserved
+    assert {"name", "ok", "seconds", "error"} <= set(c)
+
+
+def test_synthetic_generators_are_deterministic_and_acyclic():
+    a = synthetic_production(500, seed=7)
+    b = synthetic_production(500, seed=7)
+    assert a.equals(b)
+    m = synthetic_materials(500)
+    child = m["sku"].str.slice(4).astype(int)
+    parent = m["precursor_sku"].str.slice(4).astype(int)
+    assert bool((parent < child).all())
+
+
+def test_default_cases_run_and_baseline_flags_regression(db_session):
+    cases = default_cases("1k", n_rows=200, repeats=1, warmup=0)
+    report = run_benchmarks(cases, track_memory=False)
+    assert all(c["ok"] for c in report["cases"]), report["cases"]
+
+    baseline = {"cases": [dict(c, p50_ms=c["p50_ms"] / 10.0) for c in report["cases"]]}
+    cmp = compare_to_baseline(report, baseline, threshold_pct=20.0)
+    assert not cmp["ok"]
+    assert set(cmp["regressions"]) == {c["name"] for c in report["cases"]}
+
+    same = compare_to_baseline(report, report, threshold_pct=20.0)
+    assert same["ok"]
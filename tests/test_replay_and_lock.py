@@ -72,6 +72,17 @@ SKU-B,500,50,0.80,1,7202,Steel2
     assert snap.input_hash
     assert snap.result_hash
 
+    with db() as s:
+        row = s.get(type(snap), int(snap.id))
+        perf = json.loads(row.perf_trace_json or "{}")
+        energy = json.loads(row.results_json or "{}").get("energy") or {}
+    # kalıcı sonuçta enerji yalnız akış toplamlarıyla (ham ay × yakıt satırları ve faktör meta'sı yok)
+    assert energy["total_tco2"] == energy["direct_tco2"] + energy["indirect_tco2"]
+    assert energy["direct_rows"]
+    assert all("month" not in r and "factor_meta" not in r for r in energy["direct_rows"] + energy["indirect_rows"])
+    stages = perf.get("stage_timings_ms") or {}
+    assert "run_orchestrator" in stages and "orchestrator.cbam_compute" in stages and "compliance.evaluate" in stages
+
     # lock then replay
     lock_snapshot(int(snap.id))
     rep = replay(int(snap.id))
@@ -88,3 +99,56 @@ SKU-B,500,50,0.80,1,7202,Steel2
     except Exception:
         failed = True
     assert failed is True
+
+
+def test_multi_level_precursor_chain_replays_with_baseline_output(tmp_path: Path):
+    init_db()
+    with db() as s:
+        c = Company(name="TenantChain")
+        s.add(c)
+        s.commit()
+        f = Facility(company_id=c.id, name="Tesis Z", country="TR", sector="Steel")
+        s.add(f)
+        s.commit()
+        p = Project(company_id=c.id, facility_id=f.id, name="Proje Z", description="")
+        s.add(p)
+        s.commit()
+        project_id = int(p.id)
+
+    # A <- B <- C (çok seviyeli BOM)
+    energy_csv = "energy_carrier,scope,activity_amount,emission_factor_kgco2_per_unit\nnatural_gas,1,1000,2.00\nelectricity,2,5000,0.40\n"
+    prod_csv = (
+        "sku,quantity,export_to_eu_quantity,direct_emissions_tco2e,indirect_emissions_tco2e,cbam_covered,cn_code,product_name\n"
+        "A,100,50,10,1,1,7208,Sac\nB,200,0,20,2,1,7207,Yari\nC,400,0,40,4,1,7201,Pik\n"
+    )
+    mat_csv = "sku,precursor_sku,precursor_quantity,precursor_embedded_tco2\nA,B,100,0\nB,C,200,0\n"
+    _add_upload(project_id, "energy", _write(tmp_path / "energy.csv", energy_csv))
+    _add_upload(project_id, "production", _write(tmp_path / "production.csv", prod_csv))
+    _add_upload(project_id, "materials", _write(tmp_path / "materials.csv", mat_csv))
+
+    def _rows(snap) -> dict:
+        with db() as s:
+            res = json.loads(s.get(type(snap), int(snap.id)).results_json or "{}")
+        return {r["sku"]: r for r in res["cbam_table"]}
+
+    cfg = {"period": {"year": 2025}, "eua_price_eur_per_t": 70.0, "fx_tl_per_eur": 35.0}
+    snap = run_full(project_id=project_id, config=cfg, scenario={}, methodology_id=None, created_by_user_id=None)
+    rows = _rows(snap)
+    assert snap.engine_version == "engine-3.0.0-packetA"
+    # baseline: A'ya B'nin yalnızca kendi (precursor'sız) gömülü emisyonunun payı eklenir
+    assert rows["B"]["precursor_tco2e"] > 0.0
+    assert abs(rows["A"]["precursor_tco2e"] - (rows["B"]["direct_emissions_tco2e"] + rows["B"]["indirect_emissions_tco2e"]) * 100 / 200) < 1e-6
+    lock_snapshot(int(snap.id))
+    rep = replay(int(snap.id))
+    assert rep["input_hash_match"] is True and rep["result_hash_match"] is True
+
+    # yayılım yalnızca açık config ile ve ayrı engine version altında
+    chain_cfg = {**cfg, "cbam": {"precursor_chain_propagation": True}}
+    snap2 = run_full(project_id=project_id, config=chain_cfg, scenario={}, methodology_id=None, created_by_user_id=None)
+    rows2 = _rows(snap2)
+    assert snap2.engine_version == "engine-3.1.0-packetA-chain"
+    assert abs(rows2["A"]["precursor_tco2e"] - rows2["B"]["embedded_emissions_tco2e"] * 100 / 200) < 1e-6
+    assert rows2["A"]["precursor_tco2e"] > rows["A"]["precursor_tco2e"]
+    lock_snapshot(int(snap2.id))
+    rep2 = replay(int(snap2.id))
+    assert rep2["input_hash_match"] is True and rep2["result_hash_match"] is True
@@ -0,0 +1,72 @@
+from src.services import reporting
+from src.services.storage_backend import LocalStorageBackend
+
+
+def _data():
+    return {"kpis": {"energy_total_tco2": 12.5, "total_tco2": 20.0}, "config": {}, "cbam_table": []}
+
+
+def test_locked_report_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, "REPORT_DIR", tmp_path / "reports")
+    monkeypatch.setattr(reporting, "append_audit", None)
+    store = LocalStorageBackend(str(tmp_path / "blob"))
+
+    calls = []
+    real = reporting.build_pdf
+
+    def counting(*a, **kw):
+        calls.append(1)
+        return real(*a, **kw)
+
+    monkeypatch.setattr(reporting, "build_pdf", counting)
+
+    b1, sha1, hit1 = reporting.build_pdf_cached(7, "Rapor", _data(), result_hash="abc", storage=store)
+    b2, sha2, hit2 = reporting.build_pdf_cached(7, "Rapor", _data(), result_hash="abc", storage=store)
+    assert (hit1, hit2) == (False, True)
+    assert b1 == b2 and sha1 == sha2 and b1.startswith(b"%PDF")
+    assert len(calls) == 1
+    assert reporting.cached_pdf("abc", 7, "Rapor", storage=store) == b1
+
+    # farklı result_hash / başlık / şablon -> ayrı anahtar
+    assert reporting.cached_pdf("abd", 7, "Rapor", storage=store) == b""
+    assert reporting.cached_pdf("abc", 7, "Diğer", storage=store) == b""
+    assert reporting.report_cache_key("abc", 7, "Rapor") != reporting.report_cache_key("abc", 7, "Rapor", template_version="v2")
+
+    # kilitsiz (result_hash yok) -> her seferinde render
+    reporting.build_pdf_cached(7, "Rapor", _data(), result_hash="", storage=store)
+    assert len(calls) == 2
+
+
+def test_fonts_registered_once():
+    reporting._register_fonts.cache_clear()
+    reporting._register_fonts()
+    reporting._register_fonts()
+    assert reporting._register_fonts.cache_info().misses == 1
+
+
+def test_cache_hit_still_records_report_and_audit(snapshot_factory, tmp_path, monkeypatch):
+    import src.mrv.audit as audit_mod
+    from src.db.models import Report
+    from src.db.session import db
+    from src.services import exports
+
+    monkeypatch.chdir(tmp_path)
+    snap = snapshot_factory(locked=True)
+    pdf = b"%PDF-1.4 cached"
+    keys = []
+    monkeypatch.setattr(reporting, "cached_pdf", lambda rh, sid, variant="", **kw: keys.append((rh, sid, variant)) or pdf)
+    events = []
+    monkeypatch.setattr(audit_mod, "append_audit", lambda event, details=None, **kw: events.append((event, details)))
+
+    for _ in range(2):
+        data, sha = exports._ensure_pdf_for_snapshot(snap)
+        assert data == pdf
+
+    assert keys == [(snap.result_hash, snap.id, "evidence")] * 2
+    with db() as s:
+        rows = s.query(Report).filter(Report.snapshot_id == snap.id).all()
+    # aynı hash: ikinci hit yeni satır açmaz, mevcut kaydı tazeler
+    assert [(r.report_type, r.project_id, r.file_hash) for r in rows] == [("pdf", snap.project_id, sha)]
+    assert (tmp_path / rows[0].file_path).read_bytes() == pdf
+    assert [e for e, _ in events] == ["pdf_cache_hit", "pdf_cache_hit"]
+    assert events[0][1] == {"snapshot_id": snap.id, "sha256": sha}
@@ -0,0 +1,65 @@
+import pytest
+
+from src.engine.ets import ets_net_and_cost
+from src.engine.scenario_sweep import BaseDecomposition, decompose_results, run_sweep, scenario_grid, sweep_summary
+from src.services.cbam_liability import compute_cbam_liability
+
+
+def _base():
+    return BaseDecomposition(
+        direct_tco2=1000.0,
+        indirect_tco2=400.0,
+        cbam_direct_tco2=600.0,
+        cbam_indirect_tco2=200.0,
+        cbam_precursor_tco2=100.0,
+        export_share=0.5,
+        free_allocation_tco2=100.0,
+        carbon_price_paid_eur_per_t=10.0,
+        reporting_year=2030,
+        base_eua_price_eur_per_t=80.0,
+        base_fx_try_per_eur=35.0,
+    )
+
+
+def _double_total(row):
+    return {"double_total": row["total_tco2"] * 2}
+
+
+def test_grid_matches_scalar_formulas():
+    grid = scenario_grid(energy_reduction_pct=[0.0, 0.2], renewable_share=[0.0, 0.5], eua_price_eur_per_t=[60.0, 100.0])
+    out = run_sweep(_base(), grid)
+    assert len(out) == 8
+    r = out[(out.energy_reduction_pct == 0.2) & (out.renewable_share == 0.5) & (out.eua_price_eur_per_t == 100.0)].iloc[0]
+    assert r.total_tco2 == pytest.approx(800 + 400 * 0.8 * 0.5)
+    assert r.ets_cost_eur == pytest.approx((r.direct_tco2 - 100.0) * 100.0)
+    emb = 600 * 0.8 + 200 * 0.8 * 0.5 + 100
+    ref = compute_cbam_liability(year=2030, embedded_emissions_tco2=emb * 0.5, eu_ets_price_eur_per_t=100.0, carbon_price_paid_eur_per_t=10.0)
+    assert r.cbam_liability_eur == pytest.approx(ref.estimated_payable_amount_eur)
+    assert r.cbam_liability_try == pytest.approx(ref.estimated_payable_amount_eur * 35.0)
+
+
+def test_hashes_deterministic_and_pool_evaluator():
+    grid = scenario_grid(energy_reduction_pct=[0.0, 0.1, 0.3], fx_try_per_eur=[30.0, 40.0])
+    a = run_sweep(_base(), grid)
+    b = run_sweep(_base(), grid, evaluator=_double_total, processes=2, chunk_size=2)
+    assert a.scenario_hash.tolist() == b.scenario_hash.tolist()
+    assert a.scenario_hash.nunique() == len(a)
+    assert (b.double_total == b.total_tco2 * 2).all()
+    assert sweep_summary(_base(), a)["table_hash"] == sweep_summary(_base(), run_sweep(_base(), grid))["table_hash"]
+
+
+def test_unknown_axis_rejected():
+    with pytest.raises(ValueError):
+        scenario_grid(foo=[1])
+
+
+def test_decompose_uses_orchestrator_ets_inputs():
+    config = {"ets": {"free_alloc_t": 300.0, "banked_t": 50.0}, "ai": {"prices": {"ets_free_allocation_tco2": 999.0}}}
+    ets = ets_net_and_cost(1000.0, free_alloc_t=300.0, banked_t=50.0, allowance_price_eur_per_t=80.0, fx_tl_per_eur=35.0)
+    results = {"kpis": {"scope1_tco2": 1000.0, "scope2_tco2": 400.0}, "ets": {"net_and_cost": ets}}
+    base = decompose_results(results, config)
+    assert (base.free_allocation_tco2, base.banked_tco2, base.base_eua_price_eur_per_t) == (300.0, 50.0, 80.0)
+    r = run_sweep(base, scenario_grid(energy_reduction_pct=[0.0])).iloc[0]
+    assert r.ets_cost_eur == pytest.approx(ets["cost_eur"])
+    # ets bloğu olmayan eski sonuçlarda config.ets okunur
+    assert decompose_results({"kpis": {}}, config).free_allocation_tco2 == 300.0
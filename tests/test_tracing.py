@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from src.services.tracing import current_ids, export_trace, span, start_trace, traced
+
+
+@traced("unit.work")
+def _work(n):
+    return sum(range(n))
+
+
+def test_spans_nest_and_report_stage_timings(tmp_path):
+    with start_trace("unit", export=False) as tr:
+        ids = current_ids()
+        with span("stage_a") as sp:
+            _work(1000)
+            sp.set(rows=1000)
+        with pytest.raises(ValueError):
+            with span("stage_b"):
+                raise ValueError("boom")
+
+    assert ids["trace_id"] == tr.trace_id
+    assert current_ids() == {}
+
+    d = tr.to_dict()
+    assert set(d["stage_timings_ms"]) == {"stage_a", "unit.work", "stage_b"}
+    by_name = {s["name"]: s for s in d["spans"]}
+    assert by_name["unit.work"]["parent_id"] == by_name["stage_a"]["span_id"]
+    assert by_name["stage_a"]["attrs"]["rows"] == 1000
+    assert by_name["stage_b"]["status"] == "error"
+
+    paths = export_trace(tr, str(tmp_path))
+    otlp = json.loads(open(paths["otlp"], encoding="utf-8").read())
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == len(d["spans"])
+    assert all(s["traceId"] == tr.trace_id for s in spans)
+
+
+def test_nested_trace_keeps_own_summary_and_feeds_parent():
+    with start_trace("job.x", export=False) as job:
+        with start_trace("run_full") as inner:
+            with span("factor_resolution"):
+                _work(100)
+            inner.attrs["reused"] = False
+        assert current_ids()["trace_id"] == job.trace_id
+
+    assert inner is not job and inner.trace_id == job.trace_id
+    d = inner.to_dict()
+    assert d["name"] == "run_full" and d["total_ms"] is not None
+    assert set(d["stage_timings_ms"]) == {"factor_resolution", "unit.work"}
+    assert set(job.stage_timings()) == {"run_full", "factor_resolution", "unit.work"}
+    by_name = {s["name"]: s for s in job.to_dict()["spans"]}
+    assert by_name["run_full"]["parent_id"] == by_name["job.x"]["span_id"]
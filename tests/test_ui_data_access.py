@@ -0,0 +1,25 @@
+def test_ui_snapshot_cache_is_tenant_scoped_and_invalidated(db_session, snapshot_factory):
+    from src.db.models import CalculationSnapshot, Project
+    from src.ui import data_access as da
+
+    snap_a = snapshot_factory(tenant_id="A")
+    snap_b = snapshot_factory(tenant_id="B")
+    company_a = db_session.get(Project, snap_a.project_id).company_id
+    company_b = db_session.get(Project, snap_b.project_id).company_id
+
+    rows = da.list_snapshots(company_a)
+    assert [r.id for r in rows] == [snap_a.id]
+    assert da.get_snapshot(company_a, snap_b.id) is None
+    assert da.get_snapshot(company_b, snap_b.id).result_hash == "result-B"
+
+    # invalidate sadece ilgili tenant + tür için generation'ı artırır
+    gen_a, gen_b = da.generation(da.KIND_SNAPSHOTS, company_a), da.generation(da.KIND_SNAPSHOTS, company_b)
+    db_session.add(CalculationSnapshot(project_id=snap_a.project_id, engine_version="test-engine", result_hash="result-A2"))
+    db_session.commit()
+    da.invalidate(company_a, da.KIND_SNAPSHOTS)
+    assert da.generation(da.KIND_SNAPSHOTS, company_a) == gen_a + 1
+    assert da.generation(da.KIND_SNAPSHOTS, company_b) == gen_b
+    assert da.generation(da.KIND_UPLOADS, company_a) == 0
+
+    assert len(da.list_snapshots(company_a)) == 2
+    assert len(da.list_snapshots(company_b)) == 1
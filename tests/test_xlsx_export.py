@@ -0,0 +1,32 @@
+import io
+import json
+
+from openpyxl import load_workbook
+
+from src.services.exports import build_xlsx_from_results
+
+
+def _cells(data: bytes) -> dict:
+    wb = load_workbook(io.BytesIO(data))
+    return {ws.title: [[c.value for c in r] for r in ws.iter_rows()] for ws in wb.worksheets}
+
+
+def test_streaming_xlsx_matches_pandas_layout():
+    results = {
+        "kpis": {"total_tco2": 12.5, "note": "x", "empty": None},
+        "cbam_table": [{"sku": "A", "qty": 1.5} if i % 3 else {"sku": "B", "cn_code": "7208"} for i in range(50)],
+        "cbam": {"totals": {"goods_summary": [{"good": "steel", "meta": {"k": 1}}]}},
+        "ets": {"verification": {"activity_data": []}},
+    }
+    js = json.dumps(results)
+
+    streamed = _cells(build_xlsx_from_results(js))
+    legacy = _cells(build_xlsx_from_results(js, streaming=False))
+    assert list(streamed) == ["KPIs", "CBAM_Table", "CBAM_Goods"]
+    assert streamed == legacy
+    assert streamed["CBAM_Table"][0] == ["sku", "cn_code", "qty"]
+
+
+def test_streaming_xlsx_empty_results():
+    assert list(_cells(build_xlsx_from_results("{}"))) == ["KPIs", "CBAM_Table"]
+    assert list(_cells(build_xlsx_from_results("not json"))) == ["KPIs", "CBAM_Table"]